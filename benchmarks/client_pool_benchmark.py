@@ -0,0 +1,114 @@
+"""Connection pool benchmark: concurrent S3 PUTs through a default boto3 client and the shared client factory.
+
+Run from the repository root (needs boto3, no AWS access):
+    python benchmarks/client_pool_benchmark.py --threads 8 32 --requests 1000 --latency-ms 50
+Both clients talk to a local HTTP/1.1 stand-in for S3 that counts the TCP connections it accepts. Requests come
+in bursts of one per thread, like the uploads of a batch of pages. A pool keeps at most its size in idle
+connections, so after every burst wider than the default client's 10 connections the rest are closed and
+opened again for the next one; the factory's client, sized by S3_MAX_CONNECTIONS, keeps reusing them.
+"""
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+class StubS3Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # A burst of new connections overflows the default backlog of 5, and SYN retries would skew the latencies
+    request_queue_size = 256
+
+class StubS3Handler(BaseHTTPRequestHandler):
+    """Answers every PUT after the server's latency, keeping the connection open between requests"""
+    protocol_version = "HTTP/1.1"
+
+    def setup(self) -> None:
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_PUT(self) -> None:
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(self.server.latency)
+        self.send_response(200)
+        self.send_header("ETag", '"bench"')
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args) -> None:
+        pass
+
+def start_server(latency: float) -> ThreadingHTTPServer:
+    server = StubS3Server(("127.0.0.1", 0), StubS3Handler)
+    server.latency = latency
+    server.lock = threading.Lock()
+    server.connections = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def percentile(ordered: List[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+def run(client, server: ThreadingHTTPServer, threads: int, requests: int, payload: bytes) -> Dict:
+    server.connections = 0
+    latencies = []
+
+    def put(i: int) -> None:
+        start = time.perf_counter()
+        client.put_object(Bucket="bench", Key=f"object-{i}", Body=payload)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        for first in range(0, requests, threads):
+            list(executor.map(put, range(first, min(requests, first + threads))))
+    seconds = time.perf_counter() - start
+    latencies.sort()
+    return {"requests_per_second": round(requests / seconds, 1), "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 1), "connections": server.connections}
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, nargs="+", default=[8, 32], help="Concurrent callers to test")
+    parser.add_argument("--requests", type=int, default=1000, help="PUTs per run")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Server time per request")
+    parser.add_argument("--payload-kb", type=int, default=64)
+    args = parser.parse_args()
+
+    server = start_server(args.latency_ms / 1000)
+    os.environ["AWS_ENDPOINT_URL_S3"] = f"http://127.0.0.1:{server.server_address[1]}"
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "benchmark")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "benchmark")
+    os.environ.setdefault("AWS_REGION", "us-east-1")
+    # urllib3 warns for every connection it discards from a full pool
+    logging.getLogger("urllib3.connectionpool").setLevel(logging.ERROR)
+
+    import boto3
+
+    from extractor.clients import connection_pool_stats, get_s3_client
+
+    default_client = boto3.client("s3", region_name=os.environ["AWS_REGION"])
+    shared_client = get_s3_client()
+    payload = os.urandom(args.payload_kb * 1024)
+
+    print(f"{'client':>8} {'threads':>8} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'conns':>6}")
+    for threads in args.threads:
+        for name, client in (("default", default_client), ("shared", shared_client)):
+            result = run(client, server, threads, args.requests, payload)
+            print(f"{name:>8} {threads:>8} {result['requests_per_second']:>8} {result['p50_ms']:>8} "
+                  f"{result['p99_ms']:>8} {result['connections']:>6}")
+    stats = connection_pool_stats().get("s3", {})
+    print(f"shared pool: size {stats.get('size')}, peak in use {stats.get('peak_in_use')}, "
+          f"requests {stats.get('requests')}, saturated {stats.get('saturated')}, opened {stats.get('opened')}")
+    server.shutdown()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""Export benchmark: the in-memory to_excel report versus the streaming report writer.
+
+Run from the repository root:
+    python benchmarks/export_benchmark.py --rows 200000
+    python benchmarks/export_benchmark.py --rows 200000 --formats .xlsx .parquet --s3
+Each strategy runs in its own process and reports its peak resident memory; --s3 streams into a fake S3
+multipart upload instead of a local file.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from fakes import FakeS3  # noqa: E402
+from golden_corpus import generate_records  # noqa: E402
+
+def peak_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def documents(rows: int):
+    """(result, validation, doc_type) triples, generated lazily as a checkpoint reader would yield them"""
+    from extractor.validation import validate_bill_data, validate_cheque_data
+
+    # A fixed pool of records keeps the generator itself out of the memory being measured
+    pool = generate_records(1000)
+    for i in range(rows):
+        record = pool[i % len(pool)]
+        validate = validate_cheque_data if record["doc_type"] == "cheque" else validate_bill_data
+        yield record["fields"], validate(record["fields"]), record["doc_type"]
+
+def run_strategy(strategy: str, rows: int, file_format: str, s3: bool) -> Dict:
+    from extractor.clients import set_client
+    from extractor.export import stream_report, to_excel
+
+    fake = FakeS3(latency_ms=20)
+    set_client("s3", fake)
+    destination = f"s3://bench/report{file_format}" if s3 else \
+        os.path.join(tempfile.mkdtemp(prefix="export-bench-"), f"report{file_format}")
+    baseline = peak_mb()
+    start = time.perf_counter()
+    if strategy == "stream":
+        stream_report(documents(rows), destination, file_format)
+    else:
+        # The pre-streaming path: every result in lists, every row in a DataFrame, the workbook in bytes
+        results, validations, doc_types = [], [], []
+        for result, validation, doc_type in documents(rows):
+            results.append(result)
+            validations.append(validation)
+            doc_types.append(doc_type)
+        excel_bytes = to_excel(results, [None] * rows, validations, doc_types)
+        if s3:
+            fake.put_object(Bucket="bench", Key=f"report{file_format}", Body=excel_bytes)
+        else:
+            with open(destination, "wb") as out:
+                out.write(excel_bytes)
+    seconds = time.perf_counter() - start
+    size = len(fake.objects[f"bench/report{file_format}"]) if s3 else os.path.getsize(destination)
+    return {"strategy": strategy, "format": file_format, "rows": rows, "seconds": round(seconds, 2),
+            "peak_growth_mb": round(peak_mb() - baseline, 1), "size_mb": round(size / 1e6, 1)}
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200000, help="Documents in the report")
+    parser.add_argument("--formats", nargs="+", default=[".xlsx", ".csv", ".parquet"],
+                        help="Streaming formats to measure (the in-memory baseline is always .xlsx)")
+    parser.add_argument("--s3", action="store_true", help="Write to a fake S3 bucket instead of a local file")
+    parser.add_argument("--strategy", choices=["memory", "stream"], help=argparse.SUPPRESS)
+    parser.add_argument("--format", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.strategy:
+        print(json.dumps(run_strategy(args.strategy, args.rows, args.format, args.s3)))
+        return 0
+
+    print(f"{'strategy':>8} {'format':>8} {'rows':>8} {'seconds':>8} {'peak MB':>8} {'size MB':>8}")
+    runs = [("memory", ".xlsx")] + [("stream", file_format) for file_format in args.formats]
+    for strategy, file_format in runs:
+        command = [sys.executable, os.path.abspath(__file__), "--strategy", strategy, "--format", file_format,
+                   "--rows", str(args.rows)] + (["--s3"] if args.s3 else [])
+        output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{strategy:>8} {file_format:>8} {result['rows']:>8} {result['seconds']:>8} "
+              f"{result['peak_growth_mb']:>8} {result['size_mb']:>8}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,312 @@
+"""Offline stand-ins for the Bedrock runtime and S3 clients used by the benchmark harness.
+
+Install them with ``extractor.clients.set_client`` so the unmodified extraction code runs without AWS.
+"""
+import hashlib
+import json
+import random
+import threading
+import time
+from io import BytesIO
+from typing import Callable, Dict, Iterator, List, Optional
+
+# Characters of text per streamed delta event, a few tokens as Bedrock sends them
+STREAM_CHUNK_CHARS = 16
+
+class FakeClientError(Exception):
+    """Mimics botocore's ClientError closely enough for the retry and throttling logic"""
+
+    def __init__(self, code: str, message: str = "", status: int = 400):
+        super().__init__(f"An error occurred ({code}): {message or code}")
+        self.response = {"Error": {"Code": code, "Message": message or code},
+                         "ResponseMetadata": {"HTTPStatusCode": status}}
+
+def request_key(body: Dict) -> str:
+    """Stable key of a request's prompt text and image payload, used to match recorded responses"""
+    digest = hashlib.sha256()
+    for message in body.get("messages", []):
+        for block in message.get("content", []):
+            if block.get("type") == "text":
+                digest.update(block["text"].encode('utf-8'))
+            elif block.get("type") == "image":
+                digest.update(block["source"]["data"].encode('utf-8'))
+    return digest.hexdigest()
+
+def load_recordings(path: str) -> Dict[str, Dict]:
+    """Read a JSONL file of {"key", "response"} records written by RecordingBedrockRuntime"""
+    recordings = {}
+    with open(path, encoding='utf-8') as records:
+        for line in records:
+            if line.strip():
+                record = json.loads(line)
+                recordings[record["key"]] = record["response"]
+    return recordings
+
+def input_tokens(body: Dict) -> int:
+    """Approximate billed input tokens: ~4 characters per text token and a flat 1600 per (downscaled) image"""
+    tokens = 0
+    for message in body.get("messages", []):
+        for block in message.get("content", []):
+            tokens += 1600 if block.get("type") == "image" else len(json.dumps(block)) // 4
+    return tokens
+
+def stream_event(event: Dict) -> Dict:
+    """One event of a Bedrock response stream, wrapping an Anthropic streaming message event"""
+    return {"chunk": {"bytes": json.dumps(event).encode('utf-8')}}
+
+class FakeEventStream:
+    """Iterable of response-stream events with the close() of botocore's EventStream"""
+
+    def __init__(self, events: Iterator[Dict], on_close: Optional[Callable[[], None]] = None):
+        self._events = events
+        self._on_close = on_close
+        self._closed = False
+
+    def __iter__(self) -> Iterator[Dict]:
+        try:
+            yield from self._events
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._events.close()
+        if self._on_close is not None:
+            self._on_close()
+
+# --- Fake Bedrock Runtime ---
+class FakeBedrockRuntime:
+    """Serves recorded or synthesized model responses with injected latency and throttling
+
+    Streamed responses deliver their first text after first_token_share of the sampled latency and spread the
+    rest over the delta events, so a complete stream takes as long as the equivalent invoke_model call.
+    fault_rate is the probability a call fails with a 503, and slow_rate the probability it takes slow_factor
+    times longer than sampled, like a request stuck on an overloaded host.
+    """
+
+    def __init__(self, responder: Optional[Callable[[Dict, str], str]] = None,
+                 recordings: Optional[Dict[str, Dict]] = None, latency_ms: float = 800.0, latency_jitter: float = 0.3,
+                 throttle_rate: float = 0.0, max_concurrency: Optional[int] = None, seed: int = 0,
+                 model_latency_ms: Optional[Dict[str, float]] = None, first_token_share: float = 0.4,
+                 fault_rate: float = 0.0, slow_rate: float = 0.0, slow_factor: float = 10.0):
+        self.responder = responder
+        self.recordings = recordings or {}
+        self.latency_ms = latency_ms
+        # Median latency of models whose id contains the key (e.g. {"sonnet": 2500}), overriding latency_ms
+        self.model_latency_ms = model_latency_ms or {}
+        self.latency_jitter = latency_jitter
+        self.first_token_share = first_token_share
+        self.fault_rate = fault_rate
+        self.slow_rate = slow_rate
+        self.slow_factor = slow_factor
+        self.throttle_rate = throttle_rate
+        # Requests beyond this many in flight are throttled, like a per-account concurrency quota
+        self.max_concurrency = max_concurrency
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.calls = 0
+        self.throttles = 0
+        self.replayed = 0
+        self.faults = 0
+        self.slow_calls = 0
+
+    def _sample_latency(self, model_id: str) -> float:
+        with self._lock:
+            factor = self._random.lognormvariate(0.0, self.latency_jitter) if self.latency_jitter else 1.0
+            if self._random.random() < self.slow_rate:
+                self.slow_calls += 1
+                factor *= self.slow_factor
+        latency_ms = next((ms for key, ms in self.model_latency_ms.items() if key in model_id), self.latency_ms)
+        return latency_ms * factor / 1000.0
+
+    def _admit(self) -> None:
+        """Count a call, throttling it like the service would"""
+        with self._lock:
+            self.calls += 1
+            throttled = self._random.random() < self.throttle_rate or (
+                self.max_concurrency is not None and self._in_flight >= self.max_concurrency)
+            if throttled:
+                self.throttles += 1
+            else:
+                self._in_flight += 1
+        if throttled:
+            # Throttles come back quickly, as they do from the real service
+            time.sleep(0.01)
+            raise FakeClientError("ThrottlingException", "Rate exceeded", status=429)
+        with self._lock:
+            faulted = self._random.random() < self.fault_rate
+            if faulted:
+                self.faults += 1
+                self._in_flight -= 1
+        if faulted:
+            time.sleep(0.05)
+            raise FakeClientError("ServiceUnavailableException", "Service unavailable", status=503)
+
+    def _release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    def _payload(self, request: Dict, model_id: str) -> Dict:
+        recorded = self.recordings.get(request_key(request))
+        if recorded is not None:
+            with self._lock:
+                self.replayed += 1
+            return recorded
+        if self.responder is None:
+            raise FakeClientError("ValidationException", "No recorded response for this request")
+        text = self.responder(request, model_id)
+        return {
+            "content": [{"type": "text", "text": text}],
+            "usage": {"input_tokens": input_tokens(request), "output_tokens": max(1, len(text) // 4)}
+        }
+
+    def invoke_model(self, modelId: str, body: str, **kwargs) -> Dict:
+        request = json.loads(body)
+        self._admit()
+        try:
+            time.sleep(self._sample_latency(modelId))
+            payload = self._payload(request, modelId)
+            return {"body": BytesIO(json.dumps(payload).encode('utf-8'))}
+        finally:
+            self._release()
+
+    def invoke_model_with_response_stream(self, modelId: str, body: str, **kwargs) -> Dict:
+        request = json.loads(body)
+        self._admit()
+        return {"body": FakeEventStream(self._stream(request, modelId), on_close=self._release)}
+
+    def _stream(self, request: Dict, model_id: str) -> Iterator[Dict]:
+        latency = self._sample_latency(model_id)
+        time.sleep(latency * self.first_token_share)
+        payload = self._payload(request, model_id)
+        text = payload["content"][0]["text"]
+        usage = payload.get("usage", {})
+        yield stream_event({"type": "message_start",
+                            "message": {"usage": {"input_tokens": usage.get("input_tokens", 0), "output_tokens": 1}}})
+        chunks = [text[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(text), STREAM_CHUNK_CHARS)] or [""]
+        pause = latency * (1 - self.first_token_share) / len(chunks)
+        for i, chunk in enumerate(chunks):
+            if i:
+                time.sleep(pause)
+            yield stream_event({"type": "content_block_delta", "index": 0,
+                                "delta": {"type": "text_delta", "text": chunk}})
+        time.sleep(pause)
+        yield stream_event({"type": "message_delta", "delta": {"stop_reason": "end_turn"},
+                            "usage": {"output_tokens": usage.get("output_tokens", 0)}})
+        yield stream_event({"type": "message_stop"})
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"calls": self.calls, "throttles": self.throttles, "replayed": self.replayed,
+                    "faults": self.faults, "slow_calls": self.slow_calls}
+
+class RecordingBedrockRuntime:
+    """Wraps a real Bedrock runtime client and appends every response to a JSONL file for later replay"""
+
+    def __init__(self, client, path: str):
+        self.client = client
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _record(self, body: str, payload: Dict) -> None:
+        with self._lock, open(self.path, "a", encoding='utf-8') as records:
+            records.write(json.dumps({"key": request_key(json.loads(body)), "response": payload}) + "\n")
+
+    def invoke_model(self, modelId: str, body: str, **kwargs) -> Dict:
+        response = self.client.invoke_model(modelId=modelId, body=body, **kwargs)
+        payload = json.loads(response['body'].read())
+        self._record(body, payload)
+        return {"body": BytesIO(json.dumps(payload).encode('utf-8'))}
+
+    def invoke_model_with_response_stream(self, modelId: str, body: str, **kwargs) -> Dict:
+        response = self.client.invoke_model_with_response_stream(modelId=modelId, body=body, **kwargs)
+        stream = response['body']
+        return {**response, "body": FakeEventStream(self._record_stream(body, stream), on_close=stream.close)}
+
+    def _record_stream(self, body: str, stream) -> Iterator[Dict]:
+        """Pass the events through, recording the response once the stream is read to the end"""
+        pieces = []
+        usage = {}
+        for event in stream:
+            chunk = json.loads(event['chunk']['bytes'])
+            if chunk['type'] == 'message_start':
+                usage.update(chunk['message'].get('usage', {}))
+            elif chunk['type'] == 'content_block_delta':
+                pieces.append(chunk['delta'].get('text', ''))
+            elif chunk['type'] == 'message_delta':
+                usage.update(chunk.get('usage', {}))
+            yield event
+        # A stream the caller abandoned early is not a complete response, so it is not recorded
+        self._record(body, {"content": [{"type": "text", "text": "".join(pieces)}], "usage": usage})
+
+# --- Fake S3 ---
+class FakeS3:
+    """In-memory S3 with per-request latency and optional transient failures"""
+
+    def __init__(self, latency_ms: float = 50.0, failure_rate: float = 0.0, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.objects: Dict[str, bytes] = {}
+        self.uploads: Dict[str, Dict[int, bytes]] = {}
+        self.requests = 0
+
+    def _call(self) -> None:
+        time.sleep(self.latency_ms / 1000.0)
+        with self._lock:
+            self.requests += 1
+            if self._random.random() < self.failure_rate:
+                raise FakeClientError("SlowDown", "Please reduce your request rate")
+
+    def _request(self, bucket: str, key: str, data: bytes) -> None:
+        self._call()
+        with self._lock:
+            self.objects[f"{bucket}/{key}"] = data
+
+    def put_object(self, Bucket: str, Key: str, Body: bytes, **kwargs) -> Dict:
+        self._request(Bucket, Key, Body)
+        return {}
+
+    def upload_fileobj(self, Fileobj, Bucket: str, Key: str, **kwargs) -> None:
+        self._request(Bucket, Key, Fileobj.read())
+
+    def get_object(self, Bucket: str, Key: str, **kwargs) -> Dict:
+        time.sleep(self.latency_ms / 1000.0)
+        with self._lock:
+            self.requests += 1
+            data = self.objects.get(f"{Bucket}/{Key}")
+        if data is None:
+            raise FakeClientError("NoSuchKey", "The specified key does not exist.")
+        return {"Body": BytesIO(data), "ContentLength": len(data)}
+
+    def create_multipart_upload(self, Bucket: str, Key: str, **kwargs) -> Dict:
+        self._call()
+        with self._lock:
+            self.uploads[f"{Bucket}/{Key}"] = {}
+        return {"UploadId": f"{Bucket}/{Key}"}
+
+    def upload_part(self, Bucket: str, Key: str, UploadId: str, PartNumber: int, Body: bytes, **kwargs) -> Dict:
+        self._call()
+        with self._lock:
+            self.uploads[UploadId][PartNumber] = bytes(Body)
+        return {"ETag": f'"{PartNumber}"'}
+
+    def complete_multipart_upload(self, Bucket: str, Key: str, UploadId: str, MultipartUpload: Dict,
+                                  **kwargs) -> Dict:
+        with self._lock:
+            parts = self.uploads.pop(UploadId)
+        self._request(Bucket, Key, b"".join(parts[part["PartNumber"]] for part in MultipartUpload["Parts"]))
+        return {}
+
+    def abort_multipart_upload(self, Bucket: str, Key: str, UploadId: str, **kwargs) -> Dict:
+        with self._lock:
+            self.uploads.pop(UploadId, None)
+        return {}
+
+    def keys(self) -> List[str]:
+        with self._lock:
+            return list(self.objects)
@@ -0,0 +1,198 @@
+"""Synthetic golden dataset of cheques and bills with ground-truth fields, and a model stand-in that answers from it."""
+import hashlib
+import json
+import os
+import random
+import threading
+from typing import Dict, List, Optional, Tuple
+
+BANKS = [("STATE BANK OF INDIA", "SBIN"), ("HDFC BANK", "HDFC"), ("ICICI BANK", "ICIC"),
+         ("AXIS BANK", "UTIB"), ("PUNJAB NATIONAL BANK", "PUNB"), ("CANARA BANK", "CNRB")]
+NAMES = ["RAHUL SHARMA", "PRIYA NAIR", "AMIT PATEL", "SNEHA REDDY", "VIKRAM SINGH", "ANJALI GUPTA"]
+VENDORS = ["SHREE GANESH TRADERS PVT LTD", "METRO OFFICE SUPPLIES LTD", "BLUE LEAF CAFE PVT LTD",
+           "SUNRISE ELECTRONICS PVT LTD", "GREEN VALLEY PHARMA LTD"]
+PAYMENT_METHODS = ["Cash", "Card", "UPI", "Cheque"]
+ALNUM = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+
+# --- Ground Truth ---
+def _cheque_fields(rng: random.Random) -> Dict:
+    bank, ifsc_prefix = rng.choice(BANKS)
+    return {
+        "bank": bank,
+        "account_holder": rng.choice(NAMES),
+        "account_number": "".join(rng.choice("0123456789") for _ in range(rng.randint(11, 16))),
+        "amount": rng.randint(500, 5000000),
+        "ifsc_code": ifsc_prefix + "0" + "".join(rng.choice(ALNUM) for _ in range(6)),
+        "date": f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.randint(2023, 2026)}",
+        "has_signature": rng.random() < 0.9,
+    }
+
+def _bill_fields(rng: random.Random) -> Dict:
+    total = rng.randint(5000, 5000000) / 100
+    gst = (f"{rng.randint(10, 37)}" + "".join(rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ") for _ in range(5)) +
+           f"{rng.randint(1000, 9999)}" + rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ") + rng.choice("123456789") + "Z" +
+           rng.choice(ALNUM))
+    vendor = rng.choice(VENDORS)
+    return {
+        "vendor_name": vendor,
+        "bill_number": f"INV-{rng.randint(10000, 999999)}",
+        "date": f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.randint(2023, 2026)}",
+        "total_amount": f"{total:.2f}",
+        "tax_amount": f"{total * 0.18:.2f}",
+        "gst_number": gst,
+        "vendor_phone": f"+91 {rng.choice('6789')}{rng.randint(100000000, 999999999)}",
+        "vendor_email": f"accounts@{vendor.split()[0].lower()}.in",
+        "customer_name": rng.choice(NAMES),
+        "payment_method": rng.choice(PAYMENT_METHODS),
+        "currency": "₹",
+    }
+
+def generate_records(count: int, bill_ratio: float = 0.4, seed: int = 7) -> List[Dict]:
+    """Deterministic ground-truth records for a mixed cheque/bill corpus"""
+    rng = random.Random(seed)
+    records = []
+    for i in range(count):
+        doc_type = "bill" if rng.random() < bill_ratio else "cheque"
+        fields = _bill_fields(rng) if doc_type == "bill" else _cheque_fields(rng)
+        records.append({"name": f"{doc_type}_{i:05d}.jpg", "doc_type": doc_type, "fields": fields})
+    return records
+
+def render_document(record: Dict):
+    """Draw a record onto a lightly noisy page: a ~2.2:1 cheque with a MICR line, or a portrait A4 bill"""
+    from PIL import Image, ImageDraw
+
+    rng = random.Random(record["name"])
+    size = (2400, 1090) if record["doc_type"] == "cheque" else (1240, 1754)
+    # Faint per-document noise keeps every page's pixels (and so its payload) distinct
+    image = Image.blend(Image.new('RGB', size, (246, 244, 238)), Image.effect_noise(size, 16).convert('RGB'), 0.06)
+    draw = ImageDraw.Draw(image)
+    draw.text((60, 40), record["doc_type"].upper(), fill=(10, 10, 10))
+    for row, (field, value) in enumerate(record["fields"].items()):
+        draw.text((60, 120 + row * 80), f"{field}: {value}", fill=(20, 20, 20))
+
+    width, height = size
+    if record["doc_type"] == "cheque":
+        # MICR code line: a row of solid glyph-sized blocks across the bottom band
+        top = int(height * 0.9)
+        for x in range(int(width * 0.15), int(width * 0.75), 34):
+            draw.rectangle((x, top, x + 20 + rng.randint(0, 6), top + 30), fill=(15, 15, 15))
+    else:
+        # Line items
+        for row in range(rng.randint(12, 25)):
+            y = 1050 + row * 26
+            if y > height - 60:
+                break
+            draw.text((60, y), f"Item {row + 1}  x{rng.randint(1, 9)}  {rng.randint(10, 999)}.00", fill=(20, 20, 20))
+    return image
+
+# --- Corpus Files ---
+def save_corpus(directory: str, records: List[Dict]) -> None:
+    """Write rendered images plus a golden.jsonl manifest of ground truth"""
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, "golden.jsonl"), "w", encoding='utf-8') as manifest:
+        for record in records:
+            render_document(record).save(os.path.join(directory, record["name"]), format='JPEG', quality=90)
+            manifest.write(json.dumps({"path": record["name"], **record}, ensure_ascii=False) + "\n")
+
+def load_corpus(directory: str) -> List[Dict]:
+    """Read golden.jsonl records, resolving image paths against the corpus directory"""
+    records = []
+    with open(os.path.join(directory, "golden.jsonl"), encoding='utf-8') as manifest:
+        for line in manifest:
+            if line.strip():
+                record = json.loads(line)
+                record["path"] = os.path.join(directory, record["path"])
+                records.append(record)
+    return records
+
+# --- Model Stand-in ---
+def _perturb(value, rng: random.Random):
+    """Introduce a plausible OCR-style error into one field value"""
+    if isinstance(value, bool):
+        return not value
+    text = str(value)
+    if not text:
+        return text
+    position = rng.randrange(len(text))
+    return text[:position] + rng.choice(ALNUM) + text[position + 1:]
+
+class GoldenResponder:
+    """Answers detection, yes/no validation, per-type and unified extraction prompts from ground truth
+
+    Requests carrying several images get a JSON array with one indexed entry per image; batch_miss_rate is the
+    probability that an entry is dropped or merged into its neighbour, as a model sometimes does.
+    model_error_rates overrides error_rate for models whose id contains the key, e.g. {"sonnet": 0.005}.
+    """
+
+    def __init__(self, error_rate: float = 0.0, seed: int = 0, batch_miss_rate: float = 0.0,
+                 model_error_rates: Optional[Dict[str, float]] = None):
+        self.error_rate = error_rate
+        self.batch_miss_rate = batch_miss_rate
+        self.model_error_rates = model_error_rates or {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._documents: Dict[str, Dict] = {}
+
+    def register(self, model_payload: str, record: Dict) -> None:
+        """Associate the exact base64 image the pipeline will send with its ground-truth record"""
+        self._documents[hashlib.sha256(model_payload.encode('utf-8')).hexdigest()] = record
+
+    def _fields(self, record: Dict, model_id: str = "") -> Dict:
+        error_rate = next((rate for key, rate in self.model_error_rates.items() if key in model_id), self.error_rate)
+        fields = {}
+        with self._lock:
+            for field, value in record["fields"].items():
+                fields[field] = _perturb(value, self._rng) if self._rng.random() < error_rate else value
+        # The model returns amounts as strings, as the prompts ask
+        if "amount" in fields:
+            fields["amount"] = str(fields["amount"])
+        return fields
+
+    def _record(self, block: Dict) -> Optional[Dict]:
+        return self._documents.get(hashlib.sha256(block["source"]["data"].encode('utf-8')).hexdigest())
+
+    def _batch_answer(self, prompt: str, images: List[Dict], model_id: str) -> str:
+        entries = []
+        for index, block in enumerate(images):
+            record = self._record(block)
+            doc_type = record["doc_type"] if record else "unknown"
+            if '"document_type"' in prompt:
+                entry = {"index": index, "document_type": doc_type, "is_valid": record is not None}
+            else:
+                entry = {"index": index, "is_valid": doc_type == ("cheque" if "bank cheque" in prompt else "bill")}
+            entry["fields"] = self._fields(record, model_id) if record and entry["is_valid"] else {}
+            with self._lock:
+                missed = self._rng.random() < self.batch_miss_rate
+                merged = missed and bool(entries) and self._rng.random() < 0.5
+            if merged:
+                entries[-1]["index"] = f"{entries[-1]['index']}, {index}"
+            elif not missed:
+                entries.append(entry)
+        return json.dumps(entries, ensure_ascii=False)
+
+    def __call__(self, request: Dict, model_id: str = "") -> str:
+        content = request["messages"][0]["content"]
+        prompt = content[0]["text"]
+        images = [block for block in content if block.get("type") == "image"]
+        if len(images) > 1:
+            return self._batch_answer(prompt, images, model_id)
+        record = self._record(images[0])
+        doc_type = record["doc_type"] if record else "unknown"
+
+        if '"document_type"' in prompt:
+            fields = self._fields(record, model_id) if record else {}
+            return json.dumps({"document_type": doc_type, "is_valid": record is not None, "fields": fields},
+                              ensure_ascii=False)
+        if "Respond with just one word" in prompt:
+            return doc_type
+        if "'yes' or 'no'" in prompt:
+            asked = "cheque" if "bank cheque" in prompt else "bill"
+            return "yes" if doc_type == asked else "no"
+        return json.dumps(self._fields(record, model_id) if record else {}, ensure_ascii=False)
+
+def field_accuracy(expected: Dict, actual: Dict) -> Tuple[int, int]:
+    """Count ground-truth fields reproduced exactly (case- and whitespace-insensitive); return (matched, total)"""
+    matched = 0
+    for field, value in expected.items():
+        matched += str(actual.get(field, "")).strip().upper() == str(value).strip().upper()
+    return matched, len(expected)
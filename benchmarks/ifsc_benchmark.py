@@ -0,0 +1,112 @@
+"""IFSC index benchmark: build time, size, load time and per-lookup latency.
+
+Run from the repository root:
+    python benchmarks/ifsc_benchmark.py --source IFSC.csv          # the full RBI list (~170k codes)
+    python benchmarks/ifsc_benchmark.py --codes 170000             # a synthetic list of the same size
+"""
+import argparse
+import csv
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from typing import List
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from golden_corpus import ALNUM, BANKS  # noqa: E402
+from offline_benchmark import percentile  # noqa: E402
+
+STATES = ["MAHARASHTRA", "KARNATAKA", "TAMIL NADU", "DELHI", "GUJARAT", "WEST BENGAL", "KERALA", "PUNJAB"]
+
+def synthetic_list(path: str, codes: int, seed: int) -> List[str]:
+    """Write an RBI-shaped CSV of roughly 1,300 banks and return its codes"""
+    rng = random.Random(seed)
+    banks = list(BANKS) + [(f"SAMPLE {i} CO-OPERATIVE BANK LIMITED", f"Q{i:03d}") for i in range(1300 - len(BANKS))]
+    written = set()
+    with open(path, "w", newline="", encoding='utf-8') as out:
+        writer = csv.writer(out)
+        writer.writerow(["BANK", "IFSC", "BRANCH", "ADDRESS", "CITY1", "CITY2", "STATE", "MICR CODE"])
+        while len(written) < codes:
+            # A few large banks own most branches, as in the real list
+            bank, prefix = BANKS[rng.randrange(len(BANKS))] if rng.random() < 0.6 else rng.choice(banks)
+            ifsc = prefix + "0" + "".join(rng.choice(ALNUM) for _ in range(6))
+            if ifsc in written:
+                continue
+            written.add(ifsc)
+            city = f"CITY {rng.randint(1, 4000)}"
+            writer.writerow([bank, ifsc, f"{city} MAIN BRANCH", f"{rng.randint(1, 300)} MG ROAD, {city}", city,
+                             city, rng.choice(STATES), f"{rng.randint(100000000, 999999999)}"])
+    return sorted(written)
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--source", nargs="+", help="RBI IFSC list files (.csv or .xlsx)")
+    parser.add_argument("--codes", type=int, default=170000, help="Synthetic codes when no source is given")
+    parser.add_argument("--lookups", type=int, default=100000, help="Single-code lookups to time")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    from extractor.ifsc import IfscIndex, build_ifsc_index, set_ifsc_index
+    from extractor.validation import validate_cheque_data
+
+    workdir = tempfile.mkdtemp(prefix="ifsc-bench-")
+    index_path = os.path.join(workdir, "ifsc_index.sqlite3")
+    sources = args.source
+    if not sources:
+        sources = [os.path.join(workdir, "ifsc.csv")]
+        synthetic_list(sources[0], args.codes, args.seed)
+
+    start = time.perf_counter()
+    count = build_ifsc_index(sources, index_path)
+    build_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = IfscIndex(index_path)
+    load_ms = (time.perf_counter() - start) * 1000
+
+    rng = random.Random(args.seed)
+    with sqlite3.connect(index_path) as conn:
+        known = [row[0] for row in conn.execute("SELECT ifsc FROM branches")]
+    # Mostly real codes plus well-formed ones that are not listed
+    queries = [rng.choice(known) if rng.random() < 0.9 else "ZZZZ0" + "".join(rng.choice(ALNUM) for _ in range(6))
+               for _ in range(args.lookups)]
+    timings = []
+    for code in queries:
+        start = time.perf_counter()
+        index.lookup(code)
+        timings.append((time.perf_counter() - start) * 1e6)
+
+    batch = rng.sample(known, min(10000, len(known)))
+    start = time.perf_counter()
+    index.lookup_many(batch)
+    batch_us = (time.perf_counter() - start) * 1e6 / len(batch)
+
+    print(f"codes indexed        {count}")
+    print(f"banks                {len(index.banks)}")
+    print(f"index size           {os.path.getsize(index_path) / 1e6:.1f} MB")
+    print(f"build                {build_seconds:.2f} s")
+    print(f"load                 {load_ms:.1f} ms")
+    print(f"lookup mean          {statistics.mean(timings):.1f} us")
+    print(f"lookup p50 / p99     {percentile(timings, 50):.1f} / {percentile(timings, 99):.1f} us")
+    print(f"lookup_many per code {batch_us:.1f} us")
+
+    # What a cheque validation costs with the reference checks, against the format checks alone
+    sample = [{"bank": index.bank_for(code), "ifsc_code": code, "account_number": "123456789012",
+               "date": "01/02/2025", "amount": "1500"} for code in queries[:20000]]
+    timings = {}
+    for label, loaded in (("format only", None), ("with index", index)):
+        set_ifsc_index(loaded)
+        start = time.perf_counter()
+        for record in sample:
+            validate_cheque_data(record)
+        timings[label] = (time.perf_counter() - start) * 1e6 / len(sample)
+    print(f"validate_cheque_data {timings['format only']:.1f} us format only, {timings['with index']:.1f} us with index")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
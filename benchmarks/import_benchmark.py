@@ -0,0 +1,60 @@
+"""Cold-start import benchmark: eager top-level imports vs the lazily loaded extractor package.
+
+Run from the repository root:
+    python benchmarks/import_benchmark.py --runs 10
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = {
+    # What importing the extraction functions used to cost: every heavy dependency plus both clients
+    "eager (old main.py imports + clients)": (
+        "import json, base64, re\n"
+        "import pandas, boto3, xlsxwriter\n"
+        "from PIL import Image\n"
+        "boto3.client('bedrock-runtime', region_name='us-east-1')\n"
+        "boto3.client('s3', region_name='us-east-1')\n"
+    ),
+    "lazy extractor (import + resolve public API)": (
+        "import extractor\n"
+        "from extractor import analyze_document, validate_cheque_data, validate_bill_data, to_excel, upload_to_s3\n"
+    ),
+    "lazy extractor CLI module": "import extractor.cli\n",
+}
+
+def time_import(code: str) -> float:
+    """Run code in a fresh interpreter and return its wall-clock import time in milliseconds"""
+    timed = (
+        "import time\n"
+        "_start = time.perf_counter()\n"
+        f"{code}"
+        "print((time.perf_counter() - _start) * 1000)\n"
+    )
+    completed = subprocess.run(
+        [sys.executable, "-c", timed], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+    )
+    return float(completed.stdout.strip().splitlines()[-1])
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per scenario")
+    args = parser.parse_args()
+
+    print(f"{'scenario':<48} {'median ms':>10} {'min ms':>10}")
+    for name, code in SCENARIOS.items():
+        try:
+            samples = [time_import(code) for _ in range(args.runs)]
+        except subprocess.CalledProcessError as e:
+            reason = e.stderr.strip().splitlines()[-1] if e.stderr else "failed"
+            print(f"{name:<48} skipped: {reason}")
+            continue
+        print(f"{name:<48} {statistics.median(samples):>10.1f} {min(samples):>10.1f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
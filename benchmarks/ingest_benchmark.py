@@ -0,0 +1,83 @@
+"""Page ingestion benchmark: decode time and peak memory while streaming multi-page PDFs and TIFFs.
+
+Run from the repository root:
+    python benchmarks/ingest_benchmark.py --pages 25 100 400
+Each file is streamed in its own process, so peak memory is measured per file size; it should stay flat as the
+page count grows, since only the page being handed to the pipeline is decoded.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from golden_corpus import generate_records, render_document  # noqa: E402
+
+def peak_mb() -> float:
+    """Peak resident set size of this process (VmHWM on Linux, which unlike ru_maxrss is not inherited over exec)"""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def write_scan(path: str, pages: int) -> None:
+    """A multi-page scan of synthetic cheques and bills, written one page at a time"""
+    images = (render_document(record).convert('RGB') for record in generate_records(pages))
+    first = next(images)
+    if path.endswith(".pdf"):
+        first.save(path, save_all=True, append_images=images, resolution=200)
+    else:
+        first.save(path, save_all=True, append_images=images, compression="tiff_lzw")
+
+def stream(path: str) -> Dict:
+    from extractor.ingest import iter_pages
+
+    baseline = peak_mb()
+    start = time.perf_counter()
+    pages = 0
+    for page in iter_pages(path):
+        # Stand-in for the pipeline: the page is used, then dropped
+        page.image.getbbox()
+        pages += 1
+    seconds = time.perf_counter() - start
+    return {"pages": pages, "ms_per_page": round(seconds * 1000 / pages, 1),
+            "peak_growth_mb": round(peak_mb() - baseline, 1), "size_mb": round(os.path.getsize(path) / 1e6, 1)}
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[25, 100, 400], help="Page counts to test")
+    parser.add_argument("--formats", nargs="+", default=[".pdf", ".tif"])
+    parser.add_argument("--stream", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.stream:
+        print(json.dumps(stream(args.stream)))
+        return 0
+
+    workdir = tempfile.mkdtemp(prefix="ingest-bench-")
+    print(f"{'format':>7} {'pages':>6} {'file MB':>8} {'ms/page':>8} {'peak MB':>8}")
+    for file_format in args.formats:
+        for pages in args.pages:
+            path = os.path.join(workdir, f"scan_{pages}{file_format}")
+            write_scan(path, pages)
+            output = subprocess.run([sys.executable, os.path.abspath(__file__), "--stream", path],
+                                    check=True, capture_output=True, text=True).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{file_format:>7} {result['pages']:>6} {result['size_mb']:>8} {result['ms_per_page']:>8} "
+                  f"{result['peak_growth_mb']:>8}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
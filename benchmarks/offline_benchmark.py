@@ -0,0 +1,249 @@
+"""Offline throughput and accuracy benchmark against local Bedrock and S3 stand-ins.
+
+Runs the real detect/extract/validate path, background uploads and the Excel report over a golden corpus
+with no AWS access. Run from the repository root:
+    python benchmarks/offline_benchmark.py --docs 100 --workers 8 --latency-ms 900 --throttle-rate 0.05
+    python benchmarks/offline_benchmark.py --corpus golden/ --mode legacy --output results.json
+    python benchmarks/offline_benchmark.py --docs 100 --workers 16 --batch-size 4   # multi-document requests
+    python benchmarks/offline_benchmark.py --docs 200 --error-rate 0.1 --no-cascade  # Haiku only, for comparison
+    python benchmarks/offline_benchmark.py --docs 100 --no-stream               # whole responses, no streaming
+    python benchmarks/offline_benchmark.py --docs 300 --slow-rate 0.03 --hedge  # tail latency with hedged requests
+    python benchmarks/offline_benchmark.py --save-corpus golden/ --docs 50     # write a reusable corpus
+    python benchmarks/offline_benchmark.py --corpus golden/ --record           # record live Bedrock responses
+A corpus directory holds images plus golden.jsonl ground truth; responses.jsonl, if present, is replayed.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile of a list of samples"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q / 100.0 * len(ordered))) - 1))]
+
+def configure_environment(args) -> None:
+    """Point the extraction core at benchmark settings before config is imported"""
+    os.environ["EXTRACTION_MODE"] = args.mode
+    os.environ["BEDROCK_INITIAL_RPS"] = str(args.rps)
+    os.environ["BEDROCK_MAX_RPS"] = str(max(args.rps, args.max_rps))
+    os.environ["BEDROCK_TOKENS_PER_MINUTE"] = str(args.tokens_per_minute)
+    os.environ["EXTRACTION_BATCH_SIZE"] = str(args.batch_size)
+    os.environ["EXTRACTION_BATCH_WAIT_MS"] = str(args.batch_wait_ms)
+    os.environ["CASCADE_ENABLED"] = "false" if args.no_cascade else "true"
+    os.environ["CASCADE_THRESHOLD"] = str(args.cascade_threshold)
+    os.environ["BEDROCK_STREAMING"] = "false" if args.no_stream else "true"
+    os.environ["BEDROCK_HEDGE_ENABLED"] = "true" if args.hedge else "false"
+    os.environ["BEDROCK_CALL_TIMEOUT"] = str(args.call_timeout)
+    # A fresh cache per run, so every document really goes through the model path
+    os.environ["EXTRACTION_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="extraction-bench-"), "cache.sqlite3")
+    os.environ.setdefault("S3_BUCKET_NAME", "offline-benchmark")
+
+def run(args) -> Dict:
+    configure_environment(args)
+
+    from fakes import FakeBedrockRuntime, FakeS3, RecordingBedrockRuntime, load_recordings
+    from golden_corpus import GoldenResponder, field_accuracy, generate_records, load_corpus, save_corpus
+
+    from config.config import CLAUDE_HAIKU_MODEL_ID, CLAUDE_SONNET_MODEL_ID
+    from extractor.clients import get_bedrock_client, set_client
+    from extractor.document import PreparedDocument, encode_archive_jpeg
+    from extractor.export import to_excel
+    from extractor.metrics import get_metrics
+    from extractor.pipeline import DocumentPipeline
+    from extractor.processing import analyze_document, load_image
+    from extractor.storage import get_background_uploader, upload_excel_to_s3
+
+    corpus_dir = args.corpus or args.save_corpus or tempfile.mkdtemp(prefix="golden-corpus-")
+    if not args.corpus:
+        save_corpus(corpus_dir, generate_records(args.docs, bill_ratio=args.bill_ratio, seed=args.seed))
+    records = load_corpus(corpus_dir)
+
+    responder = GoldenResponder(error_rate=args.error_rate, seed=args.seed, batch_miss_rate=args.batch_miss_rate,
+                                model_error_rates={"sonnet": args.sonnet_error_rate})
+    fake_s3 = FakeS3(latency_ms=args.s3_latency_ms, failure_rate=args.s3_failure_rate, seed=args.seed)
+    recordings_path = os.path.join(corpus_dir, "responses.jsonl")
+    if args.record:
+        bedrock = RecordingBedrockRuntime(get_bedrock_client(), recordings_path)
+    else:
+        recordings = load_recordings(recordings_path) if os.path.exists(recordings_path) else {}
+        bedrock = FakeBedrockRuntime(responder, recordings, latency_ms=args.latency_ms,
+                                     latency_jitter=args.latency_jitter, throttle_rate=args.throttle_rate,
+                                     max_concurrency=args.max_concurrency, seed=args.seed,
+                                     model_latency_ms={"sonnet": args.sonnet_latency_ms},
+                                     first_token_share=args.first_token_share, fault_rate=args.fault_rate,
+                                     slow_rate=args.slow_rate, slow_factor=args.slow_factor)
+        # The stand-in recognises each document by the exact payload the pipeline will send
+        for record in records:
+            responder.register(PreparedDocument(load_image(record["path"])).model_payload, record)
+    set_client('bedrock-runtime', bedrock)
+    set_client('s3', fake_s3)
+
+    uploader = get_background_uploader()
+
+    def process(index: int, record: Dict) -> Dict:
+        start = time.perf_counter()
+        doc = PreparedDocument(load_image(record["path"]), name=record["name"])
+        outcome = analyze_document(doc, mode=args.mode)
+        if "error" not in outcome:
+            uploader.submit(lambda: encode_archive_jpeg(doc.image), f"processed/{outcome['doc_type']}_{index}.jpg")
+        outcome["latency"] = time.perf_counter() - start
+        return outcome
+
+    # Only the timed run below counts, not the registration pass above
+    get_metrics().reset()
+    pipeline = DocumentPipeline(process, max_workers=args.workers)
+    start = time.perf_counter()
+    outcomes = [result.value or {"error": result.error, "latency": 0.0}
+                for result in pipeline.run((record["name"], record) for record in records)]
+    processing_seconds = time.perf_counter() - start
+
+    succeeded = [(record, outcome) for record, outcome in zip(records, outcomes) if "error" not in outcome]
+    report_start = time.perf_counter()
+    excel_bytes = to_excel([outcome["result"] for _, outcome in succeeded],
+                           [outcome.get("verification") for _, outcome in succeeded],
+                           [outcome["validation"] for _, outcome in succeeded],
+                           [outcome["doc_type"] for _, outcome in succeeded])
+    report_ms = (time.perf_counter() - report_start) * 1000
+    upload_excel_to_s3(excel_bytes)
+    uploader.shutdown(wait=True)
+    total_seconds = time.perf_counter() - start
+
+    matched = total = type_correct = 0
+    for record, outcome in zip(records, outcomes):
+        type_correct += outcome.get("doc_type") == record["doc_type"]
+        hits, fields = field_accuracy(record["fields"], outcome.get("result") or {})
+        matched += hits
+        total += fields
+
+    latencies = [outcome["latency"] * 1000 for outcome in outcomes if outcome.get("latency")]
+    model_calls = bedrock.stats()["calls"] if hasattr(bedrock, "stats") else None
+    metrics = get_metrics()
+    input_tokens = metrics.counter_total("bedrock_input_tokens")
+    output_tokens = metrics.counter_total("bedrock_output_tokens")
+    prices = {CLAUDE_HAIKU_MODEL_ID: (args.input_price, args.output_price),
+              CLAUDE_SONNET_MODEL_ID: (args.sonnet_input_price, args.sonnet_output_price)}
+    cost = sum((metrics.counter_total("bedrock_input_tokens", model=model_id) * input_price +
+                metrics.counter_total("bedrock_output_tokens", model=model_id) * output_price) / 1e6
+               for model_id, (input_price, output_price) in prices.items())
+    escalated = metrics.counter_total("cascade", decision="escalated")
+    stages = metrics.snapshot()["stages"]
+    first_field = stages.get("time_to_first_field", {})
+    return {
+        "mode": args.mode,
+        "batch_size": args.batch_size,
+        "documents": len(records),
+        "failed": len(records) - len(succeeded),
+        "workers": args.workers,
+        "processing_seconds": round(processing_seconds, 3),
+        "total_seconds": round(total_seconds, 3),
+        "docs_per_second": round(len(records) / processing_seconds, 3) if processing_seconds else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 1),
+            "p95": round(percentile(latencies, 95), 1),
+            "p99": round(percentile(latencies, 99), 1),
+            "mean": round(statistics.mean(latencies), 1) if latencies else 0.0,
+        },
+        "streaming": not args.no_stream,
+        "time_to_first_field_ms": {"p50": first_field.get("p50_ms"), "p95": first_field.get("p95_ms")},
+        "stream_aborts": metrics.counter_total("bedrock_stream_aborts"),
+        "model_calls": model_calls,
+        "model_calls_per_document": round(model_calls / len(records), 2) if model_calls and records else None,
+        "throttles": bedrock.stats()["throttles"] if hasattr(bedrock, "stats") else None,
+        "injected_faults": bedrock.stats()["faults"] if hasattr(bedrock, "stats") else None,
+        "injected_slow_calls": bedrock.stats()["slow_calls"] if hasattr(bedrock, "stats") else None,
+        "hedges": metrics.counter_total("bedrock_hedges"),
+        "hedge_wins": metrics.counter_total("bedrock_hedge_wins"),
+        "timeouts": metrics.counter_total("bedrock_timeouts"),
+        "transient_retries": metrics.counter_total("bedrock_transient_errors"),
+        "input_tokens_per_document": round(input_tokens / len(records), 1) if records else None,
+        "output_tokens_per_document": round(output_tokens / len(records), 1) if records else None,
+        "cost_per_1000_documents": round(1000 * cost / len(records), 4) if records else None,
+        "batched_documents": metrics.counter_total("batched_items"),
+        "batch_fallbacks": metrics.counter_total("batch_fallbacks"),
+        "escalated_documents": escalated,
+        "escalation_rate": round(100.0 * escalated / len(records), 2) if records else 0.0,
+        "doc_type_accuracy": round(100.0 * type_correct / len(records), 2) if records else 0.0,
+        "field_accuracy": round(100.0 * matched / total, 2) if total else 0.0,
+        "excel_report_ms": round(report_ms, 1),
+        "s3_objects": len(fake_s3.keys()),
+        "uploader": uploader.stats(),
+        "stages": stages,
+    }
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", help="Corpus directory with golden.jsonl (default: generate one)")
+    parser.add_argument("--save-corpus", help="Generate the synthetic corpus into this directory and keep it")
+    parser.add_argument("--docs", type=int, default=40, help="Synthetic documents to generate")
+    parser.add_argument("--bill-ratio", type=float, default=0.4, help="Share of bills in the synthetic corpus")
+    parser.add_argument("--mode", choices=["unified", "legacy"], default="unified")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent documents")
+    parser.add_argument("--rps", type=float, default=20.0, help="Initial client-side request rate")
+    parser.add_argument("--max-rps", type=float, default=50.0, help="Ceiling of the adaptive request rate")
+    parser.add_argument("--tokens-per-minute", type=int, default=2000000)
+    parser.add_argument("--latency-ms", type=float, default=800.0, help="Median fake model latency")
+    parser.add_argument("--latency-jitter", type=float, default=0.3, help="Lognormal sigma of the latency")
+    parser.add_argument("--first-token-share", type=float, default=0.4,
+                        help="Share of the fake latency spent before the first streamed text")
+    parser.add_argument("--no-stream", action="store_true", help="Wait for whole responses (BEDROCK_STREAMING)")
+    parser.add_argument("--fault-rate", type=float, default=0.0, help="Probability a model call fails with a 503")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="Probability a model call is --slow-factor slower")
+    parser.add_argument("--slow-factor", type=float, default=10.0)
+    parser.add_argument("--hedge", action="store_true", help="Hedge late model calls (BEDROCK_HEDGE_ENABLED)")
+    parser.add_argument("--call-timeout", type=float, default=60.0,
+                        help="Deadline per model call (BEDROCK_CALL_TIMEOUT)")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Probability a model call is throttled")
+    parser.add_argument("--max-concurrency", type=int, help="Throttle model calls beyond this many in flight")
+    parser.add_argument("--error-rate", type=float, default=0.02, help="Probability a returned field is wrong")
+    parser.add_argument("--batch-size", type=int, default=1, help="Documents per model request (EXTRACTION_BATCH_SIZE)")
+    parser.add_argument("--batch-wait-ms", type=float, default=250.0, help="Longest wait for a batch to fill")
+    parser.add_argument("--batch-miss-rate", type=float, default=0.0,
+                        help="Probability a batched answer drops or merges a document")
+    parser.add_argument("--input-price", type=float, default=0.25, help="USD per million input tokens")
+    parser.add_argument("--output-price", type=float, default=1.25, help="USD per million output tokens")
+    parser.add_argument("--no-cascade", action="store_true", help="Disable Sonnet escalation (CASCADE_ENABLED)")
+    parser.add_argument("--cascade-threshold", type=float, default=float(os.getenv("CASCADE_THRESHOLD", "85")),
+                        help="Rule-based score below which Sonnet re-extracts a document")
+    parser.add_argument("--sonnet-error-rate", type=float, default=0.005,
+                        help="Probability a field returned by Sonnet is wrong")
+    parser.add_argument("--sonnet-latency-ms", type=float, default=2000.0, help="Median fake Sonnet latency")
+    parser.add_argument("--sonnet-input-price", type=float, default=3.0, help="USD per million Sonnet input tokens")
+    parser.add_argument("--sonnet-output-price", type=float, default=15.0,
+                        help="USD per million Sonnet output tokens")
+    parser.add_argument("--s3-latency-ms", type=float, default=60.0)
+    parser.add_argument("--s3-failure-rate", type=float, default=0.0)
+    parser.add_argument("--record", action="store_true", help="Call live Bedrock and record responses.jsonl")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Also write the results as JSON to this file")
+    parser.add_argument("--min-docs-per-second", type=float, help="Exit non-zero below this throughput")
+    parser.add_argument("--min-field-accuracy", type=float, help="Exit non-zero below this field accuracy (%%)")
+    args = parser.parse_args()
+    if args.record and not args.corpus:
+        parser.error("--record needs --corpus")
+
+    results = run(args)
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding='utf-8') as out:
+            json.dump(results, out, indent=2)
+
+    if args.min_docs_per_second is not None and results["docs_per_second"] < args.min_docs_per_second:
+        print(f"Throughput regression: {results['docs_per_second']} < {args.min_docs_per_second} docs/s")
+        return 1
+    if args.min_field_accuracy is not None and results["field_accuracy"] < args.min_field_accuracy:
+        print(f"Accuracy regression: {results['field_accuracy']}% < {args.min_field_accuracy}%")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
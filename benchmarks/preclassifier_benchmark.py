@@ -0,0 +1,62 @@
+"""Local pre-classifier benchmark: hit rate, precision and detection time saved on a labelled corpus.
+
+Run from the repository root:
+    python benchmarks/preclassifier_benchmark.py --corpus golden/ --detect-ms 900
+    python benchmarks/preclassifier_benchmark.py --docs 200 --thresholds 0.7 0.8 0.85 0.9
+The corpus is a directory with golden.jsonl (see offline_benchmark.py); without one, a synthetic corpus is generated.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from golden_corpus import generate_records, load_corpus, save_corpus  # noqa: E402
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", help="Corpus directory with golden.jsonl")
+    parser.add_argument("--docs", type=int, default=60, help="Synthetic documents when no corpus is given")
+    parser.add_argument("--detect-ms", type=float, default=900.0,
+                        help="Typical detect_document_type round-trip the pre-classifier replaces")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.75, 0.85, 0.95],
+                        help="Minimum confidence values to compare")
+    args = parser.parse_args()
+
+    from extractor.classifier import preclassify
+    from extractor.document import PreparedDocument
+    from extractor.processing import load_image
+
+    corpus_dir = args.corpus
+    if not corpus_dir:
+        corpus_dir = tempfile.mkdtemp(prefix="golden-corpus-")
+        save_corpus(corpus_dir, generate_records(args.docs))
+    records = load_corpus(corpus_dir)
+    # Classify exactly what the pipeline would: the upright, model-sized image
+    images = [PreparedDocument(load_image(record["path"])).model_image for record in records]
+
+    print(f"{len(records)} documents, detect call assumed {args.detect_ms:.0f} ms\n")
+    print(f"{'threshold':>9} {'hit rate %':>11} {'precision %':>12} {'cheque hits':>12} {'bill hits':>10} "
+          f"{'classify ms':>12} {'saved s':>8}")
+    for threshold in args.thresholds:
+        timings, decided, correct = [], {"cheque": 0, "bill": 0}, 0
+        for record, image in zip(records, images):
+            start = time.perf_counter()
+            verdict = preclassify(image, min_confidence=threshold)
+            timings.append((time.perf_counter() - start) * 1000)
+            if verdict.doc_type is not None:
+                decided[verdict.doc_type] += 1
+                correct += verdict.doc_type == record["doc_type"]
+        hits = sum(decided.values())
+        saved = (hits * args.detect_ms - sum(timings)) / 1000.0
+        print(f"{threshold:>9.2f} {100.0 * hits / len(records):>11.1f} "
+              f"{100.0 * correct / hits if hits else 0.0:>12.1f} {decided['cheque']:>12} {decided['bill']:>10} "
+              f"{statistics.mean(timings):>12.2f} {saved:>8.1f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""Model image preprocessing benchmark: payload size, encode time and extraction accuracy per setting.
+
+Run from the repository root on a directory of sample cheques/bills:
+    python benchmarks/preprocess_benchmark.py samples/ --runs 3
+    python benchmarks/preprocess_benchmark.py samples/ --extract   # also calls Bedrock for accuracy
+Without a directory, synthetic 12-MP phone-photo-sized documents are generated.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from typing import Dict, List
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from extractor.cli import collect_sources  # noqa: E402
+from extractor.document import PreparedDocument  # noqa: E402
+
+# name -> PreparedDocument settings; the first entry is the baseline the others are compared against
+SETTINGS = {
+    "full res, q70 (old)": {"max_edge": 0, "target_kb": 5 * 1024, "max_quality": 70},
+    "2048px / 800 KB": {"max_edge": 2048, "target_kb": 800, "max_quality": 85},
+    "1568px / 400 KB (default)": {"max_edge": 1568, "target_kb": 400, "max_quality": 85},
+    "1092px / 200 KB": {"max_edge": 1092, "target_kb": 200, "max_quality": 85},
+}
+
+def synthetic_documents(count: int) -> List:
+    """Noisy 4000x3000 pages with cheque-like text, roughly what a phone camera produces"""
+    from PIL import Image, ImageDraw, ImageFilter
+
+    images = []
+    for i in range(count):
+        image = Image.effect_noise((4000, 3000), 24).convert('RGB')
+        draw = ImageDraw.Draw(image)
+        for row in range(12):
+            draw.text((200, 200 + row * 220), f"STATE BANK OF INDIA  A/C 0000{i}{row}123456  IFSC SBIN0001234",
+                      fill=(20, 20, 20))
+        images.append(image.filter(ImageFilter.GaussianBlur(1)))
+    return images
+
+def load_documents(inputs: List[str], synthetic: int) -> List:
+    """Decode sample images, falling back to synthetic documents"""
+    from extractor.processing import load_image
+
+    sources = collect_sources(inputs) if inputs else []
+    if sources:
+        return [load_image(source) for source in sources]
+    return synthetic_documents(synthetic)
+
+def measure_encoding(images: List, settings: Dict, runs: int) -> Dict:
+    """Payload bytes, chosen quality and wall-clock time of orient + downscale + encode + base64"""
+    sizes, qualities, timings = [], [], []
+    for image in images:
+        samples = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            doc = PreparedDocument(image, **settings)
+            payload = doc.model_payload
+            samples.append((time.perf_counter() - start) * 1000)
+        sizes.append(len(payload))
+        qualities.append(doc.quality)
+        timings.append(statistics.median(samples))
+    return {
+        "payload_kb": statistics.mean(sizes) / 1024,
+        "quality": statistics.mean(qualities),
+        "encode_ms": statistics.median(timings),
+    }
+
+def measure_accuracy(images: List, settings: Dict) -> List[Dict]:
+    """Run the full model path on every image and return the outcomes"""
+    from extractor.processing import analyze_document
+
+    return [analyze_document(PreparedDocument(image, **settings)) for image in images]
+
+def field_agreement(outcomes: List[Dict], baseline: List[Dict]) -> float:
+    """Percentage of baseline-extracted fields reproduced exactly under another setting"""
+    matched = total = 0
+    for outcome, reference in zip(outcomes, baseline):
+        expected = reference.get("result") or {}
+        actual = outcome.get("result") or {}
+        for field, value in expected.items():
+            if value in (None, ""):
+                continue
+            total += 1
+            matched += str(actual.get(field, "")).strip() == str(value).strip()
+    return 100.0 * matched / total if total else 0.0
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("inputs", nargs="*", help="Sample image directories, globs, files or JSONL manifests")
+    parser.add_argument("--runs", type=int, default=3, help="Encodes per image and setting")
+    parser.add_argument("--synthetic", type=int, default=5, help="Synthetic documents when no inputs are given")
+    parser.add_argument("--extract", action="store_true", help="Also run extraction (live Bedrock) for accuracy")
+    args = parser.parse_args()
+
+    from extractor.validation import calculate_automated_accuracy
+
+    images = load_documents(args.inputs, args.synthetic)
+    print(f"{len(images)} documents\n")
+    print(f"{'setting':<28} {'payload KB':>11} {'quality':>8} {'encode ms':>10} {'rule acc %':>11} {'agree %':>8}")
+
+    baseline = None
+    for name, settings in SETTINGS.items():
+        stats = measure_encoding(images, settings, args.runs)
+        accuracy = agreement = "-"
+        if args.extract:
+            outcomes = measure_accuracy(images, settings)
+            scores = [calculate_automated_accuracy(outcome["result"], None, outcome["validation"])
+                      for outcome in outcomes if "error" not in outcome]
+            accuracy = f"{statistics.mean(scores):.1f}" if scores else "n/a"
+            baseline = baseline or outcomes
+            agreement = f"{field_agreement(outcomes, baseline):.1f}"
+        print(f"{name:<28} {stats['payload_kb']:>11.1f} {stats['quality']:>8.0f} {stats['encode_ms']:>10.1f} "
+              f"{accuracy:>11} {agreement:>8}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
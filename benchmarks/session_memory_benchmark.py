@@ -0,0 +1,86 @@
+"""Session memory benchmark: full PIL images in parallel lists versus the thumbnail-and-spill ResultStore.
+
+Run from the repository root:
+    python benchmarks/session_memory_benchmark.py --docs 300
+Each strategy runs in its own process, so the reported resident-memory growth is not skewed by the other.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from io import BytesIO
+from typing import Dict
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from golden_corpus import generate_records, render_document  # noqa: E402
+
+def resident_mb() -> float:
+    """Current resident set size, from /proc on Linux or the peak from getrusage elsewhere"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except OSError:
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def run_strategy(strategy: str, docs: int, memory_mb: int) -> Dict:
+    from PIL import Image
+
+    from extractor.results import ResultStore, make_thumbnail
+
+    records = generate_records(docs)
+    baseline = resident_mb()
+    images = []
+    store = ResultStore(tempfile.mkdtemp(prefix="session-bench-"), memory_cap_bytes=memory_mb * 1024 * 1024)
+    start = time.perf_counter()
+    for record in records:
+        # What process_document hands back: the decoded upload and its original bytes
+        upload = BytesIO()
+        render_document(record).save(upload, format='JPEG', quality=90)
+        image = Image.open(BytesIO(upload.getvalue()))
+        image.load()
+        if strategy == "lists":
+            images.append(image)
+        else:
+            store.add(record["name"], record["doc_type"], record["fields"], {}, {}, make_thumbnail(image),
+                      source_bytes=upload.getvalue())
+    add_seconds = time.perf_counter() - start
+
+    # A user paging through every document once
+    start = time.perf_counter()
+    for index in range(docs):
+        _ = images[index] if strategy == "lists" else store.image(index)
+    view_ms = (time.perf_counter() - start) * 1000 / docs
+    return {"strategy": strategy, "docs": docs, "rss_growth_mb": round(resident_mb() - baseline, 1),
+            "add_seconds": round(add_seconds, 2), "view_ms_per_doc": round(view_ms, 1)}
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=300, help="Documents per simulated session")
+    parser.add_argument("--memory-mb", type=int, default=64, help="ResultStore decoded-image cap")
+    parser.add_argument("--strategy", choices=["lists", "store"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.strategy:
+        print(json.dumps(run_strategy(args.strategy, args.docs, args.memory_mb)))
+        return 0
+
+    print(f"{'strategy':>8} {'docs':>6} {'RSS growth MB':>14} {'add s':>7} {'view ms/doc':>12}")
+    for strategy in ("lists", "store"):
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), "--strategy", strategy,
+                                 "--docs", str(args.docs), "--memory-mb", str(args.memory_mb)],
+                                check=True, capture_output=True, text=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{strategy:>8} {result['docs']:>6} {result['rss_growth_mb']:>14} {result['add_seconds']:>7} "
+              f"{result['view_ms_per_doc']:>12}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""Batch validation benchmark: per-record validators versus the column-oriented frame validators.
+
+Run from the repository root:
+    python benchmarks/validation_benchmark.py --rows 100000
+    python benchmarks/validation_benchmark.py --rows 20000 --corrupt-rate 0.3
+Rows come from the synthetic golden-corpus generators with a share of fields corrupted, so both valid and
+invalid paths are exercised; the frame results are checked against the per-record ones field by field.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from typing import Dict, List
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from golden_corpus import generate_records  # noqa: E402
+
+# Values the model has been seen to return for fields it could not read or misread
+ODD_VALUES = ["N/A", "", "31/02/2024", "13/13/2024", "29/02/2023", "29/02/2024", "2024-01-05", "0", "-50",
+              "12.50", "1_000", " 42 ", "abc", "HDFC", "+91 98765-43210", "12345", "INV 001", "a@b", None]
+
+def corrupt(records: List[Dict], rate: float, seed: int) -> List[Dict]:
+    """Replace a share of field values with malformed, missing or borderline ones"""
+    rng = random.Random(seed)
+    for record in records:
+        fields = record["fields"]
+        for field in list(fields):
+            roll = rng.random()
+            if roll < rate / 2:
+                fields[field] = rng.choice(ODD_VALUES)
+            elif roll < rate:
+                del fields[field]
+    return records
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000, help="Records to validate")
+    parser.add_argument("--corrupt-rate", type=float, default=0.2, help="Share of fields replaced or dropped")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    import pandas as pd
+
+    from extractor.validation import (
+        BILL_FIELDS, CHEQUE_FIELDS, calculate_automated_accuracy, validate_bill_data, validate_bill_frame,
+        validate_cheque_data, validate_cheque_frame
+    )
+
+    records = corrupt(generate_records(args.rows, seed=args.seed), args.corrupt_rate, args.seed)
+    cases = [
+        ("cheque", CHEQUE_FIELDS, validate_cheque_data, validate_cheque_frame),
+        ("bill", BILL_FIELDS, validate_bill_data, validate_bill_frame),
+    ]
+    print(f"{'type':>6} {'rows':>8} {'per-record s':>13} {'frame s':>8} {'speedup':>8} {'mismatches':>11}")
+    mismatches = 0
+    for doc_type, fields, validate_record, validate_frame in cases:
+        rows = [record["fields"] for record in records if record["doc_type"] == doc_type]
+        # None stands for a field the model returned as null; the frame treats it like a missing one
+        rows = [{key: value for key, value in row.items() if value is not None} for row in rows]
+
+        start = time.perf_counter()
+        expected = [validate_record(row) for row in rows]
+        expected_accuracy = [calculate_automated_accuracy(row, None, result) for row, result in zip(rows, expected)]
+        record_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        frame = pd.DataFrame.from_records(rows)
+        validated = validate_frame(frame)
+        frame_seconds = time.perf_counter() - start
+
+        errors = 0
+        for field in fields:
+            valid = validated[f"{field}_valid"].tolist()
+            messages = validated[f"{field}_message"].tolist()
+            for i, result in enumerate(expected):
+                if (result[field]["valid"], result[field]["message"]) != (valid[i], messages[i]):
+                    if errors < 5:
+                        print(f"  {doc_type} row {i} {field}={rows[i].get(field)!r}: "
+                              f"expected {result[field]}, got {valid[i]} {messages[i]!r}")
+                    errors += 1
+        accuracy = validated["rule_based_accuracy"].tolist()
+        errors += sum(1 for a, b in zip(expected_accuracy, accuracy) if abs(a - b) > 1e-9)
+        mismatches += errors
+        print(f"{doc_type:>6} {len(rows):>8} {record_seconds:>13.3f} {frame_seconds:>8.3f} "
+              f"{record_seconds / frame_seconds if frame_seconds else 0.0:>7.1f}x {errors:>11}")
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
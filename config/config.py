@@ -14,6 +14,108 @@ S3_BUCKET_NAME = os.getenv("S3_BUCKET_NAME")
 CLAUDE_SONNET_MODEL_ID = "anthropic.claude-3-sonnet-20240229-v1:0"
 CLAUDE_HAIKU_MODEL_ID = "anthropic.claude-3-haiku-20240307-v1:0"
 
+# "unified" classifies, validates and extracts in a single model call;
+# "legacy" keeps the original detect -> yes/no validation -> extract path
+EXTRACTION_MODE = os.getenv("EXTRACTION_MODE", "unified").lower()
+
+# Local pre-classifier that answers cheque/bill from image layout before spending a detection
+# model call (legacy mode); only verdicts at or above the confidence threshold are trusted
+PRECLASSIFIER_ENABLED = os.getenv("PRECLASSIFIER_ENABLED", "true").lower() in ("1", "true", "yes")
+PRECLASSIFIER_MIN_CONFIDENCE = float(os.getenv("PRECLASSIFIER_MIN_CONFIDENCE", "0.85"))
+
+# Model cascade: Haiku extracts every document, and documents whose rule-based accuracy falls under
+# CASCADE_THRESHOLD (%) are re-extracted with Sonnet and cross-validated field by field. At 85 a cheque with one
+# failed check (80%) is escalated, but a bill needs two (one leaves 6 of 7, 85.7%)
+CASCADE_ENABLED = os.getenv("CASCADE_ENABLED", "true").lower() in ("1", "true", "yes")
+CASCADE_THRESHOLD = float(os.getenv("CASCADE_THRESHOLD", "85"))
+
+# Pipeline Configuration
+# Number of documents processed concurrently
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "4"))
+
+# Multi-document requests: extraction calls made by concurrent documents are packed up to this many
+# images per Bedrock request (1 disables it), waiting at most EXTRACTION_BATCH_WAIT_MS for a batch to fill.
+# Documents the model's answer leaves out fall back to single-document calls
+EXTRACTION_BATCH_SIZE = int(os.getenv("EXTRACTION_BATCH_SIZE", "1"))
+EXTRACTION_BATCH_WAIT_MS = float(os.getenv("EXTRACTION_BATCH_WAIT_MS", "250"))
+
+# Client-side Bedrock budget; the request rate adapts between the min and max on throttling/success
+BEDROCK_INITIAL_RPS = float(os.getenv("BEDROCK_INITIAL_RPS", "1.0"))
+BEDROCK_MAX_RPS = float(os.getenv("BEDROCK_MAX_RPS", "10.0"))
+BEDROCK_TOKENS_PER_MINUTE = int(os.getenv("BEDROCK_TOKENS_PER_MINUTE", "200000"))
+# Deadline of one Bedrock request, counted from when it is sent; a request past it, a dropped connection or a
+# 5xx error is retried with backoff like a throttle
+BEDROCK_CALL_TIMEOUT = float(os.getenv("BEDROCK_CALL_TIMEOUT", "60"))
+BEDROCK_CONNECT_TIMEOUT = float(os.getenv("BEDROCK_CONNECT_TIMEOUT", "5"))
+# Hedged requests: a request still unanswered at the rolling BEDROCK_HEDGE_PERCENTILE latency of its kind gets a
+# duplicate if the rate limiter has spare budget; the first answer wins and the other request is cancelled
+BEDROCK_HEDGE_ENABLED = os.getenv("BEDROCK_HEDGE_ENABLED", "false").lower() in ("1", "true", "yes")
+BEDROCK_HEDGE_PERCENTILE = float(os.getenv("BEDROCK_HEDGE_PERCENTILE", "95"))
+BEDROCK_HEDGE_MIN_SAMPLES = int(os.getenv("BEDROCK_HEDGE_MIN_SAMPLES", "20"))
+# Threads and HTTP connections for Bedrock requests in flight, hedges and abandoned requests included
+BEDROCK_MAX_CONNECTIONS = int(os.getenv("BEDROCK_MAX_CONNECTIONS", str(max(16, 4 * PIPELINE_WORKERS))))
+# Stream extraction responses, so fields reach the UI as they are generated and a document the model calls
+# unknown or invalid is abandoned as soon as it says so
+BEDROCK_STREAMING = os.getenv("BEDROCK_STREAMING", "true").lower() in ("1", "true", "yes")
+
+# Bedrock Batch Inference for large offline runs: JSONL request records are staged under the S3 prefix,
+# and the service role needs read/write access to it
+BEDROCK_BATCH_ROLE_ARN = os.getenv("BEDROCK_BATCH_ROLE_ARN")
+BEDROCK_BATCH_S3_URI = os.getenv("BEDROCK_BATCH_S3_URI")
+BEDROCK_BATCH_POLL_SECONDS = float(os.getenv("BEDROCK_BATCH_POLL_SECONDS", "60"))
+# Largest JSONL input file (MB) of a batch job; Bedrock rejects files over 1 GB by default and a record is about
+# 530 KB at MODEL_IMAGE_TARGET_KB=400, so records are split across files of at most this size
+BEDROCK_BATCH_FILE_MB = float(os.getenv("BEDROCK_BATCH_FILE_MB", "500"))
+
+# Durable job queue: with PROCESSING_BACKEND=queue the UI spools uploads into the SQLite queue and polls it,
+# while `python -m extractor.worker` processes (or JOB_EMBEDDED_WORKERS started by the UI itself) run them.
+# A job whose worker stops renewing its lease is retried elsewhere, up to JOB_MAX_ATTEMPTS times
+PROCESSING_BACKEND = os.getenv("PROCESSING_BACKEND", "inline").lower()
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", ".cache/jobs.sqlite3")
+JOB_SPOOL_DIR = os.getenv("JOB_SPOOL_DIR", ".cache/jobs")
+JOB_WORKER_PROCESSES = int(os.getenv("JOB_WORKER_PROCESSES", "2"))
+JOB_EMBEDDED_WORKERS = int(os.getenv("JOB_EMBEDDED_WORKERS", "0"))
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "300"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1.0"))
+JOB_RETENTION_HOURS = float(os.getenv("JOB_RETENTION_HOURS", "72"))
+
+# Local index of the RBI IFSC list (build it with `python -m extractor <list files> --build-ifsc-index`);
+# when present, cheque IFSC codes must exist and belong to the extracted bank, and branch details are filled in
+IFSC_INDEX_PATH = os.getenv("IFSC_INDEX_PATH", "data/ifsc_index.sqlite3")
+
+# Persistent cache of model outputs keyed by image content; bump the version whenever
+# a prompt or the result post-processing changes so stale entries are never served
+EXTRACTION_CACHE_PATH = os.getenv("EXTRACTION_CACHE_PATH", ".cache/extraction_cache.sqlite3")
+EXTRACTION_CACHE_MAX_MB = int(os.getenv("EXTRACTION_CACHE_MAX_MB", "256"))
+EXTRACTION_CACHE_VERSION = "1"
+
+# Background S3 uploads; objects at or above the threshold use multipart transfers
+S3_UPLOAD_WORKERS = int(os.getenv("S3_UPLOAD_WORKERS", "4"))
+S3_UPLOAD_QUEUE_SIZE = int(os.getenv("S3_UPLOAD_QUEUE_SIZE", "32"))
+S3_MULTIPART_THRESHOLD_MB = int(os.getenv("S3_MULTIPART_THRESHOLD_MB", "8"))
+# HTTP connections of the shared S3 client: every upload worker may run a multipart upload of up to 10 parts at
+# once, and pipeline threads fetch archived images back
+S3_MAX_CONNECTIONS = int(os.getenv("S3_MAX_CONNECTIONS", str(10 * S3_UPLOAD_WORKERS + PIPELINE_WORKERS)))
+
+# Streamlit session results: thumbnails stay in memory, full images are spilled under the directory
+# (or fetched back from S3) and decoded copies are cached per session up to the memory cap
+RESULT_STORE_DIR = os.getenv("RESULT_STORE_DIR", ".cache/results")
+RESULT_STORE_MEMORY_MB = int(os.getenv("RESULT_STORE_MEMORY_MB", "64"))
+RESULT_THUMBNAIL_EDGE = int(os.getenv("RESULT_THUMBNAIL_EDGE", "320"))
+
+# Multi-page PDF scans are rasterized at this resolution, one page at a time as they are processed
+PDF_RENDER_DPI = int(os.getenv("PDF_RENDER_DPI", "200"))
+
+# Model image preprocessing: images are auto-oriented, downscaled to the long edge the vision model
+# actually uses and JPEG quality is searched between the bounds to fit the byte budget
+MODEL_IMAGE_MAX_EDGE = int(os.getenv("MODEL_IMAGE_MAX_EDGE", "1568"))
+MODEL_IMAGE_TARGET_KB = int(os.getenv("MODEL_IMAGE_TARGET_KB", "400"))
+MODEL_JPEG_MAX_QUALITY = int(os.getenv("MODEL_JPEG_MAX_QUALITY", "85"))
+MODEL_JPEG_MIN_QUALITY = int(os.getenv("MODEL_JPEG_MIN_QUALITY", "30"))
+# The S3 archive keeps the full-resolution image, encoded at Pillow's default JPEG quality as it always was
+ARCHIVE_JPEG_QUALITY = int(os.getenv("ARCHIVE_JPEG_QUALITY", "75"))
+
 # Validation Patterns
 BANK_NAME_PATTERNS = [
     r'STATE BANK OF INDIA', r'SBI', r'HDFC BANK', r'ICICI BANK', 
@@ -23,7 +125,28 @@ BANK_NAME_PATTERNS = [
 
 IFSC_CODE_PATTERN = r'^[A-Z]{4}0[A-Z0-9]{6}$'
 ACCOUNT_NUMBER_PATTERN = r'^\d{9,18}$'
-DATE_PATTERN = r'^\d{2}/\d{2}/\d{4}$'
+DATE_PATTERN = r'^\d{1,2}/\d{1,2}/\d{4}$'
+
+# Bill Validation Patterns
+BILL_NUMBER_PATTERN = r'^[A-Z0-9\-/]{5,20}$'
+GST_NUMBER_PATTERN = r'^[0-9]{2}[A-Z]{5}[0-9]{4}[A-Z]{1}[1-9A-Z]{1}Z[0-9A-Z]{1}$'
+PHONE_PATTERN = r'^[\+]?[0-9\s\-\(\)]{10,15}$'
+EMAIL_PATTERN = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
+
+# Currency Detection Patterns
+INDIAN_PHONE_PATTERNS = [
+    r'^0\d{2,4}-\d{6,8}$',  # Landline format like 0381-2325984
+    r'^\+91[\s\-]?\d{10}$',  # Mobile with +91
+    r'^91\d{10}$',  # Mobile with 91
+    r'^[6-9]\d{9}$'  # Indian mobile numbers
+]
+
+US_PHONE_PATTERNS = [
+    r'^\+1[\s\-]?\d{10}$',  # US format with +1
+    r'^1[\s\-]?\d{10}$',   # US format with 1
+    r'^\(\d{3}\)\s?\d{3}-\d{4}$',  # (555) 123-4567
+    r'^\d{3}-\d{3}-\d{4}$'  # 555-123-4567
+]
 
 # CSS Styles
 CSS_STYLES = """
@@ -34,6 +157,7 @@ CSS_STYLES = """
 .clear-btn { margin-top: 20px; }  
 .data-table { width: 100%; margin-top: 20px; }  
 .cheque-container { margin-bottom: 30px; padding: 15px; border: 1px solid #eee; border-radius: 5px; }  
+.bill-container { margin-bottom: 30px; padding: 15px; border: 1px solid #f39c12; border-radius: 5px; }  
 .stButton>button, .stDownloadButton>button { background-color: #2e86c1 !important; color: white !important; border: none !important; width: 100%; margin: 5px 0 !important; transition: background-color 0.3s; }  
 .stButton>button:hover, .stDownloadButton>button:hover { background-color: #2874a6 !important; }  
 .stButton, .stDownloadButton { display: flex; justify-content: center; }  
@@ -41,5 +165,8 @@ CSS_STYLES = """
 .accuracy-value { font-weight: bold; color: #2e86c1; }  
 .discrepancy { color: #e74c3c; font-weight: bold; }  
 .validation-pass { color: #27ae60; font-weight: bold; }  
+.document-type-badge { padding: 5px 10px; border-radius: 15px; color: white; font-weight: bold; margin-bottom: 10px; }
+.cheque-badge { background-color: #2e86c1; }
+.bill-badge { background-color: #f39c12; }
 </style>
-""" 
\ No newline at end of file
+"""
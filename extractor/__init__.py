@@ -0,0 +1,72 @@
+"""Importable cheque/bill extraction core.
+
+Submodules are imported on first attribute access so that ``import extractor`` stays cheap;
+boto3, PIL and pandas are only loaded by the code paths that actually need them.
+"""
+import importlib
+
+_EXPORTS = {
+    "LocalBatchInference": "batch", "LocalObjectStore": "batch", "S3ObjectStore": "batch",
+    "collect_batch_results": "batch", "run_batch": "batch", "submit_batch": "batch", "wait_for_batch": "batch",
+    "CallTimeoutError": "bedrock", "LatencyTracker": "bedrock", "StreamInterruptedError": "bedrock",
+    "exponential_backoff_delay": "bedrock", "get_latency_tracker": "bedrock", "get_rate_limiter": "bedrock",
+    "invoke_model_stream_with_retry": "bedrock", "invoke_model_with_retry": "bedrock",
+    "ExtractionCache": "cache", "image_fingerprint": "cache",
+    "Preclassification": "classifier", "extract_layout_features": "classifier", "preclassifier_report": "classifier",
+    "preclassify": "classifier",
+    "connection_pool_stats": "clients", "get_bedrock_client": "clients", "get_bedrock_control_client": "clients",
+    "get_s3_client": "clients", "set_client": "clients",
+    "DocumentImage": "document", "PreparedDocument": "document", "downscale_for_model": "document",
+    "encode_archive_jpeg": "document", "encode_to_budget": "document", "orient_image": "document",
+    "prepare_document": "document",
+    "IncrementalReport": "export", "LocalReportFile": "export", "StreamingReport": "export",
+    "build_report_row": "export", "open_report_sink": "export", "render_workbook": "export", "report_columns": "export",
+    "revalidate_report": "export", "stream_report": "export", "to_excel": "export",
+    "batch_extraction_prompt": "extraction", "build_batch_request": "extraction", "build_image_request": "extraction",
+    "clean_bill_result": "extraction", "clean_cheque_result": "extraction",
+    "detect_currency_from_bill_data": "extraction", "detect_document_type": "extraction",
+    "encode_image_for_model": "extraction", "extract_bill_data": "extraction", "extract_cheque_data": "extraction",
+    "extract_document_data": "extraction", "extract_documents_batch": "extraction", "extract_fields": "extraction",
+    "fields_extraction_prompt": "extraction", "interpret_unified_result": "extraction",
+    "match_batch_entries": "extraction", "parse_json_array": "extraction", "parse_json_response": "extraction",
+    "rejects_document": "extraction", "request_json": "extraction",
+    "DocumentDecodeError": "ingest", "DocumentPage": "ingest", "expand_pages": "ingest", "iter_page_keys": "ingest",
+    "iter_page_outcomes": "ingest", "iter_pages": "ingest", "page_count": "ingest", "page_key": "ingest",
+    "split_page_key": "ingest",
+    "IfscBranch": "ifsc", "IfscIndex": "ifsc", "bank_names_match": "ifsc", "build_ifsc_index": "ifsc",
+    "enrich_cheque_result": "ifsc", "get_ifsc_index": "ifsc", "set_ifsc_index": "ifsc",
+    "Job": "jobs", "JobQueue": "jobs", "get_job_queue": "jobs",
+    "MetricsRegistry": "metrics", "get_metrics": "metrics",
+    "MicroBatcher": "microbatch",
+    "DocumentPipeline": "pipeline", "PipelineResult": "pipeline",
+    "analyze_document": "processing", "cached_model_call": "processing", "escalate_if_uncertain": "processing",
+    "finish_analysis": "processing",
+    "get_extraction_batcher": "processing", "get_extraction_cache": "processing", "load_image": "processing",
+    "run_extraction": "processing",
+    "ResultStore": "results", "StoredDocument": "results", "make_thumbnail": "results",
+    "AdaptiveRateLimiter": "rate_limiter", "estimate_request_tokens": "rate_limiter",
+    "is_throttling_error": "rate_limiter", "is_transient_error": "rate_limiter",
+    "BackgroundUploader": "storage", "S3MultipartWriter": "storage", "crop_signature_area": "storage",
+    "encode_signature_crop": "storage", "get_background_uploader": "storage", "resolve_url": "storage",
+    "signature_s3_key": "storage", "upload_excel_to_s3": "storage", "upload_to_s3": "storage",
+    "JsonFieldStream": "streaming",
+    "calculate_automated_accuracy": "validation", "cross_validate_results": "validation",
+    "reconcile_results": "validation",
+    "validate_bill_data": "validation", "validate_bill_frame": "validation", "validate_cheque_data": "validation",
+    "validate_cheque_frame": "validation", "validate_frame": "validation",
+    "JobWorker": "worker", "WorkerPool": "worker", "process_job": "worker", "start_embedded_workers": "worker",
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name: str):
+    """Resolve public names from their submodule on first access"""
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
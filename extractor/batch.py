@@ -0,0 +1,408 @@
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config.config import (
+    BEDROCK_BATCH_FILE_MB, BEDROCK_BATCH_POLL_SECONDS, BEDROCK_BATCH_ROLE_ARN, BEDROCK_BATCH_S3_URI,
+    CLAUDE_HAIKU_MODEL_ID
+)
+from .clients import get_bedrock_client, get_bedrock_control_client, get_s3_client
+from .document import PreparedDocument
+from .extraction import UNIFIED_EXTRACTION_PROMPT, build_image_request, interpret_unified_result, parse_json_response
+from .ingest import iter_page_keys
+from .processing import finish_analysis
+
+logger = logging.getLogger(__name__)
+
+# Job states after which get_model_invocation_job will not change any more
+TERMINAL_STATUSES = {"Completed", "PartiallyCompleted", "Failed", "Stopped", "Expired"}
+# Bedrock rejects batch jobs with fewer records than this
+MIN_BATCH_RECORDS = 100
+# Besides an output file per input file, Bedrock writes a summary of the job that holds no records
+MANIFEST_FILE = "manifest.json.out"
+
+def split_s3_uri(uri: str) -> Tuple[str, str]:
+    """Split s3://bucket/key into (bucket, key)"""
+    if not uri.startswith("s3://"):
+        raise ValueError(f"Not an s3:// URI: {uri}")
+    bucket, _, key = uri[len("s3://"):].partition("/")
+    return bucket, key
+
+# --- Object Stores ---
+class S3ObjectStore:
+    """Reads and writes batch inputs and outputs in S3"""
+
+    def __init__(self, client_factory: Callable = get_s3_client):
+        self.client_factory = client_factory
+
+    def upload_file(self, path: str, uri: str) -> None:
+        bucket, key = split_s3_uri(uri)
+        # upload_file switches to multipart transfers for large request files
+        self.client_factory().upload_file(path, bucket, key)
+
+    def read(self, uri: str) -> bytes:
+        bucket, key = split_s3_uri(uri)
+        return self.client_factory().get_object(Bucket=bucket, Key=key)['Body'].read()
+
+    def write(self, uri: str, data: bytes) -> None:
+        bucket, key = split_s3_uri(uri)
+        self.client_factory().put_object(Bucket=bucket, Key=key, Body=data)
+
+    def list(self, prefix_uri: str) -> List[str]:
+        bucket, prefix = split_s3_uri(prefix_uri)
+        uris = []
+        for page in self.client_factory().get_paginator('list_objects_v2').paginate(Bucket=bucket, Prefix=prefix):
+            uris.extend(f"s3://{bucket}/{item['Key']}" for item in page.get('Contents', []))
+        return uris
+
+class LocalObjectStore:
+    """S3-like store over a local directory: s3://bucket/key lives at <root>/bucket/key"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, uri: str) -> str:
+        bucket, key = split_s3_uri(uri)
+        return os.path.join(self.root, bucket, *key.split("/"))
+
+    def upload_file(self, path: str, uri: str) -> None:
+        target = self._path(uri)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copyfile(path, target)
+
+    def read(self, uri: str) -> bytes:
+        with open(self._path(uri), "rb") as source:
+            return source.read()
+
+    def write(self, uri: str, data: bytes) -> None:
+        target = self._path(uri)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, "wb") as out:
+            out.write(data)
+
+    def list(self, prefix_uri: str) -> List[str]:
+        bucket, prefix = split_s3_uri(prefix_uri)
+        bucket_root = os.path.join(self.root, bucket)
+        uris = []
+        for directory, _, files in os.walk(bucket_root):
+            for name in files:
+                key = os.path.relpath(os.path.join(directory, name), bucket_root).replace(os.sep, "/")
+                if key.startswith(prefix):
+                    uris.append(f"s3://{bucket}/{key}")
+        return sorted(uris)
+
+# --- Local Batch Stand-in ---
+class LocalBatchInference:
+    """Stand-in for Bedrock's batch job API that answers each record through the runtime client
+
+    Jobs are recorded under <root>/.jobs, so a later process can look up, and finish, a job an interrupted run
+    submitted, as it could with Bedrock.
+    """
+
+    def __init__(self, store: LocalObjectStore, runtime_factory: Callable = get_bedrock_client):
+        self.store = store
+        self.runtime_factory = runtime_factory
+        self._jobs: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def _job_path(self, job_id: str) -> str:
+        return os.path.join(self.store.root, ".jobs", f"{job_id}.json")
+
+    def _save(self, job: Dict) -> None:
+        """Record a job's current state; called with the lock held"""
+        path = self._job_path(job["jobArn"].rsplit("/", 1)[-1])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding='utf-8') as record:
+            json.dump(job, record)
+
+    def create_model_invocation_job(self, jobName: str, roleArn: str, modelId: str, inputDataConfig: Dict,
+                                    outputDataConfig: Dict, **kwargs) -> Dict:
+        job_id = f"{jobName}-{uuid.uuid4().hex[:8]}"
+        job = {
+            "jobArn": f"arn:aws:bedrock:local:000000000000:model-invocation-job/{job_id}",
+            "jobName": jobName,
+            "modelId": modelId,
+            "status": "Submitted",
+            "inputDataConfig": inputDataConfig,
+            "outputDataConfig": outputDataConfig,
+        }
+        with self._lock:
+            self._jobs[job["jobArn"]] = job
+            self._save(job)
+        threading.Thread(target=self._run, args=(job, job_id), daemon=True).start()
+        return {"jobArn": job["jobArn"]}
+
+    def get_model_invocation_job(self, jobIdentifier: str) -> Dict:
+        with self._lock:
+            job = self._jobs.get(jobIdentifier)
+            if job is None:
+                job = self._load(jobIdentifier)
+            return dict(job)
+
+    def _load(self, job_arn: str) -> Dict:
+        """A job recorded by an earlier process, restarted if that process stopped before it finished"""
+        job_id = job_arn.rsplit("/", 1)[-1]
+        try:
+            with open(self._job_path(job_id), encoding='utf-8') as record:
+                job = json.load(record)
+        except FileNotFoundError:
+            raise ValueError(f"Unknown batch job {job_arn}") from None
+        self._jobs[job_arn] = job
+        if job["status"] not in TERMINAL_STATUSES:
+            threading.Thread(target=self._run, args=(job, job_id), daemon=True).start()
+        return job
+
+    def _input_files(self, input_uri: str) -> List[str]:
+        """The JSONL files of a job: the input URI itself, or every .jsonl file under it when it is a prefix"""
+        if not input_uri.endswith("/"):
+            return [input_uri]
+        return [uri for uri in self.store.list(input_uri) if uri.endswith(".jsonl")]
+
+    def _run(self, job: Dict, job_id: str) -> None:
+        """Invoke the model for every record of every input file and write <output>/<job id>/<input file>.out"""
+        with self._lock:
+            job["status"] = "InProgress"
+            self._save(job)
+        input_uri = job["inputDataConfig"]["s3InputDataConfig"]["s3Uri"]
+        output_uri = job["outputDataConfig"]["s3OutputDataConfig"]["s3Uri"].rstrip("/")
+        try:
+            runtime = self.runtime_factory()
+            total = failed = 0
+            for file_uri in self._input_files(input_uri):
+                lines = []
+                for line in self.store.read(file_uri).decode('utf-8').splitlines():
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    output = {"recordId": record["recordId"], "modelInput": record["modelInput"]}
+                    total += 1
+                    try:
+                        response = runtime.invoke_model(modelId=job["modelId"],
+                                                        body=json.dumps(record["modelInput"]))
+                        output["modelOutput"] = json.loads(response['body'].read())
+                    except Exception as e:
+                        failed += 1
+                        output["error"] = {"errorCode": 500, "errorMessage": str(e)}
+                    lines.append(json.dumps(output))
+                file_name = file_uri.rsplit("/", 1)[-1]
+                self.store.write(f"{output_uri}/{job_id}/{file_name}.out",
+                                 ("\n".join(lines) + "\n").encode('utf-8'))
+            manifest = {"totalRecordCount": total, "processedRecordCount": total - failed,
+                        "errorRecordCount": failed}
+            self.store.write(f"{output_uri}/{job_id}/{MANIFEST_FILE}", json.dumps(manifest).encode('utf-8'))
+            status = "PartiallyCompleted" if failed else "Completed"
+        except Exception as e:
+            logger.error(f"Local batch job {job_id} failed: {str(e)}")
+            status = "Failed"
+        with self._lock:
+            job["status"] = status
+            self._save(job)
+
+# --- Batch Extraction ---
+def build_batch_record(record_id: str, doc: PreparedDocument) -> Dict:
+    """One batch input record: the unified single-call extraction request for a document"""
+    return {"recordId": record_id, "modelInput": build_image_request(UNIFIED_EXTRACTION_PROMPT, doc.model_payload)}
+
+class _RecordFiles:
+    """Writes records into JSONL files of at most max_bytes, uploading each under the input prefix once full"""
+
+    def __init__(self, store, input_prefix: str, max_bytes: int):
+        self.store = store
+        self.input_prefix = input_prefix
+        self.max_bytes = max_bytes
+        # Record ids of each uploaded file, by file name
+        self.files: Dict[str, List[str]] = {}
+        self._file = None
+        self._size = 0
+        self._record_ids: List[str] = []
+
+    def write(self, record_id: str, record: Dict) -> None:
+        line = (json.dumps(record) + "\n").encode('utf-8')
+        if self._file is not None and self._size + len(line) > self.max_bytes:
+            self.flush()
+        if self._file is None:
+            # Staged on disk so thousands of base64 payloads are never held in memory together
+            self._file = tempfile.NamedTemporaryFile("wb", suffix=".jsonl", delete=False)
+            self._size = 0
+        self._file.write(line)
+        self._size += len(line)
+        self._record_ids.append(record_id)
+
+    def flush(self) -> None:
+        """Upload the file being written, if any"""
+        if self._file is None:
+            return
+        self._file.close()
+        file_name = f"records-{len(self.files):05d}.jsonl"
+        try:
+            self.store.upload_file(self._file.name, f"{self.input_prefix}{file_name}")
+        finally:
+            os.remove(self._file.name)
+            self._file = None
+        self.files[file_name] = self._record_ids
+        self._record_ids = []
+
+    def discard(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            os.remove(self._file.name)
+            self._file = None
+
+def submit_batch(sources: List[str], job_name: str, s3_uri: str, role_arn: Optional[str] = None,
+                 client=None, store=None, model_id: str = CLAUDE_HAIKU_MODEL_ID,
+                 max_file_mb: float = BEDROCK_BATCH_FILE_MB) -> Dict:
+    """Write the request records as JSONL files under s3_uri and start a batch inference job reading them all
+
+    Records are split across files of at most max_file_mb, and the returned job lists each file's record ids
+    under "input_files". Pages that cannot be decoded are left out; their errors are kept under "errors".
+    """
+    client = client or get_bedrock_control_client()
+    store = store or S3ObjectStore()
+
+    base_uri = f"{s3_uri.rstrip('/')}/{job_name}"
+    input_prefix = f"{base_uri}/input/"
+    output_uri = f"{base_uri}/output/"
+    record_sources = {}
+    page_errors = {}
+
+    records = _RecordFiles(store, input_prefix, int(max_file_mb * 1024 * 1024))
+    try:
+        # Pages of multi-page scans are decoded one at a time, opening each file once
+        for index, (source, page) in enumerate(iter_page_keys(sources)):
+            record_id = f"{index:08d}"
+            record_sources[record_id] = source
+            if isinstance(page, Exception):
+                # Reported as this page's result when the job is collected; the rest of the batch goes ahead
+                page_errors[record_id] = str(page)
+                continue
+            records.write(record_id, build_batch_record(record_id, PreparedDocument(page.image, name=source)))
+        records.flush()
+    finally:
+        records.discard()
+    job = {"job_arn": None, "job_name": job_name, "output_uri": output_uri, "sources": record_sources,
+           "errors": page_errors, "input_files": records.files}
+    submitted = len(record_sources) - len(page_errors)
+    if not submitted:
+        logger.error("None of the batch inputs could be read; no job submitted")
+        return job
+    if submitted < MIN_BATCH_RECORDS:
+        logger.warning(f"Bedrock batch jobs need at least {MIN_BATCH_RECORDS} records; this one has {submitted}")
+
+    response = client.create_model_invocation_job(
+        jobName=job_name,
+        roleArn=role_arn or BEDROCK_BATCH_ROLE_ARN,
+        modelId=model_id,
+        # A prefix makes the job read every file under it
+        inputDataConfig={"s3InputDataConfig": {"s3Uri": input_prefix, "s3InputFormat": "JSONL"}},
+        outputDataConfig={"s3OutputDataConfig": {"s3Uri": output_uri}}
+    )
+    logger.info(f"Submitted batch job {response['jobArn']} with {submitted} records in {len(records.files)} files")
+    return {**job, "job_arn": response["jobArn"]}
+
+def wait_for_batch(job_arn: str, client=None, poll_seconds: float = BEDROCK_BATCH_POLL_SECONDS,
+                   timeout: Optional[float] = None) -> str:
+    """Poll a batch job until it reaches a terminal status and return that status"""
+    client = client or get_bedrock_control_client()
+    deadline = time.monotonic() + timeout if timeout else None
+    while True:
+        job = client.get_model_invocation_job(jobIdentifier=job_arn)
+        status = job["status"]
+        if status in TERMINAL_STATUSES:
+            if status not in ("Completed", "PartiallyCompleted"):
+                logger.error(f"Batch job {job_arn} ended as {status}: {job.get('message', '')}")
+            return status
+        if deadline is not None and time.monotonic() >= deadline:
+            raise TimeoutError(f"Batch job {job_arn} still {status} after {timeout}s")
+        logger.info(f"Batch job {job_arn}: {status}")
+        time.sleep(poll_seconds)
+
+def parse_batch_output(record: Dict) -> Dict:
+    """Post-process one batch output record exactly like a synchronous unified extraction"""
+    if "error" in record or "modelOutput" not in record:
+        error = record.get("error") or {}
+        return {"error": f"Batch record failed: {error.get('errorMessage', error) or 'no model output'}"}
+    try:
+        response_text = record["modelOutput"]['content'][0]['text'].strip()
+        doc_type, claude_result = interpret_unified_result(parse_json_response(response_text))
+    except (KeyError, IndexError, ValueError) as e:
+        logger.error(f"Failed to parse batch output {record.get('recordId')}: {str(e)}")
+        doc_type, claude_result = "unknown", None
+    return finish_analysis(doc_type, claude_result)
+
+def collect_batch_results(job: Dict, store=None) -> List[Dict]:
+    """Read the output file of each of the job's input files and return one record per source, in submission order
+
+    Pages that could not be decoded for submission get their error instead, like a failed synchronous page.
+    """
+    store = store or S3ObjectStore()
+    errors = job.get("errors", {})
+    outcomes: Dict[str, Dict] = {record_id: {"error": error} for record_id, error in errors.items()}
+    # Jobs submitted before inputs were split across files staged a single records.jsonl
+    input_files = job.get("input_files") or {"records.jsonl": [key for key in job["sources"] if key not in errors]}
+    outputs = {}
+    if job["job_arn"]:
+        # <input file>.out per input file; the job's manifest.json.out matches none of them
+        outputs = {uri.rsplit("/", 1)[-1][:-len(".out")]: uri for uri in store.list(job["output_uri"])
+                   if uri.endswith(".out")}
+    for file_name, record_ids in input_files.items():
+        if file_name not in outputs:
+            outcomes.update((record_id, {"error": f"No batch output for input file {file_name}"})
+                            for record_id in record_ids)
+            continue
+        expected = set(record_ids)
+        for line in store.read(outputs[file_name]).decode('utf-8').splitlines():
+            if line.strip():
+                record = json.loads(line)
+                if record.get("recordId") in expected:
+                    outcomes[record["recordId"]] = parse_batch_output(record)
+
+    results = []
+    for record_id, source in sorted(job["sources"].items()):
+        outcome = outcomes.get(record_id, {"error": "No batch output for this record"})
+        results.append({
+            "source": source,
+            "doc_type": outcome.get("doc_type"),
+            "result": outcome.get("result"),
+            "validation": outcome.get("validation"),
+            "error": outcome.get("error")
+        })
+    return results
+
+def run_batch(sources: List[str], state_path: str, job_name: Optional[str] = None, local_root: Optional[str] = None,
+              poll_seconds: float = BEDROCK_BATCH_POLL_SECONDS) -> List[Dict]:
+    """Submit (or resume) a batch job for the sources, wait for it and return the parsed records"""
+    if local_root:
+        store = LocalObjectStore(local_root)
+        client = LocalBatchInference(store)
+        s3_uri = BEDROCK_BATCH_S3_URI or "s3://local-batch/jobs"
+    else:
+        store, client, s3_uri = S3ObjectStore(), get_bedrock_control_client(), BEDROCK_BATCH_S3_URI
+        if not s3_uri or not BEDROCK_BATCH_ROLE_ARN:
+            raise ValueError("Batch mode needs BEDROCK_BATCH_S3_URI and BEDROCK_BATCH_ROLE_ARN")
+
+    # A job submitted by an earlier, interrupted run is resumed rather than paid for twice
+    job = None
+    if os.path.exists(state_path):
+        with open(state_path, encoding='utf-8') as state:
+            job = json.load(state)
+        if sorted(job["sources"].values()) != sorted(sources):
+            logger.warning(f"Ignoring {state_path}: it belongs to a batch with different inputs")
+            job = None
+        else:
+            logger.info(f"Resuming batch job {job['job_arn']}")
+    if job is None:
+        job_name = job_name or f"cheque-batch-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+        job = submit_batch(sources, job_name, s3_uri, client=client, store=store)
+        with open(state_path, "w", encoding='utf-8') as state:
+            json.dump(job, state)
+
+    if job["job_arn"]:
+        wait_for_batch(job["job_arn"], client=client, poll_seconds=poll_seconds)
+    return collect_batch_results(job, store=store)
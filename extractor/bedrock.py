@@ -0,0 +1,362 @@
+import json
+import logging
+import math
+import queue
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+from config.config import (
+    BEDROCK_CALL_TIMEOUT, BEDROCK_HEDGE_ENABLED, BEDROCK_HEDGE_MIN_SAMPLES, BEDROCK_HEDGE_PERCENTILE,
+    BEDROCK_INITIAL_RPS, BEDROCK_MAX_CONNECTIONS, BEDROCK_MAX_RPS, BEDROCK_TOKENS_PER_MINUTE
+)
+from .clients import get_bedrock_client
+from .metrics import get_metrics
+from .rate_limiter import AdaptiveRateLimiter, estimate_request_tokens, is_throttling_error, is_transient_error
+
+logger = logging.getLogger(__name__)
+
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+_call_pool = None
+_latency_tracker = None
+_call_pool_lock = threading.Lock()
+
+def get_rate_limiter() -> AdaptiveRateLimiter:
+    """Process-wide limiter shared by every Bedrock call"""
+    global _rate_limiter
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            _rate_limiter = AdaptiveRateLimiter(
+                requests_per_second=BEDROCK_INITIAL_RPS,
+                tokens_per_minute=BEDROCK_TOKENS_PER_MINUTE,
+                max_rate=BEDROCK_MAX_RPS
+            )
+    return _rate_limiter
+
+# --- Call Latency ---
+class LatencyTracker:
+    """Rolling window of recent request latencies per kind of call, used to decide when a request is late"""
+
+    def __init__(self, window: int = 200, min_samples: int = BEDROCK_HEDGE_MIN_SAMPLES):
+        self.window = window
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        self._samples: Dict[Tuple, Deque[float]] = {}
+
+    def record(self, kind: Tuple, seconds: float) -> None:
+        with self._lock:
+            samples = self._samples.get(kind)
+            if samples is None:
+                samples = self._samples[kind] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def percentile(self, kind: Tuple, q: float) -> Optional[float]:
+        """q-th percentile of the window, or None until it holds min_samples"""
+        with self._lock:
+            samples = sorted(self._samples.get(kind, ()))
+        if len(samples) < max(1, self.min_samples):
+            return None
+        return samples[min(len(samples) - 1, max(0, int(math.ceil(q / 100.0 * len(samples))) - 1))]
+
+def get_latency_tracker() -> LatencyTracker:
+    """Process-wide latency window shared by every Bedrock call"""
+    global _latency_tracker
+    with _call_pool_lock:
+        if _latency_tracker is None:
+            _latency_tracker = LatencyTracker()
+    return _latency_tracker
+
+def _get_call_pool() -> ThreadPoolExecutor:
+    # Requests run here so the caller can stop waiting at the deadline; a blocked request holds its thread until
+    # the client's read timeout frees it, and requests queued behind it only start their deadline once they run
+    global _call_pool
+    with _call_pool_lock:
+        if _call_pool is None:
+            _call_pool = ThreadPoolExecutor(max_workers=BEDROCK_MAX_CONNECTIONS, thread_name_prefix="bedrock-call")
+    return _call_pool
+
+# --- Retry Logic Helper Functions ---
+def exponential_backoff_delay(attempt: int, base_delay: float = 3.0, max_delay: float = 120.0) -> float:
+    """Calculate exponential backoff delay with jitter - more aggressive for rate limiting"""
+    delay = min(base_delay * (2 ** attempt), max_delay)
+    # Add jitter to avoid thundering herd problem
+    jitter = random.uniform(0.1, 0.3) * delay
+    return delay + jitter
+
+class StreamInterruptedError(Exception):
+    """A response stream failed after part of its output was handed to the caller, so it cannot be retried"""
+
+class CallTimeoutError(TimeoutError):
+    """No request of a call answered before its deadline"""
+
+# --- Requests ---
+class _Request:
+    """One request of a call (the first, or a hedge) running on the call pool, reporting through a shared queue"""
+
+    def __init__(self, arrivals: queue.Queue, hedge: bool):
+        self.arrivals = arrivals
+        self.hedge = hedge
+        self.cancelled = threading.Event()
+        self.failed = False
+        # Set when a pool thread picks the request up, so time spent queued is not counted against it
+        self.started: Optional[float] = None
+        self.usage: Dict = {}
+        self.output_chars = 0
+
+    def put(self, kind: str, payload: Any) -> None:
+        self.arrivals.put((self, kind, payload))
+
+def _request_whole(request: _Request, model_id: str, body: str) -> Dict:
+    response = get_bedrock_client().invoke_model(modelId=model_id, body=body)
+    # Read even when cancelled, as the usage of the losing request is still billed
+    result = json.loads(response['body'].read())
+    request.usage = result.get('usage', {})
+    return result
+
+def _close_stream(stream) -> None:
+    """Close a response stream that may not have been read to the end, returning its slot to the connection pool"""
+    stream.close()
+    # urllib3 closes the socket of a response closed early but only gives its pool slot back on release_conn(),
+    # so without this every losing hedge and aborted stream would shrink the client's pool by one connection
+    release = getattr(getattr(stream, '_raw_stream', None), 'release_conn', None)
+    if release is not None:
+        release()
+
+def _request_stream(request: _Request, model_id: str, body: str) -> Dict:
+    response = get_bedrock_client().invoke_model_with_response_stream(modelId=model_id, body=body)
+    stream = response['body']
+    stop_reason = None
+    try:
+        for event in stream:
+            chunk = json.loads(event['chunk']['bytes'])
+            if chunk['type'] == 'message_start':
+                # Input tokens are billed even if this request loses the race
+                request.usage.update(chunk['message'].get('usage', {}))
+            if request.cancelled.is_set():
+                break
+            if chunk['type'] == 'content_block_delta' and chunk['delta'].get('type') == 'text_delta':
+                request.output_chars += len(chunk['delta']['text'])
+                request.put("text", chunk['delta']['text'])
+            elif chunk['type'] == 'message_delta':
+                request.usage.update(chunk.get('usage', {}))
+                stop_reason = chunk['delta'].get('stop_reason')
+    finally:
+        _close_stream(stream)
+    if request.cancelled.is_set():
+        # No final usage event arrives for a closed stream, so the output is estimated from its length
+        request.usage['output_tokens'] = max(request.usage.get('output_tokens', 0), request.output_chars // 4)
+    return {"stop_reason": stop_reason}
+
+def _run_request(request: _Request, send: Callable, model_id: str, body: str, stage: str,
+                 estimated_tokens: int) -> None:
+    """Send one request and account for it, whether it wins, loses or fails"""
+    if request.cancelled.is_set():
+        # The call was settled while this request waited for a thread, so it is never sent
+        return
+    limiter = get_rate_limiter()
+    metrics = get_metrics()
+    request.started = time.perf_counter()
+    request.put("started", None)
+    try:
+        result = send(request, model_id, body)
+    except Exception as e:
+        request.put("error", e)
+        if is_throttling_error(e):
+            limiter.record_throttle()
+            metrics.increment("bedrock_throttles", model=model_id)
+        return
+    usage = request.usage
+    used_tokens = usage.get('input_tokens', 0) + usage.get('output_tokens', 0) if usage else None
+    if usage:
+        metrics.increment("bedrock_input_tokens", usage.get('input_tokens', 0), stage=stage, model=model_id)
+        metrics.increment("bedrock_output_tokens", usage.get('output_tokens', 0), stage=stage, model=model_id)
+    limiter.record_success(estimated_tokens, used_tokens)
+    request.put("done", result)
+
+def _race(model_id: str, body: Dict, send: Callable, stage: str, estimated_tokens: int,
+          timeout: float) -> Iterator[Tuple[str, Any]]:
+    """("text", ...) and ("done", ...) items of whichever request answers first, hedging a late one
+
+    With BEDROCK_HEDGE_ENABLED, a request still unanswered at the rolling BEDROCK_HEDGE_PERCENTILE latency of
+    this kind of call gets a duplicate, if the rate limiter has budget to spare right now. The first request to
+    produce output wins and the other is cancelled. The deadline and the hedge delay count from when the first
+    request is actually sent, not from when it was queued for a thread. Raises CallTimeoutError once the deadline
+    passes.
+    """
+    metrics = get_metrics()
+    tracker = get_latency_tracker()
+    payload = json.dumps(body)
+    streamed = send is _request_stream
+    # Detection, extraction and multi-document requests differ in output budget and so in latency
+    kind = (model_id, streamed, body.get("max_tokens"))
+    arrivals: queue.Queue = queue.Queue()
+    requests: List[_Request] = []
+
+    def launch(hedge: bool) -> None:
+        request = _Request(arrivals, hedge)
+        requests.append(request)
+        metrics.increment("bedrock_requests", model=model_id)
+        _get_call_pool().submit(_run_request, request, send, model_id, payload, stage, estimated_tokens)
+
+    hedge_delay = tracker.percentile(kind, BEDROCK_HEDGE_PERCENTILE) if BEDROCK_HEDGE_ENABLED else None
+    # Both are set once the first request leaves the pool queue
+    deadline = hedge_at = math.inf
+    winner = None
+    launch(hedge=False)
+    try:
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                metrics.increment("bedrock_timeouts", model=model_id)
+                raise CallTimeoutError(f"No answer from {model_id} within {timeout:g}s")
+            if winner is None and now >= hedge_at:
+                hedge_at = math.inf
+                if get_rate_limiter().try_acquire(estimated_tokens):
+                    metrics.increment("bedrock_hedges", model=model_id)
+                    launch(hedge=True)
+                else:
+                    metrics.increment("bedrock_hedges_skipped", model=model_id)
+            wake = min(deadline, hedge_at)
+            try:
+                request, item, value = arrivals.get(timeout=None if wake == math.inf else max(0.0, wake - now))
+            except queue.Empty:
+                continue
+
+            if item == "started":
+                if request is requests[0]:
+                    deadline = request.started + timeout
+                    if hedge_delay is not None:
+                        hedge_at = request.started + hedge_delay
+                continue
+            if winner is None:
+                if item == "error":
+                    # Another request of the call may still answer
+                    request.failed = True
+                    if all(other.failed for other in requests):
+                        raise value
+                    continue
+                winner = request
+                hedge_at = math.inf
+                # Timed from the first request even when a hedge wins: its latency is then only known to be at
+                # least this long, and recording the hedge's shorter one would pull the percentile down and fire
+                # hedges ever earlier
+                tracker.record(kind, time.perf_counter() - requests[0].started)
+                if request.hedge:
+                    metrics.increment("bedrock_hedge_wins", model=model_id)
+                for other in requests:
+                    if other is not winner:
+                        other.cancelled.set()
+            if request is not winner:
+                continue
+            if item == "error":
+                raise value
+            yield item, value
+            if item == "done":
+                return
+    finally:
+        for request in requests:
+            request.cancelled.set()
+
+# --- Model Invocation ---
+def invoke_model_with_retry(model_id: str, body: Dict, max_retries: int = 5) -> Dict:
+    """Invoke Bedrock model through the shared rate limiter with exponential backoff retry logic"""
+    def consume(items: Iterator[Tuple[str, Any]]) -> Dict:
+        # A whole response arrives as a single "done" item
+        return next(items)[1]
+
+    return _call_with_retry(model_id, body, _request_whole, consume, max_retries)
+
+def invoke_model_stream_with_retry(model_id: str, body: Dict, on_text: Callable[[str], bool],
+                                   on_reset: Optional[Callable[[], None]] = None, max_retries: int = 5) -> Dict:
+    """Invoke a model with a streamed response, handing each piece of text to on_text as it arrives
+
+    on_text runs on the calling thread; returning True closes the stream early. A stream that fails part way is
+    retried from the start after calling on_reset, or raises StreamInterruptedError when there is no on_reset.
+    The result has the shape of an invoke_model response, with the text received so far and "aborted" set when
+    the caller stopped the stream.
+    """
+    delivered = False
+
+    def consume(items: Iterator[Tuple[str, Any]]) -> Dict:
+        nonlocal delivered
+        metrics = get_metrics()
+        if delivered:
+            on_reset()
+            delivered = False
+        start = time.perf_counter()
+        pieces = []
+        stop_reason = None
+        aborted = False
+        try:
+            for item, value in items:
+                if item == "done":
+                    stop_reason = value.get("stop_reason")
+                    break
+                if not pieces:
+                    metrics.observe("bedrock_first_token", time.perf_counter() - start, model=model_id)
+                pieces.append(value)
+                delivered = True
+                if on_text(value):
+                    aborted = True
+                    metrics.increment("bedrock_stream_aborts", model=model_id)
+                    break
+        except Exception as e:
+            if pieces and on_reset is None:
+                raise StreamInterruptedError(f"Model response stream broke off after {len(pieces)} chunks") from e
+            raise
+        return {"content": [{"type": "text", "text": "".join(pieces)}], "stop_reason": stop_reason,
+                "aborted": aborted}
+
+    return _call_with_retry(model_id, body, _request_stream, consume, max_retries)
+
+def _call_with_retry(model_id: str, body: Dict, send: Callable, consume: Callable[[Iterator], Dict],
+                     max_retries: int) -> Dict:
+    limiter = get_rate_limiter()
+    metrics = get_metrics()
+    # Token usage is attributed to the stage making the call (detect, extract, ...)
+    stage = metrics.current_stage() or "unattributed"
+    estimated_tokens = estimate_request_tokens(body)
+    for attempt in range(max_retries):
+        metrics.observe("rate_limit_wait", limiter.acquire(estimated_tokens))
+        if attempt:
+            metrics.increment("bedrock_retries", model=model_id)
+        items = _race(model_id, body, send, stage, estimated_tokens, BEDROCK_CALL_TIMEOUT)
+        try:
+            with metrics.span("bedrock_invoke", model=model_id):
+                return consume(items)
+        except StreamInterruptedError:
+            metrics.increment("bedrock_errors", model=model_id)
+            raise
+        except Exception as e:
+            # Check if it's a throttling exception
+            if is_throttling_error(e):
+                if attempt < max_retries - 1:  # Don't wait on the last attempt
+                    # The limiter has already slowed down, so only a short jittered pause is needed
+                    delay = exponential_backoff_delay(attempt, base_delay=1.0)
+                    logger.warning(f"⏳ Rate limit reached. Waiting {delay:.1f} seconds before retry {attempt + 1}/{max_retries}...")
+                    with metrics.span("backoff_sleep"):
+                        time.sleep(delay)
+                    continue
+                else:
+                    raise Exception(f"Max retries reached due to rate limiting: {str(e)}")
+            elif is_transient_error(e) and attempt < max_retries - 1:
+                # Timeouts, dropped connections and 5xx errors say nothing about the rate, so the limiter is left alone
+                metrics.increment("bedrock_transient_errors", model=model_id)
+                delay = exponential_backoff_delay(attempt, base_delay=0.5, max_delay=10.0)
+                logger.warning(f"Transient Bedrock error ({e}). Retrying in {delay:.1f} seconds "
+                               f"({attempt + 1}/{max_retries})...")
+                with metrics.span("backoff_sleep"):
+                    time.sleep(delay)
+                continue
+            else:
+                # For non-throttling errors, re-raise immediately
+                metrics.increment("bedrock_errors", model=model_id)
+                raise e
+        finally:
+            items.close()
+
+    raise Exception("Max retries exceeded")
@@ -0,0 +1,154 @@
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from config.config import PRECLASSIFIER_MIN_CONFIDENCE
+from .metrics import MetricsRegistry, get_metrics
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+# Analysis resolution: enough to keep thin text strokes dark, small enough to stay in the tens of ms
+ANALYSIS_LONG_EDGE = 1024
+# Indian CTS-2010 cheques are 8 x 3.67 in (~2.2:1); bills and invoices are mostly A4/letter portrait
+CHEQUE_ASPECT = (2.0, 2.7)
+# The MICR code line sits in the bottom ~15% of a cheque
+MICR_BAND = 0.15
+# A cheque scanned on an A4 page can sit anywhere on it, so bills are also searched for a MICR line in bands
+# this fraction of the page width high (the MICR band of a cheque as wide as the page)
+PAGE_MICR_BAND = MICR_BAND / CHEQUE_ASPECT[0]
+
+@dataclass
+class Preclassification:
+    """Local verdict on a document's type; doc_type is None when the model should decide"""
+    doc_type: Optional[str]
+    confidence: float
+    features: Dict[str, float] = field(default_factory=dict)
+
+# --- Image Features ---
+def _ink_mask(image: "Image.Image") -> "Image.Image":
+    """Small grayscale copy with ink as 255 and paper as 0"""
+    gray = image.convert('L')
+    gray.thumbnail((ANALYSIS_LONG_EDGE, ANALYSIS_LONG_EDGE))
+    # Ink is anything clearly darker than the paper, whose brightness is the median pixel
+    histogram = gray.histogram()
+    half, seen, paper = gray.size[0] * gray.size[1] / 2, 0, 255
+    for level, count in enumerate(histogram):
+        seen += count
+        if seen >= half:
+            paper = level
+            break
+    threshold = min(paper - 40, paper * 0.7)
+    return gray.point([255 if level < threshold else 0 for level in range(256)])
+
+def _profile(mask: "Image.Image", rows: bool) -> List[float]:
+    """Fraction of ink per row (or column), computed by box-averaging the mask down to one pixel wide"""
+    from PIL import Image
+
+    width, height = mask.size
+    size = (1, height) if rows else (width, 1)
+    return [value / 255.0 for value in mask.resize(size, Image.BOX).getdata()]
+
+def _count_runs(profile: List[float], threshold: float, min_gap: int = 1) -> int:
+    """Number of separate runs above threshold, e.g. text lines in a row profile"""
+    runs = 0
+    gap = min_gap
+    for value in profile:
+        if value > threshold:
+            if gap >= min_gap:
+                runs += 1
+            gap = 0
+        else:
+            gap += 1
+    return runs
+
+def _micr_evidence(mask: "Image.Image", rows: List[float], band_start: int, band_end: int,
+                   above_start: int) -> Dict[str, float]:
+    """Coverage, peak and contrast of the rows [band_start, band_end) against the rows from above_start down to it"""
+    band = mask.crop((0, band_start, mask.size[0], band_end))
+    band_columns = _profile(band, rows=False)
+    above = rows[above_start:band_start] or [0.0]
+    band_rows = rows[band_start:band_end] or [0.0]
+    return {
+        # A MICR line is one dense row run spanning a large part of the cheque's width
+        "micr_coverage": sum(1 for value in band_columns if value > 0.04) / len(band_columns),
+        "micr_peak": max(band_rows),
+        "micr_contrast": max(band_rows) / (max(above) + 1e-3),
+    }
+
+def extract_layout_features(image: "Image.Image") -> Dict[str, float]:
+    """Aspect ratio, text-line count, ink density and MICR-band evidence of a page"""
+    width, height = image.size
+    mask = _ink_mask(image)
+    rows = _profile(mask, rows=True)
+    band_start = int(len(rows) * (1 - MICR_BAND))
+    features = {
+        "aspect": width / height,
+        "ink_density": sum(rows) / len(rows),
+        "text_lines": float(_count_runs(rows, threshold=0.02, min_gap=2)),
+        **_micr_evidence(mask, rows, band_start, len(rows), int(len(rows) * 0.55)),
+    }
+
+    # Strongest MICR-like band anywhere on the page, each compared with the rows above it as in the bottom band
+    band_height = max(1, int(mask.size[0] * PAGE_MICR_BAND))
+    body_height = int(mask.size[0] / CHEQUE_ASPECT[0] * (1 - MICR_BAND - 0.55))
+    features["micr_anywhere"] = max(
+        (_micr_score(_micr_evidence(mask, rows, start, start + band_height, max(0, start - body_height)))
+         for start in range(0, max(1, len(rows) - band_height + 1), max(1, band_height // 2))),
+        default=0.0
+    )
+    return features
+
+def _ramp(value: float, low: float, high: float) -> float:
+    """0 at or below low, 1 at or above high, linear in between"""
+    if high == low:
+        return float(value >= high)
+    return min(1.0, max(0.0, (value - low) / (high - low)))
+
+def _micr_score(features: Dict[str, float]) -> float:
+    """How much a band looks like a MICR code line, from 0 to 1"""
+    return _ramp(features["micr_coverage"], 0.2, 0.35) * _ramp(features["micr_peak"], 0.04, 0.1) * \
+        _ramp(features["micr_contrast"], 0.8, 1.5)
+
+# --- Classifier ---
+def preclassify(image: "Image.Image", min_confidence: float = PRECLASSIFIER_MIN_CONFIDENCE) -> Preclassification:
+    """Classify clear-cut cheques and bills from layout alone, leaving ambiguous pages to the model"""
+    features = extract_layout_features(image)
+    aspect = features["aspect"]
+
+    in_cheque_range = _ramp(aspect, CHEQUE_ASPECT[0] - 0.4, CHEQUE_ASPECT[0]) * \
+        (1 - _ramp(aspect, CHEQUE_ASPECT[1], CHEQUE_ASPECT[1] + 0.4))
+    micr = _micr_score(features)
+    sparse_layout = 1 - _ramp(features["text_lines"], 12, 20)
+    cheque_score = 0.5 * in_cheque_range + 0.35 * micr + 0.15 * sparse_layout
+
+    portrait = _ramp(1 / aspect, 1.1, 1.3)
+    dense_layout = _ramp(features["text_lines"], 6, 12)
+    bill_score = 0.6 * portrait + 0.4 * dense_layout
+
+    features.update(cheque_score=round(cheque_score, 3), bill_score=round(bill_score, 3))
+    doc_type, confidence = ("cheque", cheque_score) if cheque_score >= bill_score else ("bill", bill_score)
+    # Both looking plausible (e.g. a landscape receipt with many lines) is exactly the case to defer, and so is
+    # a portrait page with a MICR-like line on it, which may be a cheque scanned on A4
+    if confidence < min_confidence or min(cheque_score, bill_score) >= 0.5 or \
+            (doc_type == "bill" and features["micr_anywhere"] >= 0.5):
+        return Preclassification(None, confidence, features)
+    return Preclassification(doc_type, confidence, features)
+
+def preclassifier_report(metrics: Optional[MetricsRegistry] = None) -> Dict:
+    """Hit rate of the pre-classifier and the detection-call time it saved in the metrics window"""
+    metrics = metrics or get_metrics()
+    decided = metrics.counter_total("preclassifier_decided")
+    deferred = metrics.counter_total("preclassifier_deferred")
+    total = decided + deferred
+    stages = metrics.snapshot()["stages"]
+    detect = stages.get("detect")
+    classify = stages.get("preclassify")
+    # Each local verdict replaces one detection call of the average observed duration
+    seconds_saved = decided * detect["mean_ms"] / 1000.0 if detect else None
+    return {
+        "decided": int(decided),
+        "deferred": int(deferred),
+        "hit_rate": decided / total if total else 0.0,
+        "seconds_saved": seconds_saved,
+        "classifier_seconds": classify["total_seconds"] if classify else 0.0,
+    }
@@ -0,0 +1,309 @@
+import argparse
+import csv
+import glob
+import importlib.util
+import io
+import json
+import logging
+import os
+import sys
+from typing import Dict, List, Optional, TextIO, Union
+
+from config.config import BEDROCK_BATCH_POLL_SECONDS, EXTRACTION_MODE, IFSC_INDEX_PATH, PIPELINE_WORKERS
+from .batch import run_batch
+from .classifier import preclassifier_report
+from .export import REPORT_FORMATS, open_report_sink, revalidate_report, stream_report
+from .ifsc import build_ifsc_index
+from .ingest import DocumentPage, expand_pages, iter_page_keys, split_page_key
+from .metrics import get_metrics
+from .pipeline import DocumentPipeline
+from .processing import analyze_document
+from .validation import calculate_automated_accuracy, validate_frame
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".tif", ".tiff", ".pdf")
+
+# --- Input Discovery ---
+def read_manifest(path: str) -> List[str]:
+    """Read image paths from a JSONL manifest; relative paths resolve against the manifest's directory"""
+    base_dir = os.path.dirname(os.path.abspath(path))
+    sources = []
+    with open(path, encoding='utf-8') as manifest:
+        for line in manifest:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            source = record.get("path") or record.get("image") if isinstance(record, dict) else record
+            if not source:
+                raise ValueError(f"Manifest entry without a 'path': {line}")
+            sources.append(source if os.path.isabs(source) else os.path.join(base_dir, source))
+    return sources
+
+def collect_sources(inputs: List[str]) -> List[str]:
+    """Expand directories, glob patterns and JSONL manifests into an ordered, de-duplicated list of input files"""
+    sources = []
+    for item in inputs:
+        if os.path.isdir(item):
+            candidates = sorted(glob.glob(os.path.join(item, "**", "*"), recursive=True))
+            sources.extend(path for path in candidates if path.lower().endswith(IMAGE_EXTENSIONS))
+        elif item.lower().endswith(".jsonl"):
+            sources.extend(read_manifest(item))
+        elif glob.has_magic(item):
+            sources.extend(sorted(glob.glob(item, recursive=True)))
+        else:
+            sources.append(item)
+    return list(dict.fromkeys(os.path.normpath(source) for source in sources))
+
+# --- Checkpointing ---
+def load_checkpoint(path: str) -> Dict[str, Dict]:
+    """Load completed records keyed by source, ignoring a line truncated by a crash mid-write"""
+    records = {}
+    if not os.path.exists(path):
+        return records
+    with open(path, encoding='utf-8') as checkpoint:
+        for line in checkpoint:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            records[record["source"]] = record
+    return records
+
+def append_checkpoint(checkpoint, record: Dict) -> None:
+    """Durably append one completed record to the checkpoint file"""
+    checkpoint.write(json.dumps(record) + "\n")
+    checkpoint.flush()
+    os.fsync(checkpoint.fileno())
+
+# --- Processing ---
+def process_page(page: Union[DocumentPage, Exception], mode: str) -> Dict:
+    """Run the shared detect/extract/validate path on one decoded page"""
+    if isinstance(page, Exception):
+        raise page
+    return analyze_document(page.image, mode=mode)
+
+def page_record(key: str, **fields) -> Dict:
+    """Output record of one page, naming the file and page number it came from"""
+    path, page = split_page_key(key)
+    return {"source": key, "file": path, "page": page, **fields}
+
+# --- Output ---
+def check_output(output: str) -> None:
+    """Raise ValueError up front if write_results could not write this output once every document is done"""
+    extension = os.path.splitext(output)[1].lower()
+    if extension not in (".xlsx", ".csv", ".parquet", ".jsonl"):
+        raise ValueError(f"Unsupported output format '{extension}' (use .xlsx, .csv, .parquet or .jsonl)")
+    if extension == ".parquet" and importlib.util.find_spec("pyarrow") is None:
+        raise ValueError("Parquet output needs pyarrow (pip install pyarrow)")
+
+def write_results(records: List[Dict], output: str) -> None:
+    """Write records as JSONL, CSV, an Excel report or Parquet to a local path or an s3://bucket/key URI"""
+    extension = os.path.splitext(output)[1].lower()
+    if extension in (".xlsx", ".parquet"):
+        # Rows are streamed into the file (and on to S3 in parts), so the report is never held in memory whole
+        stream_report(((record["result"], record["validation"], record["doc_type"], record.get("verification"))
+                       for record in records if not record.get("error")), output, extension)
+    elif extension in (".jsonl", ".csv"):
+        # The sink discards a partial file or S3 upload if writing fails instead of completing a truncated one
+        with open_report_sink(output, REPORT_FORMATS.get(extension, 'application/x-ndjson')) as sink:
+            out = io.TextIOWrapper(sink, encoding='utf-8', newline="")
+            if extension == ".jsonl":
+                for record in records:
+                    out.write(json.dumps(record) + "\n")
+            else:
+                write_csv(records, out)
+            out.flush()
+            out.detach()
+    else:
+        raise ValueError(f"Unsupported output format '{extension}' (use .xlsx, .csv, .parquet or .jsonl)")
+
+def write_csv(records: List[Dict], out: TextIO) -> None:
+    """Write one flattened row per document with extracted fields and per-field validity"""
+    result_fields = list(dict.fromkeys(field for record in records for field in (record.get("result") or {})))
+    validation_fields = list(dict.fromkeys(field for record in records for field in (record.get("validation") or {})))
+    header = ["source", "file", "page", "document_type", "error", "rule_based_accuracy", "model_agreement"] + \
+        result_fields + [f"{field}_valid" for field in validation_fields]
+
+    writer = csv.writer(out)
+    writer.writerow(header)
+    for record in records:
+        result = record.get("result") or {}
+        validation = record.get("validation") or {}
+        accuracy = calculate_automated_accuracy(result, None, validation) if result else ""
+        verification = record.get("verification")
+        writer.writerow(
+            [record["source"], record.get("file", record["source"]), record.get("page", 1),
+             record.get("doc_type") or "", record.get("error") or "",
+             f"{accuracy:.1f}" if accuracy != "" else "",
+             f"{verification['agreement']:.1f}" if verification else ""] +
+            [result.get(field, "") for field in result_fields] +
+            [validation[field]["valid"] if field in validation else "" for field in validation_fields]
+        )
+
+# --- Re-validation ---
+def revalidate_csv(source: str, output: str) -> None:
+    """Recompute the validity and accuracy columns of a CSV written by write_csv"""
+    import pandas as pd
+
+    frame = pd.read_csv(source, dtype=str, keep_default_na=False)
+    for doc_type in ("cheque", "bill"):
+        rows = frame["document_type"] == doc_type
+        if not rows.any():
+            continue
+        validated = validate_frame(frame.loc[rows], doc_type)
+        for column in validated:
+            # Only fields this document type checks; the other type's columns stay empty for these rows
+            if column.endswith("_valid") and column in frame:
+                frame.loc[rows, column] = validated[column].map(str)
+        frame.loc[rows, "rule_based_accuracy"] = validated["rule_based_accuracy"].map("{:.1f}".format)
+    frame.to_csv(output, index=False)
+
+def revalidate_file(source: str, output: str) -> None:
+    """Re-run rule-based validation over an earlier .xlsx report or .csv output"""
+    extension = os.path.splitext(source)[1].lower()
+    if extension == ".xlsx":
+        with open(source, "rb") as report:
+            excel_bytes = revalidate_report(report.read())
+        with open(output, "wb") as out:
+            out.write(excel_bytes)
+    elif extension == ".csv":
+        revalidate_csv(source, output)
+    else:
+        raise ValueError(f"Cannot re-validate '{extension}' files (use .xlsx or .csv)")
+
+# --- Run Modes ---
+def run_pipeline_mode(args, pending: List[str], checkpoint_path: str, completed: Dict[str, Dict]) -> None:
+    """Process documents with synchronous model calls on the worker pipeline, checkpointing each one"""
+    pipeline = DocumentPipeline(lambda _, page: process_page(page, args.mode), max_workers=args.workers)
+    with open(checkpoint_path, "a", encoding='utf-8') as checkpoint:
+        # Pages are decoded one at a time as the pipeline takes them, so a 500-page PDF never sits in memory
+        for done, outcome in enumerate(pipeline.run(iter_page_keys(pending)), start=1):
+            value = outcome.value or {}
+            record = page_record(
+                outcome.name,
+                doc_type=value.get("doc_type"),
+                result=value.get("result"),
+                validation=value.get("validation"),
+                verification=value.get("verification"),
+                error=outcome.error or value.get("error")
+            )
+            append_checkpoint(checkpoint, record)
+            completed[outcome.name] = record
+            status = f"error: {record['error']}" if record["error"] else record["doc_type"]
+            logger.info(f"[{done}/{len(pending)}] {outcome.name}: {status}")
+
+def run_batch_mode(args, pending: List[str], checkpoint_path: str, completed: Dict[str, Dict]) -> None:
+    """Process documents as one batch inference job, checkpointing the parsed outputs"""
+    state_path = f"{checkpoint_path}.batch.json"
+    records = run_batch(pending, state_path, local_root=args.batch_local, poll_seconds=args.batch_poll)
+    with open(checkpoint_path, "a", encoding='utf-8') as checkpoint:
+        for record in records:
+            record = page_record(record.pop("source"), **record)
+            append_checkpoint(checkpoint, record)
+            completed[record["source"]] = record
+    # The job's results are durable in the checkpoint now, so the next run must not resume it
+    os.remove(state_path)
+
+# --- Entry Point ---
+def build_parser() -> argparse.ArgumentParser:
+    """Command-line arguments for headless batch runs"""
+    parser = argparse.ArgumentParser(
+        prog="python -m extractor",
+        description="Extract cheque and bill data from images without the Streamlit UI"
+    )
+    parser.add_argument("inputs", nargs="+",
+                        help="Image directories, glob patterns, image, PDF or TIFF files, or JSONL manifests")
+    parser.add_argument("-o", "--output",
+                        help="Output file (.xlsx, .csv, .parquet or .jsonl), local or s3://bucket/key; "
+                             "required unless building the IFSC index")
+    parser.add_argument("-w", "--workers", type=int, default=PIPELINE_WORKERS, help="Concurrent documents")
+    parser.add_argument("--mode", choices=["unified", "legacy"], default=EXTRACTION_MODE,
+                        help="Single-call unified extraction or the legacy three-call path")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <output>.checkpoint.jsonl, in the "
+                                               "working directory for S3 outputs)")
+    parser.add_argument("--fresh", action="store_true", help="Ignore an existing checkpoint and start over")
+    parser.add_argument("--retry-failed", action="store_true", help="Reprocess documents that failed last time")
+    parser.add_argument("--batch", action="store_true",
+                        help="Submit pending documents as one Bedrock Batch Inference job (unified prompt) instead "
+                             "of synchronous calls; cheaper and throttle-free, but finishes within hours")
+    parser.add_argument("--batch-local", metavar="DIR",
+                        help="Run batch mode against a local stand-in that keeps S3 objects under DIR")
+    parser.add_argument("--batch-poll", type=float, default=BEDROCK_BATCH_POLL_SECONDS,
+                        help="Seconds between batch job status checks")
+    parser.add_argument("--revalidate", action="store_true",
+                        help="Treat the input as an earlier .xlsx report or .csv output and only re-run "
+                             "rule-based validation over it")
+    parser.add_argument("--build-ifsc-index", action="store_true",
+                        help="Treat the inputs as RBI IFSC list files (.csv or .xlsx) and build the IFSC index "
+                             "at the output path (default IFSC_INDEX_PATH)")
+    parser.add_argument("--metrics",
+                        help="Write per-stage timings to this file (.prom for Prometheus text, .jsonl for spans)")
+    parser.add_argument("--log-level", default="INFO", help="Logging level")
+    return parser
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Process every input document, checkpointing each result so interrupted runs resume"""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    if args.build_ifsc_index:
+        count = build_ifsc_index(args.inputs, args.output or IFSC_INDEX_PATH)
+        logger.info(f"Indexed {count} IFSC codes into {args.output or IFSC_INDEX_PATH}")
+        return 0
+    if not args.output:
+        parser.error("the following arguments are required: -o/--output")
+    if args.revalidate:
+        if len(args.inputs) != 1:
+            logger.error("--revalidate takes exactly one report or CSV file")
+            return 1
+        revalidate_file(args.inputs[0], args.output)
+        logger.info(f"Re-validated {args.inputs[0]} into {args.output}")
+        return 0
+    try:
+        check_output(args.output)
+    except ValueError as e:
+        parser.error(str(e))
+
+    # Multi-page PDFs and TIFFs contribute one entry per page; only page counts are read here
+    sources = expand_pages(collect_sources(args.inputs))
+    if not sources:
+        logger.error("No input images found")
+        return 1
+
+    # The checkpoint is appended to per document, so it stays local even when the output goes to S3
+    output_name = os.path.basename(args.output) if args.output.startswith("s3://") else args.output
+    checkpoint_path = args.checkpoint or f"{output_name}.checkpoint.jsonl"
+    if args.fresh and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    completed = load_checkpoint(checkpoint_path)
+    if args.retry_failed:
+        completed = {source: record for source, record in completed.items() if not record.get("error")}
+
+    pending = [source for source in sources if source not in completed]
+    logger.info(f"{len(sources)} documents, {len(sources) - len(pending)} already done, {len(pending)} to process")
+
+    if (args.batch or args.batch_local) and pending:
+        run_batch_mode(args, pending, checkpoint_path, completed)
+    else:
+        run_pipeline_mode(args, pending, checkpoint_path, completed)
+
+    records = [completed[source] for source in sources if source in completed]
+    write_results(records, args.output)
+    failed = sum(1 for record in records if record.get("error"))
+    logger.info(f"Wrote {len(records)} records to {args.output} ({failed} failed)")
+    classifier_stats = preclassifier_report()
+    if classifier_stats["decided"] or classifier_stats["deferred"]:
+        saved = classifier_stats["seconds_saved"]
+        logger.info(f"Pre-classifier decided {classifier_stats['decided']} documents locally "
+                    f"({classifier_stats['hit_rate'] * 100:.0f}% hit rate), saving "
+                    f"{f'~{saved:.1f}s of' if saved is not None else 'all'} detection calls")
+    if args.metrics:
+        get_metrics().write(args.metrics)
+        logger.info(f"Wrote stage metrics to {args.metrics}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+import logging
+import threading
+from functools import partial
+from typing import Any, Dict, List
+from urllib.parse import urlsplit
+
+from config.config import (
+    AWS_ACCESS_KEY_ID, AWS_REGION, AWS_SECRET_ACCESS_KEY, BEDROCK_CALL_TIMEOUT, BEDROCK_CONNECT_TIMEOUT,
+    BEDROCK_MAX_CONNECTIONS, S3_MAX_CONNECTIONS
+)
+from .metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+# Module state outlives Streamlit script reruns, so the session, its credentials and the clients' connection
+# pools are created once per process and shared by the UI, pipeline threads and background uploads
+_session = None
+_clients = {}
+_clients_lock = threading.Lock()
+
+# HTTP connections each client may keep open; botocore's default is 10
+_POOL_SIZES = {'bedrock-runtime': BEDROCK_MAX_CONNECTIONS, 's3': S3_MAX_CONNECTIONS}
+
+# --- Connection Pool Accounting ---
+_pool_managers: Dict[str, Any] = {}
+_pool_stats: Dict[str, Dict[str, int]] = {}
+_pool_stats_lock = threading.Lock()
+
+def _open_pools(service_name: str) -> List[Any]:
+    """urllib3 connection pools a client currently holds, one per endpoint host"""
+    manager = _pool_managers.get(service_name)
+    if manager is None:
+        return []
+    pools = (manager.pools.get(key) for key in manager.pools.keys())
+    return [pool for pool in pools if pool is not None and pool.pool is not None]
+
+def _sample_pools(service_name: str, request, **kwargs) -> None:
+    """Record the pool state each request meets as it is sent (a botocore before-send handler)"""
+    pools = _open_pools(service_name)
+    host = urlsplit(request.url).hostname
+    # A pool's queue holds its idle connections and unused slots; empty means every pooled connection is busy,
+    # and urllib3 runs the request on an extra connection it closes afterwards instead of waiting
+    saturated = any(pool.host == host and pool.pool.empty() for pool in pools)
+    in_use = sum(pool.pool.maxsize - pool.pool.qsize() for pool in pools) + 1
+    opened = sum(pool.num_connections for pool in pools)
+    metrics = get_metrics()
+    with _pool_stats_lock:
+        stats = _pool_stats.setdefault(service_name, {"requests": 0, "saturated": 0, "peak_in_use": 0, "opened": 0})
+        stats["requests"] += 1
+        stats["saturated"] += saturated
+        stats["peak_in_use"] = max(stats["peak_in_use"], in_use)
+        newly_opened, stats["opened"] = max(0, opened - stats["opened"]), max(stats["opened"], opened)
+    if saturated:
+        metrics.increment("http_pool_saturated", service=service_name)
+    if newly_opened:
+        metrics.increment("http_connections_opened", newly_opened, service=service_name)
+
+def _instrument_pools(client, service_name: str) -> None:
+    """Sample a boto3 client's connection pools on every request
+
+    botocore has no public view of its pools, so this reaches into its internals (client._endpoint.http_session
+    ._manager, the urllib3 PoolManager) and urllib3's pool queues. If a botocore upgrade moves them, the pool
+    metrics are switched off with a warning rather than failing every request.
+    """
+    http_session = getattr(getattr(client, '_endpoint', None), 'http_session', None)
+    manager = getattr(http_session, '_manager', None)
+    if manager is None or not hasattr(manager, 'pools'):
+        logger.warning(f"Connection pool metrics are off for {service_name}: this botocore version does not expose "
+                       f"client._endpoint.http_session._manager")
+        return
+    _pool_managers[service_name] = manager
+    client.meta.events.register('before-send', partial(_sample_pools, service_name))
+
+def connection_pool_stats() -> Dict[str, Dict[str, int]]:
+    """Per service: pool size, connections in use now and at peak, requests sent, requests that found every pooled
+    connection busy (saturated), and connections opened, which stays near the pool size while connections are reused"""
+    stats = {}
+    for service_name in list(_pool_managers):
+        pools = _open_pools(service_name)
+        with _pool_stats_lock:
+            sampled = dict(_pool_stats.get(service_name, {"requests": 0, "saturated": 0, "peak_in_use": 0}))
+        sampled.update(
+            size=_POOL_SIZES.get(service_name, 10),
+            in_use=sum(pool.pool.maxsize - pool.pool.qsize() for pool in pools),
+            opened=sum(pool.num_connections for pool in pools),
+        )
+        stats[service_name] = sampled
+    return stats
+
+# --- Lazily Created AWS Clients ---
+def _client_config(service_name: str):
+    """botocore settings of a service's client: TCP keep-alive and a pool sized for its concurrent callers"""
+    from botocore.config import Config
+
+    config = Config(tcp_keepalive=True, max_pool_connections=_POOL_SIZES.get(service_name, 10))
+    if service_name == 'bedrock-runtime':
+        # Retries are left to invoke_model_with_retry, which paces them through the shared rate limiter
+        config = config.merge(Config(connect_timeout=BEDROCK_CONNECT_TIMEOUT, read_timeout=BEDROCK_CALL_TIMEOUT,
+                                     retries={"mode": "standard", "total_max_attempts": 1}))
+    return config
+
+def _get_session():
+    """boto3 session shared by every client, so credentials are resolved once per process"""
+    global _session
+    if _session is None:
+        # boto3 adds hundreds of milliseconds to import, so only pay for it when a call is made
+        import boto3
+
+        _session = boto3.session.Session(
+            region_name=AWS_REGION,
+            aws_access_key_id=AWS_ACCESS_KEY_ID,
+            aws_secret_access_key=AWS_SECRET_ACCESS_KEY
+        )
+    return _session
+
+def _get_client(service_name: str):
+    """Create a boto3 client on first use and share it across threads"""
+    with _clients_lock:
+        client = _clients.get(service_name)
+        if client is None:
+            # Sessions are not thread-safe, so clients are only ever created under the lock
+            client = _get_session().client(service_name, config=_client_config(service_name))
+            _instrument_pools(client, service_name)
+            _clients[service_name] = client
+    return client
+
+def get_bedrock_client():
+    """Shared Bedrock runtime client"""
+    return _get_client('bedrock-runtime')
+
+def get_bedrock_control_client():
+    """Shared Bedrock control-plane client (batch inference jobs)"""
+    return _get_client('bedrock')
+
+def get_s3_client():
+    """Shared S3 client"""
+    return _get_client('s3')
+
+def set_client(service_name: str, client) -> None:
+    """Install a client (e.g. an offline stand-in) for a service; None reverts to a boto3 client on next use"""
+    with _clients_lock:
+        if client is None:
+            _clients.pop(service_name, None)
+        else:
+            _clients[service_name] = client
@@ -0,0 +1,175 @@
+import base64
+import logging
+import threading
+from io import BytesIO
+from typing import TYPE_CHECKING, Optional, Tuple, Union
+
+from config.config import (
+    ARCHIVE_JPEG_QUALITY, MODEL_IMAGE_MAX_EDGE, MODEL_IMAGE_TARGET_KB, MODEL_JPEG_MAX_QUALITY, MODEL_JPEG_MIN_QUALITY
+)
+from .cache import image_fingerprint
+from .metrics import get_metrics
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Bedrock rejects images above 5 MB, whatever the configured byte budget
+MAX_MODEL_IMAGE_BYTES = 5 * 1024 * 1024
+
+# --- Preprocessing ---
+def orient_image(image: "Image.Image") -> "Image.Image":
+    """Apply the EXIF orientation tag and convert to a JPEG-compatible mode"""
+    from PIL import ImageOps
+
+    image = ImageOps.exif_transpose(image)
+    # Convert image to RGB if it's RGBA (or any other mode JPEG can't store)
+    if image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    return image
+
+def downscale_for_model(image: "Image.Image", max_edge: int = MODEL_IMAGE_MAX_EDGE) -> "Image.Image":
+    """Shrink the image so its long edge is at most max_edge; the vision model downsamples anything larger anyway"""
+    from PIL import Image
+
+    if max_edge <= 0 or max(image.size) <= max_edge:
+        return image
+    scale = max_edge / max(image.size)
+    size = (max(1, round(image.size[0] * scale)), max(1, round(image.size[1] * scale)))
+    return image.resize(size, Image.LANCZOS)
+
+def _jpeg(image: "Image.Image", quality: int) -> bytes:
+    buffer = BytesIO()
+    image.save(buffer, format='JPEG', quality=quality)
+    return buffer.getvalue()
+
+def encode_to_budget(image: "Image.Image", target_bytes: int = MODEL_IMAGE_TARGET_KB * 1024,
+                     max_quality: int = MODEL_JPEG_MAX_QUALITY,
+                     min_quality: int = MODEL_JPEG_MIN_QUALITY) -> Tuple[bytes, int]:
+    """Binary-search the highest JPEG quality whose encoding fits target_bytes; return (bytes, quality)"""
+    best = _jpeg(image, max_quality)
+    if len(best) <= target_bytes:
+        return best, max_quality
+
+    best_quality = max_quality
+    low, high = min_quality, max_quality - 1
+    while low <= high:
+        quality = (low + high) // 2
+        data = _jpeg(image, quality)
+        if len(data) <= target_bytes or quality == min_quality:
+            best, best_quality = data, quality
+        if len(data) <= target_bytes:
+            low = quality + 1
+        else:
+            high = quality - 1
+
+    if len(best) > target_bytes:
+        logger.warning(f"Image exceeds the {target_bytes // 1024} KB budget even at quality {best_quality}")
+
+    # Hard service limit: keep shrinking until the payload is accepted
+    while len(best) > MAX_MODEL_IMAGE_BYTES:
+        logger.warning("Image too large for the model, downscaling further")
+        image = downscale_for_model(image, int(max(image.size) * 0.75))
+        best = _jpeg(image, min_quality)
+        best_quality = min_quality
+    return best, best_quality
+
+def encode_archive_jpeg(image: "Image.Image", quality: int = ARCHIVE_JPEG_QUALITY) -> bytes:
+    """Full-resolution JPEG of an upright document image for the S3 archive, never the model's smaller copy"""
+    with get_metrics().span("archive_encode"):
+        return _jpeg(image, quality)
+
+# --- Prepared Document ---
+class PreparedDocument:
+    """Decoded image with its model-sized JPEG, base64 payload and fingerprint, each computed at most once"""
+
+    __slots__ = ("image", "name", "max_edge", "target_kb", "max_quality", "quality", "_model_image", "_jpeg",
+                 "_payload", "_fingerprint", "_consumers", "_lock")
+
+    def __init__(self, image: "Image.Image", name: str = "", max_edge: int = MODEL_IMAGE_MAX_EDGE,
+                 target_kb: int = MODEL_IMAGE_TARGET_KB, max_quality: int = MODEL_JPEG_MAX_QUALITY):
+        # Full-resolution, upright image for display and signature crops
+        with get_metrics().span("orient"):
+            self.image = orient_image(image)
+        self.name = name
+        self.max_edge = max_edge
+        self.target_kb = target_kb
+        self.max_quality = max_quality
+        self.quality: Optional[int] = None
+        self._model_image = None
+        self._jpeg: Optional[bytes] = None
+        self._payload: Optional[str] = None
+        self._fingerprint: Optional[str] = None
+        self._consumers = 0
+        self._lock = threading.RLock()
+
+    @property
+    def model_image(self) -> "Image.Image":
+        """Upright image downscaled to the resolution sent to the model"""
+        with self._lock:
+            if self._model_image is None:
+                with get_metrics().span("downscale"):
+                    self._model_image = downscale_for_model(self.image, self.max_edge)
+            return self._model_image
+
+    @property
+    def jpeg_bytes(self) -> bytes:
+        """Size-budgeted JPEG encoding sent to the model; archives use encode_archive_jpeg(image) instead"""
+        with self._lock:
+            if self._jpeg is None:
+                model_image = self.model_image
+                with get_metrics().span("jpeg_encode"):
+                    self._jpeg, self.quality = encode_to_budget(model_image, self.target_kb * 1024, self.max_quality)
+            return self._jpeg
+
+    @property
+    def model_payload(self) -> str:
+        """Base64 JPEG payload for Anthropic image blocks"""
+        with self._lock:
+            if self._payload is None:
+                jpeg = self.jpeg_bytes
+                with get_metrics().span("base64_encode"):
+                    self._payload = base64.b64encode(jpeg).decode('utf-8')
+            return self._payload
+
+    @property
+    def fingerprint(self) -> str:
+        """Content hash of the pixels the model sees, used as the extraction cache key"""
+        with self._lock:
+            if self._fingerprint is None:
+                model_image = self.model_image
+                with get_metrics().span("fingerprint"):
+                    self._fingerprint = image_fingerprint(model_image)
+            return self._fingerprint
+
+    def drop_model_payload(self) -> None:
+        """Free the model encodings once no more model calls will be made, keeping the JPEG for retained consumers"""
+        with self._lock:
+            self._payload = None
+            self._model_image = None
+            if self._consumers == 0:
+                self._jpeg = None
+
+    def retain(self) -> None:
+        """Register a later consumer (e.g. a background upload) of the JPEG bytes"""
+        with self._lock:
+            self._consumers += 1
+
+    def release(self) -> None:
+        """Mark one consumer as done; the encodings are freed when the last one finishes"""
+        with self._lock:
+            self._consumers = max(0, self._consumers - 1)
+            if self._consumers == 0:
+                self._jpeg = None
+                self._payload = None
+                self._model_image = None
+
+# Anything the model-calling functions accept: a raw decoded image or an already prepared document
+DocumentImage = Union["Image.Image", PreparedDocument]
+
+def prepare_document(image: DocumentImage, name: str = "") -> PreparedDocument:
+    """Wrap a decoded image in a PreparedDocument, passing existing ones through unchanged"""
+    if isinstance(image, PreparedDocument):
+        return image
+    return PreparedDocument(image, name=name)
@@ -0,0 +1,404 @@
+import contextlib
+import io
+import os
+import threading
+import uuid
+from io import BytesIO
+from typing import TYPE_CHECKING, BinaryIO, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .metrics import get_metrics
+from .storage import S3MultipartWriter
+from .validation import calculate_automated_accuracy, validate_frame
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Report sheets and, per document type, the validated fields' value and validity columns
+REPORT_SHEETS = {"ChequeData": "cheque", "BillData": "bill"}
+REPORT_FORMATS = {
+    ".xlsx": 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    ".csv": 'text/csv',
+    ".parquet": 'application/vnd.apache.parquet',
+}
+REPORT_COLUMNS = {
+    "cheque": {
+        "bank": ("Bank Name", "Bank Valid"),
+        "account_number": ("Account Number", "Account Number Valid"),
+        "ifsc_code": ("IFSC Code", "IFSC Valid"),
+        "date": ("Date", "Date Valid"),
+        "amount": ("Amount", "Amount Valid"),
+    },
+    "bill": {
+        "vendor_name": ("Vendor Name", "Vendor Name Valid"),
+        "bill_number": ("Bill Number", "Bill Number Valid"),
+        "gst_number": ("GST Number", "GST Number Valid"),
+        "vendor_phone": ("Vendor Phone", "Phone Valid"),
+        "vendor_email": ("Vendor Email", "Email Valid"),
+        "date": ("Date", "Date Valid"),
+        "total_amount": ("Total Amount", "Amount Valid"),
+    },
+}
+
+# --- Report Rows ---
+def build_report_row(result: Dict, verification: Optional[Dict], validation: Dict, doc_type: str, number: int) -> Dict:
+    """Build the report row for one document; number is its position among documents of the same type
+
+    verification is the record of a Sonnet cross-check (see escalate_if_uncertain), for documents that had one.
+    """
+    discrepancies = verification["discrepancies"] if verification else {}
+    agreement = f"{verification['agreement']:.1f}%" if verification else "N/A"
+    automated_accuracy = calculate_automated_accuracy(result, None, validation)
+    
+    if doc_type == "cheque":
+        row_data = {  
+            "Cheque No.": number,  
+            "Bank Name": str(result.get("bank", "N/A")),  
+            "Account Holder": str(result.get("account_holder", "N/A")),  
+            "Account Number": str(result.get("account_number", "N/A")),  
+            "Amount": str(result.get("amount", "N/A")),  
+            "IFSC Code": str(result.get("ifsc_code", "N/A")),  
+            "Branch": str(result.get("branch_name", "N/A")),
+            "Date": str(result.get("date", "N/A")),  
+            "Signature Present": "Yes" if result.get("has_signature", False) else "No",
+            "Rule-Based Accuracy": f"{automated_accuracy:.1f}%",
+            "Model Agreement": agreement,
+            "Bank Valid": "Yes" if validation.get("bank", {}).get("valid", False) else "No",
+            "Account Number Valid": "Yes" if validation.get("account_number", {}).get("valid", False) else "No",
+            "IFSC Valid": "Yes" if validation.get("ifsc_code", {}).get("valid", False) else "No",
+            "Date Valid": "Yes" if validation.get("date", {}).get("valid", False) else "No",
+            "Amount Valid": "Yes" if validation.get("amount", {}).get("valid", False) else "No"
+        }
+        
+        # Add discrepancy information for cheques
+        if verification:
+            for field in ["bank", "account_holder", "account_number", "amount", "ifsc_code", "date"]:
+                row_data[f"{field} Matches"] = "Yes" if field not in discrepancies else "No"
+        else:
+            for field in ["bank", "account_holder", "account_number", "amount", "ifsc_code", "date"]:
+                row_data[f"{field} Matches"] = "N/A"
+        
+        return row_data
+    
+    return {  
+        "Bill No.": number,  
+        "Vendor Name": str(result.get("vendor_name", "N/A")),  
+        "Bill Number": str(result.get("bill_number", "N/A")),  
+        "Date": str(result.get("date", "N/A")),  
+        "Total Amount": f"{result.get('currency', '₹')}{result.get('total_amount', 'N/A')}" if result.get('total_amount', 'N/A') != 'N/A' else 'N/A',  
+        "Tax Amount": f"{result.get('currency', '₹')}{result.get('tax_amount', 'N/A')}" if result.get('tax_amount', 'N/A') != 'N/A' else 'N/A',  
+        "GST Number": str(result.get("gst_number", "N/A")),  
+        "Vendor Phone": str(result.get("vendor_phone", "N/A")),  
+        "Vendor Email": str(result.get("vendor_email", "N/A")),  
+        "Customer Name": str(result.get("customer_name", "N/A")),  
+        "Payment Method": str(result.get("payment_method", "N/A")),
+        "Currency": str(result.get("currency", "₹")),
+        "Rule-Based Accuracy": f"{automated_accuracy:.1f}%",
+        "Model Agreement": agreement,
+        "Vendor Name Valid": "Yes" if validation.get("vendor_name", {}).get("valid", False) else "No",
+        "Bill Number Valid": "Yes" if validation.get("bill_number", {}).get("valid", False) else "No",
+        "GST Number Valid": "Yes" if validation.get("gst_number", {}).get("valid", False) else "No",
+        "Phone Valid": "Yes" if validation.get("vendor_phone", {}).get("valid", False) else "No",
+        "Email Valid": "Yes" if validation.get("vendor_email", {}).get("valid", False) else "No",
+        "Date Valid": "Yes" if validation.get("date", {}).get("valid", False) else "No",
+        "Amount Valid": "Yes" if validation.get("total_amount", {}).get("valid", False) else "No"
+    }
+
+def render_workbook(cheque_rows: List[Dict], bill_rows: List[Dict]) -> bytes:
+    """Serialize report rows into an Excel workbook with separate sheets for cheques and bills"""
+    # pandas and xlsxwriter are only needed when a report is actually built
+    import pandas as pd
+
+    output = BytesIO()
+    
+    # Create Excel with separate sheets for cheques and bills
+    with get_metrics().span("excel_render"), pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        if cheque_rows:
+            cheque_df = pd.DataFrame(cheque_rows)
+            cheque_df.to_excel(writer, index=False, sheet_name='ChequeData')
+        
+        if bill_rows:
+            bill_df = pd.DataFrame(bill_rows)
+            bill_df.to_excel(writer, index=False, sheet_name='BillData')
+    
+    return output.getvalue()
+
+# --- Excel Export ---
+def to_excel(all_results: List[Dict], all_verifications: List[Optional[Dict]], all_validations: List[Dict], doc_types: List[str]) -> bytes:  
+    """Convert all results to Excel bytes including automated verification data for both cheques and bills"""  
+    report = IncrementalReport()
+    for result, verification, validation, doc_type in zip(all_results, all_verifications, all_validations, doc_types):
+        report.add(result, validation, doc_type, verification)
+    return report.to_excel()
+
+# --- Incremental Report ---
+class IncrementalReport:
+    """Report whose rows are built once per document and whose workbook is rendered once per version"""
+
+    def __init__(self):
+        self.cheque_rows: List[Dict] = []
+        self.bill_rows: List[Dict] = []
+        # Results are append-only, so the number of documents added identifies a report version
+        self.version = 0
+        self._lock = threading.Lock()
+        self._excel: Optional[bytes] = None
+        self._excel_version = -1
+        self._uploaded_version = -1
+        self.s3_url: Optional[str] = None
+
+    def add(self, result: Dict, validation: Dict, doc_type: str, verification: Optional[Dict] = None) -> None:
+        """Append the row for one newly processed document"""
+        with self._lock:
+            if doc_type == "cheque":
+                self.cheque_rows.append(build_report_row(result, verification, validation, doc_type, len(self.cheque_rows) + 1))
+            elif doc_type == "bill":
+                self.bill_rows.append(build_report_row(result, verification, validation, doc_type, len(self.bill_rows) + 1))
+            self.version += 1
+
+    def sync(self, all_results: List[Dict], all_validations: List[Dict], doc_types: List[str],
+             all_verifications: Optional[List[Optional[Dict]]] = None) -> None:
+        """Add rows only for documents appended to the result lists since the last sync"""
+        verifications = all_verifications or [None] * len(all_results)
+        for result, validation, doc_type, verification in zip(all_results[self.version:],
+                                                               all_validations[self.version:],
+                                                               doc_types[self.version:],
+                                                               verifications[self.version:]):
+            self.add(result, validation, doc_type, verification)
+
+    def to_excel(self) -> bytes:
+        """Return the workbook for the current version, rendering it only if rows were added since last time"""
+        with self._lock:
+            if self._excel_version != self.version:
+                self._excel = render_workbook(self.cheque_rows, self.bill_rows)
+                self._excel_version = self.version
+            return self._excel
+
+    def upload_once(self, upload: Callable[[bytes], Optional[str]]) -> Optional[str]:
+        """Upload the current version with the given function unless it has already been uploaded"""
+        excel_bytes = self.to_excel()
+        with self._lock:
+            if self._uploaded_version == self._excel_version:
+                return self.s3_url
+        s3_url = upload(excel_bytes)
+        with self._lock:
+            if s3_url:
+                self.s3_url = s3_url
+                self._uploaded_version = self._excel_version
+        return s3_url
+
+# --- Streaming Export ---
+def report_columns(doc_type: str) -> List[str]:
+    """Column names of a report row for the document type, in sheet order"""
+    return list(build_report_row({}, None, {}, doc_type, 0))
+
+class LocalReportFile(io.FileIO):
+    """Local report written under a temporary name next to its destination and moved into place on close
+
+    abort(), or leaving a with block on an exception, deletes the temporary file instead, so a failed export
+    never leaves a truncated report that looks complete at the destination.
+    """
+
+    def __init__(self, destination: str):
+        self.destination = destination
+        self.temp_path = f"{destination}.{uuid.uuid4().hex[:8]}.part"
+        self._finished = False
+        super().__init__(self.temp_path, "xb")
+
+    def close(self) -> None:
+        super().close()
+        if not self._finished:
+            self._finished = True
+            os.replace(self.temp_path, self.destination)
+
+    def abort(self) -> None:
+        """Discard the partial report"""
+        self._finished = True
+        super().close()
+        try:
+            os.remove(self.temp_path)
+        except FileNotFoundError:
+            pass
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+
+    def __del__(self) -> None:
+        # An abandoned writer must not move its partial file into place
+        if not self._finished:
+            self.abort()
+
+def open_report_sink(destination: str, content_type: str = 'application/octet-stream') -> BinaryIO:
+    """Binary file object for a local path, or a streaming multipart upload for an s3://bucket/key destination
+
+    Both only put the report at the destination once closed successfully; abort() discards it.
+    """
+    if destination.startswith("s3://"):
+        from .batch import split_s3_uri
+
+        bucket, key = split_s3_uri(destination)
+        return S3MultipartWriter(bucket, key, content_type=content_type)
+    directory = os.path.dirname(destination)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    return LocalReportFile(destination)
+
+class StreamingReport:
+    """Report written row by row to a binary sink, so memory stays flat however many documents are exported
+
+    .xlsx uses xlsxwriter's constant_memory mode with the usual ChequeData/BillData sheets; .csv and .parquet
+    write one table with a "Document Type" column and the union of both sheets' columns, Parquet in row groups.
+    """
+
+    def __init__(self, sink: BinaryIO, file_format: str = ".xlsx", row_group_size: int = 10000):
+        if file_format not in REPORT_FORMATS:
+            raise ValueError(f"Unsupported report format '{file_format}' (use .xlsx, .csv or .parquet)")
+        self.sink = sink
+        self.file_format = file_format
+        self.row_group_size = row_group_size
+        self.counts = {"cheque": 0, "bill": 0}
+        self._lock = threading.Lock()
+        self.columns = ["Document Type"] + list(dict.fromkeys(report_columns("cheque") + report_columns("bill")))
+        if file_format == ".xlsx":
+            import xlsxwriter
+
+            # Each sheet's rows go to a temp file as they are written; the zip is streamed out on close
+            self._workbook = xlsxwriter.Workbook(sink, {"constant_memory": True})
+            self._sheets = {}
+        elif file_format == ".csv":
+            import csv
+
+            self._text = io.TextIOWrapper(sink, encoding='utf-8', newline="")
+            self._csv = csv.writer(self._text)
+            self._csv.writerow(self.columns)
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            self._schema = pa.schema([(column, pa.string()) for column in self.columns])
+            self._parquet = pq.ParquetWriter(sink, self._schema)
+            self._pending: Dict[str, List[Optional[str]]] = {column: [] for column in self.columns}
+            self._pending_rows = 0
+
+    def add(self, result: Dict, validation: Dict, doc_type: str, verification: Optional[Dict] = None) -> None:
+        """Write the row for one document"""
+        if doc_type not in self.counts:
+            return
+        with self._lock:
+            self.counts[doc_type] += 1
+            row = build_report_row(result, verification, validation, doc_type, self.counts[doc_type])
+            if self.file_format == ".xlsx":
+                self._write_sheet_row(doc_type, row)
+            elif self.file_format == ".csv":
+                row["Document Type"] = doc_type
+                self._csv.writerow([row.get(column, "") for column in self.columns])
+            else:
+                row["Document Type"] = doc_type
+                for column in self.columns:
+                    value = row.get(column)
+                    self._pending[column].append(None if value is None else str(value))
+                self._pending_rows += 1
+                if self._pending_rows >= self.row_group_size:
+                    self._flush_row_group()
+
+    def _write_sheet_row(self, doc_type: str, row: Dict) -> None:
+        sheet = self._sheets.get(doc_type)
+        if sheet is None:
+            # Sheets are created on first use, as render_workbook only creates sheets that have rows
+            sheet_name = "ChequeData" if doc_type == "cheque" else "BillData"
+            sheet = self._workbook.add_worksheet(sheet_name)
+            sheet.write_row(0, 0, report_columns(doc_type))
+            self._sheets[doc_type] = sheet
+        sheet.write_row(self.counts[doc_type], 0, list(row.values()))
+
+    def _flush_row_group(self) -> None:
+        import pyarrow as pa
+
+        if self._pending_rows:
+            self._parquet.write_table(pa.table(self._pending, schema=self._schema))
+            self._pending = {column: [] for column in self.columns}
+            self._pending_rows = 0
+
+    def close(self) -> None:
+        """Finish the file and close the sink (completing an S3 upload)"""
+        with self._lock, get_metrics().span("report_finish", format=self.file_format):
+            if self.file_format == ".xlsx":
+                self._workbook.close()
+            elif self.file_format == ".csv":
+                self._text.flush()
+                self._text.detach()
+            else:
+                self._flush_row_group()
+                self._parquet.close()
+            self.sink.close()
+
+    def __enter__(self) -> "StreamingReport":
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        if exc_type is not None and isinstance(self.sink, (LocalReportFile, S3MultipartWriter)):
+            # A partial report is discarded rather than left at the destination looking complete
+            if self.file_format == ".csv":
+                self._text.detach()
+            elif self.file_format == ".parquet":
+                # Finished into the doomed sink so the writer has nothing left to flush once it is gone
+                with contextlib.suppress(Exception):
+                    self._parquet.close()
+            self.sink.abort()
+            return
+        self.close()
+
+def stream_report(documents: Iterable[Tuple], destination: str, file_format: Optional[str] = None) -> Dict[str, int]:
+    """Write (result, validation, doc_type[, verification]) tuples to a local or s3:// report
+
+    Returns the row count per document type.
+    """
+    file_format = file_format or os.path.splitext(destination)[1].lower()
+    if file_format not in REPORT_FORMATS:
+        raise ValueError(f"Unsupported report format '{file_format}' (use .xlsx, .csv or .parquet)")
+    with StreamingReport(open_report_sink(destination, REPORT_FORMATS[file_format]), file_format) as report:
+        for document in documents:
+            report.add(*document)
+    return dict(report.counts)
+
+# --- Re-validation ---
+def revalidate_report_rows(frame: "pd.DataFrame", doc_type: str) -> "pd.DataFrame":
+    """Recompute the validity and accuracy columns of one report sheet with the batch validators"""
+    import numpy as np
+    import pandas as pd
+
+    columns = REPORT_COLUMNS[doc_type]
+    fields = pd.DataFrame({field: frame[value_column] for field, (value_column, _) in columns.items()
+                           if value_column in frame}, index=frame.index)
+    if "total_amount" in fields and "Currency" in frame:
+        # Bill totals are exported with their currency symbol in front
+        for currency in frame["Currency"].unique():
+            rows = frame["Currency"] == currency
+            fields.loc[rows, "total_amount"] = fields.loc[rows, "total_amount"].str.removeprefix(currency)
+    validated = validate_frame(fields, doc_type)
+
+    frame = frame.copy()
+    for field, (_, valid_column) in columns.items():
+        frame[valid_column] = np.where(validated[f"{field}_valid"], "Yes", "No")
+    frame["Rule-Based Accuracy"] = validated["rule_based_accuracy"].map("{:.1f}%".format)
+    return frame
+
+def revalidate_report(excel_bytes: bytes) -> bytes:
+    """Re-run rule-based validation over a previously exported workbook and return the updated workbook"""
+    import pandas as pd
+
+    # Read every cell as text so 'N/A' placeholders and leading zeros survive as exported
+    sheets = pd.read_excel(BytesIO(excel_bytes), sheet_name=None, dtype=str, keep_default_na=False)
+    output = BytesIO()
+    with get_metrics().span("revalidate"), pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        for sheet_name, frame in sheets.items():
+            doc_type = REPORT_SHEETS.get(sheet_name)
+            if doc_type:
+                frame = revalidate_report_rows(frame, doc_type)
+                number_column = "Cheque No." if doc_type == "cheque" else "Bill No."
+                if number_column in frame:
+                    frame[number_column] = pd.to_numeric(frame[number_column])
+            frame.to_excel(writer, index=False, sheet_name=sheet_name)
+    return output.getvalue()
+
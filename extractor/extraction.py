@@ -0,0 +1,675 @@
+import json
+import logging
+import re
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config.config import (
+    BEDROCK_STREAMING, CLAUDE_HAIKU_MODEL_ID, CLAUDE_SONNET_MODEL_ID, GST_NUMBER_PATTERN, INDIAN_PHONE_PATTERNS,
+    US_PHONE_PATTERNS
+)
+from .bedrock import invoke_model_stream_with_retry, invoke_model_with_retry
+from .document import DocumentImage, prepare_document
+from .metrics import get_metrics
+from .streaming import JsonFieldStream
+
+logger = logging.getLogger(__name__)
+
+# --- Model Request Helpers ---
+def encode_image_for_model(image: DocumentImage) -> str:
+    """Base64 JPEG payload for the model, reusing a prepared document's encoding when given one"""
+    return prepare_document(image).model_payload
+
+def _image_block(encoded_image: str) -> Dict:
+    return {
+        "type": "image",
+        "source": {
+            "type": "base64",
+            "media_type": "image/jpeg",
+            "data": encoded_image
+        }
+    }
+
+def build_image_request(prompt: str, encoded_image: str, max_tokens: int = 1000) -> Dict:
+    """Build an Anthropic messages request body with a text prompt and one image"""
+    return {
+        "anthropic_version": "bedrock-2023-05-31",
+        "max_tokens": max_tokens,
+        "temperature": 0.1,
+        "messages": [
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": prompt},
+                    _image_block(encoded_image)
+                ]
+            }
+        ]
+    }
+
+def build_batch_request(prompt: str, encoded_images: List[str], max_tokens: int) -> Dict:
+    """Build a messages request body with a text prompt and several images, each preceded by a "Document <i>" label"""
+    content = [{"type": "text", "text": prompt}]
+    for index, encoded_image in enumerate(encoded_images):
+        content.append({"type": "text", "text": f"Document {index}"})
+        content.append(_image_block(encoded_image))
+    return {
+        "anthropic_version": "bedrock-2023-05-31",
+        "max_tokens": max_tokens,
+        "temperature": 0.1,
+        "messages": [{"role": "user", "content": content}]
+    }
+
+def parse_json_response(response_text: str) -> Dict:
+    """Extract and parse the outermost JSON object from a model response"""
+    start_idx = response_text.find('{')
+    end_idx = response_text.rfind('}') + 1
+    if start_idx == -1 or end_idx == 0:
+        raise ValueError("No JSON object found in response")
+
+    return json.loads(response_text[start_idx:end_idx])
+
+def parse_json_array(response_text: str) -> List:
+    """Extract and parse the outermost JSON array from a model response"""
+    start_idx = response_text.find('[')
+    end_idx = response_text.rfind(']') + 1
+    if start_idx == -1 or end_idx == 0:
+        raise ValueError("No JSON array found in response")
+
+    parsed = json.loads(response_text[start_idx:end_idx])
+    if not isinstance(parsed, list):
+        raise ValueError("Response is not a JSON array")
+    return parsed
+
+# Called with each field name and value as soon as the model has produced it
+FieldCallback = Callable[[str, Any], None]
+
+def request_json(model_id: str, body: Dict, on_field: Optional[FieldCallback] = None,
+                 reject: Optional[Callable[[str, Any], bool]] = None) -> Tuple[str, Optional[Dict]]:
+    """Response text of a call answering with a JSON object, streamed when BEDROCK_STREAMING is on
+
+    While streaming, on_field gets each member as soon as it is complete, and the stream is closed once
+    reject(path, value) returns True for one. The members read up to then are returned as the second item;
+    it is None for a complete response, which the caller parses from the text as before.
+    """
+    if not BEDROCK_STREAMING:
+        response = invoke_model_with_retry(model_id, body)
+        return response['content'][0]['text'].strip(), None
+
+    metrics = get_metrics()
+    # Measured from the same point as the caller's span, so it compares directly with total latency
+    stage = metrics.current_stage() or "unattributed"
+    start = time.perf_counter()
+    parser = JsonFieldStream()
+    first_field = True
+
+    def on_reset() -> None:
+        # A retried stream starts over; fields it repeats simply overwrite what on_field was given
+        nonlocal parser
+        parser = JsonFieldStream()
+
+    def on_text(text: str) -> bool:
+        nonlocal first_field
+        for path, value in parser.feed(text):
+            if first_field:
+                metrics.observe("time_to_first_field", time.perf_counter() - start, caller=stage)
+                first_field = False
+            if on_field is not None:
+                on_field(path.rsplit(".", 1)[-1], value)
+            if reject is not None and reject(path, value):
+                return True
+        return False
+
+    response = invoke_model_stream_with_retry(model_id, body, on_text, on_reset)
+    return response['content'][0]['text'].strip(), parser.value if response.get("aborted") else None
+
+def clean_cheque_result(result: Dict) -> Dict:
+    """Normalize the amount and fill missing fields of an extracted cheque"""
+    if "amount" in result and result["amount"] != "N/A":
+        amount_str = str(result["amount"])
+        cleaned_amount = ''.join(filter(str.isdigit, amount_str))
+        if cleaned_amount and len(cleaned_amount) <= 15:
+            result["amount"] = int(cleaned_amount)
+        else:
+            result["amount"] = "N/A"
+
+    required_fields = ["bank", "account_holder", "account_number",
+                    "ifsc_code", "date", "has_signature"]
+    for field in required_fields:
+        if field not in result:
+            result[field] = "N/A"
+
+    return result
+
+def clean_bill_result(result: Dict) -> Dict:
+    """Normalize amounts and currency and fill missing fields of an extracted bill"""
+    # Clean amount fields
+    for amount_field in ["total_amount", "tax_amount"]:
+        if amount_field in result and result[amount_field] != "N/A":
+            amount_str = str(result[amount_field])
+            # Remove currency symbols and spaces, but keep decimal point
+            cleaned_amount = re.sub(r'[₹$Rs,\s]', '', amount_str)
+
+            try:
+                # Parse as float to handle decimal amounts
+                if cleaned_amount and '.' in cleaned_amount:
+                    amount_value = float(cleaned_amount)
+                    result[amount_field] = f"{amount_value:.2f}"
+                elif cleaned_amount and cleaned_amount.replace('.', '').isdigit():
+                    amount_value = float(cleaned_amount)
+                    result[amount_field] = f"{amount_value:.2f}"
+                else:
+                    result[amount_field] = "N/A"
+            except (ValueError, TypeError):
+                result[amount_field] = "N/A"
+
+    required_fields = ["vendor_name", "bill_number", "date", "total_amount",
+                    "tax_amount", "gst_number", "vendor_phone", "vendor_email",
+                    "customer_name", "payment_method", "currency"]
+    for field in required_fields:
+        if field not in result:
+            result[field] = "N/A"
+
+    # Currency detection - use AI result or fallback to rule-based detection
+    if result.get("currency", "N/A") == "N/A" or not result.get("currency"):
+        result["currency"] = detect_currency_from_bill_data(result)
+
+    # Validate and clean currency symbol
+    detected_currency = result.get("currency", "₹")
+    if detected_currency not in ["₹", "$", "€", "£", "¥"]:
+        # If AI returned text description, convert to symbol
+        currency_map = {
+            "rupee": "₹", "rupees": "₹", "inr": "₹", "rs": "₹",
+            "dollar": "$", "dollars": "$", "usd": "$",
+            "euro": "€", "euros": "€", "eur": "€",
+            "pound": "£", "pounds": "£", "gbp": "£",
+            "yen": "¥", "jpy": "¥"
+        }
+        detected_currency_lower = detected_currency.lower().strip()
+        result["currency"] = currency_map.get(detected_currency_lower, detect_currency_from_bill_data(result))
+
+    return result
+
+# --- Core Functions ---
+def extract_cheque_data(image: DocumentImage, on_field: Optional[FieldCallback] = None) -> Dict:
+    """Send cheque image to Claude 3 Haiku and parse response"""
+    try:
+        encoded_image = encode_image_for_model(image)
+        
+        # First check if this is a valid cheque image
+        validation_prompt = """
+        Is this image a bank cheque/check? Respond with just 'yes' or 'no'.
+        Look for key cheque elements: bank name, payee line, date field, amount box, 
+        signature line, account details, etc. If multiple of these elements are missing,
+        it's likely not a valid cheque image.
+        """
+        
+        validation_body = build_image_request(validation_prompt, encoded_image, max_tokens=10)
+        
+        with get_metrics().span("validity_check", doc_type="cheque"):
+            validation_response = invoke_model_with_retry(CLAUDE_HAIKU_MODEL_ID, validation_body)
+        
+        validation_text = validation_response['content'][0]['text'].strip().lower()
+        
+        if "no" in validation_text:
+            return {"error": "Invalid cheque image. Please upload a valid bank cheque."}
+        
+        prompt = """  
+        Analyze this cheque image and extract the following details in EXACTLY this JSON format:  
+        {  
+            "bank": "Bank Name",  
+            "account_holder": "Account Holder Name",  
+            "account_number": "Account Number",  
+            "amount": "Amount in numbers (digits only, no symbols, e.g., 3300000)",  
+            "ifsc_code": "IFSC Code",  
+            "date": "DD/MM/YYYY",  
+            "has_signature": true/false  
+        }  
+
+        CRITICAL INSTRUCTIONS FOR AMOUNT EXTRACTION:  
+        1. Locate both the numerical amount (digits) and written amount (words)  
+        2. If numerical amount is present and clear, use that  
+        3. If numerical amount is unclear, convert the written amount to digits:  
+            - "Thirty Three Lakhs" → 3300000  
+            - "Thirty Three Thousand" → 33000  
+        4. Amount must be digits only (no ₹, Rs, commas, or spaces)  
+        5. If amount cannot be determined, use "N/A"  
+
+        IMPORTANT:  
+        1. Return ONLY the JSON object  
+        2. Do not include any additional text or explanations  
+        3. All amounts must be in complete rupees (no paise)  
+        """  
+        
+        body = build_image_request(prompt, encoded_image)
+        
+        with get_metrics().span("extract", doc_type="cheque"):
+            response_text, _ = request_json(CLAUDE_HAIKU_MODEL_ID, body, on_field)
+        
+        result = parse_json_response(response_text)
+        
+        return clean_cheque_result(result)
+        
+    except json.JSONDecodeError as e:  
+        logger.error(f"Failed to parse JSON response: {str(e)}\nRaw response: {response_text}")
+        return None  
+    except Exception as e:  
+        logger.error(f"Extraction failed: {str(e)}")  
+        return None
+
+# --- Document Type Detection ---
+def detect_document_type(image: DocumentImage) -> str:
+    """Detect if the document is a cheque or bill using AI"""
+    try:
+        encoded_image = encode_image_for_model(image)
+        
+        detection_prompt = """
+        Analyze this image and determine if it's a:
+        1. "cheque" - Bank cheque/check with elements like payee line, account details, signature line
+        2. "bill" - Invoice/receipt/bill with vendor details, items, amounts, tax information
+        3. "unknown" - Neither a cheque nor a bill
+        
+        Respond with just one word: "cheque", "bill", or "unknown"
+        """
+        
+        body = build_image_request(detection_prompt, encoded_image, max_tokens=10)
+        
+        with get_metrics().span("detect"):
+            response = invoke_model_with_retry(CLAUDE_HAIKU_MODEL_ID, body)
+        doc_type = response['content'][0]['text'].strip().lower()
+        
+        if "cheque" in doc_type:
+            return "cheque"
+        elif "bill" in doc_type:
+            return "bill"
+        else:
+            return "unknown"
+            
+    except Exception as e:
+        logger.error(f"Document type detection failed: {str(e)}")
+        return "unknown"
+
+# --- Bill Extraction Functions ---
+def extract_bill_data(image: DocumentImage, on_field: Optional[FieldCallback] = None) -> Dict:  
+    """Send bill image to Claude 3 Haiku and parse response"""  
+    try:  
+        encoded_image = encode_image_for_model(image)
+        
+        # First check if this is a valid bill image
+        validation_prompt = """
+        Is this image a bill/invoice/receipt? Respond with just 'yes' or 'no'.
+        Look for key bill elements: vendor/company name, invoice number, date, 
+        item details, amounts, tax information, etc. If multiple of these elements are missing,
+        it's likely not a valid bill image.
+        """
+        
+        validation_body = build_image_request(validation_prompt, encoded_image, max_tokens=10)
+        
+        with get_metrics().span("validity_check", doc_type="bill"):
+            validation_response = invoke_model_with_retry(CLAUDE_HAIKU_MODEL_ID, validation_body)
+        
+        validation_text = validation_response['content'][0]['text'].strip().lower()
+        
+        if "no" in validation_text:
+            return {"error": "Invalid bill image. Please upload a valid bill/invoice/receipt."}
+        
+        prompt = """  
+        Analyze this bill/invoice image and extract the following details in EXACTLY this JSON format:  
+        {  
+            "vendor_name": "Company/Vendor Name",  
+            "bill_number": "Invoice/Bill Number",  
+            "date": "MM/DD/YYYY or DD/MM/YYYY format as shown",  
+            "total_amount": "Total amount with decimal (e.g., 182.40)",  
+            "tax_amount": "Tax/GST amount with decimal (e.g., 12.50)",  
+            "gst_number": "GST Number/Tax ID",  
+            "vendor_phone": "Vendor Phone Number",  
+            "vendor_email": "Vendor Email Address",  
+            "customer_name": "Customer/Bill To Name",  
+            "payment_method": "Payment Method (Cash/Card/UPI/etc.)",
+            "currency": "Currency symbol if visible (₹, $, €, etc.) or best guess based on location indicators"  
+        }  
+
+        CRITICAL INSTRUCTIONS FOR AMOUNT EXTRACTION:  
+        1. Locate the total amount and tax amounts clearly  
+        2. Include decimal places (e.g., 182.40, not 18240)  
+        3. If amount cannot be determined, use "N/A"  
+        4. Extract the amount exactly as shown, preserving decimal formatting
+        5. For currency, look for currency symbols in the document or deduce from:
+           - GST numbers (India = ₹)
+           - Phone number formats (Indian vs US patterns)
+           - Email domains (.in = ₹, .com could be $)
+           - Company names (Pvt Ltd = ₹, Inc/Corp = $)
+
+        IMPORTANT:  
+        1. Return ONLY the JSON object  
+        2. Do not include any additional text or explanations  
+        3. Keep decimal precision for all amounts  
+        4. Extract date exactly as shown (MM/DD/YYYY or DD/MM/YYYY)  
+        """  
+        
+        body = build_image_request(prompt, encoded_image)
+        
+        with get_metrics().span("extract", doc_type="bill"):
+            response_text, _ = request_json(CLAUDE_HAIKU_MODEL_ID, body, on_field)
+        
+        result = parse_json_response(response_text)
+        
+        return clean_bill_result(result)
+        
+    except json.JSONDecodeError as e:  
+        logger.error(f"Failed to parse JSON response: {str(e)}\nRaw response: {response_text}")
+        return None  
+    except Exception as e:  
+        logger.error(f"Bill extraction failed: {str(e)}")  
+        return None
+
+# --- Unified Extraction ---
+# Prompt sections shared by the single-document and multi-document requests
+CLASSIFICATION_STEPS = """STEP 1 - document_type:
+1. "cheque" - Bank cheque/check with elements like payee line, account details, signature line
+2. "bill" - Invoice/receipt/bill with vendor details, items, amounts, tax information
+3. "unknown" - Neither a cheque nor a bill
+
+STEP 2 - is_valid:
+true only if the image is a complete, readable document of that type. Look for the key
+elements (cheque: bank name, payee line, date field, amount box, signature line, account
+details; bill: vendor/company name, invoice number, date, item details, amounts, tax
+information). If multiple of these elements are missing, use false.
+"""
+
+CHEQUE_FIELDS_FORMAT = """{
+    "bank": "Bank Name",
+    "account_holder": "Account Holder Name",
+    "account_number": "Account Number",
+    "amount": "Amount in numbers (digits only, no symbols, e.g., 3300000)",
+    "ifsc_code": "IFSC Code",
+    "date": "DD/MM/YYYY",
+    "has_signature": true/false
+}"""
+
+BILL_FIELDS_FORMAT = """{
+    "vendor_name": "Company/Vendor Name",
+    "bill_number": "Invoice/Bill Number",
+    "date": "MM/DD/YYYY or DD/MM/YYYY format as shown",
+    "total_amount": "Total amount with decimal (e.g., 182.40)",
+    "tax_amount": "Tax/GST amount with decimal (e.g., 12.50)",
+    "gst_number": "GST Number/Tax ID",
+    "vendor_phone": "Vendor Phone Number",
+    "vendor_email": "Vendor Email Address",
+    "customer_name": "Customer/Bill To Name",
+    "payment_method": "Payment Method (Cash/Card/UPI/etc.)",
+    "currency": "Currency symbol if visible (₹, $, €, etc.) or best guess based on location indicators"
+}"""
+
+AMOUNT_INSTRUCTIONS = """CRITICAL INSTRUCTIONS FOR AMOUNT EXTRACTION:
+1. Cheques: use the numerical amount if clear, otherwise convert the written amount to digits
+   ("Thirty Three Lakhs" → 3300000). Digits only (no ₹, Rs, commas, or spaces), complete rupees.
+2. Bills: include decimal places exactly as shown (e.g., 182.40, not 18240). For currency, look
+   for symbols or deduce from GST numbers, phone formats, email domains and company suffixes.
+3. If an amount cannot be determined, use "N/A"
+"""
+
+UNIFIED_FIELDS_STEP = """STEP 3 - fields:
+If document_type is "cheque", fields must be:
+""" + CHEQUE_FIELDS_FORMAT + """
+If document_type is "bill", fields must be:
+""" + BILL_FIELDS_FORMAT + """
+If document_type is "unknown" or is_valid is false, fields must be {}.
+"""
+
+UNIFIED_EXTRACTION_PROMPT = """
+Analyze this image and respond in EXACTLY this JSON format:
+{
+    "document_type": "cheque", "bill" or "unknown",
+    "is_valid": true/false,
+    "fields": { ... }
+}
+
+""" + CLASSIFICATION_STEPS + "\n" + UNIFIED_FIELDS_STEP + "\n" + AMOUNT_INSTRUCTIONS + """
+IMPORTANT:
+1. Return ONLY the JSON object
+2. Do not include any additional text or explanations
+"""
+
+def rejects_document(path: str, value: Any) -> bool:
+    """Whether a streamed unified-prompt member already settles that there are no fields to extract"""
+    if path == "document_type":
+        verdict = str(value).strip().lower()
+        return "cheque" not in verdict and "bill" not in verdict
+    if path == "is_valid":
+        return value is False or str(value).strip().lower() in ("false", "no")
+    return False
+
+def interpret_unified_result(result: Dict) -> Tuple[str, Dict]:
+    """Map a parsed unified-prompt response to (doc_type, cleaned fields or an error dict)"""
+    doc_type = str(result.get("document_type", "")).strip().lower()
+    if "cheque" in doc_type:
+        doc_type = "cheque"
+    elif "bill" in doc_type:
+        doc_type = "bill"
+    else:
+        return "unknown", None
+
+    is_valid = result.get("is_valid", True)
+    if is_valid is False or str(is_valid).strip().lower() in ("false", "no"):
+        if doc_type == "cheque":
+            return doc_type, {"error": "Invalid cheque image. Please upload a valid bank cheque."}
+        return doc_type, {"error": "Invalid bill image. Please upload a valid bill/invoice/receipt."}
+
+    fields = result.get("fields") or {}
+    if doc_type == "cheque":
+        return doc_type, clean_cheque_result(fields)
+    return doc_type, clean_bill_result(fields)
+
+def extract_document_data(image: DocumentImage, on_field: Optional[FieldCallback] = None) -> Tuple[str, Dict]:
+    """Classify, validate and extract a document with a single Claude 3 Haiku call"""
+    try:
+        encoded_image = encode_image_for_model(image)
+        body = build_image_request(UNIFIED_EXTRACTION_PROMPT, encoded_image)
+
+        with get_metrics().span("extract_unified"):
+            # A streamed answer is cut short once it calls the document unknown or invalid
+            response_text, partial = request_json(CLAUDE_HAIKU_MODEL_ID, body, on_field, reject=rejects_document)
+
+        return interpret_unified_result(partial if partial is not None else parse_json_response(response_text))
+
+    except json.JSONDecodeError as e:
+        logger.error(f"Failed to parse JSON response: {str(e)}\nRaw response: {response_text}")
+        return "unknown", None
+    except Exception as e:
+        logger.error(f"Unified extraction failed: {str(e)}")
+        return "unknown", None
+
+# --- Multi-Document Extraction ---
+# Claude 3 Haiku answers with at most 4096 tokens, which bounds how many documents one request can carry
+MAX_BATCH_DOCUMENTS = 8
+BATCH_OUTPUT_TOKENS_PER_DOCUMENT = 400
+
+CHEQUE_BATCH_TASK = """Each should be a bank cheque/check. For every document give:
+is_valid: true only if the image is a complete, readable cheque. Look for the bank name, payee line, date field,
+amount box, signature line and account details; if multiple of these elements are missing, use false.
+fields: EXACTLY this format, or {} if is_valid is false:
+""" + CHEQUE_FIELDS_FORMAT + "\n"
+
+BILL_BATCH_TASK = """Each should be a bill/invoice/receipt. For every document give:
+is_valid: true only if the image is a complete, readable bill. Look for the vendor/company name, invoice number,
+date, item details, amounts and tax information; if multiple of these elements are missing, use false.
+fields: EXACTLY this format, or {} if is_valid is false:
+""" + BILL_FIELDS_FORMAT + "\n"
+
+UNIFIED_BATCH_TASK = """Analyze every document on its own and give its document_type, is_valid and fields:
+
+""" + CLASSIFICATION_STEPS + "\n" + UNIFIED_FIELDS_STEP
+
+def batch_extraction_prompt(kind: str, count: int) -> str:
+    """Prompt asking for a JSON array with one indexed answer per image, for "unified", "cheque" or "bill" batches"""
+    if kind == "unified":
+        task = UNIFIED_BATCH_TASK
+        entry = ('{"index": 0, "document_type": "cheque", "bill" or "unknown", "is_valid": true/false, '
+                 '"fields": { ... }}')
+    else:
+        task = CHEQUE_BATCH_TASK if kind == "cheque" else BILL_BATCH_TASK
+        entry = '{"index": 0, "is_valid": true/false, "fields": { ... }}'
+    return f"""
+The {count} images below are separate documents, each preceded by its label ("Document 0" to "Document {count - 1}").
+{task}
+{AMOUNT_INSTRUCTIONS}
+Respond with a JSON array holding one object per document, in document order:
+[
+    {entry},
+    ...
+]
+
+IMPORTANT:
+1. "index" is the number in the document's label; every document from 0 to {count - 1} appears exactly once
+2. Never combine two documents into one object or split one document across objects
+3. Return ONLY the JSON array, without any additional text or explanations
+"""
+
+def match_batch_entries(entries: List, count: int) -> Dict[int, Dict]:
+    """Map the entries of a batched answer to document indexes, leaving out documents dropped, merged or repeated"""
+    matched: Dict[int, Dict] = {}
+    seen = set()
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        try:
+            index = int(entry.get("index"))
+        except (TypeError, ValueError):
+            # e.g. "0-1" or [0, 1] when the model merged two documents into one answer
+            continue
+        if not 0 <= index < count:
+            continue
+        if index in seen:
+            # Two answers for one document: neither can be trusted
+            matched.pop(index, None)
+        else:
+            matched[index] = entry
+        seen.add(index)
+    return matched
+
+def _interpret_batch_entry(kind: str, entry: Dict) -> Any:
+    """Shape a batch entry like the single-document function of that kind would return it"""
+    if kind == "unified":
+        return interpret_unified_result(entry)
+    return interpret_unified_result({**entry, "document_type": kind})[1]
+
+def extract_documents_batch(images: List[DocumentImage], kind: str = "unified") -> Dict[int, Any]:
+    """Extract several documents with one Claude 3 Haiku call, returning answers keyed by position in images
+
+    Each answer has the shape extract_document_data ("unified"), extract_cheque_data ("cheque") or
+    extract_bill_data ("bill") returns. Documents the model dropped, merged or answered twice are left out,
+    for the caller to extract one at a time.
+    """
+    response_text = ""
+    try:
+        encoded_images = [encode_image_for_model(image) for image in images]
+        body = build_batch_request(batch_extraction_prompt(kind, len(images)), encoded_images,
+                                   max_tokens=BATCH_OUTPUT_TOKENS_PER_DOCUMENT * len(images))
+
+        with get_metrics().span("extract_batch", doc_type=kind):
+            response = invoke_model_with_retry(CLAUDE_HAIKU_MODEL_ID, body)
+
+        response_text = response['content'][0]['text'].strip()
+        matched = match_batch_entries(parse_json_array(response_text), len(images))
+        answers = {index: _interpret_batch_entry(kind, entry) for index, entry in matched.items()}
+
+    except json.JSONDecodeError as e:
+        logger.error(f"Failed to parse batched JSON response: {str(e)}\nRaw response: {response_text}")
+        return {}
+    except Exception as e:
+        logger.error(f"Batched extraction failed: {str(e)}")
+        return {}
+
+    if len(answers) < len(images):
+        logger.warning(f"Batched {kind} answer accounted for {len(answers)} of {len(images)} documents")
+    return answers
+
+# Single-document function each kind of batch falls back to
+BATCH_EXTRACTORS = {
+    "unified": extract_document_data,
+    "cheque": extract_cheque_data,
+    "bill": extract_bill_data,
+}
+
+# --- Cross-Verification ---
+def fields_extraction_prompt(doc_type: str) -> str:
+    """Field extraction prompt for a document whose type and validity are already known"""
+    document = "cheque" if doc_type == "cheque" else "bill/invoice"
+    fields_format = CHEQUE_FIELDS_FORMAT if doc_type == "cheque" else BILL_FIELDS_FORMAT
+    return f"""
+Analyze this {document} image and extract the following details in EXACTLY this JSON format:
+{fields_format}
+
+{AMOUNT_INSTRUCTIONS}
+IMPORTANT:
+1. Return ONLY the JSON object
+2. Do not include any additional text or explanations
+"""
+
+def extract_fields(image: DocumentImage, doc_type: str, model_id: str = CLAUDE_SONNET_MODEL_ID) -> Optional[Dict]:
+    """Re-extract the fields of a cheque or bill with another model (Claude 3 Sonnet by default)"""
+    response_text = ""
+    try:
+        body = build_image_request(fields_extraction_prompt(doc_type), encode_image_for_model(image))
+
+        with get_metrics().span("cross_verify", doc_type=doc_type):
+            response_text, _ = request_json(model_id, body)
+
+        result = parse_json_response(response_text)
+
+        return clean_cheque_result(result) if doc_type == "cheque" else clean_bill_result(result)
+
+    except json.JSONDecodeError as e:
+        logger.error(f"Failed to parse JSON response: {str(e)}\nRaw response: {response_text}")
+        return None
+    except Exception as e:
+        logger.error(f"Cross-verification extraction failed: {str(e)}")
+        return None
+
+# --- Currency Detection ---
+def detect_currency_from_bill_data(data: Dict) -> str:
+    """Detect currency based on extracted bill data"""
+    # Check for Indian indicators
+    indian_indicators = 0
+    us_indicators = 0
+    
+    # GST number indicates India
+    gst_number = str(data.get('gst_number', ''))
+    if gst_number != 'N/A' and re.match(GST_NUMBER_PATTERN, gst_number):
+        indian_indicators += 3
+    
+    # Check phone number patterns
+    phone = str(data.get('vendor_phone', ''))
+    if phone != 'N/A':
+        # Clean phone for pattern matching
+        cleaned_phone = re.sub(r'[\s\-\(\)]', '', phone)
+        
+        # Check Indian phone patterns
+        if any(re.match(pattern, phone) for pattern in INDIAN_PHONE_PATTERNS):
+            indian_indicators += 2
+        elif any(re.match(pattern, phone) for pattern in US_PHONE_PATTERNS):
+            us_indicators += 2
+    
+    # Check email domain for Indian indicators
+    email = str(data.get('vendor_email', ''))
+    if email != 'N/A':
+        if '.in' in email.lower() or 'gov.in' in email.lower():
+            indian_indicators += 1
+        elif '.com' in email.lower() or '.org' in email.lower():
+            us_indicators += 0.5  # Less specific
+    
+    # Check vendor name for Indian companies/government
+    vendor_name = str(data.get('vendor_name', '')).lower()
+    if 'gem' in vendor_name or 'government' in vendor_name or 'pvt' in vendor_name or 'ltd' in vendor_name:
+        indian_indicators += 1
+    elif 'inc' in vendor_name or 'corp' in vendor_name or 'llc' in vendor_name:
+        us_indicators += 1
+    
+    # Determine currency based on indicators
+    if indian_indicators > us_indicators:
+        return '₹'
+    elif us_indicators > indian_indicators:
+        return '$'
+    else:
+        return '₹'  # Default to INR if unclear
@@ -0,0 +1,218 @@
+import csv
+import os
+import pathlib
+import re
+import sqlite3
+import threading
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from config.config import IFSC_INDEX_PATH
+
+# Header spellings used by the RBI IFSC/MICR lists and the usual CSV mirrors of them
+SOURCE_COLUMNS = {
+    "ifsc": ("IFSC", "IFSC CODE"),
+    "bank": ("BANK", "BANK NAME"),
+    "branch": ("BRANCH", "BRANCH NAME", "OFFICE"),
+    "address": ("ADDRESS",),
+    "city": ("CITY", "CITY1", "CENTRE"),
+    "district": ("DISTRICT", "CITY2"),
+    "state": ("STATE",),
+    "micr": ("MICR", "MICR CODE"),
+}
+# SQLite variables per IN (...) query; well under every build's limit
+LOOKUP_CHUNK = 500
+
+IFSC_UNKNOWN_MESSAGE = "IFSC code not found in the RBI IFSC list"
+IFSC_BANK_MISMATCH_MESSAGE = "IFSC code belongs to {bank}, not the extracted bank"
+
+@dataclass
+class IfscBranch:
+    """Reference details of one IFSC code"""
+    ifsc: str
+    bank: str
+    branch: str = ""
+    address: str = ""
+    city: str = ""
+    district: str = ""
+    state: str = ""
+    micr: str = ""
+
+# --- Building ---
+def _column_map(header: Iterable[str]) -> Dict[str, str]:
+    """Map index fields to a source file's header names, case- and separator-insensitively"""
+    normalized = {re.sub(r'[\s_]+', ' ', str(name)).strip().upper(): name for name in header}
+    columns = {}
+    for field, spellings in SOURCE_COLUMNS.items():
+        for spelling in spellings:
+            if spelling in normalized:
+                columns[field] = normalized[spelling]
+                break
+    missing = {"ifsc", "bank"} - set(columns)
+    if missing:
+        raise ValueError(f"IFSC list has no {', '.join(sorted(missing))} column")
+    return columns
+
+def _read_rows(source: str) -> Iterator[Dict[str, str]]:
+    """Stream rows of an RBI list as .csv, or as .xlsx/.xls via pandas"""
+    if os.path.splitext(source)[1].lower() in (".xlsx", ".xls"):
+        import pandas as pd
+
+        for frame in pd.read_excel(source, sheet_name=None, dtype=str, keep_default_na=False).values():
+            yield from frame.to_dict("records")
+        return
+    with open(source, newline="", encoding='utf-8-sig') as handle:
+        yield from csv.DictReader(handle)
+
+def _branches(sources: List[str]) -> Iterator[Tuple[str, ...]]:
+    for source in sources:
+        columns = None
+        for row in _read_rows(source):
+            if columns is None:
+                columns = _column_map(row.keys())
+            ifsc = str(row.get(columns["ifsc"]) or "").strip().upper()
+            if not ifsc:
+                continue
+            yield (ifsc,) + tuple(" ".join(str(row.get(columns[field]) or "").split()) if field in columns else ""
+                                  for field in list(SOURCE_COLUMNS)[1:])
+
+def build_ifsc_index(sources: List[str], path: str = IFSC_INDEX_PATH) -> int:
+    """Build the SQLite IFSC index from RBI list files (.csv or .xlsx) and return the number of codes"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # Build next to the target and swap it in, so running processes never see a half-written index
+    staging = f"{path}.building"
+    if os.path.exists(staging):
+        os.remove(staging)
+    conn = sqlite3.connect(staging)
+    try:
+        conn.execute(
+            "CREATE TABLE branches (ifsc TEXT PRIMARY KEY, bank TEXT NOT NULL, branch TEXT, address TEXT,"
+            " city TEXT, district TEXT, state TEXT, micr TEXT) WITHOUT ROWID"
+        )
+        conn.executemany("INSERT OR REPLACE INTO branches VALUES (?, ?, ?, ?, ?, ?, ?, ?)", _branches(sources))
+        # Every IFSC starts with its bank's 4-letter code; keep the most common spelling of each bank's name
+        conn.execute("CREATE TABLE banks (prefix TEXT PRIMARY KEY, bank TEXT NOT NULL) WITHOUT ROWID")
+        conn.execute(
+            "INSERT INTO banks SELECT prefix, bank FROM ("
+            " SELECT prefix, bank, MAX(n) FROM ("
+            "  SELECT substr(ifsc, 1, 4) AS prefix, bank, COUNT(*) AS n FROM branches GROUP BY prefix, bank)"
+            " GROUP BY prefix)"
+        )
+        count = conn.execute("SELECT COUNT(*) FROM branches").fetchone()[0]
+        conn.commit()
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+    os.replace(staging, path)
+    return count
+
+# --- Lookups ---
+class IfscIndex:
+    """Read-only, memory-mapped SQLite index of the RBI IFSC list with the bank-code table held in memory"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        uri = pathlib.Path(path).resolve().as_uri() + "?mode=ro&immutable=1"
+        self._conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        # Map the whole file (a 170k-code list is ~25 MB) so lookups are page-cache reads, not syscalls
+        self._conn.execute(f"PRAGMA mmap_size={max(os.path.getsize(path), 1 << 20)}")
+        self.banks: Dict[str, str] = dict(self._conn.execute("SELECT prefix, bank FROM banks"))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM branches").fetchone()[0]
+
+    def lookup(self, ifsc: str) -> Optional[IfscBranch]:
+        """Branch details of one IFSC code, or None if it is not in the list"""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM branches WHERE ifsc = ?", (ifsc.strip().upper(),)).fetchone()
+        return IfscBranch(*row) if row else None
+
+    def lookup_many(self, codes: Iterable[str]) -> Dict[str, IfscBranch]:
+        """Branch details of every listed code found in the index, keyed by code"""
+        codes = sorted({code.strip().upper() for code in codes})
+        found = {}
+        for start in range(0, len(codes), LOOKUP_CHUNK):
+            chunk = codes[start:start + LOOKUP_CHUNK]
+            placeholders = ", ".join("?" * len(chunk))
+            with self._lock:
+                rows = self._conn.execute(f"SELECT * FROM branches WHERE ifsc IN ({placeholders})", chunk).fetchall()
+            found.update((row[0], IfscBranch(*row)) for row in rows)
+        return found
+
+    def bank_for(self, ifsc: str) -> Optional[str]:
+        """Name of the bank that owns an IFSC code's 4-letter bank code"""
+        return self.banks.get(ifsc.strip().upper()[:4])
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+_ifsc_index = None
+_ifsc_index_loaded = False
+_ifsc_index_lock = threading.Lock()
+
+def get_ifsc_index() -> Optional[IfscIndex]:
+    """Process-wide IFSC index, or None when IFSC_INDEX_PATH has not been built"""
+    global _ifsc_index, _ifsc_index_loaded
+    with _ifsc_index_lock:
+        if not _ifsc_index_loaded:
+            _ifsc_index = IfscIndex(IFSC_INDEX_PATH) if IFSC_INDEX_PATH and os.path.exists(IFSC_INDEX_PATH) else None
+            _ifsc_index_loaded = True
+    return _ifsc_index
+
+def set_ifsc_index(index: Optional[IfscIndex]) -> None:
+    """Use this index process-wide instead of IFSC_INDEX_PATH; None turns the reference checks off"""
+    global _ifsc_index, _ifsc_index_loaded
+    with _ifsc_index_lock:
+        _ifsc_index, _ifsc_index_loaded = index, True
+
+# --- Bank Matching ---
+# Words that differ between how a bank's name is printed and how the RBI lists it
+_NAME_NOISE = {"THE", "LTD", "LIMITED", "CO", "OPERATIVE", "COOPERATIVE"}
+_ACRONYM_SKIP = {"OF", "AND", "&"}
+
+def _name_tokens(name: str) -> List[str]:
+    return [token for token in re.sub(r'[^A-Z0-9&]+', ' ', str(name).upper()).split() if token not in _NAME_NOISE]
+
+def bank_names_match(extracted: str, reference: str) -> bool:
+    """Whether an extracted bank name refers to the reference bank, allowing acronyms such as SBI or PNB"""
+    extracted_tokens, reference_tokens = _name_tokens(extracted), _name_tokens(reference)
+    if not extracted_tokens or not reference_tokens or extracted_tokens == ["BANK"]:
+        return False
+    # "HDFC" for "HDFC BANK" or "STATE BANK OF INDIA MG ROAD" for "STATE BANK OF INDIA",
+    # but not "BANK OF INDIA" for "STATE BANK OF INDIA"
+    shorter, longer = sorted((extracted_tokens, reference_tokens), key=len)
+    if longer[:len(shorter)] == shorter:
+        return True
+    acronym = "".join(extracted_tokens)
+    return acronym in ("".join(token[0] for token in reference_tokens),
+                       "".join(token[0] for token in reference_tokens if token not in _ACRONYM_SKIP))
+
+def check_branch(branch: Optional[IfscBranch], bank: Optional[str]) -> Tuple[bool, str]:
+    """Check a looked-up IFSC exists and belongs to the extracted bank; returns (valid, message)"""
+    if branch is None:
+        return False, IFSC_UNKNOWN_MESSAGE
+    if bank is not None and str(bank) not in ("", "N/A") and not bank_names_match(str(bank), branch.bank):
+        return False, IFSC_BANK_MISMATCH_MESSAGE.format(bank=branch.bank)
+    return True, ""
+
+def branch_details(branch: IfscBranch) -> Dict[str, str]:
+    """Result fields filled in from an IFSC's reference entry"""
+    details = asdict(branch)
+    return {f"branch_{field}" if field != "branch" else "branch_name": value
+            for field, value in details.items() if field not in ("ifsc", "bank") and value}
+
+def enrich_cheque_result(result: Dict) -> Dict:
+    """Copy of a cheque result with branch details from the IFSC index added, when the code is listed"""
+    index = get_ifsc_index()
+    ifsc = str(result.get("ifsc_code", ""))
+    if index is None or not ifsc or ifsc == "N/A":
+        return result
+    branch = index.lookup(ifsc)
+    if branch is None:
+        return result
+    return {**result, **{key: value for key, value in branch_details(branch).items() if key not in result}}
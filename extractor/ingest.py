@@ -0,0 +1,212 @@
+import logging
+import re
+from dataclasses import dataclass
+from itertools import groupby
+from typing import IO, TYPE_CHECKING, Iterable, Iterator, List, Optional, Tuple, Union
+
+from config.config import PDF_RENDER_DPI
+from .metrics import get_metrics
+from .processing import load_image
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Scanner output holding many documents per file; everything else is read as a single image
+PAGED_EXTENSIONS = (".pdf", ".tif", ".tiff")
+PAGE_KEY_RE = re.compile(r'^(?P<path>.*)#page=(?P<page>\d+)$')
+
+DocumentSource = Union[str, IO[bytes]]
+
+@dataclass
+class DocumentPage:
+    """One page of an input file, decoded when the page generator reaches it"""
+    source: str
+    page: int
+    pages: int
+    image: "Image.Image"
+    data: Optional[bytes] = None
+
+    @property
+    def key(self) -> str:
+        return page_key(self.source, self.page, self.pages)
+
+    @property
+    def label(self) -> str:
+        """Display name: the file name, with the page for multi-page files"""
+        return self.source if self.pages == 1 else f"{self.source} (page {self.page}/{self.pages})"
+
+def page_key(source: str, page: int, pages: int) -> str:
+    """Stable id of a page: the file itself for single-page files, else '<file>#page=<n>'"""
+    return source if pages == 1 else f"{source}#page={page}"
+
+def split_page_key(key: str) -> Tuple[str, int]:
+    """File and 1-based page number of a page key"""
+    match = PAGE_KEY_RE.match(key)
+    return (match.group("path"), int(match.group("page"))) if match else (key, 1)
+
+class DocumentDecodeError(ValueError):
+    """An input file that cannot be read at all, as opposed to one bad page of a readable file"""
+
+# --- Format Detection ---
+def _source_name(source: DocumentSource) -> str:
+    return source if isinstance(source, str) else getattr(source, "name", "upload")
+
+def _is_pdf(source: DocumentSource) -> bool:
+    """Sniff the PDF signature rather than trusting the file name"""
+    if isinstance(source, str):
+        with open(source, "rb") as handle:
+            return handle.read(5) == b"%PDF-"
+    position = source.tell()
+    try:
+        return source.read(5) == b"%PDF-"
+    finally:
+        source.seek(position)
+
+def _open_pdf(source: DocumentSource):
+    try:
+        import pypdfium2
+    except ImportError as e:
+        raise ImportError("Reading PDF files needs pypdfium2 (pip install pypdfium2)") from e
+    return pypdfium2.PdfDocument(source)
+
+def page_count(source: DocumentSource) -> int:
+    """Number of pages (PDF) or frames (TIFF) in a file, without decoding any of them"""
+    if not isinstance(source, str):
+        source.seek(0)
+    if _is_pdf(source):
+        pdf = _open_pdf(source)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+    from PIL import Image
+
+    with Image.open(source) as image:
+        return getattr(image, "n_frames", 1)
+
+# --- Page Streaming ---
+def _render_pdf_page(pdf, index: int, dpi: int) -> "Image.Image":
+    page = pdf[index]
+    try:
+        bitmap = page.render(scale=dpi / 72)
+        # Copied out of the PDFium bitmap, which is freed with the page
+        return bitmap.to_pil().convert('RGB')
+    finally:
+        page.close()
+
+def iter_pages(source: DocumentSource, name: Optional[str] = None, pages: Optional[Iterable[int]] = None,
+               dpi: int = PDF_RENDER_DPI) -> Iterator[DocumentPage]:
+    """Yield the pages of a PDF, multi-frame TIFF or single image one at a time, decoding each only when reached
+
+    pages restricts the output to those 1-based page numbers (e.g. the ones an interrupted run had not finished).
+    """
+    name = name or _source_name(source)
+    if not isinstance(source, str):
+        source.seek(0)
+    wanted = set(pages) if pages is not None else None
+    metrics = get_metrics()
+    if _is_pdf(source):
+        pdf = _open_pdf(source)
+        try:
+            total = len(pdf)
+            for index in range(total):
+                if wanted is not None and index + 1 not in wanted:
+                    continue
+                with metrics.span("decode", format="pdf"):
+                    image = _render_pdf_page(pdf, index, dpi)
+                yield DocumentPage(name, index + 1, total, image)
+        finally:
+            pdf.close()
+        return
+
+    from PIL import Image
+
+    with Image.open(source) as image:
+        total = getattr(image, "n_frames", 1)
+        if total == 1:
+            if wanted is None or 1 in wanted:
+                if not isinstance(source, str):
+                    source.seek(0)
+                # The original encoding, so a single image can be spilled to disk without re-encoding it
+                data = source.getvalue() if hasattr(source, "getvalue") else None
+                yield DocumentPage(name, 1, 1, load_image(source), data=data)
+            return
+        for index in range(total):
+            if wanted is not None and index + 1 not in wanted:
+                continue
+            # Seeking reads the frame's directory; copy() decodes just that frame
+            with metrics.span("decode", format="tiff"):
+                image.seek(index)
+                frame = image.copy()
+            yield DocumentPage(name, index + 1, total, frame)
+
+def iter_page_outcomes(source: DocumentSource, name: Optional[str] = None, dpi: int = PDF_RENDER_DPI
+                       ) -> Iterator[Tuple[int, int, Union[DocumentPage, Exception]]]:
+    """(page, pages, page or error) for every page of a file, carrying on past pages that fail to decode
+
+    A damaged page yields its error and decoding resumes at the next one. Raises DocumentDecodeError if the
+    file cannot be read at all.
+    """
+    name = name or _source_name(source)
+    total: Optional[int] = None
+    next_page = 1
+    while total is None or next_page <= total:
+        wanted = range(next_page, total + 1) if total is not None else None
+        try:
+            for document_page in iter_pages(source, name=name, pages=wanted, dpi=dpi):
+                total, next_page = document_page.pages, document_page.page + 1
+                yield document_page.page, total, document_page
+            return
+        except Exception as e:
+            if total is None:
+                try:
+                    total = page_count(source)
+                except Exception:
+                    raise DocumentDecodeError(f"Could not read {name}: {e}") from e
+                if total == 1:
+                    raise DocumentDecodeError(f"Could not read {name}: {e}") from e
+            logger.error(f"Could not decode page {next_page} of {name}: {e}")
+            yield next_page, total, e
+            next_page += 1
+
+# --- Input Expansion ---
+def expand_pages(paths: List[str]) -> List[str]:
+    """Page keys of every page of the given files, in file then page order"""
+    keys = []
+    for path in paths:
+        if not path.lower().endswith(PAGED_EXTENSIONS):
+            keys.append(path)
+            continue
+        try:
+            pages = page_count(path)
+        except Exception as e:
+            # Left as one entry, so the file is reported as failed rather than silently dropped
+            logger.error(f"Could not read {path}: {e}")
+            pages = 1
+        keys.extend(page_key(path, page, pages) for page in range(1, pages + 1))
+    return keys
+
+def iter_page_keys(keys: Iterable[str], dpi: int = PDF_RENDER_DPI
+                   ) -> Iterator[Tuple[str, Union[DocumentPage, Exception]]]:
+    """(key, page) for each page key, opening each file once and decoding one page at a time
+
+    A file that cannot be read yields its error in place of each of its remaining pages, so one corrupt scan
+    is reported per page instead of ending the run.
+    """
+    for path, group in groupby(keys, key=lambda key: split_page_key(key)[0]):
+        pages = {split_page_key(key)[1]: key for key in group}
+        done = set()
+        try:
+            for document_page in iter_pages(path, name=path, pages=pages, dpi=dpi):
+                done.add(document_page.page)
+                yield pages[document_page.page], document_page
+        except Exception as e:
+            logger.error(f"Could not read {path}: {e}")
+            error = e
+        else:
+            error = ValueError(f"{path} has no such page")
+        for page, key in pages.items():
+            if page not in done:
+                yield key, error
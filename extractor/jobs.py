@@ -0,0 +1,213 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from config.config import JOB_LEASE_SECONDS, JOB_MAX_ATTEMPTS, JOB_QUEUE_PATH, JOB_SPOOL_DIR
+
+JOB_STATES = ("queued", "running", "done", "failed")
+LOST_WORKER_MESSAGE = "Worker stopped responding {attempts} times while processing this document"
+
+@dataclass
+class Job:
+    """One queued document and, once a worker has finished it, its outcome"""
+    id: str
+    seq: int
+    session: str
+    name: str
+    status: str
+    attempts: int = 0
+    enqueued_at: float = 0.0
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    outcome: Optional[Dict] = None
+    error: Optional[str] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+_COLUMNS = "id, seq, session, name, status, attempts, enqueued_at, started_at, finished_at, outcome, error"
+
+def _job(row: tuple) -> Job:
+    values = list(row)
+    values[9] = json.loads(values[9]) if values[9] else None
+    return Job(*values)
+
+# --- Job Queue ---
+class JobQueue:
+    """Durable SQLite queue of uploaded documents shared by UI processes and worker processes
+
+    Uploads are spooled to files next to the database. Workers claim a job with a lease and renew it while they
+    work; a job whose worker dies is handed to another worker once its lease runs out, up to max_attempts.
+    """
+
+    def __init__(self, path: str = JOB_QUEUE_PATH, spool_dir: str = JOB_SPOOL_DIR,
+                 lease_seconds: float = JOB_LEASE_SECONDS, max_attempts: int = JOB_MAX_ATTEMPTS):
+        self.path = path
+        self.spool_dir = spool_dir
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        os.makedirs(spool_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        # Autocommit, so claims can take the write lock up front with BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT, id TEXT NOT NULL UNIQUE, session TEXT NOT NULL,"
+            " name TEXT NOT NULL, status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, worker TEXT,"
+            " lease_until REAL, enqueued_at REAL NOT NULL, started_at REAL, finished_at REAL, outcome TEXT,"
+            " error TEXT)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, seq)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_session ON jobs (session, seq)")
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def input_path(self, job_id: str) -> str:
+        """Spool file holding the uploaded bytes of a job"""
+        return os.path.join(self.spool_dir, job_id)
+
+    def read_input(self, job_id: str) -> bytes:
+        with open(self.input_path(job_id), "rb") as spooled:
+            return spooled.read()
+
+    def enqueue(self, session: str, name: str, data: bytes) -> str:
+        """Spool an uploaded document and queue it for the workers; returns the job id"""
+        job_id = uuid.uuid4().hex
+        path = self.input_path(job_id)
+        # Written under a temporary name so a worker never reads a partial upload
+        with open(f"{path}.part", "wb") as spooled:
+            spooled.write(data)
+        os.replace(f"{path}.part", path)
+        with self._transaction() as conn:
+            conn.execute("INSERT INTO jobs (id, session, name, status, enqueued_at) VALUES (?, ?, ?, 'queued', ?)",
+                         (job_id, session, name, time.time()))
+        return job_id
+
+    def claim(self, worker: str) -> Optional[Job]:
+        """Lease the oldest queued job (or one whose worker's lease expired) to a worker"""
+        now = time.time()
+        with self._transaction() as conn:
+            # Documents that keep killing their workers are given up on rather than retried forever
+            for job_id, attempts in conn.execute(
+                    "SELECT id, attempts FROM jobs WHERE status = 'running' AND lease_until < ? AND attempts >= ?",
+                    (now, self.max_attempts)).fetchall():
+                conn.execute("UPDATE jobs SET status = 'failed', finished_at = ?, error = ? WHERE id = ?",
+                             (now, LOST_WORKER_MESSAGE.format(attempts=attempts), job_id))
+            row = conn.execute(
+                "SELECT seq FROM jobs WHERE status = 'queued' OR (status = 'running' AND lease_until < ?)"
+                " ORDER BY seq LIMIT 1", (now,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1, lease_until = ?,"
+                " started_at = ? WHERE seq = ?", (worker, now + self.lease_seconds, now, row[0])
+            )
+            return _job(conn.execute(f"SELECT {_COLUMNS} FROM jobs WHERE seq = ?", (row[0],)).fetchone())
+
+    def heartbeat(self, job_ids: Iterable[str], worker: str) -> None:
+        """Extend the leases a worker holds on jobs it is still processing"""
+        job_ids = list(job_ids)
+        if not job_ids:
+            return
+        with self._transaction() as conn:
+            conn.executemany(
+                "UPDATE jobs SET lease_until = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                [(time.time() + self.lease_seconds, job_id, worker) for job_id in job_ids]
+            )
+
+    def finish(self, job_id: str, worker: str, outcome: Optional[Dict] = None, error: Optional[str] = None,
+               retry: bool = False) -> bool:
+        """Record a worker's outcome, or its error (re-queued while attempts remain if retry is set)
+
+        Returns False if the worker no longer holds the job, e.g. after its lease expired or the session was reset.
+        """
+        with self._transaction() as conn:
+            row = conn.execute("SELECT attempts FROM jobs WHERE id = ? AND worker = ? AND status = 'running'",
+                               (job_id, worker)).fetchone()
+            if row is None:
+                return False
+            if error is not None and retry and row[0] < self.max_attempts:
+                conn.execute("UPDATE jobs SET status = 'queued', worker = NULL, lease_until = NULL, error = ?"
+                             " WHERE id = ?", (error, job_id))
+            else:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, worker = NULL, lease_until = NULL, finished_at = ?, outcome = ?,"
+                    " error = ? WHERE id = ?",
+                    ("failed" if error is not None else "done", time.time(),
+                     json.dumps(outcome) if outcome is not None else None, error, job_id)
+                )
+            return True
+
+    def session_jobs(self, session: str) -> List[Job]:
+        """Every job of a UI session, in upload order"""
+        with self._lock:
+            rows = self._conn.execute(f"SELECT {_COLUMNS} FROM jobs WHERE session = ? ORDER BY seq",
+                                      (session,)).fetchall()
+        return [_job(row) for row in rows]
+
+    def _delete(self, conn: sqlite3.Connection, where: str, params: tuple) -> int:
+        job_ids = [row[0] for row in conn.execute(f"SELECT id FROM jobs WHERE {where}", params)]
+        conn.executemany("DELETE FROM jobs WHERE id = ?", [(job_id,) for job_id in job_ids])
+        for job_id in job_ids:
+            try:
+                os.remove(self.input_path(job_id))
+            except FileNotFoundError:
+                pass
+        return len(job_ids)
+
+    def forget_session(self, session: str) -> int:
+        """Drop a session's jobs, queued or finished, and their spooled uploads"""
+        with self._transaction() as conn:
+            return self._delete(conn, "session = ?", (session,))
+
+    def purge(self, older_than_seconds: float) -> int:
+        """Drop jobs that finished longer ago than the retention period"""
+        with self._transaction() as conn:
+            return self._delete(conn, "finished_at < ?", (time.time() - older_than_seconds,))
+
+    def stats(self) -> Dict:
+        """Job counts per state and the age of the oldest queued job"""
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+            oldest = self._conn.execute("SELECT MIN(enqueued_at) FROM jobs WHERE status = 'queued'").fetchone()[0]
+        stats = {state: counts.get(state, 0) for state in JOB_STATES}
+        stats["oldest_queued_seconds"] = round(time.time() - oldest, 1) if oldest else 0.0
+        return stats
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+def get_job_queue() -> JobQueue:
+    """Process-wide handle on the job queue at JOB_QUEUE_PATH"""
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue()
+    return _job_queue
@@ -0,0 +1,193 @@
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
+
+# Histogram bucket upper bounds in seconds, from fast local stages up to slow, retried model calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def _percentile(ordered: List[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, int(round(q / 100.0 * len(ordered))) - 1))]
+
+def _label_text(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    rendered = ",".join(f'{key}="{str(value)}"'.replace("\n", " ") for key, value in labels)
+    return "{" + rendered + "}"
+
+# --- Stage Statistics ---
+class StageStats:
+    """Running count/sum/min/max, a cumulative histogram and a window of recent durations for one stage"""
+
+    def __init__(self, buckets: Tuple[float, ...], window: int = 2048):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+        self.recent: Deque[float] = deque(maxlen=window)
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+        self.recent.append(seconds)
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.bucket_counts[i] += 1
+
+    def summary(self) -> Dict:
+        ordered = sorted(self.recent)
+        return {
+            "count": self.count,
+            "total_seconds": round(self.total, 4),
+            "mean_ms": round(self.total / self.count * 1000, 2) if self.count else 0.0,
+            "p50_ms": round(_percentile(ordered, 50) * 1000, 2),
+            "p95_ms": round(_percentile(ordered, 95) * 1000, 2),
+            "max_ms": round(self.max * 1000, 2),
+        }
+
+# --- Metrics Registry ---
+class MetricsRegistry:
+    """Thread-safe per-stage timers, labelled counters and a bounded log of span events"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS, max_events: int = 20000):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stages: Dict[str, StageStats] = {}
+        self._counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        self._events: Deque[Dict] = deque(maxlen=max_events)
+        self.started_at = time.time()
+
+    def _stack(self) -> List[str]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def current_stage(self) -> Optional[str]:
+        """Innermost open span on this thread, used to attribute counters such as token usage"""
+        stack = self._stack()
+        return stack[-1] if stack else None
+
+    @contextmanager
+    def document(self, name: str) -> Iterator[None]:
+        """Tag every span recorded on this thread with the document being processed"""
+        previous = getattr(self._local, "document", None)
+        self._local.document = name
+        try:
+            yield
+        finally:
+            self._local.document = previous
+
+    @contextmanager
+    def span(self, stage: str, **attributes) -> Iterator[None]:
+        """Time the enclosed block as one occurrence of a pipeline stage"""
+        stack = self._stack()
+        stack.append(stage)
+        start = time.perf_counter()
+        error = None
+        try:
+            yield
+        except Exception as e:
+            error = type(e).__name__
+            raise
+        finally:
+            stack.pop()
+            if error:
+                attributes["error"] = error
+            self.observe(stage, time.perf_counter() - start, **attributes)
+
+    def observe(self, stage: str, seconds: float, **attributes) -> None:
+        """Record a duration measured elsewhere (rate-limiter waits, backoff sleeps)"""
+        event = {"ts": round(time.time(), 6), "stage": stage, "seconds": round(seconds, 6),
+                 "thread": threading.current_thread().name}
+        document = getattr(self._local, "document", None)
+        if document is not None:
+            event["document"] = document
+        event.update(attributes)
+        with self._lock:
+            stats = self._stages.get(stage)
+            if stats is None:
+                stats = self._stages[stage] = StageStats(self.buckets)
+            stats.add(seconds)
+            self._events.append(event)
+
+    def increment(self, name: str, value: float = 1, **labels) -> None:
+        """Add to a counter identified by name and label values"""
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def reset(self) -> None:
+        """Start a fresh measurement window, e.g. for a new batch"""
+        with self._lock:
+            self._stages.clear()
+            self._counters.clear()
+            self._events.clear()
+            self.started_at = time.time()
+
+    # --- Export ---
+    def snapshot(self) -> Dict:
+        """Per-stage summaries and counter totals"""
+        with self._lock:
+            stages = {stage: stats.summary() for stage, stats in self._stages.items()}
+            counters = {}
+            for (name, labels), value in self._counters.items():
+                counters[name + _label_text(labels)] = value
+        return {"started_at": self.started_at, "stages": stages, "counters": counters}
+
+    def counter_total(self, name: str, **labels) -> float:
+        """Sum of a counter across all label values, or across those matching the given labels"""
+        wanted = {(key, str(value)) for key, value in labels.items()}
+        with self._lock:
+            return sum(value for (counter, counter_labels), value in self._counters.items()
+                       if counter == name and wanted.issubset(counter_labels))
+
+    def to_prometheus(self, prefix: str = "extractor") -> str:
+        """Render stage histograms and counters in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            if self._stages:
+                lines.append(f"# HELP {prefix}_stage_duration_seconds Time spent in each pipeline stage")
+                lines.append(f"# TYPE {prefix}_stage_duration_seconds histogram")
+            for stage, stats in sorted(self._stages.items()):
+                for bound, count in zip(stats.buckets, stats.bucket_counts):
+                    lines.append(f'{prefix}_stage_duration_seconds_bucket{{stage="{stage}",le="{bound}"}} {count}')
+                lines.append(f'{prefix}_stage_duration_seconds_bucket{{stage="{stage}",le="+Inf"}} {stats.count}')
+                lines.append(f'{prefix}_stage_duration_seconds_sum{{stage="{stage}"}} {stats.total:.6f}')
+                lines.append(f'{prefix}_stage_duration_seconds_count{{stage="{stage}"}} {stats.count}')
+
+            by_name: Dict[str, List[Tuple[Tuple[Tuple[str, str], ...], float]]] = {}
+            for (name, labels), value in self._counters.items():
+                by_name.setdefault(name, []).append((labels, value))
+        for name, series in sorted(by_name.items()):
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            for labels, value in sorted(series):
+                lines.append(f"{prefix}_{name}_total{_label_text(labels)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def to_jsonl(self) -> str:
+        """One JSON object per recorded span, oldest first"""
+        with self._lock:
+            events = list(self._events)
+        return "".join(json.dumps(event) + "\n" for event in events)
+
+    def write(self, path: str) -> None:
+        """Write Prometheus text (.prom/.txt) or span events (.jsonl) depending on the extension"""
+        content = self.to_jsonl() if path.lower().endswith(".jsonl") else self.to_prometheus()
+        with open(path, "w", encoding='utf-8') as out:
+            out.write(content)
+
+_metrics = MetricsRegistry()
+
+def get_metrics() -> MetricsRegistry:
+    """Process-wide metrics registry shared by every stage"""
+    return _metrics
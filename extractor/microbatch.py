@@ -0,0 +1,76 @@
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from .metrics import get_metrics
+
+@dataclass
+class _Batch:
+    """Items collected for one batched call, and its answers once the call returns"""
+    items: List[Any] = field(default_factory=list)
+    answers: Optional[Dict[int, Any]] = None
+    error: Optional[BaseException] = None
+    done: threading.Event = field(default_factory=threading.Event)
+
+# --- Micro-Batcher ---
+class MicroBatcher:
+    """Coalesces concurrent single-item calls from pipeline threads into batched calls
+
+    A thread calling submit() joins the open batch. The thread that fills it, or the first one whose max_wait
+    runs out, makes the batched call on behalf of all of them, so no extra threads are involved. run_batch
+    returns answers keyed by position in the batch; an item it leaves out, and an item that ends up alone in
+    its batch, is handled by fallback(item) on its own submitting thread.
+    """
+
+    def __init__(self, run_batch: Callable[[List[Any]], Dict[int, Any]], fallback: Callable[[Any], Any],
+                 batch_size: int, max_wait: float, name: str = "batch"):
+        self.run_batch = run_batch
+        self.fallback = fallback
+        self.batch_size = max(1, int(batch_size))
+        self.max_wait = max_wait
+        self.name = name
+        self._lock = threading.Lock()
+        self._open: Optional[_Batch] = None
+
+    def submit(self, item: Any) -> Any:
+        """Result for one item, blocking until its batch has been answered"""
+        if self.batch_size == 1:
+            return self.fallback(item)
+
+        with self._lock:
+            batch = self._open or _Batch()
+            slot = len(batch.items)
+            batch.items.append(item)
+            self._open = None if len(batch.items) >= self.batch_size else batch
+            lead = self._open is None
+        if not lead and not batch.done.wait(self.max_wait):
+            # Nobody filled the batch in time, so whoever times out first sends what there is
+            with self._lock:
+                lead = self._open is batch
+                if lead:
+                    self._open = None
+        if lead:
+            self._run(batch)
+        batch.done.wait()
+
+        if batch.error is not None:
+            raise batch.error
+        if slot not in batch.answers:
+            if len(batch.items) > 1:
+                get_metrics().increment("batch_fallbacks", batch=self.name)
+            return self.fallback(item)
+        return batch.answers[slot]
+
+    def _run(self, batch: _Batch) -> None:
+        metrics = get_metrics()
+        try:
+            if len(batch.items) == 1:
+                batch.answers = {}
+            else:
+                metrics.increment("batch_calls", batch=self.name)
+                metrics.increment("batched_items", len(batch.items), batch=self.name)
+                batch.answers = self.run_batch(batch.items)
+        except BaseException as e:
+            batch.error = e
+        finally:
+            batch.done.set()
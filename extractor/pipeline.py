@@ -0,0 +1,48 @@
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Iterable, Iterator, Optional, Tuple
+
+from .metrics import get_metrics
+
+# --- Pipeline Results ---
+@dataclass
+class PipelineResult:
+    """Outcome of processing one document through the pipeline"""
+    index: int
+    name: str
+    value: Any = None
+    error: Optional[str] = None
+
+# --- Pipeline Engine ---
+class DocumentPipeline:
+    """Process documents concurrently on a bounded worker pool, yielding results in input order"""
+
+    def __init__(self, process: Callable[[int, Any], Any], max_workers: int = 4,
+                 max_in_flight: Optional[int] = None, initializer: Optional[Callable[[], None]] = None):
+        self.process = process
+        self.max_workers = max(1, int(max_workers))
+        # Cap the number of submitted-but-unconsumed documents so decoded images don't pile up
+        self.max_in_flight = max(self.max_workers, max_in_flight or self.max_workers * 2)
+        self.initializer = initializer
+
+    def _run_one(self, index: int, name: str, item: Any) -> PipelineResult:
+        """Run the processing function for a single document, capturing any error"""
+        metrics = get_metrics()
+        try:
+            with metrics.document(name), metrics.span("document"):
+                return PipelineResult(index=index, name=name, value=self.process(index, item))
+        except Exception as e:
+            return PipelineResult(index=index, name=name, error=str(e))
+
+    def run(self, items: Iterable[Tuple[str, Any]]) -> Iterator[PipelineResult]:
+        """Yield a result per (name, item) pair in input order, as soon as each and all earlier ones complete"""
+        pending: Deque[Future] = deque()
+        with ThreadPoolExecutor(max_workers=self.max_workers, initializer=self.initializer) as executor:
+            for index, (name, item) in enumerate(items):
+                pending.append(executor.submit(self._run_one, index, name, item))
+                if len(pending) >= self.max_in_flight:
+                    yield pending.popleft().result()
+
+            while pending:
+                yield pending.popleft().result()
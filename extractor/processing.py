@@ -0,0 +1,180 @@
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional
+
+from config.config import (
+    CASCADE_ENABLED, CASCADE_THRESHOLD, CLAUDE_HAIKU_MODEL_ID, CLAUDE_SONNET_MODEL_ID, EXTRACTION_BATCH_SIZE,
+    EXTRACTION_BATCH_WAIT_MS, EXTRACTION_CACHE_MAX_MB, EXTRACTION_CACHE_PATH, EXTRACTION_CACHE_VERSION,
+    EXTRACTION_MODE, PRECLASSIFIER_ENABLED
+)
+from .cache import ExtractionCache
+from .classifier import preclassify
+from .document import DocumentImage, PreparedDocument, prepare_document
+from .metrics import get_metrics
+from .extraction import (
+    BATCH_EXTRACTORS, MAX_BATCH_DOCUMENTS, FieldCallback, detect_document_type, extract_documents_batch,
+    extract_fields
+)
+from .ifsc import enrich_cheque_result
+from .microbatch import MicroBatcher
+from .validation import calculate_automated_accuracy, reconcile_results, validate_bill_data, validate_cheque_data
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+_extraction_cache = None
+_extraction_cache_lock = threading.Lock()
+_batchers: Dict[str, MicroBatcher] = {}
+_batchers_lock = threading.Lock()
+
+# --- Extraction Cache ---
+def get_extraction_cache() -> ExtractionCache:
+    """Process-wide extraction cache shared by every caller"""
+    global _extraction_cache
+    with _extraction_cache_lock:
+        if _extraction_cache is None:
+            _extraction_cache = ExtractionCache(EXTRACTION_CACHE_PATH, max_bytes=EXTRACTION_CACHE_MAX_MB * 1024 * 1024)
+    return _extraction_cache
+
+def cached_model_call(kind: str, fingerprint: str, compute: Callable[[], Any],
+                      model_id: str = CLAUDE_HAIKU_MODEL_ID) -> Any:
+    """Return the cached output of a model-backed step for this image, computing and storing it on a miss"""
+    cache = get_extraction_cache()
+    key = cache.make_key(fingerprint, f"{kind}:{model_id}:{EXTRACTION_CACHE_VERSION}")
+    cached = cache.get(key)
+    get_metrics().increment("cache_lookups", kind=kind, result="miss" if cached is None else "hit")
+    if cached is not None:
+        return cached
+
+    value = compute()
+    # Failed calls surface as None / "unknown" and are retried on the next upload instead of cached
+    verdict = value[0] if isinstance(value, tuple) else value
+    if value is not None and verdict != "unknown":
+        cache.set(key, value)
+    return value
+
+# --- Multi-Document Requests ---
+def get_extraction_batcher(kind: str) -> MicroBatcher:
+    """Process-wide batcher packing the "unified", "cheque" or "bill" extraction calls of concurrent documents"""
+    with _batchers_lock:
+        if kind not in _batchers:
+            _batchers[kind] = MicroBatcher(
+                lambda docs: extract_documents_batch(docs, kind), BATCH_EXTRACTORS[kind],
+                batch_size=min(EXTRACTION_BATCH_SIZE, MAX_BATCH_DOCUMENTS),
+                max_wait=EXTRACTION_BATCH_WAIT_MS / 1000, name=kind
+            )
+        return _batchers[kind]
+
+def run_extraction(kind: str, doc: PreparedDocument, on_field: Optional[FieldCallback] = None) -> Any:
+    """Run the extraction call of one kind for a document, sharing a request with other documents when enabled
+
+    on_field receives fields as they stream in; shared requests answer all their documents at once, so it
+    is not called for them.
+    """
+    if EXTRACTION_BATCH_SIZE > 1:
+        return get_extraction_batcher(kind).submit(doc)
+    return BATCH_EXTRACTORS[kind](doc, on_field=on_field)
+
+# --- Document Processing ---
+def load_image(source) -> "Image.Image":
+    """Decode an image from a path or file-like object, converting RGBA to RGB"""
+    from PIL import Image
+
+    with get_metrics().span("decode"):
+        img = Image.open(source)
+        img.load()
+        # Convert to RGB if needed
+        if img.mode == 'RGBA':
+            img = img.convert('RGB')
+    return img
+
+def analyze_document(img: DocumentImage, mode: Optional[str] = None, on_field: Optional[FieldCallback] = None) -> Dict:
+    """Detect, extract and validate a decoded document image, passing extracted fields to on_field as they stream"""
+    mode = mode or EXTRACTION_MODE
+    # Every model call below reuses one JPEG/base64 encoding; the payload is freed once they are done
+    doc = prepare_document(img)
+    try:
+        return _analyze_prepared(doc, mode, on_field)
+    finally:
+        doc.drop_model_payload()
+
+def _analyze_prepared(doc: PreparedDocument, mode: str, on_field: Optional[FieldCallback] = None) -> Dict:
+    """Run the model-backed steps on a prepared document"""
+    # Identical scans (re-uploads, session resets) are served from the cache without model calls
+    fingerprint = doc.fingerprint
+
+    claude_result = None
+    if mode == "unified":
+        # Classify, validate and extract in one model call
+        doc_type, claude_result = cached_model_call("unified", fingerprint,
+                                                    lambda: run_extraction("unified", doc, on_field))
+    else:
+        # Detect document type first, skipping the model call when the page layout is unambiguous
+        doc_type = detect_type_locally(doc) if PRECLASSIFIER_ENABLED else None
+        if doc_type is None:
+            doc_type = cached_model_call("detect", fingerprint, lambda: detect_document_type(doc))
+
+    # Process based on document type
+    if mode != "unified" and doc_type != "unknown":
+        claude_result = cached_model_call(doc_type, fingerprint, lambda: run_extraction(doc_type, doc, on_field))
+
+    outcome = finish_analysis(doc_type, claude_result)
+    if CASCADE_ENABLED and "error" not in outcome:
+        outcome = escalate_if_uncertain(doc, claude_result, outcome)
+    return outcome
+
+def detect_type_locally(doc: PreparedDocument) -> Optional[str]:
+    """Run the layout pre-classifier, counting its confident verdicts and deferrals"""
+    metrics = get_metrics()
+    with metrics.span("preclassify"):
+        verdict = preclassify(doc.model_image)
+    if verdict.doc_type is None:
+        metrics.increment("preclassifier_deferred")
+    else:
+        metrics.increment("preclassifier_decided", doc_type=verdict.doc_type)
+    return verdict.doc_type
+
+# --- Model Cascade ---
+def escalate_if_uncertain(doc: PreparedDocument, claude_result: Dict, outcome: Dict) -> Dict:
+    """Re-extract a document scoring under CASCADE_THRESHOLD with Sonnet and reconcile both extractions
+
+    The returned outcome holds the reconciled result and its validation, plus a "verification" record of the
+    models' agreement and every field they disagreed on. Documents that pass keep Haiku's outcome untouched.
+    """
+    metrics = get_metrics()
+    doc_type = outcome["doc_type"]
+    score = calculate_automated_accuracy(outcome["result"], None, outcome["validation"])
+    if score >= CASCADE_THRESHOLD:
+        metrics.increment("cascade", doc_type=doc_type, decision="accepted")
+        return outcome
+
+    sonnet_result = cached_model_call(f"{doc_type}_fields", doc.fingerprint, lambda: extract_fields(doc, doc_type),
+                                      model_id=CLAUDE_SONNET_MODEL_ID)
+    if sonnet_result is None:
+        metrics.increment("cascade", doc_type=doc_type, decision="failed")
+        return outcome
+    metrics.increment("cascade", doc_type=doc_type, decision="escalated")
+
+    # Reconciled from Haiku's raw fields, so branch details are looked up again for the IFSC code that was kept
+    merged, verification = reconcile_results(claude_result, sonnet_result, doc_type)
+    verified = finish_analysis(doc_type, merged)
+    verified["verification"] = {"model": CLAUDE_SONNET_MODEL_ID, "haiku_score": round(score, 1), **verification}
+    return verified
+
+def finish_analysis(doc_type: str, claude_result: Optional[Dict]) -> Dict:
+    """Turn a model verdict into the error or {doc_type, result, validation} outcome shared by every entry point"""
+    if doc_type == "unknown":
+        return {"error": "Could not identify as cheque or bill. Please upload valid documents."}
+
+    if claude_result is None:
+        return {"error": f"{doc_type.capitalize()} extraction failed"}
+
+    # Check if the result contains an error message (invalid image)
+    if "error" in claude_result:
+        return {"error": claude_result["error"]}
+
+    with get_metrics().span("validate", doc_type=doc_type):
+        validation = validate_cheque_data(claude_result) if doc_type == "cheque" else validate_bill_data(claude_result)
+        if doc_type == "cheque":
+            claude_result = enrich_cheque_result(claude_result)
+
+    return {"doc_type": doc_type, "result": claude_result, "validation": validation}
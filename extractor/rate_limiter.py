@@ -0,0 +1,164 @@
+import json
+import threading
+import time
+from typing import Dict, Optional
+
+# Error codes Bedrock uses when a caller exceeds its quota
+THROTTLING_ERROR_CODES = {"ThrottlingException", "TooManyRequestsException", "ServiceQuotaExceededException"}
+
+# Failures a retry may well get past: the service or model was briefly unavailable, or the connection dropped
+TRANSIENT_ERROR_CODES = {"InternalServerException", "ServiceUnavailableException", "ModelTimeoutException",
+                         "ModelNotReadyException", "ModelStreamErrorException"}
+# botocore's timeout and connection failures, matched by name so botocore need not be imported
+TRANSIENT_EXCEPTION_NAMES = {"HTTPClientError", "ConnectionError", "ReadTimeoutError", "ConnectTimeoutError"}
+
+# Claude resizes images to ~1.15 MP, which costs at most ~1600 input tokens per image
+IMAGE_TOKEN_ESTIMATE = 1600
+
+def is_throttling_error(error: Exception) -> bool:
+    """Return True if the exception signals a Bedrock throttling / quota error"""
+    response = getattr(error, "response", None)
+    if isinstance(response, dict) and response.get("Error", {}).get("Code") in THROTTLING_ERROR_CODES:
+        return True
+    error_str = str(error).lower()
+    return "throttling" in error_str or "too many requests" in error_str or "rate exceeded" in error_str
+
+def is_transient_error(error: Exception) -> bool:
+    """Return True if the exception is a timeout, dropped connection or 5xx error rather than a bad request"""
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    if any(cls.__name__ in TRANSIENT_EXCEPTION_NAMES for cls in type(error).__mro__):
+        return True
+    response = getattr(error, "response", None)
+    if not isinstance(response, dict):
+        return False
+    if response.get("Error", {}).get("Code") in TRANSIENT_ERROR_CODES:
+        return True
+    return response.get("ResponseMetadata", {}).get("HTTPStatusCode", 0) >= 500
+
+def estimate_request_tokens(body: Dict) -> int:
+    """Estimate input + output tokens an Anthropic messages request will consume"""
+    text_chars = 0
+    images = 0
+    for message in body.get("messages", []):
+        for block in message.get("content", []):
+            if block.get("type") == "image":
+                images += 1
+            else:
+                text_chars += len(json.dumps(block))
+    return text_chars // 4 + images * IMAGE_TOKEN_ESTIMATE + int(body.get("max_tokens", 0))
+
+# --- Adaptive Rate Limiter ---
+class AdaptiveRateLimiter:
+    """Token-bucket limiter on requests/s and tokens/min whose request rate adapts AIMD-style"""
+
+    def __init__(self, requests_per_second: float = 1.0, tokens_per_minute: int = 200000,
+                 min_rate: float = 0.1, max_rate: float = 10.0, increase_step: float = 0.05,
+                 decrease_factor: float = 0.5, throttle_cooldown: float = 2.0):
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        # Concurrent throttles from one burst should only cut the rate once
+        self.throttle_cooldown = throttle_cooldown
+        self.tokens_per_minute = tokens_per_minute
+
+        self._lock = threading.Lock()
+        self._rate = min(max(requests_per_second, min_rate), max_rate)
+        self._request_allowance = 1.0
+        self._token_allowance = float(tokens_per_minute)
+        self._last_refill = time.monotonic()
+        self._last_throttle = 0.0
+        self._waiting = 0
+
+        self.total_requests = 0
+        self.total_throttles = 0
+        self.total_wait_seconds = 0.0
+
+    def _refill(self) -> None:
+        """Top up both buckets for the time elapsed since the last refill"""
+        now = time.monotonic()
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        # Allow a burst of at most one second's worth of requests
+        self._request_allowance = min(max(1.0, self._rate), self._request_allowance + elapsed * self._rate)
+        self._token_allowance = min(float(self.tokens_per_minute),
+                                    self._token_allowance + elapsed * self.tokens_per_minute / 60.0)
+
+    def acquire(self, tokens: int = 0) -> float:
+        """Block until a request of the given token cost fits both budgets; return seconds waited"""
+        tokens = min(tokens, self.tokens_per_minute)
+        start = time.monotonic()
+        with self._lock:
+            self._waiting += 1
+        try:
+            while True:
+                with self._lock:
+                    self._refill()
+                    request_wait = (1.0 - self._request_allowance) / self._rate
+                    token_wait = (tokens - self._token_allowance) * 60.0 / self.tokens_per_minute
+                    wait = max(request_wait, token_wait)
+                    if wait <= 0:
+                        self._request_allowance -= 1.0
+                        self._token_allowance -= tokens
+                        self.total_requests += 1
+                        waited = time.monotonic() - start
+                        self.total_wait_seconds += waited
+                        return waited
+                time.sleep(min(wait, 1.0))
+        finally:
+            with self._lock:
+                self._waiting -= 1
+
+    def try_acquire(self, tokens: int = 0) -> bool:
+        """Take a slot only if both budgets have room right now, without waiting (used for optional requests)"""
+        tokens = min(tokens, self.tokens_per_minute)
+        with self._lock:
+            self._refill()
+            if self._request_allowance < 1.0 or self._token_allowance < tokens:
+                return False
+            self._request_allowance -= 1.0
+            self._token_allowance -= tokens
+            self.total_requests += 1
+            return True
+
+    def record_success(self, estimated_tokens: int = 0, used_tokens: Optional[int] = None) -> None:
+        """Additively raise the rate and reconcile the token budget with actual usage"""
+        with self._lock:
+            self._rate = min(self.max_rate, self._rate + self.increase_step)
+            if used_tokens is not None:
+                self._token_allowance = min(float(self.tokens_per_minute),
+                                            self._token_allowance + estimated_tokens - used_tokens)
+
+    def record_throttle(self) -> None:
+        """Multiplicatively cut the rate and drain any accumulated burst allowance"""
+        with self._lock:
+            self.total_throttles += 1
+            now = time.monotonic()
+            if now - self._last_throttle < self.throttle_cooldown:
+                return
+            self._last_throttle = now
+            self._rate = max(self.min_rate, self._rate * self.decrease_factor)
+            self._request_allowance = min(self._request_allowance, 0.0)
+
+    @property
+    def current_rate(self) -> float:
+        """Current allowed requests per second"""
+        return self._rate
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of callers currently waiting for a slot"""
+        return self._waiting
+
+    def stats(self) -> Dict:
+        """Snapshot of limiter state for tuning"""
+        with self._lock:
+            return {
+                "current_rate": round(self._rate, 3),
+                "queue_depth": self._waiting,
+                "token_allowance": int(self._token_allowance),
+                "total_requests": self.total_requests,
+                "total_throttles": self.total_throttles,
+                "total_wait_seconds": round(self.total_wait_seconds, 2)
+            }
@@ -0,0 +1,178 @@
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import weakref
+from collections import OrderedDict
+from io import BytesIO
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from config.config import RESULT_STORE_DIR, RESULT_STORE_MEMORY_MB, RESULT_THUMBNAIL_EDGE
+from .document import orient_image
+from .storage import resolve_url
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+
+    from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+def make_thumbnail(image: "Image.Image", max_edge: int = RESULT_THUMBNAIL_EDGE) -> bytes:
+    """Small JPEG preview of a document, cheap enough to keep for every result in a session"""
+    thumbnail = image.copy()
+    thumbnail.thumbnail((max_edge, max_edge))
+    if thumbnail.mode not in ('RGB', 'L'):
+        thumbnail = thumbnail.convert('RGB')
+    output = BytesIO()
+    thumbnail.save(output, format='JPEG', quality=80)
+    return output.getvalue()
+
+def _decoded_size(image: "Image.Image") -> int:
+    return image.size[0] * image.size[1] * len(image.getbands())
+
+class StoredDocument:
+    """Compact record of one processed document; the full image lives on disk, in S3 or in the store's LRU"""
+    __slots__ = ("name", "doc_type", "result", "validation", "s3_urls", "thumbnail", "spill_path", "verification")
+
+    def __init__(self, name: str, doc_type: str, result: Dict, validation: Dict, s3_urls: Dict[str, "Future"],
+                 thumbnail: bytes, spill_path: Optional[str], verification: Optional[Dict] = None):
+        self.name = name
+        self.doc_type = doc_type
+        self.result = result
+        self.validation = validation
+        self.s3_urls = s3_urls
+        self.thumbnail = thumbnail
+        self.spill_path = spill_path
+        self.verification = verification
+
+# --- Result Store ---
+class ResultStore:
+    """Per-session results holding thumbnails in memory and full images on disk behind a size-capped LRU"""
+
+    def __init__(self, directory: str = RESULT_STORE_DIR,
+                 memory_cap_bytes: int = RESULT_STORE_MEMORY_MB * 1024 * 1024):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = tempfile.mkdtemp(prefix="session-", dir=directory)
+        self.memory_cap_bytes = memory_cap_bytes
+        self.documents: List[StoredDocument] = []
+        self._images: "OrderedDict[int, Image.Image]" = OrderedDict()
+        self._image_bytes = 0
+        self._lock = threading.Lock()
+        # Sessions that end without "Clear All Data" still remove their spilled images
+        self._finalizer = weakref.finalize(self, shutil.rmtree, self.directory, True)
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def add(self, name: str, doc_type: str, result: Dict, validation: Dict, s3_urls: Dict[str, "Future"],
+            thumbnail: bytes, source_bytes: Optional[bytes] = None, image: Optional["Image.Image"] = None,
+            verification: Optional[Dict] = None) -> int:
+        """Record a processed document, spilling its original bytes (or the image, losslessly) to disk"""
+        with self._lock:
+            index = len(self.documents)
+            spill_path = os.path.join(self.directory, f"{index:06d}")
+            try:
+                if source_bytes is not None:
+                    with open(spill_path, "wb") as spill:
+                        spill.write(source_bytes)
+                elif image is not None:
+                    image.save(spill_path, format='PNG')
+                else:
+                    spill_path = None
+            except OSError as e:
+                logger.warning(f"Could not spill {name} to disk, will fall back to S3: {e}")
+                spill_path = None
+            self.documents.append(StoredDocument(name, doc_type, result, validation, s3_urls, thumbnail, spill_path,
+                                                 verification))
+        return index
+
+    @property
+    def results(self) -> List[Dict]:
+        return [document.result for document in self.documents]
+
+    @property
+    def validations(self) -> List[Dict]:
+        return [document.validation for document in self.documents]
+
+    @property
+    def verifications(self) -> List[Optional[Dict]]:
+        return [document.verification for document in self.documents]
+
+    @property
+    def doc_types(self) -> List[str]:
+        return [document.doc_type for document in self.documents]
+
+    def image(self, index: int) -> "Image.Image":
+        """Full image of a document from the LRU, its spill file or its S3 archive, else the thumbnail"""
+        with self._lock:
+            if index in self._images:
+                self._images.move_to_end(index)
+                return self._images[index]
+        image = self._load(self.documents[index])
+        self._remember(index, image)
+        return image
+
+    def _load(self, document: StoredDocument) -> "Image.Image":
+        from PIL import Image
+
+        if document.spill_path and os.path.exists(document.spill_path):
+            with Image.open(document.spill_path) as image:
+                image.load()
+                return orient_image(image)
+        data = self._fetch_archived(document)
+        if data is not None:
+            image = Image.open(BytesIO(data))
+            image.load()
+            return image
+        return Image.open(BytesIO(document.thumbnail))
+
+    @staticmethod
+    def _fetch_archived(document: StoredDocument) -> Optional[bytes]:
+        """The JPEG archived to S3 for this document, if its upload has finished"""
+        from .batch import split_s3_uri
+        from .clients import get_s3_client
+
+        url = resolve_url(document.s3_urls.get("document"), timeout=0)
+        if not url:
+            return None
+        try:
+            bucket, key = split_s3_uri(url)
+            return get_s3_client().get_object(Bucket=bucket, Key=key)["Body"].read()
+        except Exception as e:
+            logger.warning(f"Could not fetch {document.name} from S3: {e}")
+            return None
+
+    def _remember(self, index: int, image: "Image.Image") -> None:
+        """Cache a decoded image, evicting the least recently viewed ones beyond the memory cap"""
+        size = _decoded_size(image)
+        with self._lock:
+            if index in self._images or size > self.memory_cap_bytes:
+                return
+            self._images[index] = image
+            self._image_bytes += size
+            while self._image_bytes > self.memory_cap_bytes:
+                _, evicted = self._images.popitem(last=False)
+                self._image_bytes -= _decoded_size(evicted)
+
+    def stats(self) -> Dict:
+        """Document count, thumbnail bytes and decoded-image cache usage"""
+        with self._lock:
+            return {
+                "documents": len(self.documents),
+                "thumbnail_bytes": sum(len(document.thumbnail) for document in self.documents),
+                "cached_images": len(self._images),
+                "cached_image_bytes": self._image_bytes,
+                "memory_cap_bytes": self.memory_cap_bytes,
+            }
+
+    def clear(self) -> None:
+        """Drop every record and delete the spilled images"""
+        with self._lock:
+            self.documents = []
+            self._images.clear()
+            self._image_bytes = 0
+            self._finalizer()
+            os.makedirs(self.directory, exist_ok=True)
+            self._finalizer = weakref.finalize(self, shutil.rmtree, self.directory, True)
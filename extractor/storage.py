@@ -0,0 +1,318 @@
+import io
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import datetime
+from io import BytesIO
+from typing import TYPE_CHECKING, Callable, Dict, Optional, Union
+
+from config.config import S3_BUCKET_NAME, S3_MULTIPART_THRESHOLD_MB, S3_UPLOAD_QUEUE_SIZE, S3_UPLOAD_WORKERS
+from .bedrock import exponential_backoff_delay
+from .clients import get_s3_client
+from .metrics import get_metrics
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# --- S3 Storage ---
+def upload_to_s3(file_bytes: bytes, s3_key: str, content_type: str = 'image/jpeg') -> str:
+    """Upload file bytes to S3 and return public URL"""
+    try:
+        with get_metrics().span("s3_put", key_prefix=s3_key.split("/")[0]):
+            get_s3_client().put_object(
+                Bucket=S3_BUCKET_NAME,
+                Key=s3_key,
+                Body=file_bytes,
+                ContentType=content_type
+            )
+        return f"s3://{S3_BUCKET_NAME}/{s3_key}"
+    except Exception as e:
+        logger.error(f"Failed to upload to S3: {str(e)}")
+        return None
+
+def upload_excel_to_s3(excel_bytes: bytes) -> str:
+    """Upload Excel file to S3 and return URL"""
+    try:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        s3_key = f"excel_reports/cheque_report_{timestamp}.xlsx"
+        
+        with get_metrics().span("s3_put", key_prefix="excel_reports"):
+            get_s3_client().put_object(
+                Bucket=S3_BUCKET_NAME,
+                Key=s3_key,
+                Body=excel_bytes,
+                ContentType='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            )
+        return f"s3://{S3_BUCKET_NAME}/{s3_key}"
+    except Exception as e:
+        logger.error(f"Failed to upload Excel to S3: {str(e)}")
+        return None
+
+# --- Streaming Uploads ---
+# S3 rejects multipart parts under 5 MB, except the last one
+MIN_MULTIPART_PART_BYTES = 5 * 1024 * 1024
+
+class S3MultipartWriter(io.RawIOBase):
+    """Write-only, non-seekable file object that streams into an S3 multipart upload one part at a time"""
+
+    def __init__(self, bucket: str, key: str, content_type: str = 'application/octet-stream',
+                 part_size: int = S3_MULTIPART_THRESHOLD_MB * 1024 * 1024, max_retries: int = 3):
+        super().__init__()
+        self.bucket = bucket
+        self.key = key
+        self.content_type = content_type
+        self.part_size = max(part_size, MIN_MULTIPART_PART_BYTES)
+        self.max_retries = max_retries
+        self._buffer = bytearray()
+        self._position = 0
+        self._upload_id: Optional[str] = None
+        self._parts = []
+
+    @property
+    def url(self) -> str:
+        return f"s3://{self.bucket}/{self.key}"
+
+    def writable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def write(self, data) -> int:
+        self._buffer += data
+        self._position += len(data)
+        while len(self._buffer) >= self.part_size:
+            part = bytes(self._buffer[:self.part_size])
+            del self._buffer[:self.part_size]
+            self._upload_part(part)
+        return len(data)
+
+    def _with_retries(self, operation: str, call: Callable):
+        for attempt in range(self.max_retries):
+            try:
+                with get_metrics().span("s3_put", key_prefix=self.key.split("/")[0], operation=operation):
+                    return call()
+            except Exception:
+                if attempt == self.max_retries - 1:
+                    raise
+                get_metrics().increment("s3_retries")
+                with get_metrics().span("s3_backoff_sleep"):
+                    time.sleep(exponential_backoff_delay(attempt))
+
+    def _upload_part(self, data: bytes) -> None:
+        client = get_s3_client()
+        if self._upload_id is None:
+            self._upload_id = self._with_retries("create", lambda: client.create_multipart_upload(
+                Bucket=self.bucket, Key=self.key, ContentType=self.content_type))["UploadId"]
+        number = len(self._parts) + 1
+        response = self._with_retries("part", lambda: client.upload_part(
+            Bucket=self.bucket, Key=self.key, UploadId=self._upload_id, PartNumber=number, Body=data))
+        self._parts.append({"PartNumber": number, "ETag": response["ETag"]})
+        get_metrics().increment("s3_bytes", len(data))
+
+    def close(self) -> None:
+        """Upload the remaining bytes and complete the upload (a single PUT if it never reached one part)"""
+        if self.closed:
+            return
+        try:
+            client = get_s3_client()
+            if self._upload_id is None:
+                body = bytes(self._buffer)
+                self._with_retries("put", lambda: client.put_object(
+                    Bucket=self.bucket, Key=self.key, Body=body, ContentType=self.content_type))
+                get_metrics().increment("s3_bytes", len(body))
+            else:
+                if self._buffer:
+                    self._upload_part(bytes(self._buffer))
+                self._with_retries("complete", lambda: client.complete_multipart_upload(
+                    Bucket=self.bucket, Key=self.key, UploadId=self._upload_id,
+                    MultipartUpload={"Parts": self._parts}))
+            self._buffer = bytearray()
+        except Exception:
+            self.abort()
+            raise
+        finally:
+            super().close()
+
+    def abort(self) -> None:
+        """Discard the upload so no orphaned parts are billed"""
+        if self._upload_id is not None:
+            try:
+                get_s3_client().abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self._upload_id)
+            except Exception as e:
+                logger.warning(f"Could not abort multipart upload of {self.url}: {e}")
+            self._upload_id = None
+        self._buffer = bytearray()
+        if not self.closed:
+            super().close()
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+
+    def __del__(self) -> None:
+        # IOBase would close(), completing an upload of whatever was written; an unclosed writer is abandoned
+        if not self.closed:
+            self.abort()
+
+def encode_signature_crop(image: "Image.Image") -> bytes:
+    """Crop slightly higher bottom-right corner of cheque image and encode it as JPEG"""
+    # Convert to RGB if needed
+    if image.mode == 'RGBA':
+        image = image.convert('RGB')
+        
+    width, height = image.size
+    left = int(width * 0.75)
+    top = int(height * 0.57)
+    right = width
+    bottom = int(height * 0.92)
+    signature = image.crop((left, top, right, bottom))
+    
+    # Save to bytes instead of local file
+    img_byte_arr = BytesIO()
+    signature.save(img_byte_arr, format='JPEG')
+    return img_byte_arr.getvalue()
+
+def signature_s3_key(cheque_id: str) -> str:
+    """Unique S3 key for a cheque's signature crop"""
+    # Generate unique timestamp
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    return f"signatures/signature_{timestamp}_{cheque_id}.jpg"
+
+def crop_signature_area(image: "Image.Image", cheque_id: str) -> str:
+    """Crop slightly higher bottom-right corner of cheque image and upload to S3"""
+    return upload_to_s3(encode_signature_crop(image), signature_s3_key(cheque_id))
+
+# --- Background Uploads ---
+class BackgroundUploader:
+    """Upload objects to S3 on a worker pool behind a bounded queue, returning futures of their URLs"""
+
+    def __init__(self, bucket: str, max_workers: int = 4, max_queue: int = 32,
+                 multipart_threshold: int = 8 * 1024 * 1024, max_retries: int = 4,
+                 client_factory: Callable = get_s3_client):
+        self.bucket = bucket
+        self.max_retries = max_retries
+        self.multipart_threshold = multipart_threshold
+        self.client_factory = client_factory
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="s3-upload")
+        # Producers block once max_queue uploads are pending, so a slow S3 can't buffer unbounded image bytes
+        self._slots = threading.BoundedSemaphore(max_queue)
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.retries = 0
+        self.bytes_uploaded = 0
+
+    def submit(self, payload: Union[bytes, Callable[[], bytes]], s3_key: str,
+               content_type: str = 'image/jpeg') -> "Future[Optional[str]]":
+        """Queue an upload; payload may be bytes or a callable that encodes them on the upload thread"""
+        self._slots.acquire()
+        with self._lock:
+            self.pending += 1
+        try:
+            future = self._executor.submit(self._upload, payload, s3_key, content_type)
+        except Exception:
+            self._release()
+            raise
+        future.add_done_callback(lambda _: self._release())
+        return future
+
+    def _release(self) -> None:
+        with self._lock:
+            self.pending -= 1
+        self._slots.release()
+
+    def _upload(self, payload: Union[bytes, Callable[[], bytes]], s3_key: str, content_type: str) -> Optional[str]:
+        """Upload one object with retries, using multipart transfers above the threshold"""
+        metrics = get_metrics()
+        key_prefix = s3_key.split("/")[0]
+        try:
+            with metrics.span("upload_encode", key_prefix=key_prefix):
+                data = payload() if callable(payload) else payload
+        except Exception as e:
+            logger.error(f"Failed to encode {s3_key} for upload: {str(e)}")
+            with self._lock:
+                self.failed += 1
+            return None
+
+        for attempt in range(self.max_retries):
+            try:
+                client = self.client_factory()
+                with metrics.span("s3_put", key_prefix=key_prefix, bytes=len(data)):
+                    if len(data) >= self.multipart_threshold:
+                        from boto3.s3.transfer import TransferConfig
+
+                        client.upload_fileobj(
+                            BytesIO(data), self.bucket, s3_key,
+                            ExtraArgs={'ContentType': content_type},
+                            Config=TransferConfig(multipart_threshold=self.multipart_threshold,
+                                                  multipart_chunksize=self.multipart_threshold)
+                        )
+                    else:
+                        client.put_object(Bucket=self.bucket, Key=s3_key, Body=data, ContentType=content_type)
+                metrics.increment("s3_uploads", result="ok")
+                metrics.increment("s3_bytes", len(data))
+                with self._lock:
+                    self.completed += 1
+                    self.bytes_uploaded += len(data)
+                return f"s3://{self.bucket}/{s3_key}"
+            except Exception as e:
+                if attempt < self.max_retries - 1:
+                    with self._lock:
+                        self.retries += 1
+                    metrics.increment("s3_retries")
+                    with metrics.span("s3_backoff_sleep"):
+                        time.sleep(exponential_backoff_delay(attempt, base_delay=0.5, max_delay=10.0))
+                    continue
+                logger.error(f"Failed to upload to S3: {str(e)}")
+                metrics.increment("s3_uploads", result="failed")
+                with self._lock:
+                    self.failed += 1
+                return None
+
+    def stats(self) -> Dict:
+        """Queue depth and completion counters"""
+        with self._lock:
+            return {
+                "pending": self.pending,
+                "completed": self.completed,
+                "failed": self.failed,
+                "retries": self.retries,
+                "bytes_uploaded": self.bytes_uploaded
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop accepting uploads, optionally waiting for queued ones to finish"""
+        self._executor.shutdown(wait=wait)
+
+_uploader = None
+_uploader_lock = threading.Lock()
+
+def get_background_uploader() -> BackgroundUploader:
+    """Process-wide background uploader for document and signature images"""
+    global _uploader
+    with _uploader_lock:
+        if _uploader is None:
+            _uploader = BackgroundUploader(
+                S3_BUCKET_NAME,
+                max_workers=S3_UPLOAD_WORKERS,
+                max_queue=S3_UPLOAD_QUEUE_SIZE,
+                multipart_threshold=S3_MULTIPART_THRESHOLD_MB * 1024 * 1024
+            )
+    return _uploader
+
+def resolve_url(future: Optional["Future[Optional[str]]"], timeout: Optional[float] = None) -> Optional[str]:
+    """Return the URL of a background upload, waiting up to timeout seconds; None if missing or failed"""
+    if future is None:
+        return None
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        return None
@@ -0,0 +1,110 @@
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+_WHITESPACE = " \t\r\n"
+_LITERAL_END = ",}]" + _WHITESPACE
+
+class _Level:
+    """An object or array still being read, and the key its next value belongs to"""
+    __slots__ = ("container", "key", "prefix")
+
+    def __init__(self, container: Any, prefix: str):
+        self.container = container
+        self.key: Optional[str] = None
+        self.prefix = prefix
+
+# --- Incremental JSON ---
+class JsonFieldStream:
+    """Incremental parser of a JSON object streamed in chunks, reporting each scalar member once it is complete
+
+    feed() returns the (path, value) pairs a chunk completed, where path is the dotted key path, e.g.
+    "fields.bank". Text before the opening brace is skipped, as parse_json_response does. value holds the object
+    read so far, so a stream cut off early still yields every member already seen. Malformed input sets failed
+    and stops the parser instead of raising, leaving the full response to the regular parser.
+    """
+
+    def __init__(self):
+        self.value: Dict = {}
+        self.done = False
+        self.failed = False
+        self._levels: List[_Level] = []
+        # Raw characters of the string or literal being read, and whether it is a string
+        self._token: Optional[List[str]] = None
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        completed = []
+        for char in chunk:
+            if self.done or self.failed:
+                break
+            try:
+                self._read(char, completed)
+            except ValueError:
+                self.failed = True
+        return completed
+
+    def _read(self, char: str, completed: List[Tuple[str, Any]]) -> None:
+        if not self._levels:
+            if char == "{":
+                self._levels.append(_Level(self.value, ""))
+            return
+
+        if self._in_string:
+            self._token.append(char)
+            if self._escaped:
+                self._escaped = False
+            elif char == "\\":
+                self._escaped = True
+            elif char == '"':
+                self._in_string = False
+                text = json.loads("".join(self._token))
+                self._token = None
+                level = self._levels[-1]
+                if isinstance(level.container, dict) and level.key is None:
+                    level.key = text
+                else:
+                    self._add(text, completed)
+            return
+
+        if self._token is not None:
+            if char not in _LITERAL_END:
+                self._token.append(char)
+                return
+            # json.loads raises ValueError for anything that is not a number, true, false or null
+            literal = json.loads("".join(self._token))
+            self._token = None
+            self._add(literal, completed)
+
+        if char in _WHITESPACE or char == ":":
+            return
+        if char == '"':
+            self._token = [char]
+            self._in_string = True
+        elif char in "{[":
+            container = {} if char == "{" else []
+            prefix = self._add(container, completed)
+            self._levels.append(_Level(container, prefix + "."))
+        elif char in "}]":
+            self._levels.pop()
+            self.done = not self._levels
+        elif char == ",":
+            self._levels[-1].key = None
+        else:
+            self._token = [char]
+
+    def _add(self, value: Any, completed: List[Tuple[str, Any]]) -> str:
+        """Store a value in the innermost container, reporting it if scalar; returns its path"""
+        level = self._levels[-1]
+        if isinstance(level.container, dict):
+            if level.key is None:
+                raise ValueError("Value without a key")
+            path = level.prefix + level.key
+            level.container[level.key] = value
+            level.key = None
+        else:
+            path = level.prefix + str(len(level.container))
+            level.container.append(value)
+        if not isinstance(value, (dict, list)):
+            completed.append((path, value))
+        return path
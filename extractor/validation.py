@@ -0,0 +1,493 @@
+import math
+import re
+from datetime import datetime
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+
+from config.config import (
+    ACCOUNT_NUMBER_PATTERN, BANK_NAME_PATTERNS, BILL_NUMBER_PATTERN, DATE_PATTERN,
+    EMAIL_PATTERN, GST_NUMBER_PATTERN, IFSC_CODE_PATTERN, PHONE_PATTERN
+)
+from .ifsc import IfscIndex, bank_names_match, check_branch, get_ifsc_index
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+# --- Compiled Patterns ---
+# Compiled once at import; bank names are a single alternation instead of one search per pattern
+BANK_NAME_RE = re.compile("|".join(f"(?:{pattern})" for pattern in BANK_NAME_PATTERNS))
+ACCOUNT_NUMBER_RE = re.compile(ACCOUNT_NUMBER_PATTERN)
+IFSC_CODE_RE = re.compile(IFSC_CODE_PATTERN)
+DATE_RE = re.compile(DATE_PATTERN)
+BILL_NUMBER_RE = re.compile(BILL_NUMBER_PATTERN)
+GST_NUMBER_RE = re.compile(GST_NUMBER_PATTERN)
+PHONE_RE = re.compile(PHONE_PATTERN)
+EMAIL_RE = re.compile(EMAIL_PATTERN)
+PHONE_SEPARATORS_RE = re.compile(r'[\s\-\(\)]')
+# Plain decimal amounts such as "1500" or "1500.00" (clean_bill_result formats totals with two decimals)
+DECIMAL_RE = re.compile(r'\s*[+-]?(?:\d+(?:\.\d*)?|\.\d+)\s*')
+
+# Messages shared by the per-record and batch validators
+BANK_MESSAGE = "Bank name doesn't match known patterns"
+ACCOUNT_NUMBER_MESSAGE = "Account number format invalid (should be 9-18 digits)"
+IFSC_CODE_MESSAGE = "IFSC code format invalid (should be 11 alphanumeric characters)"
+INVALID_DATE_MESSAGE = "Invalid date (should be MM/DD/YYYY or DD/MM/YYYY and a valid date)"
+DATE_FORMAT_MESSAGE = "Date format invalid (should be MM/DD/YYYY or DD/MM/YYYY)"
+AMOUNT_NOT_POSITIVE_MESSAGE = "Amount should be positive"
+AMOUNT_NOT_NUMBER_MESSAGE = "Amount should be a valid number"
+VENDOR_NAME_MESSAGE = "Vendor name too short"
+BILL_NUMBER_MESSAGE = "Bill number format invalid (should be 5-20 alphanumeric characters)"
+GST_NUMBER_MESSAGE = "GST number format invalid"
+PHONE_MESSAGE = "Phone number format invalid"
+EMAIL_MESSAGE = "Email format invalid"
+
+def is_valid_date(date_str: str) -> bool:
+    """Check a DATE_PATTERN match is a real calendar date, read as MM/DD/YYYY when possible, else DD/MM/YYYY"""
+    try:
+        # Try to parse as MM/DD/YYYY first (common in bills), then DD/MM/YYYY
+        parts = date_str.split('/')
+        if len(parts) == 3:
+            month, day, year = map(int, parts)
+            # Check if it's a valid date in MM/DD/YYYY format
+            if month <= 12 and day <= 31:
+                datetime(year=year, month=month, day=day)
+            else:
+                # Try DD/MM/YYYY format
+                day, month, year = map(int, parts)
+                datetime(year=year, month=month, day=day)
+    except ValueError:
+        return False
+    return True
+
+def _validate_amount(amount, result: Dict) -> None:
+    """Fill a field's validation entry: the amount must be a finite number or plain decimal string above zero"""
+    if isinstance(amount, str) and DECIMAL_RE.fullmatch(amount):
+        number = float(amount)
+    # bool is an int, but true/false is not an amount
+    elif isinstance(amount, (int, float)) and not isinstance(amount, bool) and math.isfinite(amount):
+        number = amount
+    else:
+        result['valid'] = False
+        result['message'] = AMOUNT_NOT_NUMBER_MESSAGE
+        return
+    result['valid'] = number > 0
+    if not result['valid']:
+        result['message'] = AMOUNT_NOT_POSITIVE_MESSAGE
+
+# --- Cheque Validation ---
+def validate_cheque_data(data: Dict) -> Dict:
+    """Apply rule-based validation to extracted cheque data"""
+    validation_results = {
+        "bank": {"valid": False, "message": ""},
+        "account_number": {"valid": False, "message": ""},
+        "ifsc_code": {"valid": False, "message": ""},
+        "date": {"valid": False, "message": ""},
+        "amount": {"valid": False, "message": ""}
+    }
+    
+    # The IFSC reference entry, when an index is built, also vouches for banks outside BANK_NAME_PATTERNS
+    index = get_ifsc_index()
+    ifsc = str(data.get('ifsc_code', ''))
+    branch = index.lookup(ifsc) if index is not None and IFSC_CODE_RE.fullmatch(ifsc) else None
+
+    # Bank name validation
+    if data.get('bank', 'N/A') != 'N/A':
+        bank_name = str(data['bank']).upper()
+        validation_results['bank']['valid'] = bool(BANK_NAME_RE.search(bank_name)) or \
+            (branch is not None and bank_names_match(bank_name, branch.bank))
+        if not validation_results['bank']['valid']:
+            validation_results['bank']['message'] = BANK_MESSAGE
+    
+    # Account number validation
+    account_num = str(data.get('account_number', ''))
+    if account_num and account_num != 'N/A':
+        validation_results['account_number']['valid'] = bool(ACCOUNT_NUMBER_RE.fullmatch(account_num))
+        if not validation_results['account_number']['valid']:
+            validation_results['account_number']['message'] = ACCOUNT_NUMBER_MESSAGE
+    
+    # IFSC code validation
+    if ifsc and ifsc != 'N/A':
+        validation_results['ifsc_code']['valid'] = bool(IFSC_CODE_RE.fullmatch(ifsc))
+        if not validation_results['ifsc_code']['valid']:
+            validation_results['ifsc_code']['message'] = IFSC_CODE_MESSAGE
+        elif index is not None:
+            # Well-formed codes must also exist and belong to the bank named on the cheque
+            valid, message = check_branch(branch, data.get('bank'))
+            validation_results['ifsc_code'] = {"valid": valid, "message": message}
+    
+    # Date validation
+    date_str = str(data.get('date', ''))
+    if date_str and date_str != 'N/A':
+        validation_results['date']['valid'] = bool(DATE_RE.fullmatch(date_str))
+        if validation_results['date']['valid']:
+            if not is_valid_date(date_str):
+                validation_results['date']['valid'] = False
+                validation_results['date']['message'] = INVALID_DATE_MESSAGE
+        else:
+            validation_results['date']['message'] = DATE_FORMAT_MESSAGE
+    
+    # Amount validation
+    amount = data.get('amount', 'N/A')
+    if amount != 'N/A':
+        _validate_amount(amount, validation_results['amount'])
+    
+    return validation_results
+
+# --- Bill Validation ---
+def validate_bill_data(data: Dict) -> Dict:
+    """Apply rule-based validation to extracted bill data"""
+    validation_results = {
+        "vendor_name": {"valid": False, "message": ""},
+        "bill_number": {"valid": False, "message": ""},
+        "gst_number": {"valid": False, "message": ""},
+        "vendor_phone": {"valid": False, "message": ""},
+        "vendor_email": {"valid": False, "message": ""},
+        "date": {"valid": False, "message": ""},
+        "total_amount": {"valid": False, "message": ""}
+    }
+    
+    # Vendor name validation
+    if data.get('vendor_name', 'N/A') != 'N/A':
+        vendor_name = str(data['vendor_name']).strip()
+        validation_results['vendor_name']['valid'] = len(vendor_name) >= 2
+        if not validation_results['vendor_name']['valid']:
+            validation_results['vendor_name']['message'] = VENDOR_NAME_MESSAGE
+    
+    # Bill number validation
+    bill_num = str(data.get('bill_number', ''))
+    if bill_num and bill_num != 'N/A':
+        validation_results['bill_number']['valid'] = bool(BILL_NUMBER_RE.fullmatch(bill_num))
+        if not validation_results['bill_number']['valid']:
+            validation_results['bill_number']['message'] = BILL_NUMBER_MESSAGE
+    
+    # GST number validation
+    gst = str(data.get('gst_number', ''))
+    if gst and gst != 'N/A':
+        validation_results['gst_number']['valid'] = bool(GST_NUMBER_RE.fullmatch(gst))
+        if not validation_results['gst_number']['valid']:
+            validation_results['gst_number']['message'] = GST_NUMBER_MESSAGE
+    
+    # Phone validation
+    phone = str(data.get('vendor_phone', ''))
+    if phone and phone != 'N/A':
+        # Clean phone number for validation
+        cleaned_phone = PHONE_SEPARATORS_RE.sub('', phone)
+        validation_results['vendor_phone']['valid'] = bool(PHONE_RE.fullmatch(phone)) and len(cleaned_phone) >= 10
+        if not validation_results['vendor_phone']['valid']:
+            validation_results['vendor_phone']['message'] = PHONE_MESSAGE
+    
+    # Email validation
+    email = str(data.get('vendor_email', ''))
+    if email and email != 'N/A':
+        validation_results['vendor_email']['valid'] = bool(EMAIL_RE.fullmatch(email))
+        if not validation_results['vendor_email']['valid']:
+            validation_results['vendor_email']['message'] = EMAIL_MESSAGE
+    
+    # Date validation
+    date_str = str(data.get('date', ''))
+    if date_str and date_str != 'N/A':
+        validation_results['date']['valid'] = bool(DATE_RE.fullmatch(date_str))
+        if validation_results['date']['valid']:
+            if not is_valid_date(date_str):
+                validation_results['date']['valid'] = False
+                validation_results['date']['message'] = INVALID_DATE_MESSAGE
+        else:
+            validation_results['date']['message'] = DATE_FORMAT_MESSAGE
+    
+    # Amount validation
+    amount = data.get('total_amount', 'N/A')
+    if amount != 'N/A':
+        _validate_amount(amount, validation_results['total_amount'])
+    
+    return validation_results
+
+# --- Batch Validation ---
+# Columns checked per document type, in the order of the per-record validation results
+CHEQUE_FIELDS = ["bank", "account_number", "ifsc_code", "date", "amount"]
+BILL_FIELDS = ["vendor_name", "bill_number", "gst_number", "vendor_phone", "vendor_email", "date", "total_amount"]
+_DAYS_IN_MONTH = [0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+# Outcomes of the batch date check, mapped to messages at the end
+_DATE_OK, _DATE_BAD_FORMAT, _DATE_NOT_A_DATE = 0, 1, 2
+
+def _present(frame: "pd.DataFrame", column: str, allow_empty: bool = False) -> Tuple["pd.Series", "np.ndarray"]:
+    """Column as text plus a mask of rows to check; a missing column, NaN/None and 'N/A' count as absent"""
+    import numpy as np
+    import pandas as pd
+
+    if column not in frame:
+        return pd.Series("", index=frame.index, dtype=object), np.zeros(len(frame), dtype=bool)
+    values = frame[column]
+    present = values.notna()
+    if pd.api.types.is_float_dtype(values) and (values[present] % 1 == 0).all():
+        # Integers that pandas widened to float because of missing rows: render them as str(int) would
+        values = values.astype("Int64")
+    text = values.astype(str).where(present, "")
+    checked = present & (text != 'N/A')
+    if not allow_empty:
+        checked &= text != ""
+    return text, checked.to_numpy(dtype=bool)
+
+def _per_unique(text: "pd.Series", check: Callable[["pd.Series"], "np.ndarray"]) -> "np.ndarray":
+    """Run a vectorized check once per distinct value and broadcast it back to every row"""
+    import pandas as pd
+
+    # Exports repeat bank names, dates and amounts heavily, so this is usually far fewer values than rows
+    codes, uniques = pd.factorize(text)
+    return check(pd.Series(uniques, dtype=object).astype(str))[codes]
+
+def _fullmatch(values: "pd.Series", pattern: re.Pattern) -> "np.ndarray":
+    # The pattern string rather than the compiled object lets Arrow-backed strings match natively
+    return values.str.fullmatch(pattern.pattern).to_numpy(dtype=bool, na_value=False)
+
+def _result_columns(frame: "pd.DataFrame", field: str, valid: "np.ndarray", checked: "np.ndarray",
+                    message: str) -> Dict[str, "pd.Series"]:
+    """<field>_valid and <field>_message columns; checked rows that fail get the message"""
+    import numpy as np
+    import pandas as pd
+
+    return {
+        f"{field}_valid": pd.Series(valid, index=frame.index, dtype=bool),
+        f"{field}_message": pd.Series(np.where(checked & ~valid, message, ""), index=frame.index, dtype=object),
+    }
+
+def _check_pattern(frame: "pd.DataFrame", field: str, pattern: re.Pattern, message: str) -> Dict[str, "pd.Series"]:
+    """Full-match a text field; absent and 'N/A' values are invalid without a message"""
+    text, checked = _present(frame, field)
+    valid = checked & _per_unique(text, lambda values: _fullmatch(values, pattern))
+    return _result_columns(frame, field, valid, checked, message)
+
+def _date_outcomes(values: "pd.Series") -> "np.ndarray":
+    """Vectorized DATE_RE + is_valid_date over distinct date strings"""
+    import numpy as np
+
+    parts = values.str.extract(r'^(\d{1,2})/(\d{1,2})/(\d{4})$').fillna(0).astype(int)
+    well_formed = _fullmatch(values, DATE_RE)
+    first, second, year = parts[0].to_numpy(), parts[1].to_numpy(), parts[2].to_numpy()
+    # Month first when it reads as MM/DD, otherwise DD/MM, exactly as the per-record check decides
+    month_first = (first <= 12) & (second <= 31)
+    month = np.where(month_first, first, second)
+    day = np.where(month_first, second, first)
+    leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    month_days = np.asarray(_DAYS_IN_MONTH)[np.clip(month, 0, 12)] + ((month == 2) & leap)
+    calendar_ok = (year >= 1) & (month >= 1) & (month <= 12) & (day >= 1) & (day <= month_days)
+    return np.where(~well_formed, _DATE_BAD_FORMAT, np.where(calendar_ok, _DATE_OK, _DATE_NOT_A_DATE))
+
+def _check_date(frame: "pd.DataFrame") -> Dict[str, "pd.Series"]:
+    import numpy as np
+    import pandas as pd
+
+    text, checked = _present(frame, "date")
+    outcome = np.where(checked, _per_unique(text, _date_outcomes), _DATE_OK)
+    return {
+        "date_valid": pd.Series(checked & (outcome == _DATE_OK), index=frame.index, dtype=bool),
+        "date_message": pd.Series(np.select([outcome == _DATE_BAD_FORMAT, outcome == _DATE_NOT_A_DATE],
+                                            [DATE_FORMAT_MESSAGE, INVALID_DATE_MESSAGE], ""),
+                                  index=frame.index, dtype=object),
+    }
+
+def _decimal_outcomes(values: "pd.Series") -> "np.ndarray":
+    """1 for a positive decimal string, 0 for zero or negative, -1 for anything that is not a plain decimal"""
+    import numpy as np
+    import pandas as pd
+
+    parsed = _fullmatch(values, DECIMAL_RE)
+    numbers = pd.to_numeric(values.where(parsed, "0").str.strip(), errors='coerce').to_numpy(dtype=float, na_value=0.0)
+    return np.where(parsed, np.where(numbers > 0, 1, 0), -1)
+
+def _check_amount(frame: "pd.DataFrame", field: str) -> Dict[str, "pd.Series"]:
+    """Vectorized _validate_amount for string and numeric columns alike"""
+    import numpy as np
+    import pandas as pd
+
+    if field not in frame:
+        return _result_columns(frame, field, np.zeros(len(frame), dtype=bool), np.zeros(len(frame), dtype=bool), "")
+    values = frame[field]
+    checked = (values.notna() & (values != 'N/A')).to_numpy(dtype=bool)
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        is_text = np.zeros(len(values), dtype=bool)
+        is_number = np.ones(len(values), dtype=bool)
+    else:
+        is_text = values.map(lambda value: isinstance(value, str)).to_numpy(dtype=bool)
+        # Booleans would convert to 1 and 0, but true/false is not an amount
+        is_bool = values.map(lambda value: isinstance(value, (bool, np.bool_))).to_numpy(dtype=bool)
+        is_number = ~is_text & ~is_bool
+    outcome = np.full(len(values), -1)
+    if is_text.any():
+        outcome[is_text] = _per_unique(values[is_text], _decimal_outcomes)
+    if is_number.any():
+        numbers = pd.to_numeric(values[is_number], errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+        outcome[is_number] = np.where(np.isfinite(numbers), np.where(np.nan_to_num(numbers) > 0, 1, 0), -1)
+    outcome = np.where(checked, outcome, 0)
+    return {
+        f"{field}_valid": pd.Series(outcome == 1, index=frame.index, dtype=bool),
+        f"{field}_message": pd.Series(np.select([checked & (outcome == -1), checked & (outcome == 0)],
+                                                [AMOUNT_NOT_NUMBER_MESSAGE, AMOUNT_NOT_POSITIVE_MESSAGE], ""),
+                                      index=frame.index, dtype=object),
+    }
+
+def _with_accuracy(columns: Dict[str, "pd.Series"], fields: List[str]) -> "pd.DataFrame":
+    import pandas as pd
+
+    result = pd.DataFrame(columns)
+    # Same score as calculate_automated_accuracy: the share of checked fields that passed
+    result["rule_based_accuracy"] = result[[f"{field}_valid" for field in fields]].mean(axis=1) * 100
+    return result
+
+def _ifsc_reference(index: "IfscIndex", ifsc: "pd.Series", bank: "pd.Series",
+                    well_formed: "np.ndarray") -> Tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+    """Per row: whether the bank matches the IFSC's listed bank, and the IFSC reference check's valid/message"""
+    import numpy as np
+    import pandas as pd
+
+    codes, pairs = pd.factorize(ifsc.where(well_formed, "") + "\x1f" + bank)
+    branches = index.lookup_many(ifsc[well_formed].unique())
+    bank_match, valid, messages = [], [], []
+    for pair in pairs:
+        code, bank_name = pair.split("\x1f", 1)
+        branch = branches.get(code)
+        bank_match.append(branch is not None and bank_names_match(bank_name, branch.bank))
+        pair_valid, message = check_branch(branch, bank_name)
+        valid.append(pair_valid)
+        messages.append(message)
+    return np.asarray(bank_match, dtype=bool)[codes], np.asarray(valid, dtype=bool)[codes], \
+        np.asarray(messages, dtype=object)[codes]
+
+def validate_cheque_frame(frame: "pd.DataFrame") -> "pd.DataFrame":
+    """Rule-based validation of a batch of cheque records (one per row) with the same rules as validate_cheque_data"""
+    import numpy as np
+    import pandas as pd
+
+    # Unlike the other text fields, an empty bank name is checked (and fails) rather than skipped
+    bank, bank_checked = _present(frame, "bank", allow_empty=True)
+    bank_valid = bank_checked & _per_unique(
+        bank, lambda values: values.str.upper().str.contains(BANK_NAME_RE.pattern).to_numpy(dtype=bool, na_value=False))
+    ifsc, ifsc_checked = _present(frame, "ifsc_code")
+    ifsc_valid = ifsc_checked & _per_unique(ifsc, lambda values: _fullmatch(values, IFSC_CODE_RE))
+    ifsc_messages = np.where(ifsc_checked & ~ifsc_valid, IFSC_CODE_MESSAGE, "").astype(object)
+
+    index = get_ifsc_index()
+    if index is not None:
+        # Same reference checks as validate_cheque_data, run once per distinct (IFSC, bank) pair
+        bank_match, reference_valid, reference_messages = _ifsc_reference(index, ifsc, bank, ifsc_valid)
+        bank_valid |= bank_checked & ifsc_valid & bank_match
+        ifsc_messages = np.where(ifsc_valid, reference_messages, ifsc_messages)
+        ifsc_valid &= reference_valid
+
+    columns = _result_columns(frame, "bank", bank_valid, bank_checked, BANK_MESSAGE)
+    columns.update(_check_pattern(frame, "account_number", ACCOUNT_NUMBER_RE, ACCOUNT_NUMBER_MESSAGE))
+    columns.update({"ifsc_code_valid": pd.Series(ifsc_valid, index=frame.index, dtype=bool),
+                    "ifsc_code_message": pd.Series(ifsc_messages, index=frame.index, dtype=object)})
+    columns.update(_check_date(frame))
+    columns.update(_check_amount(frame, "amount"))
+    return _with_accuracy(columns, CHEQUE_FIELDS)
+
+def _phone_valid(values: "pd.Series") -> "np.ndarray":
+    cleaned_length = values.str.replace(PHONE_SEPARATORS_RE.pattern, '', regex=True).str.len().to_numpy()
+    return _fullmatch(values, PHONE_RE) & (cleaned_length >= 10)
+
+def validate_bill_frame(frame: "pd.DataFrame") -> "pd.DataFrame":
+    """Rule-based validation of a batch of bill records (one per row) with the same rules as validate_bill_data"""
+    text, checked = _present(frame, "vendor_name", allow_empty=True)
+    vendor_valid = checked & _per_unique(text, lambda values: (values.str.strip().str.len() >= 2).to_numpy(dtype=bool))
+    columns = _result_columns(frame, "vendor_name", vendor_valid, checked, VENDOR_NAME_MESSAGE)
+    columns.update(_check_pattern(frame, "bill_number", BILL_NUMBER_RE, BILL_NUMBER_MESSAGE))
+    columns.update(_check_pattern(frame, "gst_number", GST_NUMBER_RE, GST_NUMBER_MESSAGE))
+    text, checked = _present(frame, "vendor_phone")
+    columns.update(_result_columns(frame, "vendor_phone", checked & _per_unique(text, _phone_valid), checked,
+                                   PHONE_MESSAGE))
+    columns.update(_check_pattern(frame, "vendor_email", EMAIL_RE, EMAIL_MESSAGE))
+    columns.update(_check_date(frame))
+    columns.update(_check_amount(frame, "total_amount"))
+    return _with_accuracy(columns, BILL_FIELDS)
+
+def validate_frame(frame: "pd.DataFrame", doc_type: str) -> "pd.DataFrame":
+    """Validate a batch of records of one document type into <field>_valid, <field>_message and accuracy columns"""
+    if doc_type == "cheque":
+        return validate_cheque_frame(frame)
+    if doc_type == "bill":
+        return validate_bill_frame(frame)
+    raise ValueError(f"Unknown document type: {doc_type}")
+
+# --- Accuracy Scoring ---
+# Fields each document type's extraction returns, compared field by field when a second model re-extracts it
+EXTRACTED_FIELDS = {
+    "cheque": ["bank", "account_holder", "account_number", "amount", "ifsc_code", "date", "has_signature"],
+    "bill": ["vendor_name", "bill_number", "date", "total_amount", "tax_amount", "gst_number", "vendor_phone",
+             "vendor_email", "customer_name", "payment_method", "currency"],
+}
+AMOUNT_FIELDS = ("amount", "total_amount", "tax_amount")
+DIGIT_FIELDS = ("account_number", "vendor_phone")
+
+def _comparable(field: str, value) -> str:
+    """Canonical text of a field value, so formatting differences between models don't count as disagreement"""
+    if value is None or str(value).strip().upper() in ("", "N/A", "NONE", "NULL"):
+        return "N/A"
+    if isinstance(value, bool) or field == "has_signature":
+        return "TRUE" if str(value).strip().lower() in ("true", "yes", "1") else "FALSE"
+    text = str(value).strip().upper()
+    if field in AMOUNT_FIELDS:
+        number = re.sub(r'[^\d.]', '', text)
+        try:
+            return f"{float(number):.2f}"
+        except ValueError:
+            return text
+    if field in DIGIT_FIELDS:
+        return re.sub(r'\D', '', text)
+    if field == "date":
+        parts = re.split(r'[/\-.\s]+', text)
+        return "/".join(part.zfill(2) for part in parts)
+    return " ".join(text.replace(".", " ").replace(",", " ").split())
+
+def cross_validate_results(claude_result: Dict, sonnet_result: Dict) -> Tuple[Dict, float]:
+    """Compare a Haiku and a Sonnet extraction field by field; returns the disagreements and the agreement in %"""
+    if not claude_result or not sonnet_result:
+        return {}, 0.0
+
+    doc_type = "cheque" if "account_number" in claude_result or "account_number" in sonnet_result else "bill"
+    discrepancies = {}
+    compared = 0
+    for field in EXTRACTED_FIELDS[doc_type]:
+        if field not in claude_result and field not in sonnet_result:
+            continue
+        compared += 1
+        haiku_value, sonnet_value = claude_result.get(field, "N/A"), sonnet_result.get(field, "N/A")
+        if _comparable(field, haiku_value) != _comparable(field, sonnet_value):
+            discrepancies[field] = {"haiku": haiku_value, "sonnet": sonnet_value}
+
+    agreement = (compared - len(discrepancies)) / compared * 100 if compared else 0.0
+    return discrepancies, agreement
+
+def reconcile_results(claude_result: Dict, sonnet_result: Dict, doc_type: str) -> Tuple[Dict, Dict]:
+    """Merge a Haiku and a Sonnet extraction of one document into a single result and its verification record
+
+    Fields the models agree on stand. On a disagreement the value that passes its rule-based check is kept;
+    when both pass, or the field has no rule, Sonnet's is kept, and when neither passes Haiku's stays. The record
+    lists each disagreement and which model's value was kept.
+    """
+    discrepancies, agreement = cross_validate_results(claude_result, sonnet_result)
+    validate = validate_cheque_data if doc_type == "cheque" else validate_bill_data
+    sonnet_checks = validate(sonnet_result)
+
+    merged = dict(claude_result)
+    for field, values in discrepancies.items():
+        # Fields without a rule go to Sonnet; otherwise only a Sonnet value that passes the rule replaces Haiku's
+        keep_haiku = field in sonnet_checks and not sonnet_checks[field]["valid"]
+        values["kept"] = "haiku" if keep_haiku else "sonnet"
+        if not keep_haiku:
+            merged[field] = sonnet_result.get(field, "N/A")
+    return merged, {"agreement": round(agreement, 1), "discrepancies": discrepancies}
+
+def calculate_automated_accuracy(claude_result: Dict, verification: Optional[Dict], validation_results: Dict) -> float:
+    """Share of rule-based checks passed, averaged with the two models' agreement for cross-verified documents"""
+    if not claude_result:
+        return 0.0
+    
+    rule_based_score = 0
+    if validation_results:
+        valid_fields = sum(1 for field in validation_results.values() if field['valid'])
+        total_fields = len(validation_results)
+        rule_based_score = (valid_fields / total_fields) * 100 if total_fields > 0 else 0
+    
+    if verification:
+        return (rule_based_score + verification["agreement"]) / 2
+    return rule_based_score
@@ -0,0 +1,220 @@
+import argparse
+import base64
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import threading
+from io import BytesIO
+from itertools import chain
+from typing import Dict, List, Optional, Set
+
+from config.config import (
+    JOB_LEASE_SECONDS, JOB_POLL_SECONDS, JOB_RETENTION_HOURS, JOB_WORKER_PROCESSES, PIPELINE_WORKERS
+)
+from .document import PreparedDocument, encode_archive_jpeg, orient_image
+from .ingest import DocumentDecodeError, DocumentPage, iter_page_outcomes
+from .jobs import Job, JobQueue, get_job_queue
+from .metrics import get_metrics
+from .pipeline import DocumentPipeline
+from .processing import analyze_document
+from .rate_limiter import is_throttling_error, is_transient_error
+from .results import make_thumbnail
+from .storage import encode_signature_crop, get_background_uploader, resolve_url, signature_s3_key
+
+logger = logging.getLogger(__name__)
+
+# --- Job Processing ---
+def process_page(page: DocumentPage, doc_id: str) -> Dict:
+    """Detect, extract and validate one page and archive it to S3, returning a JSON-ready outcome"""
+    doc = PreparedDocument(page.image, name=page.label)
+    outcome = analyze_document(doc)
+    if "error" in outcome:
+        return outcome
+
+    doc_type = outcome["doc_type"]
+    id_field = "account_number" if doc_type == "cheque" else "bill_number"
+    doc_id = f"{doc_id}_{outcome['result'].get(id_field, 'unknown')}"
+    uploader = get_background_uploader()
+    document_url = uploader.submit(lambda: encode_archive_jpeg(doc.image), f"processed/{doc_type}_{doc_id}.jpg")
+    signature_url = None
+    if doc_type == "cheque":
+        signature_url = uploader.submit(lambda: encode_signature_crop(doc.image), signature_s3_key(doc_id))
+    # The outcome outlives this process, so it records where the uploads landed rather than futures
+    return {**outcome, "s3_urls": {"document": resolve_url(document_url), "signature": resolve_url(signature_url)}}
+
+def process_job(queue: JobQueue, job: Job, threads: int = PIPELINE_WORKERS) -> Dict:
+    """Process a spooled upload: one outcome for an image, or {"pages": [...]} for a multi-page PDF or TIFF
+
+    A page that cannot be decoded gets an {"error": ...} entry of its own; DocumentDecodeError is raised only
+    when the file cannot be read at all.
+    """
+    pages = iter_page_outcomes(BytesIO(queue.read_input(job.id)), name=job.name)
+    first = next(pages, None)
+    if first is None:
+        raise DocumentDecodeError(f"{job.name} has no pages")
+    if first[1] == 1:
+        return process_page(first[2], f"job{job.seq}")
+
+    # Pages of one scan run concurrently, decoded one at a time as the pipeline takes them
+    def run_page(index: int, page: DocumentPage) -> Dict:
+        if isinstance(page, Exception):
+            raise page
+        outcome = process_page(page, f"job{job.seq}p{page.page}")
+        # The UI cannot cheaply re-render a page, so its preview travels with the outcome
+        thumbnail = base64.b64encode(make_thumbnail(orient_image(page.image))).decode('ascii')
+        return {**outcome, "thumbnail": thumbnail}
+
+    outcomes = []
+    pipeline = DocumentPipeline(run_page, max_workers=threads)
+    labelled = ((f"{job.name} (page {number}/{total})", page) for number, total, page in chain([first], pages))
+    for result in pipeline.run(labelled):
+        outcome = result.value if result.error is None else {"error": result.error}
+        outcomes.append({**outcome, "label": result.name, "page": result.index + 1})
+    return {"pages": outcomes}
+
+# --- Workers ---
+class JobWorker:
+    """Claims jobs from the queue on a pool of threads in this process and keeps their leases alive"""
+
+    def __init__(self, queue: JobQueue, threads: int = PIPELINE_WORKERS, poll_seconds: float = JOB_POLL_SECONDS,
+                 worker_id: Optional[str] = None):
+        self.queue = queue
+        self.threads = max(1, int(threads))
+        self.poll_seconds = poll_seconds
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self._in_flight: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def run(self, stop: threading.Event) -> None:
+        """Process jobs until stop is set, then let the documents in flight finish"""
+        threads = [threading.Thread(target=self._loop, args=(stop,), name=f"job-worker-{i}", daemon=True)
+                   for i in range(self.threads)]
+        for thread in threads:
+            thread.start()
+        # Renew leases well before they run out, and drop old finished jobs now and then
+        interval = max(1.0, self.queue.lease_seconds / 3)
+        beats = 0
+        while not stop.wait(interval):
+            with self._lock:
+                in_flight = list(self._in_flight)
+            self.queue.heartbeat(in_flight, self.worker_id)
+            beats += 1
+            if beats % max(1, int(3600 / interval)) == 0:
+                self.queue.purge(JOB_RETENTION_HOURS * 3600)
+        for thread in threads:
+            thread.join()
+
+    def _loop(self, stop: threading.Event) -> None:
+        while not stop.is_set():
+            try:
+                job = self.queue.claim(self.worker_id)
+            except Exception as e:
+                logger.error(f"Could not claim a job: {e}")
+                job = None
+            if job is None:
+                stop.wait(self.poll_seconds)
+                continue
+            self.run_job(job)
+
+    def run_job(self, job: Job) -> None:
+        """Process one claimed job and record its outcome, re-queueing it on unexpected errors"""
+        metrics = get_metrics()
+        with self._lock:
+            self._in_flight.add(job.id)
+        try:
+            with metrics.document(job.name), metrics.span("document"):
+                outcome = process_job(self.queue, job)
+            self.queue.finish(job.id, self.worker_id, outcome=outcome)
+            metrics.increment("jobs", result="done")
+        except Exception as e:
+            # An unreadable file or a bug fails the same way every time, so only transient errors are re-queued;
+            # model outputs already obtained are in the extraction cache, so a retry doesn't pay for them again
+            retry = not isinstance(e, DocumentDecodeError) and (is_transient_error(e) or is_throttling_error(e))
+            logger.warning(f"Job {job.id} ({job.name}) failed on attempt {job.attempts}: {e}")
+            self.queue.finish(job.id, self.worker_id, error=str(e), retry=retry)
+            metrics.increment("jobs", result="error")
+        finally:
+            with self._lock:
+                self._in_flight.discard(job.id)
+
+def _worker_process(threads: int, stop, log_level: str) -> None:
+    """Entry point of a worker process; the parent signals shutdown through the stop event"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    logging.basicConfig(level=log_level, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    JobWorker(get_job_queue(), threads=threads).run(stop)
+
+class WorkerPool:
+    """Worker processes, each running a multi-threaded JobWorker against the shared queue"""
+
+    def __init__(self, processes: int = JOB_WORKER_PROCESSES, threads: int = PIPELINE_WORKERS,
+                 log_level: str = "INFO"):
+        self.processes = max(1, int(processes))
+        self.threads = threads
+        self.log_level = log_level.upper()
+        # Spawned, not forked, so no process inherits another's SQLite connections or boto3 clients
+        self._context = multiprocessing.get_context("spawn")
+        self._stop = self._context.Event()
+        self._children: List[multiprocessing.Process] = []
+
+    def start(self) -> "WorkerPool":
+        for i in range(self.processes):
+            child = self._context.Process(target=_worker_process, args=(self.threads, self._stop, self.log_level),
+                                          name=f"extractor-worker-{i}", daemon=True)
+            child.start()
+            self._children.append(child)
+        return self
+
+    def alive(self) -> int:
+        return sum(1 for child in self._children if child.is_alive())
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Ask the workers to finish the documents they hold and exit"""
+        self._stop.set()
+        for child in self._children:
+            child.join(timeout)
+
+_embedded_pool = None
+_embedded_pool_lock = threading.Lock()
+
+def start_embedded_workers(processes: int) -> WorkerPool:
+    """Worker processes owned by this (UI) process, started once and kept across script reruns"""
+    global _embedded_pool
+    with _embedded_pool_lock:
+        if _embedded_pool is None or not _embedded_pool.alive():
+            _embedded_pool = WorkerPool(processes).start()
+    return _embedded_pool
+
+# --- Entry Point ---
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run worker processes against the job queue until interrupted"""
+    parser = argparse.ArgumentParser(
+        prog="python -m extractor.worker",
+        description="Process documents queued by the Streamlit UI (PROCESSING_BACKEND=queue)"
+    )
+    parser.add_argument("-p", "--processes", type=int, default=JOB_WORKER_PROCESSES, help="Worker processes")
+    parser.add_argument("-t", "--threads", type=int, default=PIPELINE_WORKERS,
+                        help="Concurrent documents per worker process")
+    parser.add_argument("--log-level", default="INFO", help="Logging level")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    pool = WorkerPool(args.processes, args.threads, args.log_level).start()
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopping.set())
+    logger.info(f"Started {args.processes} worker processes x {args.threads} threads on {get_job_queue().path}")
+    try:
+        while not stopping.wait(JOB_LEASE_SECONDS / 3):
+            stats = get_job_queue().stats()
+            logger.info(f"Queue: {stats['queued']} queued, {stats['running']} running, {stats['done']} done, "
+                        f"{stats['failed']} failed")
+    except KeyboardInterrupt:
+        pass
+    logger.info("Stopping; documents in flight are finished first")
+    pool.stop()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,23 +5,26 @@
 #     run_app()
 import streamlit as st  
 from PIL import Image  
-import os  
-import json  
+import base64
+import logging
 import pandas as pd  
-import boto3  
-import base64  
-from dotenv import load_dotenv  
-from io import BytesIO  
-from typing import Dict, List, Tuple
-import re
+from typing import Dict, Optional
 from datetime import datetime
+import threading
 import time
-import random
+import uuid
+from concurrent.futures import Future
+from io import BytesIO
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from config.config import CSS_STYLES, JOB_EMBEDDED_WORKERS, JOB_POLL_SECONDS, PIPELINE_WORKERS, PROCESSING_BACKEND
+from extractor import (
+    DocumentPipeline, IncrementalReport, PreparedDocument, ResultStore, analyze_document, calculate_automated_accuracy,
+    connection_pool_stats, encode_archive_jpeg, encode_signature_crop, get_background_uploader, get_extraction_cache,
+    get_job_queue, get_metrics, get_rate_limiter, iter_pages, load_image, make_thumbnail, orient_image, page_count,
+    preclassifier_report, resolve_url, signature_s3_key, start_embedded_workers, upload_excel_to_s3
+)
 # import google.generativeai as genai
 
-# Load environment variables  
-load_dotenv()  
-
 # --- App Setup ---  
 st.set_page_config(  
     page_title="ChequeAI - Document Extractor",  
@@ -36,709 +39,70 @@ with col2:
     st.image(logo, width=600)  
 
 # Custom CSS   
-st.markdown("""  
-<style>  
-.header { font-size: 2.5em; color: #2e86c1; text-align: center; padding: 20px; border-bottom: 2px solid #3498db; margin-bottom: 30px; }  
-.upload-box { border: 2px dashed #3498db; border-radius: 5px; padding: 20px; text-align: center; }  
-.result-box { margin-top: 20px; padding: 20px; border: 1px solid #3498db; border-radius: 5px; background-color: #f8f9fa; }  
-.clear-btn { margin-top: 20px; }  
-.data-table { width: 100%; margin-top: 20px; }  
-.cheque-container { margin-bottom: 30px; padding: 15px; border: 1px solid #eee; border-radius: 5px; }  
-.bill-container { margin-bottom: 30px; padding: 15px; border: 1px solid #f39c12; border-radius: 5px; }  
-.stButton>button, .stDownloadButton>button { background-color: #2e86c1 !important; color: white !important; border: none !important; width: 100%; margin: 5px 0 !important; transition: background-color 0.3s; }  
-.stButton>button:hover, .stDownloadButton>button:hover { background-color: #2874a6 !important; }  
-.stButton, .stDownloadButton { display: flex; justify-content: center; }  
-.accuracy-meter { margin-bottom: 20px; }  
-.accuracy-value { font-weight: bold; color: #2e86c1; }  
-.discrepancy { color: #e74c3c; font-weight: bold; }  
-.validation-pass { color: #27ae60; font-weight: bold; }  
-.document-type-badge { padding: 5px 10px; border-radius: 15px; color: white; font-weight: bold; margin-bottom: 10px; }
-.cheque-badge { background-color: #2e86c1; }
-.bill-badge { background-color: #f39c12; }
-</style>  
-""", unsafe_allow_html=True)  
-
-# --- Initialize Clients ---  
-bedrock = boto3.client(  
-    service_name='bedrock-runtime',  
-    region_name=os.getenv("AWS_REGION"),  
-    aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),  
-    aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY")  
-)
-
-# --- Initialize S3 Client ---
-s3 = boto3.client(
-    's3',
-    region_name=os.getenv("AWS_REGION"),
-    aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
-    aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY")
-)
-S3_BUCKET_NAME = os.getenv("S3_BUCKET_NAME")
-
-# --- Validation Rules ---
-BANK_NAME_PATTERNS = [
-    r'STATE BANK OF INDIA', r'SBI', r'HDFC BANK', r'ICICI BANK', 
-    r'AXIS BANK', r'PUNJAB NATIONAL BANK', r'PNB', r'CANARA BANK',
-    r'BANK OF BARODA', r'BOB', r'UNION BANK OF INDIA'
-]
-
-IFSC_CODE_PATTERN = r'^[A-Z]{4}0[A-Z0-9]{6}$'
-ACCOUNT_NUMBER_PATTERN = r'^\d{9,18}$'
-DATE_PATTERN = r'^\d{1,2}/\d{1,2}/\d{4}$'
-
-# --- Bill Validation Patterns ---
-BILL_NUMBER_PATTERN = r'^[A-Z0-9\-/]{5,20}$'
-GST_NUMBER_PATTERN = r'^[0-9]{2}[A-Z]{5}[0-9]{4}[A-Z]{1}[1-9A-Z]{1}Z[0-9A-Z]{1}$'
-PHONE_PATTERN = r'^[\+]?[0-9\s\-\(\)]{10,15}$'
-EMAIL_PATTERN = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-
-# --- Currency Detection Patterns ---
-INDIAN_PHONE_PATTERNS = [
-    r'^0\d{2,4}-\d{6,8}$',  # Landline format like 0381-2325984
-    r'^\+91[\s\-]?\d{10}$',  # Mobile with +91
-    r'^91\d{10}$',  # Mobile with 91
-    r'^[6-9]\d{9}$'  # Indian mobile numbers
-]
-
-US_PHONE_PATTERNS = [
-    r'^\+1[\s\-]?\d{10}$',  # US format with +1
-    r'^1[\s\-]?\d{10}$',   # US format with 1
-    r'^\(\d{3}\)\s?\d{3}-\d{4}$',  # (555) 123-4567
-    r'^\d{3}-\d{3}-\d{4}$'  # 555-123-4567
-]
-
-# --- Retry Logic Helper Functions ---
-def exponential_backoff_delay(attempt: int, base_delay: float = 3.0, max_delay: float = 120.0) -> float:
-    """Calculate exponential backoff delay with jitter - more aggressive for rate limiting"""
-    delay = min(base_delay * (2 ** attempt), max_delay)
-    # Add jitter to avoid thundering herd problem
-    jitter = random.uniform(0.1, 0.3) * delay
-    return delay + jitter
-
-def invoke_model_with_retry(model_id: str, body: Dict, max_retries: int = 5) -> Dict:
-    """Invoke Bedrock model with exponential backoff retry logic"""
-    for attempt in range(max_retries):
-        try:
-            response = bedrock.invoke_model(
-                modelId=model_id,
-                body=json.dumps(body)
-            )
-            return json.loads(response['body'].read())
-        except Exception as e:
-            error_str = str(e).lower()
-            
-            # Check if it's a throttling exception
-            if "throttling" in error_str or "too many requests" in error_str or "rate exceeded" in error_str:
-                if attempt < max_retries - 1:  # Don't wait on the last attempt
-                    delay = exponential_backoff_delay(attempt)
-                    st.warning(f"⏳ Rate limit reached. Waiting {delay:.1f} seconds before retry {attempt + 1}/{max_retries}...")
-                    time.sleep(delay)
-                    continue
-                else:
-                    raise Exception(f"Max retries reached due to rate limiting: {str(e)}")
-            else:
-                # For non-throttling errors, re-raise immediately
-                raise e
-    
-    raise Exception("Max retries exceeded")
-
-# --- Core Functions ---
-def extract_cheque_data(image: Image) -> Dict:
-    """Send cheque image to Claude 3 Haiku and parse response"""
-    try:
-        # Convert image to RGB if it's RGBA
-        if image.mode == 'RGBA':
-            image = image.convert('RGB')
-            
-        img_byte_arr = BytesIO()  
-        image.save(img_byte_arr, format='JPEG', quality=70)  
-        
-        if img_byte_arr.tell() > 5 * 1024 * 1024:  
-            st.warning("Image too large, applying aggressive compression")  
-            img_byte_arr = BytesIO()  
-            image.save(img_byte_arr, format='JPEG', quality=30)  
-        
-        encoded_image = base64.b64encode(img_byte_arr.getvalue()).decode('utf-8') 
-        
-        # First check if this is a valid cheque image
-        validation_prompt = """
-        Is this image a bank cheque/check? Respond with just 'yes' or 'no'.
-        Look for key cheque elements: bank name, payee line, date field, amount box, 
-        signature line, account details, etc. If multiple of these elements are missing,
-        it's likely not a valid cheque image.
-        """
-        
-        validation_body = {  
-            "anthropic_version": "bedrock-2023-05-31",  
-            "max_tokens": 10,  
-            "temperature": 0.1,  
-            "messages": [  
-                {  
-                    "role": "user",  
-                    "content": [  
-                        {"type": "text", "text": validation_prompt},  
-                        {  
-                            "type": "image",  
-                            "source": {  
-                                "type": "base64",  
-                                "media_type": "image/jpeg",  
-                                "data": encoded_image  
-                            }  
-                        }  
-                    ]  
-                }  
-            ]  
-        }  
-        
-        validation_response = invoke_model_with_retry("anthropic.claude-3-haiku-20240307-v1:0", validation_body)  
-        
-        validation_text = validation_response['content'][0]['text'].strip().lower()
-        
-        if "no" in validation_text:
-            return {"error": "Invalid cheque image. Please upload a valid bank cheque."}
-        
-        prompt = """  
-        Analyze this cheque image and extract the following details in EXACTLY this JSON format:  
-        {  
-            "bank": "Bank Name",  
-            "account_holder": "Account Holder Name",  
-            "account_number": "Account Number",  
-            "amount": "Amount in numbers (digits only, no symbols, e.g., 3300000)",  
-            "ifsc_code": "IFSC Code",  
-            "date": "DD/MM/YYYY",  
-            "has_signature": true/false  
-        }  
-
-        CRITICAL INSTRUCTIONS FOR AMOUNT EXTRACTION:  
-        1. Locate both the numerical amount (digits) and written amount (words)  
-        2. If numerical amount is present and clear, use that  
-        3. If numerical amount is unclear, convert the written amount to digits:  
-            - "Thirty Three Lakhs" → 3300000  
-            - "Thirty Three Thousand" → 33000  
-        4. Amount must be digits only (no ₹, Rs, commas, or spaces)  
-        5. If amount cannot be determined, use "N/A"  
-
-        IMPORTANT:  
-        1. Return ONLY the JSON object  
-        2. Do not include any additional text or explanations  
-        3. All amounts must be in complete rupees (no paise)  
-        """  
-        
-        body = {  
-            "anthropic_version": "bedrock-2023-05-31",  
-            "max_tokens": 1000,  
-            "temperature": 0.1,  
-            "messages": [  
-                {  
-                    "role": "user",  
-                    "content": [  
-                        {"type": "text", "text": prompt},  
-                        {  
-                            "type": "image",  
-                            "source": {  
-                                "type": "base64",  
-                                "media_type": "image/jpeg",  
-                                "data": encoded_image  
-                            }  
-                        }  
-                    ]  
-                }  
-            ]  
-        }  
-        
-        response = invoke_model_with_retry("anthropic.claude-3-haiku-20240307-v1:0", body)  
-        
-        response_text = response['content'][0]['text'].strip()  
-        
-        start_idx = response_text.find('{')  
-        end_idx = response_text.rfind('}') + 1  
-        if start_idx == -1 or end_idx == 0:  
-            raise ValueError("No JSON object found in response")  
-            
-        response_text = response_text[start_idx:end_idx]  
-        result = json.loads(response_text)  
-        
-        if "amount" in result and result["amount"] != "N/A":  
-            amount_str = str(result["amount"])  
-            cleaned_amount = ''.join(filter(str.isdigit, amount_str))  
-            if cleaned_amount and len(cleaned_amount) <= 15:  
-                result["amount"] = int(cleaned_amount)  
-            else:  
-                result["amount"] = "N/A"  
-        
-        required_fields = ["bank", "account_holder", "account_number",   
-                        "ifsc_code", "date", "has_signature"]  
-        for field in required_fields:  
-            if field not in result:  
-                result[field] = "N/A"  
-                
-        return result  
-        
-    except json.JSONDecodeError as e:  
-        st.error(f"Failed to parse JSON response: {str(e)}")  
-        st.text(f"Raw response: {response_text}")  
-        return None  
-    except Exception as e:  
-        st.error(f"Extraction failed: {str(e)}")  
-        return None
+st.markdown(CSS_STYLES, unsafe_allow_html=True)  
 
-def validate_cheque_data(data: Dict) -> Dict:
-    """Apply rule-based validation to extracted cheque data"""
-    validation_results = {
-        "bank": {"valid": False, "message": ""},
-        "account_number": {"valid": False, "message": ""},
-        "ifsc_code": {"valid": False, "message": ""},
-        "date": {"valid": False, "message": ""},
-        "amount": {"valid": False, "message": ""}
-    }
-    
-    # Bank name validation
-    if data.get('bank', 'N/A') != 'N/A':
-        bank_name = str(data['bank']).upper()
-        validation_results['bank']['valid'] = any(re.search(pattern, bank_name) for pattern in BANK_NAME_PATTERNS)
-        if not validation_results['bank']['valid']:
-            validation_results['bank']['message'] = "Bank name doesn't match known patterns"
-    
-    # Account number validation
-    account_num = str(data.get('account_number', ''))
-    if account_num and account_num != 'N/A':
-        validation_results['account_number']['valid'] = bool(re.fullmatch(ACCOUNT_NUMBER_PATTERN, account_num))
-        if not validation_results['account_number']['valid']:
-            validation_results['account_number']['message'] = "Account number format invalid (should be 9-18 digits)"
-    
-    # IFSC code validation
-    ifsc = str(data.get('ifsc_code', ''))
-    if ifsc and ifsc != 'N/A':
-        validation_results['ifsc_code']['valid'] = bool(re.fullmatch(IFSC_CODE_PATTERN, ifsc))
-        if not validation_results['ifsc_code']['valid']:
-            validation_results['ifsc_code']['message'] = "IFSC code format invalid (should be 11 alphanumeric characters)"
-    
-    # Date validation
-    date_str = str(data.get('date', ''))
-    if date_str and date_str != 'N/A':
-        validation_results['date']['valid'] = bool(re.fullmatch(DATE_PATTERN, date_str))
-        if validation_results['date']['valid']:
-            try:
-                # Try to parse as MM/DD/YYYY first (common in bills), then DD/MM/YYYY
-                parts = date_str.split('/')
-                if len(parts) == 3:
-                    month, day, year = map(int, parts)
-                    # Check if it's a valid date in MM/DD/YYYY format
-                    if month <= 12 and day <= 31:
-                        datetime(year=year, month=month, day=day)
-                    else:
-                        # Try DD/MM/YYYY format
-                        day, month, year = map(int, parts)
-                        datetime(year=year, month=month, day=day)
-            except ValueError:
-                validation_results['date']['valid'] = False
-                validation_results['date']['message'] = "Invalid date (should be MM/DD/YYYY or DD/MM/YYYY and a valid date)"
-        else:
-            validation_results['date']['message'] = "Date format invalid (should be MM/DD/YYYY or DD/MM/YYYY)"
-    
-    # Amount validation
-    amount = data.get('amount', 'N/A')
-    if amount != 'N/A':
-        try:
-            amount_num = int(amount)
-            validation_results['amount']['valid'] = amount_num > 0
-            if not validation_results['amount']['valid']:
-                validation_results['amount']['message'] = "Amount should be positive"
-        except (ValueError, TypeError):
-            validation_results['amount']['valid'] = False
-            validation_results['amount']['message'] = "Amount should be a valid number"
-    
-    return validation_results
+# --- Surface extractor log messages in the page ---
+class StreamlitLogHandler(logging.Handler):
+    """Render extractor warnings and errors with st.warning / st.error"""
 
-# --- Document Type Detection ---
-def detect_document_type(image: Image) -> str:
-    """Detect if the document is a cheque or bill using AI"""
-    try:
-        if image.mode == 'RGBA':
-            image = image.convert('RGB')
-            
-        img_byte_arr = BytesIO()  
-        image.save(img_byte_arr, format='JPEG', quality=70)  
-        encoded_image = base64.b64encode(img_byte_arr.getvalue()).decode('utf-8')
-        
-        detection_prompt = """
-        Analyze this image and determine if it's a:
-        1. "cheque" - Bank cheque/check with elements like payee line, account details, signature line
-        2. "bill" - Invoice/receipt/bill with vendor details, items, amounts, tax information
-        3. "unknown" - Neither a cheque nor a bill
-        
-        Respond with just one word: "cheque", "bill", or "unknown"
-        """
-        
-        body = {  
-            "anthropic_version": "bedrock-2023-05-31",  
-            "max_tokens": 10,  
-            "temperature": 0.1,  
-            "messages": [  
-                {  
-                    "role": "user",  
-                    "content": [  
-                        {"type": "text", "text": detection_prompt},  
-                        {  
-                            "type": "image",  
-                            "source": {  
-                                "type": "base64",  
-                                "media_type": "image/jpeg",  
-                                "data": encoded_image  
-                            }  
-                        }  
-                    ]  
-                }  
-            ]  
-        }  
-        
-        response = invoke_model_with_retry("anthropic.claude-3-haiku-20240307-v1:0", body)  
-        doc_type = response['content'][0]['text'].strip().lower()
-        
-        if "cheque" in doc_type:
-            return "cheque"
-        elif "bill" in doc_type:
-            return "bill"
+    def emit(self, record: logging.LogRecord) -> None:
+        message = self.format(record)
+        if record.levelno >= logging.ERROR:
+            st.error(message)
         else:
-            return "unknown"
-            
-    except Exception as e:
-        st.error(f"Document type detection failed: {str(e)}")
-        return "unknown"
-
-# --- Bill Extraction Functions ---
-def extract_bill_data(image: Image) -> Dict:  
-    """Send bill image to Claude 3 Haiku and parse response"""  
-    try:  
-        # Convert image to RGB if it's RGBA
-        if image.mode == 'RGBA':
-            image = image.convert('RGB')
-            
-        img_byte_arr = BytesIO()  
-        image.save(img_byte_arr, format='JPEG', quality=70)  
-        
-        if img_byte_arr.tell() > 5 * 1024 * 1024:  
-            st.warning("Image too large, applying aggressive compression")  
-            img_byte_arr = BytesIO()  
-            image.save(img_byte_arr, format='JPEG', quality=30)  
-        
-        encoded_image = base64.b64encode(img_byte_arr.getvalue()).decode('utf-8') 
-        
-        # First check if this is a valid bill image
-        validation_prompt = """
-        Is this image a bill/invoice/receipt? Respond with just 'yes' or 'no'.
-        Look for key bill elements: vendor/company name, invoice number, date, 
-        item details, amounts, tax information, etc. If multiple of these elements are missing,
-        it's likely not a valid bill image.
-        """
-        
-        validation_body = {  
-            "anthropic_version": "bedrock-2023-05-31",  
-            "max_tokens": 10,  
-            "temperature": 0.1,  
-            "messages": [  
-                {  
-                    "role": "user",  
-                    "content": [  
-                        {"type": "text", "text": validation_prompt},  
-                        {  
-                            "type": "image",  
-                            "source": {  
-                                "type": "base64",  
-                                "media_type": "image/jpeg",  
-                                "data": encoded_image  
-                            }  
-                        }  
-                    ]  
-                }  
-            ]  
-        }  
-        
-        validation_response = invoke_model_with_retry("anthropic.claude-3-haiku-20240307-v1:0", validation_body)  
-        
-        validation_text = validation_response['content'][0]['text'].strip().lower()
-        
-        if "no" in validation_text:
-            return {"error": "Invalid bill image. Please upload a valid bill/invoice/receipt."}
-        
-        prompt = """  
-        Analyze this bill/invoice image and extract the following details in EXACTLY this JSON format:  
-        {  
-            "vendor_name": "Company/Vendor Name",  
-            "bill_number": "Invoice/Bill Number",  
-            "date": "MM/DD/YYYY or DD/MM/YYYY format as shown",  
-            "total_amount": "Total amount with decimal (e.g., 182.40)",  
-            "tax_amount": "Tax/GST amount with decimal (e.g., 12.50)",  
-            "gst_number": "GST Number/Tax ID",  
-            "vendor_phone": "Vendor Phone Number",  
-            "vendor_email": "Vendor Email Address",  
-            "customer_name": "Customer/Bill To Name",  
-            "payment_method": "Payment Method (Cash/Card/UPI/etc.)",
-            "currency": "Currency symbol if visible (₹, $, €, etc.) or best guess based on location indicators"  
-        }  
-
-        CRITICAL INSTRUCTIONS FOR AMOUNT EXTRACTION:  
-        1. Locate the total amount and tax amounts clearly  
-        2. Include decimal places (e.g., 182.40, not 18240)  
-        3. If amount cannot be determined, use "N/A"  
-        4. Extract the amount exactly as shown, preserving decimal formatting
-        5. For currency, look for currency symbols in the document or deduce from:
-           - GST numbers (India = ₹)
-           - Phone number formats (Indian vs US patterns)
-           - Email domains (.in = ₹, .com could be $)
-           - Company names (Pvt Ltd = ₹, Inc/Corp = $)
-
-        IMPORTANT:  
-        1. Return ONLY the JSON object  
-        2. Do not include any additional text or explanations  
-        3. Keep decimal precision for all amounts  
-        4. Extract date exactly as shown (MM/DD/YYYY or DD/MM/YYYY)  
-        """  
-        
-        body = {  
-            "anthropic_version": "bedrock-2023-05-31",  
-            "max_tokens": 1000,  
-            "temperature": 0.1,  
-            "messages": [  
-                {  
-                    "role": "user",  
-                    "content": [  
-                        {"type": "text", "text": prompt},  
-                        {  
-                            "type": "image",  
-                            "source": {  
-                                "type": "base64",  
-                                "media_type": "image/jpeg",  
-                                "data": encoded_image  
-                            }  
-                        }  
-                    ]  
-                }  
-            ]  
-        }  
-        
-        response = invoke_model_with_retry("anthropic.claude-3-haiku-20240307-v1:0", body)  
-        
-        response_text = response['content'][0]['text'].strip()  
-        
-        start_idx = response_text.find('{')  
-        end_idx = response_text.rfind('}') + 1  
-        if start_idx == -1 or end_idx == 0:  
-            raise ValueError("No JSON object found in response")  
-            
-        response_text = response_text[start_idx:end_idx]  
-        result = json.loads(response_text)  
-        
-        # Clean amount fields
-        for amount_field in ["total_amount", "tax_amount"]:
-            if amount_field in result and result[amount_field] != "N/A":  
-                amount_str = str(result[amount_field])  
-                # Remove currency symbols and spaces, but keep decimal point
-                cleaned_amount = re.sub(r'[₹$Rs,\s]', '', amount_str)
-                
-                try:
-                    # Parse as float to handle decimal amounts
-                    if cleaned_amount and '.' in cleaned_amount:
-                        amount_value = float(cleaned_amount)
-                        result[amount_field] = f"{amount_value:.2f}"
-                    elif cleaned_amount and cleaned_amount.replace('.', '').isdigit():
-                        amount_value = float(cleaned_amount)
-                        result[amount_field] = f"{amount_value:.2f}"
-                    else:
-                        result[amount_field] = "N/A"
-                except (ValueError, TypeError):
-                    result[amount_field] = "N/A"
-        
-        required_fields = ["vendor_name", "bill_number", "date", "total_amount",   
-                        "tax_amount", "gst_number", "vendor_phone", "vendor_email",
-                        "customer_name", "payment_method", "currency"]  
-        for field in required_fields:  
-            if field not in result:  
-                result[field] = "N/A"  
-        
-        # Currency detection - use AI result or fallback to rule-based detection
-        if result.get("currency", "N/A") == "N/A" or not result.get("currency"):
-            result["currency"] = detect_currency_from_bill_data(result)
-        
-        # Validate and clean currency symbol
-        detected_currency = result.get("currency", "₹")
-        if detected_currency not in ["₹", "$", "€", "£", "¥"]:
-            # If AI returned text description, convert to symbol
-            currency_map = {
-                "rupee": "₹", "rupees": "₹", "inr": "₹", "rs": "₹",
-                "dollar": "$", "dollars": "$", "usd": "$",
-                "euro": "€", "euros": "€", "eur": "€",
-                "pound": "£", "pounds": "£", "gbp": "£",
-                "yen": "¥", "jpy": "¥"
-            }
-            detected_currency_lower = detected_currency.lower().strip()
-            result["currency"] = currency_map.get(detected_currency_lower, detect_currency_from_bill_data(result))
-        
-        return result  
-        
-    except json.JSONDecodeError as e:  
-        st.error(f"Failed to parse JSON response: {str(e)}")  
-        st.text(f"Raw response: {response_text}")  
-        return None  
-    except Exception as e:  
-        st.error(f"Bill extraction failed: {str(e)}")  
-        return None
-
-def validate_bill_data(data: Dict) -> Dict:
-    """Apply rule-based validation to extracted bill data"""
-    validation_results = {
-        "vendor_name": {"valid": False, "message": ""},
-        "bill_number": {"valid": False, "message": ""},
-        "gst_number": {"valid": False, "message": ""},
-        "vendor_phone": {"valid": False, "message": ""},
-        "vendor_email": {"valid": False, "message": ""},
-        "date": {"valid": False, "message": ""},
-        "total_amount": {"valid": False, "message": ""}
-    }
-    
-    # Vendor name validation
-    if data.get('vendor_name', 'N/A') != 'N/A':
-        vendor_name = str(data['vendor_name']).strip()
-        validation_results['vendor_name']['valid'] = len(vendor_name) >= 2
-        if not validation_results['vendor_name']['valid']:
-            validation_results['vendor_name']['message'] = "Vendor name too short"
-    
-    # Bill number validation
-    bill_num = str(data.get('bill_number', ''))
-    if bill_num and bill_num != 'N/A':
-        validation_results['bill_number']['valid'] = bool(re.fullmatch(BILL_NUMBER_PATTERN, bill_num))
-        if not validation_results['bill_number']['valid']:
-            validation_results['bill_number']['message'] = "Bill number format invalid (should be 5-20 alphanumeric characters)"
-    
-    # GST number validation
-    gst = str(data.get('gst_number', ''))
-    if gst and gst != 'N/A':
-        validation_results['gst_number']['valid'] = bool(re.fullmatch(GST_NUMBER_PATTERN, gst))
-        if not validation_results['gst_number']['valid']:
-            validation_results['gst_number']['message'] = "GST number format invalid"
-    
-    # Phone validation
-    phone = str(data.get('vendor_phone', ''))
-    if phone and phone != 'N/A':
-        # Clean phone number for validation
-        cleaned_phone = re.sub(r'[\s\-\(\)]', '', phone)
-        validation_results['vendor_phone']['valid'] = bool(re.fullmatch(PHONE_PATTERN, phone)) and len(cleaned_phone) >= 10
-        if not validation_results['vendor_phone']['valid']:
-            validation_results['vendor_phone']['message'] = "Phone number format invalid"
-    
-    # Email validation
-    email = str(data.get('vendor_email', ''))
-    if email and email != 'N/A':
-        validation_results['vendor_email']['valid'] = bool(re.fullmatch(EMAIL_PATTERN, email))
-        if not validation_results['vendor_email']['valid']:
-            validation_results['vendor_email']['message'] = "Email format invalid"
-    
-    # Date validation
-    date_str = str(data.get('date', ''))
-    if date_str and date_str != 'N/A':
-        validation_results['date']['valid'] = bool(re.fullmatch(DATE_PATTERN, date_str))
-        if validation_results['date']['valid']:
-            try:
-                # Try to parse as MM/DD/YYYY first (common in bills), then DD/MM/YYYY
-                parts = date_str.split('/')
-                if len(parts) == 3:
-                    month, day, year = map(int, parts)
-                    # Check if it's a valid date in MM/DD/YYYY format
-                    if month <= 12 and day <= 31:
-                        datetime(year=year, month=month, day=day)
-                    else:
-                        # Try DD/MM/YYYY format
-                        day, month, year = map(int, parts)
-                        datetime(year=year, month=month, day=day)
-            except ValueError:
-                validation_results['date']['valid'] = False
-                validation_results['date']['message'] = "Invalid date (should be MM/DD/YYYY or DD/MM/YYYY and a valid date)"
-        else:
-            validation_results['date']['message'] = "Date format invalid (should be MM/DD/YYYY or DD/MM/YYYY)"
-    
-    # Amount validation
-    amount = data.get('total_amount', 'N/A')
-    if amount != 'N/A':
-        try:
-            amount_num = int(amount)
-            validation_results['total_amount']['valid'] = amount_num > 0
-            if not validation_results['total_amount']['valid']:
-                validation_results['total_amount']['message'] = "Amount should be positive"
-        except (ValueError, TypeError):
-            validation_results['total_amount']['valid'] = False
-            validation_results['total_amount']['message'] = "Amount should be a valid number"
-    
-    return validation_results
-
-def detect_currency_from_bill_data(data: Dict) -> str:
-    """Detect currency based on extracted bill data"""
-    # Check for Indian indicators
-    indian_indicators = 0
-    us_indicators = 0
-    
-    # GST number indicates India
-    gst_number = str(data.get('gst_number', ''))
-    if gst_number != 'N/A' and re.match(GST_NUMBER_PATTERN, gst_number):
-        indian_indicators += 3
-    
-    # Check phone number patterns
-    phone = str(data.get('vendor_phone', ''))
-    if phone != 'N/A':
-        # Clean phone for pattern matching
-        cleaned_phone = re.sub(r'[\s\-\(\)]', '', phone)
-        
-        # Check Indian phone patterns
-        if any(re.match(pattern, phone) for pattern in INDIAN_PHONE_PATTERNS):
-            indian_indicators += 2
-        elif any(re.match(pattern, phone) for pattern in US_PHONE_PATTERNS):
-            us_indicators += 2
-    
-    # Check email domain for Indian indicators
-    email = str(data.get('vendor_email', ''))
-    if email != 'N/A':
-        if '.in' in email.lower() or 'gov.in' in email.lower():
-            indian_indicators += 1
-        elif '.com' in email.lower() or '.org' in email.lower():
-            us_indicators += 0.5  # Less specific
-    
-    # Check vendor name for Indian companies/government
-    vendor_name = str(data.get('vendor_name', '')).lower()
-    if 'gem' in vendor_name or 'government' in vendor_name or 'pvt' in vendor_name or 'ltd' in vendor_name:
-        indian_indicators += 1
-    elif 'inc' in vendor_name or 'corp' in vendor_name or 'llc' in vendor_name:
-        us_indicators += 1
-    
-    # Determine currency based on indicators
-    if indian_indicators > us_indicators:
-        return '₹'
-    elif us_indicators > indian_indicators:
-        return '$'
-    else:
-        return '₹'  # Default to INR if unclear
-
-def cross_validate_results(claude_result: Dict, sonnet_result: Dict) -> Tuple[Dict, float]:
-    """Single model verification - no cross-validation possible"""
-    if not claude_result:
-        return {}, 0.0
-    
-    # Removed dual verification - using single model only
-    return {}, 85.0  # Fixed confidence for single model verification
-
-def calculate_automated_accuracy(claude_result: Dict, sonnet_result: Dict, validation_results: Dict) -> float:
-    """Calculate automated accuracy score using only rule-based validation"""
-    if not claude_result:
-        return 0.0
-    
-    # Only use rule-based validation since we don't have dual verification
-    rule_based_score = 0
-    if validation_results:
-        valid_fields = sum(1 for field in validation_results.values() if field['valid'])
-        total_fields = len(validation_results)
-        rule_based_score = (valid_fields / total_fields) * 100 if total_fields > 0 else 0
-    
-    return rule_based_score
-
-def display_bill_result(image: Image, result: Dict, index: int, sonnet_result: Dict, validation_results: Dict) -> None:  
+            st.warning(message)
+
+# The extractor logger outlives script reruns, so only attach the handler once per process
+extractor_logger = logging.getLogger("extractor")
+if not any(handler.get_name() == "streamlit" for handler in extractor_logger.handlers):
+    streamlit_handler = StreamlitLogHandler(level=logging.WARNING)
+    streamlit_handler.set_name("streamlit")
+    extractor_logger.addHandler(streamlit_handler)
+
+# --- Live extraction preview ---
+class LiveFields:
+    """Fields of the documents being extracted right now, shown in one placeholder as the model streams them"""
+
+    def __init__(self):
+        self.placeholder = st.empty()
+        self._fields: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def callback(self, name: str):
+        """on_field callback collecting one document's fields under its name"""
+        def on_field(field: str, value) -> None:
+            with self._lock:
+                self._fields.setdefault(name, {})[field] = value
+                self._render()
+        return on_field
+
+    def finish(self, name: str) -> None:
+        with self._lock:
+            self._fields.pop(name, None)
+            self._render()
+
+    def _render(self) -> None:
+        if not self._fields:
+            self.placeholder.empty()
+            return
+        lines = [f"⏳ **{name}**: " + " · ".join(f"{field}: {value}" for field, value in fields.items())
+                 for name, fields in self._fields.items()]
+        self.placeholder.markdown("  \n".join(lines))
+
+def display_verification(verification: Optional[Dict]) -> None:
+    """Show how a low-scoring document's Sonnet re-extraction compared with Haiku's, field by field"""
+    if not verification:
+        return
+    st.caption(f"🔁 Cross-verified with Claude 3 Sonnet (Haiku scored {verification['haiku_score']:.1f}%): "
+               f"the models agree on {verification['agreement']:.1f}% of fields")
+    if verification["discrepancies"]:
+        st.table(pd.DataFrame([
+            {"Field": field, "Haiku": str(values["haiku"]), "Sonnet": str(values["sonnet"]),
+             "Kept": values["kept"].capitalize()}
+            for field, values in verification["discrepancies"].items()
+        ]))
+
+def display_bill_result(image: Image, result: Dict, index: int, verification: Optional[Dict], validation_results: Dict) -> None:  
     """Display results for a single bill with automated accuracy verification"""  
     with st.container():  
         st.markdown(f'<div class="bill-container">', unsafe_allow_html=True)  
@@ -787,10 +151,11 @@ def display_bill_result(image: Image, result: Dict, index: int, sonnet_result: D
             
             df = pd.DataFrame(table_data)  
             st.table(df)  
+            display_verification(verification)
         
         st.markdown('</div>', unsafe_allow_html=True)
 
-def display_cheque_result(image: Image, result: Dict, index: int, sonnet_result: Dict, validation_results: Dict) -> None:  
+def display_cheque_result(image: Image, result: Dict, index: int, verification: Optional[Dict], validation_results: Dict) -> None:  
     """Display results for a single cheque with automated accuracy verification"""  
     with st.container():  
         st.markdown(f'<div class="cheque-container">', unsafe_allow_html=True)  
@@ -822,13 +187,14 @@ def display_cheque_result(image: Image, result: Dict, index: int, sonnet_result:
             # Display results in table format  
             table_data = {  
                 "Field": ["Bank Name", "Account Holder", "Account Number", "Amount",  
-                        "IFSC Code", "Date", "Signature Present"],  
+                        "IFSC Code", "Branch", "Date", "Signature Present"],  
                 "Extracted Value": [  
                     str(result.get("bank", "N/A")),  
                     str(result.get("account_holder", "N/A")),  
                     str(result.get("account_number", "N/A")),  
                     str(result.get("amount", "N/A")),  
                     str(result.get("ifsc_code", "N/A")),  
+                    str(result.get("branch_name", "N/A")),
                     str(result.get("date", "N/A")),  
                     "Yes" if result.get("has_signature", False) else "No"  
                 ]
@@ -836,185 +202,195 @@ def display_cheque_result(image: Image, result: Dict, index: int, sonnet_result:
             
             df = pd.DataFrame(table_data)  
             st.table(df)  
+            display_verification(verification)
         
         st.markdown('</div>', unsafe_allow_html=True)
 
-def to_excel(all_results: List[Dict], all_sonnet_results: List[Dict], all_validations: List[Dict], doc_types: List[str]) -> bytes:  
-    """Convert all results to Excel bytes including automated verification data for both cheques and bills"""  
-    output = BytesIO()  
-    
-    # Separate data by document type
-    cheque_data = []
-    bill_data = []
-    
-    for i, (result, sonnet_result, validation, doc_type) in enumerate(zip(all_results, all_sonnet_results, all_validations, doc_types)):  
-        # Handle case where sonnet_result might be None
-        if sonnet_result:
-            discrepancies, _ = cross_validate_results(result, sonnet_result)
-        else:
-            discrepancies = {}
-            
-        automated_accuracy = calculate_automated_accuracy(result, sonnet_result, validation)
-        
-        if doc_type == "cheque":
-            row_data = {  
-                "Cheque No.": len(cheque_data) + 1,  
-                "Bank Name": str(result.get("bank", "N/A")),  
-                "Account Holder": str(result.get("account_holder", "N/A")),  
-                "Account Number": str(result.get("account_number", "N/A")),  
-                "Amount": str(result.get("amount", "N/A")),  
-                "IFSC Code": str(result.get("ifsc_code", "N/A")),  
-                "Date": str(result.get("date", "N/A")),  
-                "Signature Present": "Yes" if result.get("has_signature", False) else "No",
-                "Rule-Based Accuracy": f"{automated_accuracy:.1f}%",
-                "Bank Valid": "Yes" if validation.get("bank", {}).get("valid", False) else "No",
-                "Account Number Valid": "Yes" if validation.get("account_number", {}).get("valid", False) else "No",
-                "IFSC Valid": "Yes" if validation.get("ifsc_code", {}).get("valid", False) else "No",
-                "Date Valid": "Yes" if validation.get("date", {}).get("valid", False) else "No",
-                "Amount Valid": "Yes" if validation.get("amount", {}).get("valid", False) else "No"
-            }
-            
-            # Add discrepancy information for cheques
-            if sonnet_result:
-                for field in ["bank", "account_holder", "account_number", "amount", "ifsc_code", "date"]:
-                    row_data[f"{field} Matches"] = "Yes" if field not in discrepancies else "No"
-            else:
-                for field in ["bank", "account_holder", "account_number", "amount", "ifsc_code", "date"]:
-                    row_data[f"{field} Matches"] = "N/A"
-            
-            cheque_data.append(row_data)
-        
-        elif doc_type == "bill":
-            row_data = {  
-                "Bill No.": len(bill_data) + 1,  
-                "Vendor Name": str(result.get("vendor_name", "N/A")),  
-                "Bill Number": str(result.get("bill_number", "N/A")),  
-                "Date": str(result.get("date", "N/A")),  
-                "Total Amount": f"{result.get('currency', '₹')}{result.get('total_amount', 'N/A')}" if result.get('total_amount', 'N/A') != 'N/A' else 'N/A',  
-                "Tax Amount": f"{result.get('currency', '₹')}{result.get('tax_amount', 'N/A')}" if result.get('tax_amount', 'N/A') != 'N/A' else 'N/A',  
-                "GST Number": str(result.get("gst_number", "N/A")),  
-                "Vendor Phone": str(result.get("vendor_phone", "N/A")),  
-                "Vendor Email": str(result.get("vendor_email", "N/A")),  
-                "Customer Name": str(result.get("customer_name", "N/A")),  
-                "Payment Method": str(result.get("payment_method", "N/A")),
-                "Currency": str(result.get("currency", "₹")),
-                "Rule-Based Accuracy": f"{automated_accuracy:.1f}%",
-                "Vendor Name Valid": "Yes" if validation.get("vendor_name", {}).get("valid", False) else "No",
-                "Bill Number Valid": "Yes" if validation.get("bill_number", {}).get("valid", False) else "No",
-                "GST Number Valid": "Yes" if validation.get("gst_number", {}).get("valid", False) else "No",
-                "Phone Valid": "Yes" if validation.get("vendor_phone", {}).get("valid", False) else "No",
-                "Email Valid": "Yes" if validation.get("vendor_email", {}).get("valid", False) else "No",
-                "Date Valid": "Yes" if validation.get("date", {}).get("valid", False) else "No",
-                "Amount Valid": "Yes" if validation.get("total_amount", {}).get("valid", False) else "No"
-            }
-            
-            bill_data.append(row_data)
-    
-    # Create Excel with separate sheets for cheques and bills
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:  
-        if cheque_data:
-            cheque_df = pd.DataFrame(cheque_data)
-            cheque_df.to_excel(writer, index=False, sheet_name='ChequeData')
-        
-        if bill_data:
-            bill_df = pd.DataFrame(bill_data)
-            bill_df.to_excel(writer, index=False, sheet_name='BillData')
-    
-    return output.getvalue()
-
-def upload_to_s3(file_bytes: bytes, s3_key: str, content_type: str = 'image/jpeg') -> str:
-    """Upload file bytes to S3 and return public URL"""
-    try:
-        s3.put_object(
-            Bucket=S3_BUCKET_NAME,
-            Key=s3_key,
-            Body=file_bytes,
-            ContentType=content_type
-        )
-        return f"s3://{S3_BUCKET_NAME}/{s3_key}"
-    except Exception as e:
-        st.error(f"Failed to upload to S3: {str(e)}")
-        return None
-
-def upload_excel_to_s3(excel_bytes: bytes) -> str:
-    """Upload Excel file to S3 and return URL"""
-    try:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        s3_key = f"excel_reports/cheque_report_{timestamp}.xlsx"
-        
-        s3.put_object(
-            Bucket=S3_BUCKET_NAME,
-            Key=s3_key,
-            Body=excel_bytes,
-            ContentType='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        return f"s3://{S3_BUCKET_NAME}/{s3_key}"
-    except Exception as e:
-        st.error(f"Failed to upload Excel to S3: {str(e)}")
-        return None
-
-def crop_signature_area(image: Image, cheque_id: str) -> str:
-    """Crop slightly higher bottom-right corner of cheque image and upload to S3"""
-    # Convert to RGB if needed
-    if image.mode == 'RGBA':
-        image = image.convert('RGB')
-        
-    width, height = image.size
-    left = int(width * 0.75)
-    top = int(height * 0.57)
-    right = width
-    bottom = int(height * 0.92)
-    signature = image.crop((left, top, right, bottom))
-    
-    # Save to bytes instead of local file
-    img_byte_arr = BytesIO()
-    signature.save(img_byte_arr, format='JPEG')
-    img_bytes = img_byte_arr.getvalue()
-    
-    # Generate unique timestamp
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-    # Upload to S3 with unique identifier
-    s3_key = f"signatures/signature_{timestamp}_{cheque_id}.jpg"
-    s3_url = upload_to_s3(img_bytes, s3_key)
-    return s3_url
-
 def reset_session_state():
     """Completely reset the session state to initial values"""
+    # Delete this session's spilled images now rather than whenever the store is garbage collected
+    if 'results' in st.session_state:
+        st.session_state.results.clear()
+    # Queued documents of the old session are dropped, and the page moves to a fresh session id
+    if 'job_session' in st.session_state:
+        get_job_queue().forget_session(st.session_state.job_session)
+        st.query_params["session"] = uuid.uuid4().hex
     # Clear all existing session state keys
     for key in list(st.session_state.keys()):
         del st.session_state[key]
     
     # Reinitialize the essential session state variables
     st.session_state.update({
-        'all_results': [],
-        'document_images': [],
-        'validation_results': [],
-        'document_types': [],
-        's3_urls': [],
+        'results': ResultStore(),
         'processed_files': set(),
+        'report': IncrementalReport(),
         'file_uploader_key': str(datetime.now().timestamp())  # This will force the file uploader to reset
     })
 
+def upload_pages(files, page_files: Dict[str, str]):
+    """(label, page) for every page of the uploads, decoded one page at a time as the pipeline asks for the next"""
+    for uploaded_file in files:
+        try:
+            for page in iter_pages(uploaded_file, name=uploaded_file.name):
+                page_files[page.label] = uploaded_file.name
+                yield page.label, page
+        except Exception as e:
+            # An unreadable file still produces an entry, reported as an error like any failed document
+            page_files[uploaded_file.name] = uploaded_file.name
+            yield uploaded_file.name, e
+
+def process_document(index: int, page, live: Optional[LiveFields] = None) -> Dict:
+    """Detect, extract, validate and upload a single decoded page, previewing its fields in live as they arrive"""
+    if isinstance(page, Exception):
+        raise page
+    # The image is encoded once and that JPEG/base64 payload is shared by every model call and the S3 archive
+    doc = PreparedDocument(page.image, name=page.label)
+
+    try:
+        outcome = analyze_document(doc, on_field=live.callback(page.label) if live else None)
+    finally:
+        if live:
+            live.finish(page.label)
+    if "error" in outcome:
+        return outcome
+
+    doc_type = outcome["doc_type"]
+    claude_result = outcome["result"]
+    id_field = "account_number" if doc_type == "cheque" else "bill_number"
+
+    # Generate unique ID
+    doc_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{index}_{claude_result.get(id_field, 'unknown')}"
+
+    # Queue S3 uploads in the background so the worker can move on to the next document's model call
+    uploader = get_background_uploader()
+    # The archive is a full-resolution encode made on the upload thread, not the downscaled model JPEG
+    doc_s3_url = uploader.submit(lambda: encode_archive_jpeg(doc.image), f"processed/{doc_type}_{doc_id}.jpg")
+
+    # Crop and save signature to S3 (bills don't have signatures)
+    sig_s3_url = None
+    if doc_type == "cheque":
+        sig_s3_url = uploader.submit(lambda: encode_signature_crop(doc.image), signature_s3_key(doc_id))
+
+    return {
+        "doc_type": doc_type,
+        "result": claude_result,
+        "validation": outcome["validation"],
+        "verification": outcome.get("verification"),
+        # The session keeps only this preview in memory; the original upload is spilled to disk for viewing
+        "thumbnail": make_thumbnail(doc.image),
+        # Single images keep their original encoding; pages of PDFs and TIFFs are spilled from the decoded image
+        "source_bytes": page.data,
+        "image": doc.image if page.data is None else None,
+        # Futures resolving to the s3:// URLs once the uploads finish
+        "s3_urls": {"document": doc_s3_url, "signature": sig_s3_url}
+    }
+
+def job_session_id() -> str:
+    """This browser session's job queue id, kept in the URL so results survive closing the tab or a restart"""
+    session = st.query_params.get("session")
+    if not session:
+        session = uuid.uuid4().hex
+        st.query_params["session"] = session
+    return session
+
+def finished_upload(url) -> Future:
+    """Wrap an archived URL from a job outcome like the futures of the inline uploads"""
+    future = Future()
+    future.set_result(url)
+    return future
+
+def collect_job_results(jobs) -> None:
+    """Add each newly finished job's outcome to the session's results, once"""
+    queue = get_job_queue()
+    for job in jobs:
+        if not job.finished or job.id in st.session_state.collected_jobs:
+            continue
+        st.session_state.collected_jobs.add(job.id)
+        outcome = job.outcome or {}
+        if job.status == "failed":
+            st.session_state.job_errors.append(f"Error processing document {job.name}: {job.error}")
+            continue
+        # Multi-page scans come back as one outcome per page, each with its own preview
+        for page in outcome["pages"] if "pages" in outcome else [dict(outcome, label=job.name)]:
+            if "error" in page:
+                st.session_state.job_errors.append(f"❌ {page['label']}: {page['error']}")
+                continue
+            if "thumbnail" in page:
+                # Full-size pages are fetched from their S3 archive when viewed
+                thumbnail, source_bytes = base64.b64decode(page["thumbnail"]), None
+            else:
+                source_bytes = queue.read_input(job.id)
+                thumbnail = make_thumbnail(orient_image(load_image(BytesIO(source_bytes))))
+            st.session_state.results.add(
+                page["label"], page["doc_type"], page["result"], page["validation"],
+                {kind: finished_upload(url) for kind, url in page["s3_urls"].items()},
+                thumbnail, source_bytes=source_bytes, verification=page.get("verification")
+            )
+
 # --- Main UI ---  
+queue_mode = PROCESSING_BACKEND == "queue"
+if queue_mode:
+    if JOB_EMBEDDED_WORKERS:
+        start_embedded_workers(JOB_EMBEDDED_WORKERS)
+    if 'job_session' not in st.session_state:
+        st.session_state.job_session = job_session_id()
+    with st.sidebar.expander("📬 Job queue"):
+        queue_stats = get_job_queue().stats()
+        st.metric("Queued", queue_stats["queued"])
+        st.caption(f"Running: {queue_stats['running']} · Done: {queue_stats['done']} · "
+                   f"Failed: {queue_stats['failed']} · Oldest queued: {queue_stats['oldest_queued_seconds']}s")
+
+with st.sidebar.expander("⚙️ Bedrock rate limiter"):
+    limiter_stats = get_rate_limiter().stats()
+    st.metric("Current rate (req/s)", limiter_stats["current_rate"])
+    st.metric("Queue depth", limiter_stats["queue_depth"])
+    st.caption(f"Requests: {limiter_stats['total_requests']} · Throttles: {limiter_stats['total_throttles']} · "
+               f"Waited: {limiter_stats['total_wait_seconds']}s")
+
+with st.sidebar.expander("🗄️ Extraction cache"):
+    cache_stats = get_extraction_cache().stats()
+    st.metric("Cached entries", cache_stats["entries"])
+    st.caption(f"Hits: {cache_stats['hits']} · Misses: {cache_stats['misses']} · "
+               f"Size: {cache_stats['bytes'] / (1024 * 1024):.1f} MB")
+
+with st.sidebar.expander("☁️ S3 uploads"):
+    upload_stats = get_background_uploader().stats()
+    st.metric("Pending uploads", upload_stats["pending"])
+    st.caption(f"Completed: {upload_stats['completed']} · Failed: {upload_stats['failed']} · "
+               f"Retries: {upload_stats['retries']}")
+
+if 'results' in st.session_state:
+    with st.sidebar.expander("🖼️ Session memory"):
+        store_stats = st.session_state.results.stats()
+        st.metric("Documents", store_stats["documents"])
+        st.caption(f"Thumbnails: {store_stats['thumbnail_bytes'] / (1024 * 1024):.1f} MB · "
+                   f"Full images cached: {store_stats['cached_images']} "
+                   f"({store_stats['cached_image_bytes'] / (1024 * 1024):.0f} of "
+                   f"{store_stats['memory_cap_bytes'] / (1024 * 1024):.0f} MB)")
+
 st.markdown('<div class="header">Document Information Extractor - Cheques & Bills</div>', unsafe_allow_html=True)  
 
 # File Upload Section  
 uploaded_files = st.file_uploader(  
-    "📁 Upload document images - Cheques & Bills (JPEG, PNG)",  
-    type=["jpg", "jpeg", "png"],  
+    "📁 Upload document images - Cheques & Bills (JPEG, PNG, multi-page PDF or TIFF)",  
+    type=["jpg", "jpeg", "png", "pdf", "tif", "tiff"],  
     accept_multiple_files=True,  
     key=st.session_state.get('file_uploader_key', 'initial_uploader')  
 )
 
-if uploaded_files:
+# With the job queue, results of earlier uploads come back without re-uploading (e.g. after a restart)
+if uploaded_files or queue_mode:
     # Initialize session state if not exists
-    if 'all_results' not in st.session_state:
-        st.session_state.all_results = []
-        st.session_state.document_images = []
-        st.session_state.validation_results = []
-        st.session_state.document_types = []
-        st.session_state.s3_urls = []
+    if 'results' not in st.session_state:
+        st.session_state.results = ResultStore()
         st.session_state.processed_files = set()  # Track processed files
+    if 'report' not in st.session_state:
+        st.session_state.report = IncrementalReport()
+    if queue_mode and 'collected_jobs' not in st.session_state:
+        st.session_state.collected_jobs = set()
+        st.session_state.job_errors = []
+        st.session_state.processed_files.update(
+            job.name for job in get_job_queue().session_jobs(st.session_state.job_session))
     
     # Get the set of currently uploaded files
     current_files = {file.name for file in uploaded_files}
@@ -1022,110 +398,75 @@ if uploaded_files:
     # Find new files that haven't been processed
     new_files = [file for file in uploaded_files if file.name not in st.session_state.processed_files]
     
-    if new_files:
-        with st.spinner(f"🔍 Analyzing {len(new_files)} new documents with AI verification..."):
-            for i, uploaded_file in enumerate(new_files):
-                try:
-                    img = Image.open(uploaded_file)
-                    # Convert to RGB if needed
-                    if img.mode == 'RGBA':
-                        img = img.convert('RGB')
-                    
-                    # Add longer delay between documents to avoid rate limiting
-                    if i > 0:  # Don't wait before the first request
-                        delay = 5.0 + random.uniform(2.0, 4.0)  # 7-9 second delay between documents
-                        st.info(f"⏳ Waiting {delay:.1f} seconds between documents to avoid rate limits...")
-                        time.sleep(delay)
-                    
-                    # Detect document type first
-                    doc_type = detect_document_type(img)
-                    
-                    if doc_type == "unknown":
-                        st.error(f"❌ {uploaded_file.name}: Could not identify as cheque or bill. Please upload valid documents.")
-                        st.session_state.processed_files.add(uploaded_file.name)
-                        continue
-                    
-                    # Process based on document type
-                    if doc_type == "cheque":
-                        # Extract cheque data
-                        claude_result = extract_cheque_data(img)
-                        
-                        # Check if the result contains an error message (invalid image)
-                        if claude_result and "error" in claude_result:
-                            st.error(f"❌ {uploaded_file.name}: {claude_result['error']}")
-                            st.session_state.processed_files.add(uploaded_file.name)
-                            continue
-                        
-                        # Validate cheque data
-                        validation = validate_cheque_data(claude_result)
-                        
-                        # Generate unique ID
-                        doc_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{i}_{claude_result.get('account_number', 'unknown')}"
-                        
-                        # Save to S3
-                        img_byte_arr = BytesIO()
-                        img.save(img_byte_arr, format='JPEG')
-                        doc_s3_key = f"processed/cheque_{doc_id}.jpg"
-                        doc_s3_url = upload_to_s3(img_byte_arr.getvalue(), doc_s3_key)
-                        
-                        # Crop and save signature to S3
-                        sig_s3_url = crop_signature_area(img, doc_id)
-                        
-                        # Store data
-                        st.session_state.all_results.append(claude_result)
-                        st.session_state.document_images.append(img)
-                        st.session_state.validation_results.append(validation)
-                        st.session_state.document_types.append("cheque")
-                        st.session_state.s3_urls.append({
-                            "document": doc_s3_url,
-                            "signature": sig_s3_url
-                        })
-                    
-                    elif doc_type == "bill":
-                        # Extract bill data
-                        claude_result = extract_bill_data(img)
-                        
-                        # Check if the result contains an error message (invalid image)
-                        if claude_result and "error" in claude_result:
-                            st.error(f"❌ {uploaded_file.name}: {claude_result['error']}")
-                            st.session_state.processed_files.add(uploaded_file.name)
-                            continue
-                        
-                        # Validate bill data
-                        validation = validate_bill_data(claude_result)
-                        
-                        # Generate unique ID
-                        doc_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{i}_{claude_result.get('bill_number', 'unknown')}"
-                        
-                        # Save to S3
-                        img_byte_arr = BytesIO()
-                        img.save(img_byte_arr, format='JPEG')
-                        doc_s3_key = f"processed/bill_{doc_id}.jpg"
-                        doc_s3_url = upload_to_s3(img_byte_arr.getvalue(), doc_s3_key)
-                        
-                        # Store data
-                        st.session_state.all_results.append(claude_result)
-                        st.session_state.document_images.append(img)
-                        st.session_state.validation_results.append(validation)
-                        st.session_state.document_types.append("bill")
-                        st.session_state.s3_urls.append({
-                            "document": doc_s3_url,
-                            "signature": None  # Bills don't have signatures
-                        })
-                    
-                    # Mark file as processed
-                    st.session_state.processed_files.add(uploaded_file.name)
-                
-                except Exception as e:  
-                    st.error(f"Error processing document {i+1}: {str(e)}")
-                    # Still mark as processed to avoid infinite reprocessing attempts
-                    st.session_state.processed_files.add(uploaded_file.name)
-    
+    if new_files and queue_mode:
+        # Spooled to the durable queue, so worker processes finish them even if this tab closes or reruns
+        for file in new_files:
+            get_job_queue().enqueue(st.session_state.job_session, file.name, file.getvalue())
+            st.session_state.processed_files.add(file.name)
+    elif new_files:
+        # The performance panel reports on the batch being processed now
+        get_metrics().reset()
+        # Only page counts are read up front; each page is decoded when its turn comes
+        pages_left = {}
+        for file in new_files:
+            try:
+                pages_left[file.name] = page_count(file)
+            except Exception:
+                pages_left[file.name] = 1
+        total_pages = sum(pages_left.values())
+        page_files: Dict[str, str] = {}
+        with st.spinner(f"🔍 Analyzing {total_pages} documents in {len(new_files)} new files with AI verification..."):
+            progress = st.progress(0.0)
+            live = LiveFields()
+            # Worker threads share this script run's context so their st.* messages still render
+            script_ctx = get_script_run_ctx()
+            pipeline = DocumentPipeline(
+                lambda index, page: process_document(index, page, live),
+                max_workers=PIPELINE_WORKERS,
+                initializer=lambda: add_script_run_ctx(threading.current_thread(), script_ctx)
+            )
+
+            # Results arrive in upload order, each as soon as it and every earlier document is done
+            for completed, outcome in enumerate(pipeline.run(upload_pages(new_files, page_files)), start=1):
+                if outcome.error:
+                    st.error(f"Error processing document {outcome.index+1}: {outcome.error}")
+                elif "error" in outcome.value:
+                    st.error(f"❌ {outcome.name}: {outcome.value['error']}")
+                else:
+                    # Store data
+                    st.session_state.results.add(
+                        outcome.name, outcome.value["doc_type"], outcome.value["result"], outcome.value["validation"],
+                        outcome.value["s3_urls"], outcome.value["thumbnail"],
+                        source_bytes=outcome.value["source_bytes"], image=outcome.value["image"],
+                        verification=outcome.value["verification"]
+                    )
+
+                # Mark a file as processed once all its pages are done, even on failure, to avoid infinite
+                # reprocessing attempts
+                file_name = page_files[outcome.name]
+                pages_left[file_name] -= 1
+                if pages_left[file_name] <= 0 or outcome.name == file_name:
+                    st.session_state.processed_files.add(file_name)
+                progress.progress(min(1.0, completed / total_pages))
+    
+    if queue_mode:
+        jobs = get_job_queue().session_jobs(st.session_state.job_session)
+        collect_job_results(jobs)
+        unfinished = sum(1 for job in jobs if not job.finished)
+        st.session_state.jobs_pending = unfinished > 0
+        if unfinished:
+            st.progress((len(jobs) - unfinished) / len(jobs),
+                        text=f"⏳ {unfinished} of {len(jobs)} documents queued or processing. "
+                             "You can close this tab; results stay available at this page's URL.")
+        for error in st.session_state.job_errors:
+            st.error(error)
+
     # Display results if available  
-    if st.session_state.all_results:  
+    results = st.session_state.results
+    if len(results):  
         # Document selection dropdown  
         document_options = []
-        for i, (result, doc_type) in enumerate(zip(st.session_state.all_results, st.session_state.document_types)):
+        for i, (result, doc_type) in enumerate(zip(results.results, results.doc_types)):
             if doc_type == "cheque":
                 display_name = f"Cheque {i+1} - {result.get('account_holder', 'Unknown')} (₹{result.get('amount', 'N/A')})"
             else:  # bill
@@ -1140,47 +481,51 @@ if uploaded_files:
         )  
         
         selected_index = document_options.index(selected_document)
-        selected_doc_type = st.session_state.document_types[selected_index]
+        selected = results.documents[selected_index]
         
-        # Display result based on document type
-        if selected_doc_type == "cheque":
+        # Display result based on document type; only the selected document's full image is loaded
+        if selected.doc_type == "cheque":
             display_cheque_result(  
-                st.session_state.document_images[selected_index],  
-                st.session_state.all_results[selected_index],  
+                results.image(selected_index),  
+                selected.result,  
                 selected_index,
-                None,
-                st.session_state.validation_results[selected_index]
+                selected.verification,
+                selected.validation
             )
         else:  # bill
             display_bill_result(  
-                st.session_state.document_images[selected_index],  
-                st.session_state.all_results[selected_index],  
+                results.image(selected_index),  
+                selected.result,  
                 selected_index,
-                None,
-                st.session_state.validation_results[selected_index]
+                selected.verification,
+                selected.validation
             )
         
+        # Uploads run in the background; show where the document was archived once they finish
+        selected_urls = selected.s3_urls
+        if selected_urls["document"].done():
+            stored = [url for url in (resolve_url(selected_urls["document"], timeout=0),
+                                      resolve_url(selected_urls["signature"], timeout=0)) if url]
+            if stored:
+                st.caption("Stored at " + " · ".join(stored))
+        else:
+            st.caption("⏳ Uploading to S3...")
+        
         # Summary statistics
-        cheque_count = st.session_state.document_types.count("cheque")
-        bill_count = st.session_state.document_types.count("bill")
-        st.success(f"✅ Successfully processed {len(st.session_state.all_results)} documents: {cheque_count} cheques, {bill_count} bills")  
+        cheque_count = results.doc_types.count("cheque")
+        bill_count = results.doc_types.count("bill")
+        st.success(f"✅ Successfully processed {len(results)} documents: {cheque_count} cheques, {bill_count} bills")  
         
         # Action buttons  
         col1, col2 = st.columns(2)  
         
         with col1:  
-            # Create empty sonnet results list to match the length of all_results
-            empty_sonnet_results = [None] * len(st.session_state.all_results)
-            
-            excel_file = to_excel(
-                st.session_state.all_results,
-                empty_sonnet_results,
-                st.session_state.validation_results,
-                st.session_state.document_types
-            )  
-            
-            # Upload Excel to S3 when generating
-            excel_s3_url = upload_excel_to_s3(excel_file)
+            # Rows are only built for newly processed documents, and the workbook is rendered
+            # and archived to S3 once per report version rather than on every rerun
+            report = st.session_state.report
+            report.sync(results.results, results.validations, results.doc_types, results.verifications)
+            excel_file = report.to_excel()
+            excel_s3_url = report.upload_once(upload_excel_to_s3)
             
             st.download_button(  
                 label="📥 Download All Data (Excel)",  
@@ -1192,4 +537,48 @@ if uploaded_files:
         with col2:  
             if st.button("🔄 Clear All Data", key="clear_btn"):  
                 reset_session_state()
-                st.rerun()
\ No newline at end of file
+                st.rerun()
+
+# --- Performance Panel ---
+# Rendered last so it includes this run's processing, report build and uploads
+with st.sidebar.expander("⏱️ Performance (current batch)"):
+    metrics = get_metrics()
+    snapshot = metrics.snapshot()
+    if snapshot["stages"]:
+        stage_df = pd.DataFrame.from_dict(snapshot["stages"], orient="index").sort_values("total_seconds", ascending=False)
+        st.dataframe(stage_df)
+        st.caption("Stages nest: 'document' spans the whole per-document path, and each model stage includes its "
+                   "rate_limit_wait, bedrock_invoke and backoff_sleep time. time_to_first_field is measured from "
+                   "the start of the same model stage, so it compares directly with that stage's total.")
+        st.caption(f"Model requests: {metrics.counter_total('bedrock_requests'):g} · "
+                   f"Retries: {metrics.counter_total('bedrock_retries'):g} · "
+                   f"Throttles: {metrics.counter_total('bedrock_throttles'):g} · "
+                   f"Tokens in/out: {metrics.counter_total('bedrock_input_tokens'):g}/"
+                   f"{metrics.counter_total('bedrock_output_tokens'):g} · "
+                   f"Streams stopped early: {metrics.counter_total('bedrock_stream_aborts'):g}")
+        classifier_stats = preclassifier_report(metrics)
+        if classifier_stats["decided"] or classifier_stats["deferred"]:
+            saved = classifier_stats["seconds_saved"]
+            st.caption(f"Pre-classifier: {classifier_stats['decided']} decided locally, "
+                       f"{classifier_stats['deferred']} sent to the model "
+                       f"({classifier_stats['hit_rate'] * 100:.0f}% hit rate) · "
+                       f"Detect time saved: {f'~{saved:.1f}s' if saved is not None else 'n/a'}")
+        # Pool figures cover this process since it started, not just the current batch
+        pools = connection_pool_stats()
+        if pools:
+            st.caption("Connections (peak in use / pool size, saturated checkouts): " + " · ".join(
+                f"{service} {stats['peak_in_use']}/{stats['size']}, {stats['saturated']}"
+                for service, stats in sorted(pools.items())
+            ))
+        st.download_button("📈 Prometheus metrics", metrics.to_prometheus(), file_name="extractor_metrics.prom",
+                           mime="text/plain")
+        st.download_button("🧾 Stage spans (JSON lines)", metrics.to_jsonl(), file_name="extractor_spans.jsonl",
+                           mime="application/json")
+    else:
+        st.caption("No documents processed in this batch yet")
+
+# --- Job Polling ---
+# Rerun while this session's documents are still with the workers, so results appear as they finish
+if queue_mode and st.session_state.get("jobs_pending"):
+    time.sleep(JOB_POLL_SECONDS)
+    st.rerun()
@@ -0,0 +1,27 @@
+import os
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from extractor.clients import set_client
+from extractor.rate_limiter import AdaptiveRateLimiter
+
+@pytest.fixture
+def bedrock_client(monkeypatch):
+    """Install a stand-in Bedrock runtime client for one test: bedrock_client(fake)
+
+    Calls go through a fresh limiter that never makes them wait, so throttles recorded by one test do not slow
+    the next.
+    """
+    monkeypatch.setattr("extractor.bedrock._rate_limiter",
+                        AdaptiveRateLimiter(requests_per_second=1000, tokens_per_minute=10 ** 9, max_rate=1000))
+    yield lambda client: set_client('bedrock-runtime', client)
+    set_client('bedrock-runtime', None)
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    """Retry failed Bedrock calls straight away"""
+    monkeypatch.setattr("extractor.bedrock.exponential_backoff_delay", lambda *args, **kwargs: 0.0)
@@ -0,0 +1,159 @@
+import io
+import json
+import os
+import struct
+
+import pytest
+from PIL import Image
+
+from extractor.batch import (
+    LocalBatchInference, LocalObjectStore, build_batch_record, collect_batch_results, run_batch, submit_batch,
+    wait_for_batch
+)
+from extractor.document import PreparedDocument
+from extractor.ingest import expand_pages
+
+S3_URI = "s3://local-batch/jobs"
+
+# --- Local Bedrock Stand-In ---
+class FakeRuntime:
+    """Answers each unified extraction request with the account number of the image it carries"""
+
+    def __init__(self, accounts, failing=()):
+        self.accounts = accounts
+        self.failing = set(failing)
+        self.calls = 0
+
+    def invoke_model(self, modelId, body):
+        self.calls += 1
+        content = json.loads(body)["messages"][0]["content"]
+        account = self.accounts[next(block["source"]["data"] for block in content if block["type"] == "image")]
+        if account in self.failing:
+            raise RuntimeError("ModelErrorException: could not process the image")
+        answer = {"document_type": "cheque", "is_valid": True,
+                  "fields": {"bank": "State Bank of India", "account_number": account, "amount": "1500"}}
+        result = {"content": [{"type": "text", "text": json.dumps(answer)}]}
+        return {"body": io.BytesIO(json.dumps(result).encode())}
+
+def write_tiff(path, colours, damaged_frame=None):
+    """Multi-frame TIFF, optionally with one frame's strip pointing past the end of the file"""
+    frames = [Image.new("RGB", (320, 140), colour) for colour in colours]
+    buffer = io.BytesIO()
+    frames[0].save(buffer, format="TIFF", save_all=True, append_images=frames[1:])
+    data = buffer.getvalue()
+    if damaged_frame is not None:
+        image = Image.open(io.BytesIO(data))
+        image.seek(damaged_frame)
+        data = data.replace(struct.pack("<I", image.tag_v2[273][0]), struct.pack("<I", 10 ** 9))
+    with open(path, "wb") as out:
+        out.write(data)
+
+@pytest.fixture
+def cheques(tmp_path):
+    """Six cheque images and the account number each should come back with"""
+    sources, accounts = [], {}
+    for i in range(6):
+        path = str(tmp_path / f"cheque-{i}.png")
+        image = Image.new("RGB", (320, 140), (40 * i, 255 - 40 * i, 128))
+        image.save(path)
+        sources.append(path)
+        accounts[PreparedDocument(image).model_payload] = f"1000{i}"
+    return sources, accounts
+
+def accounts_of(records):
+    return [(record["result"] or {}).get("account_number") for record in records]
+
+def test_outputs_come_back_in_submission_order(tmp_path, bedrock_client, cheques):
+    sources, accounts = cheques
+    bedrock_client(FakeRuntime(accounts))
+    records = run_batch(sources, str(tmp_path / "state.json"), local_root=str(tmp_path / "store"), poll_seconds=0.01)
+    assert [record["source"] for record in records] == sources
+    assert accounts_of(records) == [f"1000{i}" for i in range(6)]
+    assert all(record["error"] is None and record["doc_type"] == "cheque" for record in records)
+
+def test_failed_record_becomes_an_error_row(tmp_path, bedrock_client, cheques):
+    sources, accounts = cheques
+    bedrock_client(FakeRuntime(accounts, failing={"10002"}))
+    records = run_batch(sources, str(tmp_path / "state.json"), local_root=str(tmp_path / "store"), poll_seconds=0.01)
+    assert accounts_of(records) == ["10000", "10001", None, "10003", "10004", "10005"]
+    assert "could not process the image" in records[2]["error"]
+    assert [record["error"] for i, record in enumerate(records) if i != 2] == [None] * 5
+
+def test_records_are_split_across_input_files(tmp_path, bedrock_client, cheques):
+    sources, accounts = cheques
+    bedrock_client(FakeRuntime(accounts))
+    store = LocalObjectStore(str(tmp_path / "store"))
+    client = LocalBatchInference(store)
+    with Image.open(sources[0]) as image:
+        record_bytes = len(json.dumps(build_batch_record("00000000", PreparedDocument(image.convert("RGB"))))) + 1
+    # Room for two records per file, but not three
+    job = submit_batch(sources, "sharded", S3_URI, role_arn="role", client=client, store=store,
+                       max_file_mb=2.5 * record_bytes / 1024 / 1024)
+    assert job["input_files"] == {
+        "records-00000.jsonl": ["00000000", "00000001"],
+        "records-00001.jsonl": ["00000002", "00000003"],
+        "records-00002.jsonl": ["00000004", "00000005"],
+    }
+    assert wait_for_batch(job["job_arn"], client=client, poll_seconds=0.01) == "Completed"
+    outputs = [uri.rsplit("/", 1)[-1] for uri in store.list(job["output_uri"])]
+    assert sorted(outputs) == sorted([f"{name}.out" for name in job["input_files"]] + ["manifest.json.out"])
+    assert accounts_of(collect_batch_results(job, store=store)) == [f"1000{i}" for i in range(6)]
+
+def test_missing_output_file_is_reported_for_its_records(tmp_path, bedrock_client, cheques):
+    sources, accounts = cheques
+    bedrock_client(FakeRuntime(accounts))
+    store = LocalObjectStore(str(tmp_path / "store"))
+    client = LocalBatchInference(store)
+    job = submit_batch(sources, "partial", S3_URI, role_arn="role", client=client, store=store)
+    wait_for_batch(job["job_arn"], client=client, poll_seconds=0.01)
+    job["input_files"]["records-00001.jsonl"] = ["00000099"]
+    job["sources"]["00000099"] = "lost.png"
+    records = collect_batch_results(job, store=store)
+    assert records[-1]["error"] == "No batch output for input file records-00001.jsonl"
+
+def test_interrupted_run_resumes_the_submitted_job(tmp_path, bedrock_client, cheques):
+    sources, accounts = cheques
+    runtime = FakeRuntime(accounts)
+    bedrock_client(runtime)
+    state_path, local_root = str(tmp_path / "state.json"), str(tmp_path / "store")
+    first = run_batch(sources, state_path, local_root=local_root, poll_seconds=0.01)
+    with open(state_path, encoding='utf-8') as state:
+        job = json.load(state)
+
+    # A finished job is collected again without another submission or model call
+    assert run_batch(sources, state_path, local_root=local_root, poll_seconds=0.01) == first
+    assert runtime.calls == 6
+    with open(state_path, encoding='utf-8') as state:
+        assert json.load(state)["job_arn"] == job["job_arn"]
+
+    # A job the stand-in had not finished when its process stopped is picked up and completed
+    job_record = os.path.join(local_root, ".jobs", f"{job['job_arn'].rsplit('/', 1)[-1]}.json")
+    with open(job_record, encoding='utf-8') as record:
+        description = json.load(record)
+    with open(job_record, "w", encoding='utf-8') as record:
+        json.dump({**description, "status": "InProgress"}, record)
+    store = LocalObjectStore(local_root)
+    for uri in store.list(job["output_uri"]):
+        os.remove(store._path(uri))
+    assert accounts_of(run_batch(sources, state_path, local_root=local_root, poll_seconds=0.01)) == \
+        accounts_of(first)
+    assert runtime.calls == 12
+
+def test_corrupt_page_is_reported_without_stopping_the_batch(tmp_path, bedrock_client, cheques):
+    sources, accounts = cheques
+    colours = [(200, 30, 30), (30, 30, 200)]
+    write_tiff(tmp_path / "scan.tif", colours, damaged_frame=1)
+    with Image.open(tmp_path / "scan.tif") as scan:
+        accounts[PreparedDocument(scan.copy().convert("RGB")).model_payload] = "20001"
+    unreadable = tmp_path / "unreadable.png"
+    unreadable.write_bytes(b"not an image")
+    bedrock_client(FakeRuntime(accounts))
+
+    keys = expand_pages(sources[:2] + [str(tmp_path / "scan.tif"), str(unreadable)] + sources[2:])
+    records = run_batch(keys, str(tmp_path / "state.json"), local_root=str(tmp_path / "store"), poll_seconds=0.01)
+    by_source = {os.path.basename(record["source"]): record for record in records}
+    assert [record["source"] for record in records] == keys
+    assert by_source["scan.tif#page=1"]["result"]["account_number"] == "20001"
+    assert "truncated" in by_source["scan.tif#page=2"]["error"]
+    assert "cannot identify image file" in by_source["unreadable.png"]["error"]
+    assert accounts_of(records[:2] + records[-4:]) == [f"1000{i}" for i in range(6)]
@@ -0,0 +1,103 @@
+import io
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from extractor import bedrock
+from extractor.bedrock import LatencyTracker, invoke_model_stream_with_retry, invoke_model_with_retry
+
+MODEL_ID = "test-model"
+BODY = {"max_tokens": 100, "messages": [{"role": "user", "content": [{"type": "text", "text": "hello"}]}]}
+
+# --- Local Bedrock Stand-In ---
+class SlowFirstClient:
+    """Holds the first request for `delay` seconds and answers every later one at once"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def invoke_model(self, modelId, body):
+        with self._lock:
+            self.calls += 1
+            first = self.calls == 1
+        if first:
+            time.sleep(self.delay)
+        result = {"content": [{"type": "text", "text": "first" if first else "later"}]}
+        return {"body": io.BytesIO(json.dumps(result).encode())}
+
+class SlowStreamClient:
+    """Streams two pieces of text `gap` seconds apart, starting `gap` seconds after each request is sent"""
+
+    def __init__(self, gap):
+        self.gap = gap
+        self.calls = 0
+
+    def invoke_model_with_response_stream(self, modelId, body):
+        self.calls += 1
+        return {"body": self._events()}
+
+    def _events(self):
+        for text in ("hel", "lo"):
+            time.sleep(self.gap)
+            delta = {"type": "content_block_delta", "delta": {"type": "text_delta", "text": text}}
+            yield {"chunk": {"bytes": json.dumps(delta).encode()}}
+
+@pytest.fixture
+def tracker(monkeypatch):
+    latency_tracker = LatencyTracker(min_samples=1)
+    monkeypatch.setattr(bedrock, "_latency_tracker", latency_tracker)
+    return latency_tracker
+
+@pytest.fixture
+def call_pool(monkeypatch):
+    """A one-thread call pool, so a test can keep requests waiting for it"""
+    pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bedrock-call")
+    monkeypatch.setattr(bedrock, "_call_pool", pool)
+    yield pool
+    pool.shutdown(wait=True)
+
+def kind_of(body):
+    return MODEL_ID, False, body.get("max_tokens")
+
+# --- Hedged Requests ---
+def test_hedge_win_records_the_primary_elapsed_time(monkeypatch, bedrock_client, tracker):
+    monkeypatch.setattr(bedrock, "BEDROCK_HEDGE_ENABLED", True)
+    tracker.record(kind_of(BODY), 0.05)
+    client = SlowFirstClient(delay=0.5)
+    bedrock_client(client)
+
+    result = invoke_model_with_retry(MODEL_ID, BODY)
+    assert result["content"][0]["text"] == "later"
+    assert client.calls == 2
+    # The hedge answered just after 0.05s from the primary being sent; its own latency would be close to zero
+    _, recorded = tracker._samples[kind_of(BODY)]
+    assert recorded >= 0.05
+
+# --- Deadlines ---
+def test_time_queued_for_a_thread_does_not_count_against_the_deadline(monkeypatch, bedrock_client, tracker,
+                                                                      call_pool):
+    monkeypatch.setattr(bedrock, "BEDROCK_CALL_TIMEOUT", 0.2)
+    client = SlowFirstClient(delay=0)
+    bedrock_client(client)
+    # An abandoned request still holding the only thread for longer than a whole deadline
+    call_pool.submit(time.sleep, 0.4)
+
+    assert invoke_model_with_retry(MODEL_ID, BODY, max_retries=1)["content"][0]["text"] == "first"
+    assert client.calls == 1
+
+def test_hedge_queued_behind_the_winner_is_never_sent(monkeypatch, bedrock_client, tracker, call_pool):
+    monkeypatch.setattr(bedrock, "BEDROCK_HEDGE_ENABLED", True)
+    tracker.record((MODEL_ID, True, BODY["max_tokens"]), 0.05)
+    client = SlowStreamClient(gap=0.2)
+    bedrock_client(client)
+
+    # The hedge waits for the only thread, which the primary holds until its stream ends
+    result = invoke_model_stream_with_retry(MODEL_ID, BODY, lambda text: False)
+    assert result["content"][0]["text"] == "hello"
+    call_pool.submit(lambda: None).result()
+    assert client.calls == 1
@@ -0,0 +1,23 @@
+import sys
+
+import pytest
+
+from extractor import cli
+
+@pytest.fixture
+def no_processing(monkeypatch):
+    """Fail the test if the run gets as far as reading its inputs"""
+    monkeypatch.setattr(cli, "collect_sources", lambda inputs: pytest.fail("inputs read before the output was checked"))
+
+def test_parquet_output_without_pyarrow_is_rejected_up_front(monkeypatch, capsys, tmp_path, no_processing):
+    monkeypatch.setitem(sys.modules, "pyarrow", None)
+    with pytest.raises(SystemExit) as exit_info:
+        cli.main([str(tmp_path), "-o", str(tmp_path / "results.parquet")])
+    assert exit_info.value.code == 2
+    assert "Parquet output needs pyarrow" in capsys.readouterr().err
+
+def test_unsupported_output_is_rejected_up_front(capsys, tmp_path, no_processing):
+    with pytest.raises(SystemExit) as exit_info:
+        cli.main([str(tmp_path), "-o", str(tmp_path / "results.txt")])
+    assert exit_info.value.code == 2
+    assert "Unsupported output format '.txt'" in capsys.readouterr().err
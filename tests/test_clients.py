@@ -0,0 +1,50 @@
+import logging
+
+import pytest
+
+from config.config import BEDROCK_MAX_CONNECTIONS
+from extractor import clients
+
+boto3 = pytest.importorskip("boto3")
+
+@pytest.fixture
+def fresh_clients(monkeypatch):
+    """Real boto3 clients with dummy credentials, kept apart from the process-wide ones"""
+    monkeypatch.setattr(clients, "_session", boto3.session.Session(
+        region_name="us-east-1", aws_access_key_id="test", aws_secret_access_key="test"))
+    monkeypatch.setattr(clients, "_clients", {})
+    monkeypatch.setattr(clients, "_pool_managers", {})
+    monkeypatch.setattr(clients, "_pool_stats", {})
+
+def test_botocore_still_exposes_the_pool_manager(fresh_clients):
+    # The pool metrics depend on botocore internals; this fails if an upgrade moves them
+    client = clients.get_bedrock_client()
+    manager = clients._pool_managers.get("bedrock-runtime")
+    assert manager is client._endpoint.http_session._manager
+    assert hasattr(manager, "pools")
+
+def test_requests_are_sampled_as_they_are_sent(fresh_clients):
+    from botocore.awsrequest import AWSResponse
+
+    client = clients.get_bedrock_client()
+    answered = []
+
+    def answer_locally(request, **kwargs):
+        answered.append(request.url)
+        return AWSResponse(request.url, 200, {}, None)
+
+    # Registered after the pool sampler, so the request is sampled and then answered without reaching the network
+    client.meta.events.register('before-send', answer_locally)
+    client.invoke_model(modelId="test-model", body=b"{}")
+    assert len(answered) == 1
+    stats = clients.connection_pool_stats()["bedrock-runtime"]
+    assert stats["requests"] == 1 and stats["size"] == BEDROCK_MAX_CONNECTIONS
+
+def test_missing_pool_manager_is_reported(fresh_clients, caplog):
+    class OtherClient:
+        pass
+
+    with caplog.at_level(logging.WARNING, logger="extractor.clients"):
+        clients._instrument_pools(OtherClient(), "bedrock-runtime")
+    assert "Connection pool metrics are off for bedrock-runtime" in caplog.text
+    assert "bedrock-runtime" not in clients._pool_managers
@@ -0,0 +1,155 @@
+import io
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from PIL import Image
+
+from extractor.extraction import extract_documents_batch, match_batch_entries
+from extractor.microbatch import MicroBatcher
+
+def cheque_entry(index, account):
+    return {"index": index, "is_valid": True, "fields": {"bank": "SBI", "account_number": account}}
+
+# --- Local Bedrock Stand-In ---
+class FakeBatchClient:
+    """Answers invoke_model with a fixed JSON array (or error), recording how many images each request carried"""
+
+    def __init__(self, answer=None, error=None):
+        self.answer = answer
+        self.error = error
+        self.images = []
+
+    def invoke_model(self, modelId, body):
+        content = json.loads(body)["messages"][0]["content"]
+        self.images.append(sum(block["type"] == "image" for block in content))
+        if self.error is not None:
+            raise self.error
+        result = {"content": [{"type": "text", "text": json.dumps(self.answer)}],
+                  "usage": {"input_tokens": 100, "output_tokens": 50}}
+        return {"body": io.BytesIO(json.dumps(result).encode())}
+
+@pytest.fixture
+def images():
+    return [Image.new("RGB", (320, 140), (255, 255 - 40 * i, 255)) for i in range(4)]
+
+def submit_all(batcher: MicroBatcher, items):
+    with ThreadPoolExecutor(max_workers=len(items)) as executor:
+        return list(executor.map(batcher.submit, items))
+
+# --- Matching Batch Answers ---
+def test_entries_are_matched_by_index_not_position():
+    entries = [{"index": 2, "v": "c"}, {"index": 0, "v": "a"}, {"index": "1", "v": "b"}]
+    assert match_batch_entries(entries, 3) == {0: entries[1], 1: entries[2], 2: entries[0]}
+
+def test_duplicated_index_drops_both_answers():
+    entries = [{"index": 0, "v": "a"}, {"index": 1, "v": "b"}, {"index": 1, "v": "b2"}, {"index": 1, "v": "b3"}]
+    assert match_batch_entries(entries, 2) == {0: entries[0]}
+
+def test_missing_merged_and_stray_entries_are_left_out():
+    entries = [
+        {"index": 0, "v": "a"},
+        {"index": "1-2", "v": "merged"},
+        {"index": [1, 2], "v": "merged"},
+        {"index": 7, "v": "out of range"},
+        {"index": -1, "v": "out of range"},
+        {"v": "no index"},
+        "not an object",
+    ]
+    assert match_batch_entries(entries, 4) == {0: entries[0]}
+
+def test_batch_answer_is_keyed_by_image_position(bedrock_client, images):
+    client = FakeBatchClient(answer=[
+        cheque_entry(3, "3333"), cheque_entry(0, "0000"), cheque_entry(2, "2222"), cheque_entry(2, "2222"),
+    ])
+    bedrock_client(client)
+    answers = extract_documents_batch(images, "cheque")
+    assert client.images == [4]
+    assert sorted(answers) == [0, 3]
+    assert answers[0]["account_number"] == "0000"
+    assert answers[3]["account_number"] == "3333"
+
+def test_failed_batch_call_answers_nothing(bedrock_client, images):
+    bedrock_client(FakeBatchClient(error=ValueError("ValidationException: too many images")))
+    assert extract_documents_batch(images, "cheque") == {}
+
+# --- Micro-Batcher ---
+def test_full_batch_makes_one_call_and_falls_back_for_missing_items():
+    calls = []
+    fallbacks = []
+
+    def run_batch(items):
+        calls.append(list(items))
+        return {slot: f"batched {item}" for slot, item in enumerate(items) if item != "b"}
+
+    def fallback(item):
+        fallbacks.append((item, threading.current_thread()))
+        return f"single {item}"
+
+    def submit(item):
+        return batcher.submit(item), threading.current_thread()
+
+    batcher = MicroBatcher(run_batch, fallback, batch_size=3, max_wait=10)
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        results = list(executor.map(submit, ["a", "b", "c"]))
+    assert [result for result, _ in results] == ["batched a", "single b", "batched c"]
+    assert len(calls) == 1 and sorted(calls[0]) == ["a", "b", "c"]
+    # The left-out item is extracted on its own submitting thread
+    assert fallbacks == [("b", results[1][1])]
+
+def test_partial_batch_is_sent_when_max_wait_runs_out():
+    calls = []
+
+    def run_batch(items):
+        calls.append(list(items))
+        return {slot: f"batched {item}" for slot, item in enumerate(items)}
+
+    batcher = MicroBatcher(run_batch, lambda item: f"single {item}", batch_size=4, max_wait=0.05)
+    assert submit_all(batcher, ["a", "b"]) == ["batched a", "batched b"]
+    assert len(calls) == 1 and sorted(calls[0]) == ["a", "b"]
+
+def test_lone_item_is_not_batched():
+    calls = []
+    batcher = MicroBatcher(lambda items: calls.append(items) or {0: "batched"}, lambda item: f"single {item}",
+                           batch_size=4, max_wait=0.01)
+    assert batcher.submit("a") == "single a"
+    assert calls == []
+
+def test_batch_size_one_calls_fallback_directly():
+    batcher = MicroBatcher(lambda items: pytest.fail("run_batch called"), lambda item: f"single {item}",
+                           batch_size=1, max_wait=10)
+    assert submit_all(batcher, ["a", "b"]) == ["single a", "single b"]
+
+def test_batch_error_reaches_every_submitter():
+    def run_batch(items):
+        raise RuntimeError("batch failed")
+
+    batcher = MicroBatcher(run_batch, lambda item: f"single {item}", batch_size=2, max_wait=10)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [executor.submit(batcher.submit, item) for item in ("a", "b")]
+        for future in futures:
+            with pytest.raises(RuntimeError, match="batch failed"):
+                future.result()
+
+def test_failed_batch_request_falls_back_to_single_calls(bedrock_client, images):
+    client = FakeBatchClient(error=ValueError("ValidationException: too many images"))
+    bedrock_client(client)
+    singles = []
+
+    def fallback(image):
+        singles.append(image)
+        return {"account_number": "single"}
+
+    batcher = MicroBatcher(lambda docs: extract_documents_batch(docs, "cheque"), fallback, batch_size=4, max_wait=10)
+    assert submit_all(batcher, images) == [{"account_number": "single"}] * 4
+    assert client.images == [4]
+    assert len(singles) == 4
+
+def test_batcher_mixes_batched_and_single_answers(bedrock_client, images):
+    # The fake cannot tell the images apart, so it answers two of the four slots; the rest fall back
+    bedrock_client(FakeBatchClient(answer=[cheque_entry(1, "1111"), cheque_entry(0, "0000")]))
+    batcher = MicroBatcher(lambda docs: extract_documents_batch(docs, "cheque"),
+                           lambda image: {"account_number": "single"}, batch_size=4, max_wait=10)
+    results = submit_all(batcher, images)
+    assert sorted(result["account_number"] for result in results) == ["0000", "1111", "single", "single"]
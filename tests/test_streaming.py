@@ -0,0 +1,189 @@
+import json
+
+import pytest
+
+from extractor.bedrock import StreamInterruptedError, invoke_model_stream_with_retry
+from extractor.extraction import rejects_document, request_json
+from extractor.streaming import JsonFieldStream
+
+MODEL_ID = "test-model"
+BODY = {"max_tokens": 200, "messages": [{"role": "user", "content": [{"type": "text", "text": "Extract"}]}]}
+
+def feed_all(parser: JsonFieldStream, chunks):
+    completed = []
+    for chunk in chunks:
+        completed.extend(parser.feed(chunk))
+    return completed
+
+def split(text: str, size: int):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+# --- Local Bedrock Stand-In ---
+def _event(chunk):
+    return {"chunk": {"bytes": json.dumps(chunk).encode()}}
+
+class FakeEventStream:
+    """Response stream of invoke_model_with_response_stream, optionally dropping the connection part way"""
+
+    def __init__(self, texts, fail_after=None):
+        self.texts = texts
+        self.fail_after = fail_after
+        self.closed = False
+
+    def __iter__(self):
+        yield _event({"type": "message_start", "message": {"usage": {"input_tokens": 100}}})
+        for sent, text in enumerate(self.texts):
+            if sent == self.fail_after:
+                raise ConnectionError("Connection reset by peer")
+            yield _event({"type": "content_block_delta", "delta": {"type": "text_delta", "text": text}})
+        yield _event({"type": "message_delta", "delta": {"stop_reason": "end_turn"}, "usage": {"output_tokens": 20}})
+
+    def close(self):
+        self.closed = True
+
+class FakeStreamingClient:
+    """Answers each streamed call with the next of the given event streams"""
+
+    def __init__(self, *streams):
+        self.streams = list(streams)
+        self.calls = 0
+
+    def invoke_model_with_response_stream(self, modelId, body):
+        stream = self.streams[self.calls]
+        self.calls += 1
+        return {"body": stream}
+
+# --- JsonFieldStream ---
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 1000])
+def test_any_chunking_matches_json_loads(size):
+    text = json.dumps({
+        "document_type": "cheque", "is_valid": True,
+        "fields": {"bank": "State Bank", "amount": 1250.5, "payee": None, "tags": ["a", {"b": -3e2}], "empty": {}},
+    })
+    parser = JsonFieldStream()
+    completed = feed_all(parser, split(text, size))
+    assert parser.done and not parser.failed
+    assert parser.value == json.loads(text)
+    assert completed == [
+        ("document_type", "cheque"), ("is_valid", True), ("fields.bank", "State Bank"), ("fields.amount", 1250.5),
+        ("fields.payee", None), ("fields.tags.0", "a"), ("fields.tags.1.b", -300.0),
+    ]
+
+def test_member_is_reported_when_its_string_closes():
+    parser = JsonFieldStream()
+    assert parser.feed('{"ba') == []
+    assert parser.feed('nk": "HD') == []
+    assert parser.feed('FC", ') == [("bank", "HDFC")]
+
+def test_escapes_split_across_chunks():
+    parser = JsonFieldStream()
+    completed = feed_all(parser, ['{"payee": "A \\', '"Q\\', '" Rao\\u00', 'e9\\\\', '", "n": 1}'])
+    assert completed == [("payee", 'A "Q" Raoé\\'), ("n", 1)]
+
+def test_literals_split_across_chunks():
+    parser = JsonFieldStream()
+    completed = feed_all(parser, ['{"a": 12', '50, "b": tr', 'ue, "c": nu', 'll, "d": fal', 'se}'])
+    assert completed == [("a", 1250), ("b", True), ("c", None), ("d", False)]
+    assert parser.done
+
+def test_literal_is_only_reported_once_it_ends():
+    # "12" may still become "125", so the number waits for the delimiter
+    parser = JsonFieldStream()
+    assert parser.feed('{"amount": 12') == []
+    assert parser.feed('5}') == [("amount", 125)]
+
+def test_text_around_the_object_is_ignored():
+    parser = JsonFieldStream()
+    completed = feed_all(parser, ['Here is the JSON: ', '{"a": "x"}', '\nI hope this helps {"b": 2}'])
+    assert completed == [("a", "x")]
+    assert parser.done and parser.value == {"a": "x"}
+    assert parser.feed('{"c": 3}') == []
+
+def test_truncated_stream_keeps_completed_members():
+    parser = JsonFieldStream()
+    feed_all(parser, ['{"a": "x", "nested": {"b": 1, ', '"c": "unfinis'])
+    assert not parser.done and not parser.failed
+    assert parser.value == {"a": "x", "nested": {"b": 1}}
+
+@pytest.mark.parametrize("text, value", [
+    ('{"a": tru}', {}),
+    ('{"a": 1, 2}', {"a": 1}),
+    ('{"a": "x", "b": -}', {"a": "x"}),
+    ('{"a": 01x}', {}),
+])
+def test_malformed_input_stops_the_parser(text, value):
+    parser = JsonFieldStream()
+    parser.feed(text)
+    assert parser.failed and not parser.done
+    assert parser.value == value
+    assert parser.feed(', "z": 9}') == []
+
+# --- Streamed Requests ---
+def test_complete_answer_returns_text_and_reports_fields(bedrock_client):
+    chunks = ['{"document_type": "cheque", ', '"is_valid": true, "fields": {"bank": "S', 'BI"}}']
+    bedrock_client(FakeStreamingClient(FakeEventStream(chunks)))
+    fields = []
+    text, partial = request_json(MODEL_ID, BODY, on_field=lambda name, value: fields.append((name, value)),
+                                 reject=rejects_document)
+    assert text == "".join(chunks)
+    assert partial is None
+    assert fields == [("document_type", "cheque"), ("is_valid", True), ("bank", "SBI")]
+
+@pytest.mark.parametrize("chunks, partial", [
+    (['{"document_type": "oth', 'er", "is_valid"', ': false, "fields": {"bank": "SBI"}}'],
+     {"document_type": "other"}),
+    (['{"document_type": "bill", ', '"is_valid": false,', ' "fields": {"vendor_name": "X"}}'],
+     {"document_type": "bill", "is_valid": False}),
+])
+def test_rejected_document_aborts_the_stream(bedrock_client, chunks, partial):
+    bedrock_client(FakeStreamingClient(FakeEventStream(chunks)))
+    text, read = request_json(MODEL_ID, BODY, reject=rejects_document)
+    assert read == partial
+    # Nothing after the chunk that settled the verdict is handed on
+    assert text == "".join(chunks[:2])
+
+def test_broken_stream_without_reset_is_not_retried(bedrock_client, no_backoff):
+    client = FakeStreamingClient(FakeEventStream(['{"a": ', '1, "b": 2}'], fail_after=1),
+                                 FakeEventStream(['{"a": 1, "b": 2}']))
+    bedrock_client(client)
+    received = []
+    with pytest.raises(StreamInterruptedError):
+        invoke_model_stream_with_retry(MODEL_ID, BODY, lambda text: received.append(text) and False)
+    assert client.calls == 1
+    assert received == ['{"a": ']
+
+def test_stream_failing_before_any_text_is_retried(bedrock_client, no_backoff):
+    client = FakeStreamingClient(FakeEventStream(['{"a": 1}'], fail_after=0), FakeEventStream(['{"a": 1}']))
+    bedrock_client(client)
+    response = invoke_model_stream_with_retry(MODEL_ID, BODY, lambda text: False)
+    assert client.calls == 2
+    assert response["content"][0]["text"] == '{"a": 1}'
+
+def test_broken_stream_is_retried_after_reset(bedrock_client, no_backoff):
+    client = FakeStreamingClient(FakeEventStream(['{"a": ', '1, "b": 2}'], fail_after=1),
+                                 FakeEventStream(['{"a": 1, ', '"b": 2}']))
+    bedrock_client(client)
+    received, resets = [], []
+
+    def on_text(text):
+        received.append(text)
+        return False
+
+    response = invoke_model_stream_with_retry(MODEL_ID, BODY, on_text, on_reset=lambda: resets.append(len(received)))
+    assert client.calls == 2
+    assert resets == [1]
+    assert response["content"][0]["text"] == '{"a": 1, "b": 2}'
+    assert received == ['{"a": ', '{"a": 1, ', '"b": 2}']
+
+def test_request_json_restarts_parsing_on_retry(bedrock_client, no_backoff):
+    # The first attempt breaks off inside a key; parsing the retry on top of it would fail or misplace fields
+    bedrock_client(FakeStreamingClient(
+        FakeEventStream(['{"document_type": "cheque", "is_va', 'lid": true}'], fail_after=1),
+        FakeEventStream(['{"document_type": "cheque", ', '"is_valid": false,', ' "fields": {}}']),
+    ))
+    fields = []
+    text, partial = request_json(MODEL_ID, BODY, on_field=lambda name, value: fields.append((name, value)),
+                                 reject=rejects_document)
+    assert partial == {"document_type": "cheque", "is_valid": False}
+    assert text == '{"document_type": "cheque", "is_valid": false,'
+    assert fields == [("document_type", "cheque"), ("document_type", "cheque"), ("is_valid", False)]
@@ -0,0 +1,59 @@
+import pandas as pd
+import pytest
+
+from extractor.validation import (
+    AMOUNT_NOT_NUMBER_MESSAGE, AMOUNT_NOT_POSITIVE_MESSAGE, reconcile_results, validate_bill_data, validate_bill_frame
+)
+
+AMOUNTS = [
+    ("1500", True, ""),
+    ("1500.00", True, ""),
+    (" 0.50 ", True, ""),
+    (".5", True, ""),
+    (1250, True, ""),
+    (0.5, True, ""),
+    ("0.00", False, AMOUNT_NOT_POSITIVE_MESSAGE),
+    ("-10", False, AMOUNT_NOT_POSITIVE_MESSAGE),
+    (0, False, AMOUNT_NOT_POSITIVE_MESSAGE),
+    ("1_000", False, AMOUNT_NOT_NUMBER_MESSAGE),
+    ("1,000", False, AMOUNT_NOT_NUMBER_MESSAGE),
+    ("1e3", False, AMOUNT_NOT_NUMBER_MESSAGE),
+    ("abc", False, AMOUNT_NOT_NUMBER_MESSAGE),
+    (True, False, AMOUNT_NOT_NUMBER_MESSAGE),
+    (float("nan"), False, AMOUNT_NOT_NUMBER_MESSAGE),
+    (float("inf"), False, AMOUNT_NOT_NUMBER_MESSAGE),
+]
+
+@pytest.mark.parametrize("amount, valid, message", AMOUNTS)
+def test_amount_rule(amount, valid, message):
+    check = validate_bill_data({"total_amount": amount})["total_amount"]
+    assert check["valid"] is valid
+    assert check["message"] == message
+
+def test_frame_amount_rule_matches_per_record_rule():
+    # A NaN cell in a frame is an empty cell, which is not checked
+    amounts = [case for case in AMOUNTS if case[0] == case[0]]
+    checked = validate_bill_frame(pd.DataFrame({"total_amount": [amount for amount, _, _ in amounts]}))
+    assert checked["total_amount_valid"].tolist() == [valid for _, valid, _ in amounts]
+    assert checked["total_amount_message"].tolist() == [message for _, _, message in amounts]
+
+def test_boolean_column_is_not_an_amount():
+    checked = validate_bill_frame(pd.DataFrame({"total_amount": [True, False]}))
+    assert checked["total_amount_valid"].tolist() == [False, False]
+    assert checked["total_amount_message"].tolist() == [AMOUNT_NOT_NUMBER_MESSAGE] * 2
+
+@pytest.mark.parametrize("haiku, sonnet, kept", [
+    ("1500.00", "abc", "haiku"),
+    ("abc", "1500.00", "sonnet"),
+    ("1200.00", "1500.00", "sonnet"),
+    ("abc", "xyz", "haiku"),
+])
+def test_reconcile_keeps_haiku_unless_sonnet_passes(haiku, sonnet, kept):
+    merged, verification = reconcile_results({"total_amount": haiku}, {"total_amount": sonnet}, "bill")
+    assert verification["discrepancies"]["total_amount"]["kept"] == kept
+    assert merged["total_amount"] == (haiku if kept == "haiku" else sonnet)
+
+def test_reconcile_takes_sonnet_for_fields_without_a_rule():
+    merged, verification = reconcile_results({"customer_name": "A Rao"}, {"customer_name": "A. Rao & Co"}, "bill")
+    assert verification["discrepancies"]["customer_name"]["kept"] == "sonnet"
+    assert merged["customer_name"] == "A. Rao & Co"
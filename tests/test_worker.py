@@ -0,0 +1,90 @@
+import io
+import struct
+
+import pytest
+from PIL import Image
+
+from extractor import worker
+from extractor.ingest import DocumentDecodeError, DocumentPage, iter_page_outcomes
+from extractor.jobs import JobQueue
+from extractor.worker import JobWorker, process_job
+
+FRAME_SIZE = (200, 100)
+COLOURS = [(255, 0, 0), (0, 255, 0), (0, 0, 255)]
+
+def tiff_bytes(damaged_frame=None) -> bytes:
+    """Uncompressed three-frame TIFF, optionally with one frame's strip pointing past the end of the file"""
+    frames = [Image.new("RGB", FRAME_SIZE, colour) for colour in COLOURS]
+    buffer = io.BytesIO()
+    frames[0].save(buffer, format="TIFF", save_all=True, append_images=frames[1:])
+    data = buffer.getvalue()
+    if damaged_frame is not None:
+        image = Image.open(io.BytesIO(data))
+        image.seek(damaged_frame)
+        offset = struct.pack("<I", image.tag_v2[273][0])
+        assert data.count(offset) == 1
+        data = data.replace(offset, struct.pack("<I", 10 ** 9))
+    return data
+
+@pytest.fixture
+def queue(tmp_path):
+    job_queue = JobQueue(path=str(tmp_path / "jobs.db"), spool_dir=str(tmp_path / "spool"), max_attempts=3)
+    yield job_queue
+    job_queue.close()
+
+@pytest.fixture
+def analyzed(monkeypatch):
+    """Replace model calls and uploads with an outcome naming the page's colour"""
+    monkeypatch.setattr(worker, "process_page",
+                        lambda page, doc_id: {"doc_type": "cheque", "colour": page.image.getpixel((0, 0))})
+
+def claimed(queue: JobQueue, name: str, data: bytes):
+    queue.enqueue("session", name, data)
+    return queue.claim("test-worker")
+
+# --- Page Decoding ---
+def test_damaged_page_is_skipped():
+    outcomes = list(iter_page_outcomes(io.BytesIO(tiff_bytes(damaged_frame=1)), name="scan.tif"))
+    assert [(page, pages) for page, pages, _ in outcomes] == [(1, 3), (2, 3), (3, 3)]
+    assert isinstance(outcomes[0][2], DocumentPage) and outcomes[0][2].image.getpixel((0, 0)) == COLOURS[0]
+    assert isinstance(outcomes[1][2], Exception)
+    assert isinstance(outcomes[2][2], DocumentPage) and outcomes[2][2].image.getpixel((0, 0)) == COLOURS[2]
+
+def test_unreadable_file_raises_decode_error():
+    with pytest.raises(DocumentDecodeError, match="scan.tif"):
+        list(iter_page_outcomes(io.BytesIO(b"not an image"), name="scan.tif"))
+
+# --- Jobs ---
+def test_damaged_page_becomes_an_error_entry(queue, analyzed):
+    outcome = process_job(queue, claimed(queue, "scan.tif", tiff_bytes(damaged_frame=1)), threads=2)
+    pages = outcome["pages"]
+    assert [page["page"] for page in pages] == [1, 2, 3]
+    assert [page["label"] for page in pages] == [f"scan.tif (page {n}/3)" for n in (1, 2, 3)]
+    assert pages[0]["colour"] == COLOURS[0] and "thumbnail" in pages[0]
+    assert "truncated" in pages[1]["error"]
+    assert pages[2]["colour"] == COLOURS[2]
+
+def test_unreadable_upload_fails_without_retry(queue, analyzed):
+    job = claimed(queue, "scan.tif", b"not an image")
+    JobWorker(queue, worker_id="test-worker").run_job(job)
+    (stored,) = queue.session_jobs("session")
+    assert stored.status == "failed" and stored.attempts == 1
+    assert "Could not read scan.tif" in stored.error
+
+def test_transient_error_is_retried(queue, monkeypatch):
+    def lost_connection(queue, job, threads=1):
+        raise ConnectionError("Connection reset by peer")
+
+    monkeypatch.setattr(worker, "process_job", lost_connection)
+    JobWorker(queue, worker_id="test-worker").run_job(claimed(queue, "a.png", b"..."))
+    (stored,) = queue.session_jobs("session")
+    assert stored.status == "queued"
+
+def test_unexpected_error_is_not_retried(queue, monkeypatch):
+    def bug(queue, job, threads=1):
+        raise KeyError("doc_type")
+
+    monkeypatch.setattr(worker, "process_job", bug)
+    JobWorker(queue, worker_id="test-worker").run_job(claimed(queue, "a.png", b"..."))
+    (stored,) = queue.session_jobs("session")
+    assert stored.status == "failed"